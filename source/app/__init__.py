@@ -25,8 +25,10 @@ from flask import session
 from flask_bcrypt import Bcrypt
 from flask_caching import Cache
 from flask_login import LoginManager
+from flask_login import current_user
 from flask_marshmallow import Marshmallow
 from flask_socketio import SocketIO, Namespace
+from flask_socketio import join_room
 from flask_sqlalchemy import SQLAlchemy
 from functools import partial
 from sqlalchemy_imageattach.stores.fs import HttpExposedFileSystemStore
@@ -49,7 +51,24 @@ class ReverseProxied(object):
 
 
 class AlertsNamespace(Namespace):
-    pass
+    def on_connect(self):
+        # Each user joins its own room, where the progress of the batch actions it started is sent
+        if current_user.is_authenticated:
+            join_room(alerts_user_room(current_user.id))
+
+
+def alerts_user_room(user_id):
+    return f'alerts-user-{user_id}'
+
+
+def user_room(user_id):
+    return f'user-{user_id}'
+
+
+def _join_user_room():
+    # Each user joins its own room, where the progress of the background tasks it started is sent
+    if current_user.is_authenticated:
+        join_room(user_room(current_user.id))
 
 
 APP_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -98,6 +117,12 @@ app.config.from_object('app.configuration.Config')
 
 cache = Cache(app)
 
+case_access_cache = Cache(app, config={
+    'CACHE_TYPE': 'SimpleCache' if app.config.get('CASE_ACCESS_CACHE_TIMEOUT') else 'NullCache',
+    'CACHE_DEFAULT_TIMEOUT': app.config.get('CASE_ACCESS_CACHE_TIMEOUT'),
+    'CACHE_THRESHOLD': app.config.get('CASE_ACCESS_CACHE_THRESHOLD')
+})
+
 SQLALCHEMY_ENGINE_OPTIONS = {
     "json_deserializer": partial(json.loads, object_pairs_hook=collections.OrderedDict),
     "pool_pre_ping": True
@@ -124,10 +149,11 @@ store = HttpExposedFileSystemStore(
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1)
 app.wsgi_app = store.wsgi_middleware(app.wsgi_app)
 
-socket_io = SocketIO(app, cors_allowed_origins="*")
+socket_io = SocketIO(app, cors_allowed_origins="*", message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE'))
 
 alerts_namespace = AlertsNamespace('/alerts')
 socket_io.on_namespace(alerts_namespace)
+socket_io.on_event('connect', _join_user_room)
 
 oidc_client = None
 if app.config.get('AUTHENTICATION_TYPE') == "oidc":
@@ -139,3 +165,6 @@ def shutdown_session(exception=None):
 
 
 from app import views
+from app.iris_engine.utils.tracker import flush_request_activities
+
+app.teardown_request(flush_request_activities)
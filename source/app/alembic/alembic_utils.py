@@ -30,4 +30,13 @@ def _has_table(table_name):
     )
     inspector = reflection.Inspector.from_engine(engine)
     tables = inspector.get_table_names()
-    return table_name in tables
\ No newline at end of file
+    return table_name in tables
+
+def _has_index(table_name, index_name):
+    config = op.get_context().config
+    engine = engine_from_config(
+        config.get_section(config.config_ini_section), prefix="sqlalchemy."
+    )
+    inspector = reflection.Inspector.from_engine(engine)
+    indexes = inspector.get_indexes(table_name)
+    return index_name in [index['name'] for index in indexes]
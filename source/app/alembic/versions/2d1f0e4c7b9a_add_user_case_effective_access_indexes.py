@@ -0,0 +1,33 @@
+"""Add user case effective access indexes
+
+Revision ID: 2d1f0e4c7b9a
+Revises: a3c5e0f1b2d4
+Create Date: 2024-06-07 14:26:03.513370
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _has_index
+
+# revision identifiers, used by Alembic.
+revision = '2d1f0e4c7b9a'
+down_revision = 'a3c5e0f1b2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Access checks look up a single (user, case) pair, and case deletion / listing filter on the case alone
+    if not _has_index('user_case_effective_access', 'ix_user_case_effective_access_user_case'):
+        op.create_index('ix_user_case_effective_access_user_case', 'user_case_effective_access',
+                        ['user_id', 'case_id'])
+
+    if not _has_index('user_case_effective_access', 'ix_user_case_effective_access_case'):
+        op.create_index('ix_user_case_effective_access_case', 'user_case_effective_access', ['case_id'])
+
+    return
+
+
+def downgrade():
+    op.drop_index('ix_user_case_effective_access_case', table_name='user_case_effective_access')
+    op.drop_index('ix_user_case_effective_access_user_case', table_name='user_case_effective_access')
@@ -0,0 +1,60 @@
+"""Add alerts filtering indexes
+
+Revision ID: 7a4f2c9d1e3b
+Revises: 2d1f0e4c7b9a
+Create Date: 2024-06-12 09:41:27.208614
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _has_index
+
+# revision identifiers, used by Alembic.
+revision = '7a4f2c9d1e3b'
+down_revision = '2d1f0e4c7b9a'
+branch_labels = None
+depends_on = None
+
+
+_btree_indexes = [
+    # The alerts list is ordered on the event time and paginated on (event time, ID)
+    ('alerts', 'ix_alerts_source_event_time_id', ['alert_source_event_time', 'alert_id']),
+    ('alerts', 'ix_alerts_customer_source_event_time', ['alert_customer_id', 'alert_source_event_time', 'alert_id']),
+    ('alerts', 'ix_alerts_status_source_event_time', ['alert_status_id', 'alert_source_event_time']),
+    ('alerts', 'ix_alerts_severity_source_event_time', ['alert_severity_id', 'alert_source_event_time']),
+    ('alerts', 'ix_alerts_owner_source_event_time', ['alert_owner_id', 'alert_source_event_time']),
+    ('alerts', 'ix_alerts_creation_time', ['alert_creation_time']),
+    # The similarity cache is purged by alert. Asset names and IOC values are unbounded, a b-tree cannot index them
+    ('similar_alerts_cache', 'ix_similar_alerts_cache_alert', ['alert_id'])
+]
+
+# Columns filtered with ilike '%value%', which only a trigram index can serve
+_trigram_indexes = [
+    ('alerts', 'ix_alerts_title_trgm', 'alert_title'),
+    ('alerts', 'ix_alerts_description_trgm', 'alert_description'),
+    ('alerts', 'ix_alerts_source_trgm', 'alert_source'),
+    ('alerts', 'ix_alerts_tags_trgm', 'alert_tags')
+]
+
+
+def upgrade():
+    for table_name, index_name, columns in _btree_indexes:
+        if not _has_index(table_name, index_name):
+            op.create_index(index_name, table_name, columns)
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for table_name, index_name, column in _trigram_indexes:
+        if not _has_index(table_name, index_name):
+            op.create_index(index_name, table_name, [column], postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'})
+
+    return
+
+
+def downgrade():
+    for table_name, index_name, _ in reversed(_trigram_indexes):
+        op.drop_index(index_name, table_name=table_name)
+
+    for table_name, index_name, _ in reversed(_btree_indexes):
+        op.drop_index(index_name, table_name=table_name)
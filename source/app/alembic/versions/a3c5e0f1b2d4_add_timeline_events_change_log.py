@@ -0,0 +1,39 @@
+"""Add timeline events change log
+
+Revision ID: a3c5e0f1b2d4
+Revises: 11aa5b725b8e
+Create Date: 2024-06-03 10:12:45.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.alembic.alembic_utils import _has_table
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e0f1b2d4'
+down_revision = '11aa5b725b8e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not _has_table('case_events_change'):
+        op.create_table('case_events_change',
+                        sa.Column('id', sa.BigInteger, primary_key=True),
+                        sa.Column('case_id', sa.BigInteger, sa.ForeignKey('cases.case_id'), nullable=False),
+                        sa.Column('event_id', sa.BigInteger, nullable=False),
+                        sa.Column('change_type', sa.Text, nullable=False),
+                        sa.Column('object_state', sa.BigInteger, nullable=False),
+                        sa.Column('change_date', sa.TIMESTAMP)
+                        )
+
+        op.create_index('ix_case_events_change_case_state', 'case_events_change', ['case_id', 'object_state'])
+
+    return
+
+
+def downgrade():
+    if _has_table('case_events_change'):
+        op.drop_index('ix_case_events_change_case_state', table_name='case_events_change')
+        op.drop_table('case_events_change')
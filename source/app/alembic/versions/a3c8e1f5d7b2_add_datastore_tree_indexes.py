@@ -0,0 +1,37 @@
+"""Add datastore tree indexes
+
+Revision ID: a3c8e1f5d7b2
+Revises: f2b9d4e7a1c6
+Create Date: 2024-07-05 16:44:08.512736
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _has_index
+
+# revision identifiers, used by Alembic.
+revision = 'a3c8e1f5d7b2'
+down_revision = 'f2b9d4e7a1c6'
+branch_labels = None
+depends_on = None
+
+
+# The tree is listed by case, and each folder lists its children by parent
+_indexes = [
+    ('data_store_path', 'ix_data_store_path_case_parent', ['path_case_id', 'path_parent_id']),
+    ('data_store_file', 'ix_data_store_file_parent_id', ['file_parent_id']),
+    ('data_store_file', 'ix_data_store_file_case_id', ['file_case_id'])
+]
+
+
+def upgrade():
+    for table_name, index_name, columns in _indexes:
+        if not _has_index(table_name, index_name):
+            op.create_index(index_name, table_name, columns)
+
+    return
+
+
+def downgrade():
+    for table_name, index_name, _ in reversed(_indexes):
+        op.drop_index(index_name, table_name=table_name)
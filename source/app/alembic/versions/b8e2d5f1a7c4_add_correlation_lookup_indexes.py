@@ -0,0 +1,64 @@
+"""Add correlation lookup indexes
+
+Revision ID: b8e2d5f1a7c4
+Revises: 7a4f2c9d1e3b
+Create Date: 2024-06-14 16:02:51.734190
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _has_index
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2d5f1a7c4'
+down_revision = '7a4f2c9d1e3b'
+branch_labels = None
+depends_on = None
+
+
+# Assets names and IOCs values are only looked up by equality. Hash indexes are used as a b-tree entry cannot hold
+# the longest IOC values, which would make their insertion fail
+_hash_indexes = [
+    ('similar_alerts_cache', 'ix_similar_alerts_cache_asset_name', 'asset_name'),
+    ('similar_alerts_cache', 'ix_similar_alerts_cache_ioc_value', 'ioc_value'),
+    ('case_assets', 'ix_case_assets_asset_name', 'asset_name'),
+    ('ioc', 'ix_ioc_ioc_value', 'ioc_value')
+]
+
+# B-tree indexes on the same lookups, created by early development versions of 7a4f2c9d1e3b, are replaced by the
+# hash indexes. They are not created again on downgrade, as they cannot hold the longest values
+_replaced_btree_indexes = [
+    ('similar_alerts_cache', 'ix_similar_alerts_cache_customer_asset', ['customer_id', 'asset_name']),
+    ('similar_alerts_cache', 'ix_similar_alerts_cache_customer_ioc', ['customer_id', 'ioc_value'])
+]
+
+# The related alerts graph expands from the IOCs of the cases
+_btree_indexes = [
+    ('ioc_link', 'ix_ioc_link_ioc_id', ['ioc_id']),
+    ('ioc_link', 'ix_ioc_link_case_id', ['case_id'])
+]
+
+
+def upgrade():
+    # Dropped first, so no long IOC value can fail to be inserted in them
+    for table_name, index_name, _ in _replaced_btree_indexes:
+        if _has_index(table_name, index_name):
+            op.drop_index(index_name, table_name=table_name)
+
+    for table_name, index_name, column in _hash_indexes:
+        if not _has_index(table_name, index_name):
+            op.create_index(index_name, table_name, [column], postgresql_using='hash')
+
+    for table_name, index_name, columns in _btree_indexes:
+        if not _has_index(table_name, index_name):
+            op.create_index(index_name, table_name, columns)
+
+    return
+
+
+def downgrade():
+    for table_name, index_name, _ in reversed(_btree_indexes):
+        op.drop_index(index_name, table_name=table_name)
+
+    for table_name, index_name, _ in reversed(_hash_indexes):
+        op.drop_index(index_name, table_name=table_name)
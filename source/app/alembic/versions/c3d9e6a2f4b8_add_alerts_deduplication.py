@@ -0,0 +1,49 @@
+"""Add alerts deduplication
+
+Revision ID: c3d9e6a2f4b8
+Revises: b8e2d5f1a7c4
+Create Date: 2024-06-18 10:41:12.518334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.alembic.alembic_utils import _has_index
+from app.alembic.alembic_utils import _table_has_column
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9e6a2f4b8'
+down_revision = 'b8e2d5f1a7c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not _table_has_column('alerts', 'alert_fingerprint'):
+        op.add_column('alerts',
+                      sa.Column('alert_fingerprint', sa.Text(), nullable=True)
+                      )
+
+    if not _table_has_column('alerts', 'alert_occurrences'):
+        op.add_column('alerts',
+                      sa.Column('alert_occurrences', sa.Integer(), nullable=False, server_default=sa.text('1'))
+                      )
+
+    if not _table_has_column('alerts', 'alert_last_seen_time'):
+        op.add_column('alerts',
+                      sa.Column('alert_last_seen_time', sa.DateTime(), nullable=True)
+                      )
+
+    # Duplicates are looked up by client and fingerprint, within the deduplication window
+    if not _has_index('alerts', 'ix_alerts_customer_fingerprint_last_seen'):
+        op.create_index('ix_alerts_customer_fingerprint_last_seen', 'alerts',
+                        ['alert_customer_id', 'alert_fingerprint', 'alert_last_seen_time'])
+
+    return
+
+
+def downgrade():
+    op.drop_index('ix_alerts_customer_fingerprint_last_seen', table_name='alerts')
+    op.drop_column('alerts', 'alert_last_seen_time')
+    op.drop_column('alerts', 'alert_occurrences')
+    op.drop_column('alerts', 'alert_fingerprint')
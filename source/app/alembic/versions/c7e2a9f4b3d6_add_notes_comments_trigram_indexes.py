@@ -0,0 +1,39 @@
+"""Add notes and comments trigram indexes
+
+Revision ID: c7e2a9f4b3d6
+Revises: a3c8e1f5d7b2
+Create Date: 2024-07-08 10:21:37.904518
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _has_index
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a9f4b3d6'
+down_revision = 'a3c8e1f5d7b2'
+branch_labels = None
+depends_on = None
+
+
+# Notes and comments searched with the % wildcard are matched with LIKE, which only a trigram index can serve
+_trigram_indexes = [
+    ('notes', 'ix_notes_content_trgm', 'note_content'),
+    ('comments', 'ix_comments_text_trgm', 'comment_text')
+]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for table_name, index_name, column in _trigram_indexes:
+        if not _has_index(table_name, index_name):
+            op.create_index(index_name, table_name, [column], postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'})
+
+    return
+
+
+def downgrade():
+    for table_name, index_name, _ in reversed(_trigram_indexes):
+        op.drop_index(index_name, table_name=table_name)
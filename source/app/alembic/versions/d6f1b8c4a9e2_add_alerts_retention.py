@@ -0,0 +1,45 @@
+"""Add alerts retention
+
+Revision ID: d6f1b8c4a9e2
+Revises: c3d9e6a2f4b8
+Create Date: 2024-06-21 09:12:37.904215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.alembic.alembic_utils import _has_index
+from app.alembic.alembic_utils import _has_table
+
+# revision identifiers, used by Alembic.
+revision = 'd6f1b8c4a9e2'
+down_revision = 'c3d9e6a2f4b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Expired cache entries are purged by creation date
+    if not _has_index('similar_alerts_cache', 'ix_similar_alerts_cache_created_at'):
+        op.create_index('ix_similar_alerts_cache_created_at', 'similar_alerts_cache', ['created_at'])
+
+    if not _has_table('alerts_archive'):
+        op.create_table('alerts_archive',
+                        sa.Column('alert_id', sa.BigInteger, primary_key=True),
+                        sa.Column('alert_uuid', UUID(as_uuid=True), nullable=False),
+                        sa.Column('alert_customer_id', sa.BigInteger, nullable=False),
+                        sa.Column('alert_source_event_time', sa.DateTime, nullable=False),
+                        sa.Column('alert_data', JSONB, nullable=False),
+                        sa.Column('archived_at', sa.DateTime, nullable=False, server_default=sa.text("now()"))
+                        )
+
+        op.create_index('ix_alerts_archive_alert_customer_id', 'alerts_archive', ['alert_customer_id'])
+
+    return
+
+
+def downgrade():
+    op.drop_table('alerts_archive')
+    op.drop_index('ix_similar_alerts_cache_created_at', table_name='similar_alerts_cache')
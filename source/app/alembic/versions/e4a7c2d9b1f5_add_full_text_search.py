@@ -0,0 +1,73 @@
+"""Add full-text search
+
+Revision ID: e4a7c2d9b1f5
+Revises: d6f1b8c4a9e2
+Create Date: 2024-06-26 14:03:51.617402
+
+"""
+from alembic import op
+
+from app.alembic.alembic_utils import _has_index
+from app.alembic.alembic_utils import _table_has_column
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2d9b1f5'
+down_revision = 'd6f1b8c4a9e2'
+branch_labels = None
+depends_on = None
+
+
+# Same expression as app.models.models.search_vector_column, kept literal so the migration does not change with it
+_search_vector_max_length = 262144
+
+_search_vectors = [
+    ('notes', 'ix_notes_search_vector', [('note_title', 'A'), ('note_content', 'B')]),
+    ('comments', 'ix_comments_search_vector', [('comment_text', 'A')]),
+    ('cases_events', 'ix_cases_events_search_vector', [('event_title', 'A'), ('event_content', 'B'),
+                                                       ('event_tags', 'C')]),
+    ('alerts', 'ix_alerts_search_vector', [('alert_title', 'A'), ('alert_description', 'B'), ('alert_tags', 'C')])
+]
+
+# IOCs and assets are searched with LIKE and user provided wildcards, which only a trigram index can serve
+_trigram_indexes = [
+    ('ioc', 'ix_ioc_value_trgm', 'ioc_value'),
+    ('case_assets', 'ix_case_assets_name_trgm', 'asset_name'),
+    ('case_assets', 'ix_case_assets_ip_trgm', 'asset_ip')
+]
+
+
+def _search_vector_expression(weighted_columns):
+    return ' || '.join(
+        f"setweight(to_tsvector('simple'::regconfig, left(coalesce({column_name}, ''), "
+        f"{_search_vector_max_length})), '{weight}')"
+        for column_name, weight in weighted_columns
+    )
+
+
+def upgrade():
+    for table_name, index_name, weighted_columns in _search_vectors:
+        if not _table_has_column(table_name, 'search_vector'):
+            # The generated column is computed for the existing rows when added
+            op.execute(f'ALTER TABLE {table_name} ADD COLUMN search_vector tsvector '
+                       f'GENERATED ALWAYS AS ({_search_vector_expression(weighted_columns)}) STORED')
+
+        if not _has_index(table_name, index_name):
+            op.create_index(index_name, table_name, ['search_vector'], postgresql_using='gin')
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for table_name, index_name, column in _trigram_indexes:
+        if not _has_index(table_name, index_name):
+            op.create_index(index_name, table_name, [column], postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'})
+
+    return
+
+
+def downgrade():
+    for table_name, index_name, _ in reversed(_trigram_indexes):
+        op.drop_index(index_name, table_name=table_name)
+
+    for table_name, index_name, _ in reversed(_search_vectors):
+        op.drop_index(index_name, table_name=table_name)
+        op.drop_column(table_name, 'search_vector')
@@ -0,0 +1,132 @@
+"""Compress note revisions
+
+Revision ID: f2b9d4e7a1c6
+Revises: e4a7c2d9b1f5
+Create Date: 2024-07-02 10:27:14.381950
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.alembic.alembic_utils import _has_index
+from app.alembic.alembic_utils import _table_has_column
+from app.iris_engine.utils.text_delta import apply_text_delta
+from app.iris_engine.utils.text_delta import encode_text_versions
+
+# revision identifiers, used by Alembic.
+revision = 'f2b9d4e7a1c6'
+down_revision = 'e4a7c2d9b1f5'
+branch_labels = None
+depends_on = None
+
+
+# Same default as IRIS_NOTE_REVISIONS_SNAPSHOT_INTERVAL
+_snapshot_interval = 20
+_notes_batch_size = 500
+
+_t_note_revisions = sa.Table(
+    'note_revisions',
+    sa.MetaData(),
+    sa.Column('revision_id', sa.BigInteger, primary_key=True),
+    sa.Column('note_id', sa.BigInteger),
+    sa.Column('revision_number', sa.Integer),
+    sa.Column('note_content', sa.Text),
+    sa.Column('note_content_delta', sa.Text),
+    sa.Column('snapshot_revision_id', sa.BigInteger)
+)
+
+
+def _get_notes_batches(conn):
+    note_ids = [row.note_id for row in conn.execute(
+        sa.select(_t_note_revisions.c.note_id).group_by(_t_note_revisions.c.note_id).having(sa.func.count() > 1)
+    )]
+
+    for i in range(0, len(note_ids), _notes_batch_size):
+        yield note_ids[i:i + _notes_batch_size]
+
+
+def _get_revisions(conn, note_ids):
+    revisions_by_note = {}
+    for row in conn.execute(
+        sa.select(_t_note_revisions).where(
+            _t_note_revisions.c.note_id.in_(note_ids)
+        ).order_by(_t_note_revisions.c.note_id, _t_note_revisions.c.revision_number,
+                   _t_note_revisions.c.revision_id)
+    ):
+        revisions_by_note.setdefault(row.note_id, []).append(row)
+
+    return revisions_by_note
+
+
+def upgrade():
+    if not _table_has_column('note_revisions', 'note_content_delta'):
+        op.add_column('note_revisions', sa.Column('note_content_delta', sa.Text, nullable=True))
+
+    # Revisions refer to their snapshot by primary key, revision numbers are not unique
+    if not _table_has_column('note_revisions', 'snapshot_revision_id'):
+        op.add_column('note_revisions', sa.Column('snapshot_revision_id', sa.BigInteger,
+                                                  sa.ForeignKey('note_revisions.revision_id'), nullable=True))
+
+    if not _has_index('note_revisions', 'ix_note_revisions_note_id_revision_number'):
+        op.create_index('ix_note_revisions_note_id_revision_number', 'note_revisions',
+                        ['note_id', 'revision_number'])
+
+    if not _has_index('note_revisions', 'ix_note_revisions_snapshot_revision_id'):
+        op.create_index('ix_note_revisions_snapshot_revision_id', 'note_revisions', ['snapshot_revision_id'])
+
+    # Existing revisions are full copies, encoded again as snapshots and deltas, note by note
+    conn = op.get_bind()
+    update_revision = _t_note_revisions.update().where(
+        _t_note_revisions.c.revision_id == sa.bindparam('b_revision_id')
+    ).values(
+        note_content=None,
+        note_content_delta=sa.bindparam('b_delta'),
+        snapshot_revision_id=sa.bindparam('b_snapshot')
+    )
+
+    for note_ids in _get_notes_batches(conn):
+        updates = []
+        for revisions in _get_revisions(conn, note_ids).values():
+            if any(row.snapshot_revision_id is not None for row in revisions):
+                continue
+
+            encoded = encode_text_versions([(row.revision_id, row.note_content) for row in revisions],
+                                           _snapshot_interval)
+            for row, (_, snapshot_revision_id, _, delta) in zip(revisions, encoded):
+                if snapshot_revision_id is not None:
+                    updates.append({'b_revision_id': row.revision_id, 'b_delta': delta,
+                                    'b_snapshot': snapshot_revision_id})
+
+        if updates:
+            conn.execute(update_revision, updates)
+
+    return
+
+
+def downgrade():
+    conn = op.get_bind()
+    update_revision = _t_note_revisions.update().where(
+        _t_note_revisions.c.revision_id == sa.bindparam('b_revision_id')
+    ).values(
+        note_content=sa.bindparam('b_content')
+    )
+
+    for note_ids in _get_notes_batches(conn):
+        updates = []
+        for revisions in _get_revisions(conn, note_ids).values():
+            snapshots = {row.revision_id: row.note_content for row in revisions
+                         if row.snapshot_revision_id is None}
+
+            for row in revisions:
+                if row.snapshot_revision_id is not None and snapshots.get(row.snapshot_revision_id) is not None:
+                    updates.append({'b_revision_id': row.revision_id,
+                                    'b_content': apply_text_delta(snapshots[row.snapshot_revision_id],
+                                                                  row.note_content_delta)})
+
+        if updates:
+            conn.execute(update_revision, updates)
+
+    op.drop_index('ix_note_revisions_snapshot_revision_id', table_name='note_revisions')
+    op.drop_index('ix_note_revisions_note_id_revision_number', table_name='note_revisions')
+    op.drop_column('note_revisions', 'snapshot_revision_id')
+    op.drop_column('note_revisions', 'note_content_delta')
@@ -17,6 +17,7 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import json
 import marshmallow
+import uuid
 from datetime import datetime
 from flask import Blueprint, request, render_template, redirect, url_for
 from flask_login import current_user
@@ -26,17 +27,25 @@ from werkzeug import Response
 
 import app
 from app import db
+from app import ac_current_user_has_permission
 from app.blueprints.case.case_comments import case_comment_update
+from app.business.alerts import run_batch_action
+from app.business.errors import BusinessProcessingError, PermissionDeniedError
 from app.datamgmt.alerts.alerts_db import get_filtered_alerts, get_alert_by_id, create_case_from_alert
 from app.datamgmt.alerts.alerts_db import merge_alert_in_case, unmerge_alert_from_case, cache_similar_alert
 from app.datamgmt.alerts.alerts_db import get_related_alerts, get_related_alerts_details
 from app.datamgmt.alerts.alerts_db import get_alert_comments, delete_alert_comment, get_alert_comment
 from app.datamgmt.alerts.alerts_db import delete_similar_alert_cache, delete_alerts
-from app.datamgmt.alerts.alerts_db import create_case_from_alerts
+from app.datamgmt.alerts.alerts_db import add_alerts_batch, get_alerts_invalid_references, deduplicate_alerts
+from app.datamgmt.alerts.alerts_db import ALERTS_COUNT_MODES
+from app.datamgmt.alerts.alerts_db import SIMILAR_ALERTS_CACHE_FIELDS, refresh_similar_alerts_cache
 from app.datamgmt.case.case_db import get_case
 from app.datamgmt.manage.manage_access_control_db import check_ua_case_client, user_has_client_access
+from app.datamgmt.manage.manage_access_control_db import get_user_clients_id
+from app.datamgmt.manage.manage_tags_db import add_db_tags
 from app.iris_engine.access_control.utils import ac_set_new_case_access
 from app.iris_engine.module_handler.module_handler import call_modules_hook
+from app.iris_engine.tasker.tasks import task_alerts_batch
 from app.iris_engine.utils.tracker import track_activity
 from app.models.alerts import AlertStatus
 from app.models.authorization import Permissions
@@ -67,6 +76,12 @@ def alerts_list_route() -> Response:
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
 
+    # Set the cursor, even empty for the first page, to paginate on the alerts event time rather than page numbers
+    cursor = request.args.get('cursor')
+    count_mode = request.args.get('count', 'exact')
+    if count_mode not in ALERTS_COUNT_MODES:
+        return response_error(f'Invalid count mode, expecting one of {", ".join(ALERTS_COUNT_MODES)}')
+
     alert_ids_str = request.args.get('alert_ids')
     alert_ids = None
     if alert_ids_str:
@@ -111,28 +126,34 @@ def alerts_list_route() -> Response:
 
     alert_schema = AlertSchema()
 
-    filtered_data = get_filtered_alerts(
-        start_date=request.args.get('source_start_date'),
-        end_date=request.args.get('source_end_date'),
-        title=request.args.get('alert_title'),
-        description=request.args.get('alert_description'),
-        status=request.args.get('alert_status_id', type=int),
-        severity=request.args.get('alert_severity_id', type=int),
-        owner=request.args.get('alert_owner_id', type=int),
-        source=request.args.get('alert_source'),
-        tags=request.args.get('alert_tags'),
-        classification=request.args.get('alert_classification_id', type=int),
-        client=request.args.get('alert_customer_id'),
-        case_id=request.args.get('case_id', type=int),
-        alert_ids=alert_ids,
-        page=page,
-        per_page=per_page,
-        sort=request.args.get('sort'),
-        assets=alert_assets,
-        iocs=alert_iocs,
-        resolution_status=request.args.get('alert_resolution_id', type=int),
-        current_user_id=current_user.id
-    )
+    try:
+        filtered_data = get_filtered_alerts(
+            start_date=request.args.get('source_start_date'),
+            end_date=request.args.get('source_end_date'),
+            title=request.args.get('alert_title'),
+            description=request.args.get('alert_description'),
+            status=request.args.get('alert_status_id', type=int),
+            severity=request.args.get('alert_severity_id', type=int),
+            owner=request.args.get('alert_owner_id', type=int),
+            source=request.args.get('alert_source'),
+            tags=request.args.get('alert_tags'),
+            classification=request.args.get('alert_classification_id', type=int),
+            client=request.args.get('alert_customer_id'),
+            case_id=request.args.get('case_id', type=int),
+            alert_ids=alert_ids,
+            page=page,
+            per_page=per_page,
+            sort=request.args.get('sort'),
+            assets=alert_assets,
+            iocs=alert_iocs,
+            resolution_status=request.args.get('alert_resolution_id', type=int),
+            current_user_id=current_user.id,
+            cursor=cursor,
+            count_mode=count_mode
+        )
+
+    except ValueError:
+        return response_error('Invalid cursor')
 
     if filtered_data is None:
         return response_error('Filtering error')
@@ -143,6 +164,7 @@ def alerts_list_route() -> Response:
         'last_page': filtered_data.pages,
         'current_page': filtered_data.page,
         'next_page': filtered_data.next_num if filtered_data.has_next else None,
+        'next_cursor': filtered_data.next_cursor,
     }
 
     return response_success(data=alerts)
@@ -190,6 +212,19 @@ def alerts_add_route() -> Response:
         new_alert.iocs = iocs
         new_alert.assets = assets
 
+        if app.app.config.get('ALERTS_DEDUP_ENABLED'):
+            _, folded_into = deduplicate_alerts([new_alert], fields=app.app.config.get('ALERTS_DEDUP_FIELDS'),
+                                                window=app.app.config.get('ALERTS_DEDUP_WINDOW'))
+
+            if folded_into[0] is not None:
+                # The alert repeats an open alert, only its occurrences counter is updated
+                if new_alert in db.session:
+                    db.session.expunge(new_alert)
+                db.session.commit()
+
+                return response_success(msg=f'Alert aggregated into alert #{folded_into[0].alert_id}',
+                                        data=alert_schema.dump(folded_into[0]))
+
         # Add the new alert to the session and commit it
         db.session.add(new_alert)
         db.session.commit()
@@ -220,6 +255,164 @@ def alerts_add_route() -> Response:
         return response_error(str(e))
 
 
+@alerts_blueprint.route('/alerts/batch/add', methods=['POST'])
+@ac_api_requires(Permissions.alerts_write)
+def alerts_batch_add_route() -> Response:
+    """
+    Add multiple alerts to the database in a single transaction.
+    Each alert is validated independently, and the result of each one is returned in the same order.
+
+    args:
+        caseid (str): The case id
+
+    returns:
+        Response: The response
+    """
+    if not request.json:
+        return response_error('No JSON data provided')
+
+    data = request.get_json()
+    alerts_data = data.get('alerts') if isinstance(data, dict) else None
+    if not isinstance(alerts_data, list) or not alerts_data:
+        return response_error('Expecting a non-empty list of alerts in the alerts field')
+
+    max_batch_size = app.app.config.get('ALERTS_BATCH_MAX_SIZE')
+    if len(alerts_data) > max_batch_size:
+        return response_error(f'Too many alerts in the batch, the maximum is {max_batch_size}')
+
+    alert_schema = AlertSchema()
+    ioc_schema = IocSchema()
+    asset_schema = CaseAssetsSchema()
+
+    # Create the tags of the batch at once, so the validation does not create them one by one
+    tags = set()
+    for data in alerts_data:
+        if not isinstance(data, dict):
+            continue
+
+        tags.update(tag.strip() for tag in str(data.get('alert_tags') or '').split(','))
+        for ioc in data.get('alert_iocs') or []:
+            if isinstance(ioc, dict):
+                tags.update(tag.strip() for tag in str(ioc.get('ioc_tags') or '').split(','))
+
+    add_db_tags(tags)
+
+    is_admin = ac_current_user_has_permission(Permissions.server_administrator)
+    user_clients = set() if is_admin else set(get_user_clients_id(current_user.id))
+    creation_time = datetime.utcnow()
+
+    results = [None] * len(alerts_data)
+    new_alerts = []
+    new_alerts_index = []
+
+    for index, data in enumerate(alerts_data):
+        if not isinstance(data, dict):
+            results[index] = {'index': index, 'success': False, 'message': 'Expecting an alert object'}
+            continue
+
+        try:
+            data = dict(data)
+            iocs = ioc_schema.load(data.pop('alert_iocs', []), many=True)
+            assets = asset_schema.load(data.pop('alert_assets', []), many=True)
+
+            new_alert = alert_schema.load(data)
+
+        except marshmallow.exceptions.ValidationError as e:
+            results[index] = {'index': index, 'success': False, 'message': 'Data error', 'errors': e.messages}
+            continue
+
+        if not is_admin and new_alert.alert_customer_id not in user_clients:
+            results[index] = {'index': index, 'success': False,
+                              'message': 'User not entitled to create alerts for the client'}
+            continue
+
+        new_alert.alert_creation_time = creation_time
+        new_alert.iocs = iocs
+        new_alert.assets = assets
+
+        new_alerts.append(new_alert)
+        new_alerts_index.append(index)
+
+    # Check the referenced objects exist, so a single invalid alert does not fail the whole transaction
+    valid_alerts = []
+    valid_alerts_index = []
+    invalid_references = get_alerts_invalid_references(new_alerts)
+    for new_alert, index, invalid_fields in zip(new_alerts, new_alerts_index, invalid_references):
+        if invalid_fields:
+            results[index] = {'index': index, 'success': False,
+                              'message': f"Invalid reference in {', '.join(invalid_fields)}"}
+            continue
+
+        valid_alerts.append(new_alert)
+        valid_alerts_index.append(index)
+
+    added_alerts = []
+    aggregated_count = 0
+    if valid_alerts:
+        try:
+            alerts_to_add = valid_alerts
+            folded_into = [None] * len(valid_alerts)
+            if app.app.config.get('ALERTS_DEDUP_ENABLED'):
+                alerts_to_add, folded_into = deduplicate_alerts(
+                    valid_alerts, fields=app.app.config.get('ALERTS_DEDUP_FIELDS'),
+                    window=app.app.config.get('ALERTS_DEDUP_WINDOW')
+                )
+
+            # Read before the commit expires the alerts repeated by the batch
+            existing_alerts = {id(target): {
+                'alert_id': target.alert_id,
+                'alert_uuid': str(target.alert_uuid),
+                'alert_title': target.alert_title
+            } for target in folded_into if target is not None and target.alert_id is not None}
+
+            for new_alert in alerts_to_add:
+                add_obj_history_entry(new_alert, 'Alert created')
+
+            if alerts_to_add:
+                added_alerts = add_alerts_batch(alerts_to_add)
+            else:
+                db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            app.app.logger.exception(e)
+            return response_error(f'Unable to add the alerts: {e}')
+
+        if alerts_to_add:
+            call_modules_hook('on_postload_alert_create', data=alerts_to_add)
+
+        added_alerts_by_object = {id(new_alert): added_alert for new_alert, added_alert in zip(alerts_to_add,
+                                                                                                added_alerts)}
+
+        for index, target in zip(valid_alerts_index, folded_into):
+            if target is not None:
+                aggregated_count += 1
+                folded_alert = existing_alerts.get(id(target)) or added_alerts_by_object[id(target)]
+                results[index] = {'index': index, 'success': True, 'aggregated': True, **folded_alert}
+
+    for index, added_alert in zip([index for index in valid_alerts_index if results[index] is None], added_alerts):
+        results[index] = {'index': index, 'success': True, **added_alert}
+
+        track_activity(f"created alert #{added_alert['alert_id']} - {added_alert['alert_title']}", ctx_less=True)
+
+    if added_alerts:
+        # Emit a single socket io event for the whole batch
+        app.socket_io.emit('new_alerts', json.dumps({
+            'alert_ids': [added_alert['alert_id'] for added_alert in added_alerts]
+        }), namespace='/alerts')
+
+    failed_count = len(alerts_data) - len(added_alerts) - aggregated_count
+
+    return response_success(msg=f'{len(added_alerts)} alerts added, {aggregated_count} aggregated, '
+                                f'{failed_count} failed',
+                            data={
+                                'created': len(added_alerts),
+                                'aggregated': aggregated_count,
+                                'failed': failed_count,
+                                'results': results
+                            })
+
+
 @alerts_blueprint.route('/alerts/<int:alert_id>', methods=['GET'])
 @ac_api_requires(Permissions.alerts_read)
 def alerts_get_route(alert_id) -> Response:
@@ -286,16 +479,20 @@ def alerts_similarities_route(alert_id) -> Response:
     days_back = request.args.get('days-back', 180, type=int)
     number_of_results = request.args.get('number-of-nodes', 100, type=int)
 
+    depth = request.args.get('depth', 1, type=int)
+
     if number_of_results < 0:
         number_of_results = 100
     if days_back < 0:
         days_back = 180
+    depth = min(max(depth, 1), app.app.config.get('ALERTS_CORRELATION_MAX_DEPTH'))
 
     # Get similar alerts
     similar_alerts = get_related_alerts_details(alert.alert_customer_id, alert.assets, alert.iocs,
                                                 open_alerts=open_alerts, open_cases=open_cases,
                                                 closed_cases=closed_cases, closed_alerts=closed_alerts,
-                                                days_back=days_back, number_of_results=number_of_results)
+                                                days_back=days_back, number_of_results=number_of_results,
+                                                depth=depth)
 
     return response_success(data=similar_alerts)
 
@@ -358,6 +555,10 @@ def alerts_update_route(alert_id) -> Response:
         if data.get('alert_owner_id') is None and updated_alert.alert_owner_id is None:
             updated_alert.alert_owner_id = current_user.id
 
+        # Keep the correlations of the alert up to date
+        if any(field in data for field in SIMILAR_ALERTS_CACHE_FIELDS):
+            refresh_similar_alerts_cache([updated_alert])
+
         # Save the changes
         db.session.commit()
 
@@ -386,74 +587,65 @@ def alerts_update_route(alert_id) -> Response:
         return response_error(str(e))
 
 
-@alerts_blueprint.route('/alerts/batch/update', methods=['POST'])
-@ac_api_requires(Permissions.alerts_write)
-def alerts_batch_update_route() -> Response:
+def _run_alerts_batch(action: str, data: dict) -> Response:
     """
-    Update multiple alerts in the database
+    Run a batch action on alerts, either directly or as a background task when run_async is set
 
     args:
-        caseid (int): The case id
+        action (str): One of update, merge or escalate
+        data (dict): The request payload
 
     returns:
         Response: The response
     """
-    if not request.json:
-        return response_error('No JSON data provided')
-
-    # Load the JSON data from the request
-    data = request.get_json()
-
-    # Get the list of alert IDs and updates from the request data
-    alert_ids: List[int] = data.get('alert_ids', [])
-    updates = data.get('updates', {})
+    if data.get('run_async'):
+        # The user is recorded with the task before it is queued, so the status is only disclosed to it
+        task_id = str(uuid.uuid4())
+        task_alerts_batch.backend.store_result(task_id, {'user_id': current_user.id, 'done': 0, 'total': 0},
+                                               'PENDING')
+        task_alerts_batch.apply_async(kwargs={'action': action, 'user_id': current_user.id, 'payload': data},
+                                      task_id=task_id)
+        track_activity(f"started batch {action} of alerts", ctx_less=True)
 
-    if not updates.get('alert_tags'):
-        updates.pop('alert_tags', None)
+        return response_success(msg=f'Batch {action} queued', data={'task_id': task_id})
 
-    if not alert_ids:
-        return response_error('No alert IDs provided')
-
-    alert_schema = AlertSchema()
-
-    # Process each alert ID
-    for alert_id in alert_ids:
-        alert = get_alert_by_id(alert_id)
-        if not alert:
-            return response_error(f'Alert with ID {alert_id} not found')
-
-        try:
+    try:
+        result = run_batch_action(action, data)
 
-            activity_data = []
-            for key, value in updates.items():
-                old_value = getattr(alert, key, None)
+    except BusinessProcessingError as e:
+        return response_error(e.get_message(), data=e.get_data())
 
-                if old_value != value:
-                    activity_data.append(f"\"{key}\"")
+    except PermissionDeniedError as e:
+        return response_error(str(e), status=403)
 
-            # Check if the user has access to the client
-            if not user_has_client_access(current_user.id, alert.alert_customer_id):
-                return response_error('User not entitled to update alerts for the client', status=403)
+    except Exception as e:
+        app.app.logger.exception(e)
+        db.session.rollback()
+        return response_error(str(e))
 
-            # Deserialize the JSON data into an Alert object
-            alert_schema.load(updates, instance=alert, partial=True)
+    if action == 'update':
+        return response_success(msg='Batch update successful')
 
-            db.session.commit()
+    # Return the updated case as JSON
+    return response_success(data=CaseSchema().dump(result))
 
-            alert = call_modules_hook('on_postload_alert_update', data=alert)
 
-            if activity_data:
-                track_activity(f"updated alert #{alert_id}: {','.join(activity_data)}", ctx_less=True)
-                add_obj_history_entry(alert, f"updated alert: {','.join(activity_data)}")
+@alerts_blueprint.route('/alerts/batch/update', methods=['POST'])
+@ac_api_requires(Permissions.alerts_write)
+def alerts_batch_update_route() -> Response:
+    """
+    Update multiple alerts in the database
 
-            db.session.commit()
+    args:
+        caseid (int): The case id
 
-        except Exception as e:
-            # Handle any errors during deserialization or DB operations
-            return response_error(str(e))
+    returns:
+        Response: The response
+    """
+    if not request.json:
+        return response_error('No JSON data provided')
 
-    # Return a success response
-    return response_success(msg='Batch update successful')
+    return _run_alerts_batch('update', request.get_json())
 
 
 @alerts_blueprint.route('/alerts/batch/delete', methods=['POST'])
@@ -754,68 +946,7 @@ def alerts_batch_merge_route() -> Response:
     if request.json is None:
         return response_error('No JSON data provided')
 
-    data = request.get_json()
-
-    target_case_id = data.get('target_case_id')
-    if target_case_id is None:
-        return response_error('No target case id provided')
-
-    alert_ids = data.get('alert_ids')
-    if not alert_ids:
-        return response_error('No alert ids provided')
-
-    case = get_case(target_case_id)
-    if not case:
-        return response_error('Target case not found')
-
-    iocs_import_list: List[str] = data.get('iocs_import_list')
-    assets_import_list: List[str] = data.get('assets_import_list')
-    note: str = data.get('note')
-    import_as_event: bool = data.get('import_as_event')
-    case_tags = data.get('case_tags')
-
-    # Check if the user has access to the case
-    if not check_ua_case_client(current_user.id, target_case_id):
-        return response_error('User not entitled to merge alerts for the case', status=403)
-
-    try:
-        # Merge the alerts into a case
-        for alert_id in alert_ids.split(','):
-            alert_id = int(alert_id)
-
-            alert = get_alert_by_id(alert_id)
-            if not alert:
-                continue
-
-            # Check if the user has access to the client
-            if not user_has_client_access(current_user.id, alert.alert_customer_id):
-                return response_error('User not entitled to merge alerts for the client', status=403)
-
-            alert.alert_status_id = AlertStatus.query.filter_by(status_name='Merged').first().status_id
-            db.session.commit()
-
-            # Merge alert in the case
-            merge_alert_in_case(alert, case, iocs_list=iocs_import_list, assets_list=assets_import_list, note=None,
-                                import_as_event=import_as_event, case_tags=case_tags)
-
-            add_obj_history_entry(alert, f"Alert merged into existing case #{target_case_id}")
-
-            alert = call_modules_hook('on_postload_alert_merge', data=alert)
-
-        if note:
-            case.description += f"\n\n### Escalation note\n\n{note}\n\n" if case.description else f"\n\n{note}\n\n"
-            db.session.commit()
-
-        track_activity(f"batched merge alerts {alert_ids} into existing case #{target_case_id}",
-                       caseid=target_case_id)
-
-        # Return the updated case as JSON
-        return response_success(data=CaseSchema().dump(case))
-
-    except Exception as e:
-        app.app.logger.exception(e)
-        # Handle any errors during deserialization or DB operations
-        return response_error(str(e))
+    return _run_alerts_batch('merge', request.get_json())
 
 
 @alerts_blueprint.route('/alerts/batch/escalate', methods=['POST'])
@@ -833,66 +964,46 @@ def alerts_batch_escalate_route() -> Response:
     if request.json is None:
         return response_error('No JSON data provided')
 
-    data = request.get_json()
-
-    alert_ids = data.get('alert_ids')
-    if not alert_ids:
-        return response_error('No alert ids provided')
-
-    iocs_import_list: List[str] = data.get('iocs_import_list')
-    assets_import_list: List[str] = data.get('assets_import_list')
-    note: str = data.get('note')
-    import_as_event: bool = data.get('import_as_event')
-    case_tags = data.get('case_tags')
-    case_title = data.get('case_title')
-    alerts_list = []
-    case_template_id: int = data.get('case_template_id', None)
-
-    try:
-        # Merge the alerts into a case
-        for alert_id in alert_ids.split(','):
-            alert_id = int(alert_id)
-
-            alert = get_alert_by_id(alert_id)
-            if not alert:
-                continue
-
-            # Check if the user has access to the client
-            if not user_has_client_access(current_user.id, alert.alert_customer_id):
-                return response_error('User not entitled to escalate alerts for the client', status=403)
+    return _run_alerts_batch('escalate', request.get_json())
 
-            alert.alert_status_id = AlertStatus.query.filter_by(status_name='Merged').first().status_id
-            db.session.commit()
-            alert = call_modules_hook('on_postload_alert_escalate', data=alert)
 
-            alerts_list.append(alert)
-
-        # Merge alerts in the case
-        case = create_case_from_alerts(alerts_list, iocs_list=iocs_import_list, assets_list=assets_import_list,
-                                       note=note, import_as_event=import_as_event, case_tags=case_tags,
-                                       case_title=case_title, template_id=case_template_id)
-
-        if not case:
-            return response_error('Failed to create case from alert')
-
-        ac_set_new_case_access(None, case.case_id, case.client_id)
+@alerts_blueprint.route('/alerts/batch/status/<task_id>', methods=['GET'])
+@ac_api_requires(Permissions.alerts_read)
+def alerts_batch_status_route(task_id: str) -> Response:
+    """
+    Get the status of a batch action on alerts run in background
 
-        case = call_modules_hook('on_postload_case_create', data=case)
+    args:
+        task_id (str): The ID of the task
 
-        add_obj_history_entry(case, 'created')
-        track_activity("new case {case_name} created from alerts".format(case_name=case.name),
-                       caseid=case.case_id)
+    returns:
+        Response: The response
+    """
+    task = task_alerts_batch.AsyncResult(task_id)
+
+    # The pending, progress and success states all carry the user who started the task, the failures its arguments
+    info = task.info if isinstance(task.info, dict) else {}
+    user_id = info.get('user_id') if 'user_id' in info else (task.kwargs or {}).get('user_id')
+    if user_id is None or user_id != current_user.id:
+        return response_error('Task not found', status=404)
+
+    status = {
+        'task_id': task_id,
+        'state': task.state,
+        'done': 0,
+        'total': 0
+    }
 
-        for alert in alerts_list:
-            add_obj_history_entry(alert, f"Alert escalated into new case #{case.case_id}")
+    if task.state in ['PENDING', 'PROGRESS']:
+        status['done'] = info.get('done', 0)
+        status['total'] = info.get('total', 0)
 
-        # Return the updated case as JSON
-        return response_success(data=CaseSchema().dump(case))
+    elif task.state == 'SUCCESS':
+        status['success'] = info.get('success')
+        status['message'] = info.get('message')
+        status['data'] = info.get('data')
 
-    except Exception as e:
-        app.app.logger.exception(e)
-        # Handle any errors during deserialization or DB operations
-        return response_error(str(e))
+    return response_success(data=status)
 
 
 @alerts_blueprint.route('/alerts', methods=['GET'])
@@ -47,7 +47,7 @@ from app.datamgmt.case.case_assets_db import get_case_assets_comments_count
 from app.datamgmt.case.case_assets_db import get_compromise_status_list
 from app.datamgmt.case.case_assets_db import get_linked_iocs_finfo_from_asset
 from app.datamgmt.case.case_assets_db import get_linked_iocs_id_from_asset
-from app.datamgmt.case.case_assets_db import get_similar_assets
+from app.datamgmt.case.case_assets_db import get_case_similar_assets
 from app.datamgmt.case.case_assets_db import set_ioc_links
 from app.datamgmt.case.case_db import get_case
 from app.datamgmt.case.case_db import get_case_client_id
@@ -121,15 +121,14 @@ def case_list_assets(caseid):
 
     cases_access = get_user_cases_fast(current_user.id)
 
+    # Find similar assets from other cases with the same customer
+    similar_assets = get_case_similar_assets(caseid, customer_id, cases_access,
+                                             max_links=app.app.config.get('CASE_ASSETS_MAX_LINKS'))
+
     for asset in assets:
         asset = asset._asdict()
 
-        if len(assets) < 300:
-            # Find similar assets from other cases with the same customer
-            asset['link'] = list(get_similar_assets(
-                asset['asset_name'], asset['asset_type_id'], caseid, customer_id, cases_access))
-        else:
-            asset['link'] = []
+        asset['link'] = similar_assets.get((asset['asset_name'], asset['asset_type_id']), [])
 
         asset['ioc_links'] = cache_ioc_link.get(asset['asset_id'])
 
@@ -43,6 +43,7 @@ from app.datamgmt.case.case_notes_db import get_case_note_comment
 from app.datamgmt.case.case_notes_db import get_case_note_comments
 from app.datamgmt.case.case_notes_db import get_note
 from app.datamgmt.states import get_notes_state
+from app.datamgmt.states import update_notes_state
 from app.iris_engine.module_handler.module_handler import call_modules_hook
 from app.iris_engine.utils.tracker import track_activity
 from app.models import Notes
@@ -250,6 +251,7 @@ def case_directory_add(caseid):
         new_directory = directory_schema.load(request_data)
 
         db.session.add(new_directory)
+        update_notes_state(caseid=caseid)
         db.session.commit()
 
         track_activity(f"added directory \"{new_directory.name}\"", caseid=caseid)
@@ -279,6 +281,7 @@ def case_directory_update(dir_id, caseid):
 
         new_directory = directory_schema.load(request_data, instance=directory, partial=True)
 
+        update_notes_state(caseid=caseid)
         db.session.commit()
 
         track_activity(f"modified directory \"{new_directory.name}\"", caseid=caseid)
@@ -375,9 +378,22 @@ def case_filter_notes_directories(caseid):
     if not get_case(caseid=caseid):
         return response_error("Invalid case ID")
 
+    # The tree only changes with the notes state of the case, so an unchanged tree is not built again
+    notes_state = get_notes_state(caseid=caseid)
+    etag = f"notes-{caseid}-{notes_state['object_state']}" if notes_state else None
+    if etag and etag in request.if_none_match:
+        rsp = app.response_class(status=304)
+        rsp.set_etag(etag)
+        return rsp
+
     directories = get_directories_with_note_count(caseid)
 
-    return response_success("", data=directories)
+    rsp = response_success("", data=directories)
+    if etag:
+        rsp.set_etag(etag)
+        rsp.headers['Cache-Control'] = 'no-cache'
+
+    return rsp
 
 
 @case_notes_blueprint.route('/case/notes/groups/update/<int:cur_id>', methods=['POST'])
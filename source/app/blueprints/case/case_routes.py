@@ -260,7 +260,7 @@ def case_add_tasklog(caseid):
 
         log_data = log_schema.load(request.get_json())
 
-        ua = track_activity(log_data.get('log_content'), caseid, user_input=True)
+        ua = track_activity(log_data.get('log_content'), caseid, user_input=True, flush=True)
 
     except marshmallow.exceptions.ValidationError as e:
         return response_error(msg="Data error", data=e.messages)
@@ -19,7 +19,9 @@
 # IMPORTS ------------------------------------------------
 import csv
 import json
+import os
 import urllib.parse
+import uuid
 from datetime import datetime
 
 import marshmallow
@@ -27,6 +29,7 @@ from flask import Blueprint
 from flask import redirect
 from flask import render_template
 from flask import request
+from flask import stream_with_context
 from flask import url_for
 from flask_login import current_user
 from flask_wtf import FlaskForm
@@ -36,7 +39,9 @@ from app import db
 from app import app
 from app.blueprints.case.case_comments import case_comment_update
 from app.datamgmt.case.case_assets_db import get_asset_by_name
+from app.datamgmt.case.case_events_db import TIMELINE_CSV_FIELDS
 from app.datamgmt.case.case_events_db import add_comment_to_event, get_category_by_name, get_default_category
+from app.datamgmt.case.case_events_db import build_filtered_timeline
 from app.datamgmt.case.case_events_db import delete_event
 from app.datamgmt.case.case_events_db import delete_event_comment
 from app.datamgmt.case.case_events_db import get_case_assets_for_tm
@@ -50,19 +55,23 @@ from app.datamgmt.case.case_events_db import get_event_assets_ids
 from app.datamgmt.case.case_events_db import get_event_category
 from app.datamgmt.case.case_events_db import get_event_iocs_ids
 from app.datamgmt.case.case_events_db import get_events_categories
+from app.datamgmt.case.case_events_db import get_timeline_csv_missing_fields
+from app.datamgmt.case.case_events_db import group_by_event
 from app.datamgmt.case.case_events_db import save_event_category
+from app.datamgmt.case.case_events_db import stream_case_timeline
 from app.datamgmt.case.case_events_db import update_event_assets
 from app.datamgmt.case.case_events_db import update_event_iocs
 from app.datamgmt.case.case_iocs_db import get_ioc_by_value
 from app.datamgmt.manage.manage_attribute_db import get_default_custom_attributes
+from app.datamgmt.states import get_timeline_changes
 from app.datamgmt.states import get_timeline_state
 from app.datamgmt.states import update_timeline_state
 from app.forms import CaseEventForm
 from app.iris_engine.module_handler.module_handler import call_modules_hook
+from app.iris_engine.tasker.tasks import task_import_timeline_csv
 from app.iris_engine.utils.collab import collab_notify
 from app.iris_engine.utils.common import parse_bf_date_format
 from app.iris_engine.utils.tracker import track_activity
-from app.models import CompromiseStatus
 from app.models.authorization import CaseAccessLevel
 from app.models.authorization import User
 from app.models.cases import Cases
@@ -76,6 +85,7 @@ from app.models.models import Ioc
 from app.models.models import IocLink
 from app.schema.marshables import CommentSchema
 from app.schema.marshables import EventSchema
+from app.util import AlchemyEncoder
 from app.util import ac_api_case_requires
 from app.util import ac_case_requires
 from app.util import add_obj_history_entry
@@ -228,21 +238,22 @@ def case_getgraph_assets(caseid):
         CasesEvent.event_date
     ).all()
 
+    assets_by_event = group_by_event(assets_cache)
+
     tim = []
     for row in timeline:
-        for asset in assets_cache:
-            if asset.event_id == row.event_id:
-                tmp = {}
-                tmp['date'] = row.event_date
-                tmp['group'] = asset.asset_name
-                tmp['content'] = row.event_title
-                tmp['title'] = f"{row.event_date.strftime('%Y-%m-%dT%H:%M:%S')} - {row.event_content}"
+        for asset in assets_by_event.get(row.event_id, []):
+            tmp = {}
+            tmp['date'] = row.event_date
+            tmp['group'] = asset.asset_name
+            tmp['content'] = row.event_title
+            tmp['title'] = f"{row.event_date.strftime('%Y-%m-%dT%H:%M:%S')} - {row.event_content}"
 
-                if row.event_color:
-                    tmp['style'] = f'background-color: {row.event_color};'
+            if row.event_color:
+                tmp['style'] = f'background-color: {row.event_color};'
 
-                tmp['unique_id'] = row.event_id
-                tim.append(tmp)
+            tmp['unique_id'] = row.event_id
+            tim.append(tmp)
 
     res = {
         "events": tim
@@ -327,14 +338,6 @@ def case_gettimeline_api(asset_id, caseid):
         CasesEvent.category
     ).all()
 
-    assets_cache = CaseAssets.query.with_entities(
-        CaseAssets.asset_id,
-        CaseAssets.asset_name,
-        CaseEventsAssets.event_id
-    ).filter(
-        CaseEventsAssets.case_id == caseid,
-    ).join(CaseEventsAssets.asset).all()
-
     iocs_cache = CaseEventsIoc.query.with_entities(
         Ioc.ioc_id,
         Ioc.ioc_value,
@@ -345,31 +348,15 @@ def case_gettimeline_api(asset_id, caseid):
         CaseEventsIoc.ioc
     ).all()
 
+    iocs_by_event = group_by_event(iocs_cache)
+
     tim = []
     for row in timeline:
         ras = row._asdict()
         ras['event_date'] = ras['event_date'].strftime('%Y-%m-%dT%H:%M:%S.%f')
         ras['event_date_wtz'] = ras['event_date_wtz'].strftime('%Y-%m-%dT%H:%M:%S.%f')
 
-        alki = []
-        cache = {}
-        for asset in assets_cache:
-            if asset.event_id == ras['event_id']:
-                if asset.asset_id not in cache:
-                    cache[asset.asset_id] = asset.asset_name
-
-                alki.append(asset._asdict())
-
-        alki = []
-        cache = {}
-        for ioc in iocs_cache:
-            if ioc.event_id == ras['event_id']:
-                if ioc.ioc_id not in cache:
-                    cache[ioc.ioc_id] = ioc.ioc_value
-
-                alki.append(ioc._asdict())
-
-        ras['iocs'] = alki
+        ras['iocs'] = [ioc._asdict() for ioc in iocs_by_event.get(row.event_id, [])]
 
         tim.append(ras)
 
@@ -381,6 +368,112 @@ def case_gettimeline_api(asset_id, caseid):
     return response_success("", data=resp)
 
 
+@case_timeline_blueprint.route('/case/timeline/events/list/stream', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def case_streamtimeline_api_nofilter(caseid):
+    return case_streamtimeline_api(0)
+
+
+@case_timeline_blueprint.route('/case/timeline/events/list/stream/filter/<int:asset_id>', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def case_streamtimeline_api(asset_id, caseid):
+    """
+    Stream the timeline of the case as NDJSON, one event per line with its assets and IOCs.
+    """
+    def generate():
+        for event in stream_case_timeline(caseid, asset_id=asset_id):
+            yield json.dumps(event, cls=AlchemyEncoder) + '\n'
+
+    return app.response_class(response=stream_with_context(generate()),
+                              status=200,
+                              mimetype='application/x-ndjson')
+
+
+def _get_timeline_with_links(caseid, condition, assets_id=None, iocs_id=None, events_id=None):
+    timeline = CasesEvent.query.with_entities(
+        CasesEvent.event_id,
+        CasesEvent.event_uuid,
+        CasesEvent.event_date,
+        CasesEvent.event_date_wtz,
+        CasesEvent.event_tz,
+        CasesEvent.event_title,
+        CasesEvent.event_color,
+        CasesEvent.event_tags,
+        CasesEvent.event_content,
+        CasesEvent.event_in_summary,
+        CasesEvent.event_in_graph,
+        CasesEvent.event_is_flagged,
+        CasesEvent.parent_event_id,
+        User.user,
+        CasesEvent.event_added,
+        EventCategory.name.label("category_name")
+    ).filter(condition).order_by(
+        CasesEvent.event_date
+    ).outerjoin(
+        CasesEvent.category
+    ).join(
+        CasesEvent.user
+    ).all()
+
+    assets_cache_condition = and_(
+        CaseEventsAssets.case_id == caseid
+    )
+
+    if assets_id:
+        assets_cache_condition = and_(
+            assets_cache_condition,
+            CaseEventsAssets.asset_id.in_(assets_id)
+        )
+
+    if events_id is not None:
+        assets_cache_condition = and_(
+            assets_cache_condition,
+            CaseEventsAssets.event_id.in_(events_id)
+        )
+
+    assets_cache = (CaseAssets.query.with_entities(
+        CaseEventsAssets.event_id,
+        CaseAssets.asset_id,
+        CaseAssets.asset_name,
+        AssetsType.asset_name.label('type'),
+        CaseAssets.asset_ip,
+        CaseAssets.asset_description,
+        CaseAssets.asset_compromise_status_id
+    ).filter(
+        assets_cache_condition
+    ).join(CaseEventsAssets.asset)
+     .join(CaseAssets.asset_type).all())
+
+    iocs_cache_condition = and_(
+        CaseEventsIoc.case_id == caseid
+    )
+
+    if iocs_id:
+        iocs_cache_condition = and_(
+            iocs_cache_condition,
+            CaseEventsIoc.ioc_id.in_(iocs_id)
+        )
+
+    if events_id is not None:
+        iocs_cache_condition = and_(
+            iocs_cache_condition,
+            CaseEventsIoc.event_id.in_(events_id)
+        )
+
+    iocs_cache = CaseEventsIoc.query.with_entities(
+        CaseEventsIoc.event_id,
+        CaseEventsIoc.ioc_id,
+        Ioc.ioc_value,
+        Ioc.ioc_description
+    ).filter(
+        iocs_cache_condition
+    ).join(
+        CaseEventsIoc.ioc
+    ).all()
+
+    return timeline, assets_cache, iocs_cache
+
+
 @case_timeline_blueprint.route('/case/timeline/advanced-filter', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
 def case_filter_timeline(caseid):
@@ -484,157 +577,10 @@ def case_filter_timeline(caseid):
         condition = and_(condition,
                          CasesEvent.event_id.in_(event_ids))
 
-    timeline = CasesEvent.query.with_entities(
-        CasesEvent.event_id,
-        CasesEvent.event_uuid,
-        CasesEvent.event_date,
-        CasesEvent.event_date_wtz,
-        CasesEvent.event_tz,
-        CasesEvent.event_title,
-        CasesEvent.event_color,
-        CasesEvent.event_tags,
-        CasesEvent.event_content,
-        CasesEvent.event_in_summary,
-        CasesEvent.event_in_graph,
-        CasesEvent.event_is_flagged,
-        CasesEvent.parent_event_id,
-        User.user,
-        CasesEvent.event_added,
-        EventCategory.name.label("category_name")
-    ).filter(condition).order_by(
-        CasesEvent.event_date
-    ).outerjoin(
-        CasesEvent.category
-    ).join(
-        CasesEvent.user
-    ).all()
-
-    assets_cache_condition = and_(
-        CaseEventsAssets.case_id == caseid
-    )
-
-    if assets_id:
-        assets_cache_condition = and_(
-            assets_cache_condition,
-            CaseEventsAssets.asset_id.in_(assets_id)
-        )
-
-    assets_cache = (CaseAssets.query.with_entities(
-        CaseEventsAssets.event_id,
-        CaseAssets.asset_id,
-        CaseAssets.asset_name,
-        AssetsType.asset_name.label('type'),
-        CaseAssets.asset_ip,
-        CaseAssets.asset_description,
-        CaseAssets.asset_compromise_status_id
-    ).filter(
-        assets_cache_condition
-    ).join(CaseEventsAssets.asset)
-     .join(CaseAssets.asset_type).all())
-
-    iocs_cache_condition = and_(
-        CaseEventsIoc.case_id == caseid
-    )
-
-    if iocs_id:
-        iocs_cache_condition = and_(
-            iocs_cache_condition,
-            CaseEventsIoc.ioc_id.in_(iocs_id)
-        )
-
-    iocs_cache = CaseEventsIoc.query.with_entities(
-        CaseEventsIoc.event_id,
-        CaseEventsIoc.ioc_id,
-        Ioc.ioc_value,
-        Ioc.ioc_description
-    ).filter(
-        iocs_cache_condition
-    ).join(
-        CaseEventsIoc.ioc
-    ).all()
-
-    assets_map = {}
-    cache = {}
-    for asset in assets_cache:
-        if asset.asset_id not in cache:
-            cache[asset.asset_id] = [asset.asset_name, asset.type]
-
-        if (assets and asset.asset_name.lower() in assets) \
-                or (assets_id and asset.asset_id in assets_id):
-            if asset.event_id in assets_map:
-                assets_map[asset.event_id] += 1
-            else:
-                assets_map[asset.event_id] = 1
-
-    assets_filter = []
-    len_assets = 0
-    if assets:
-        len_assets += len(assets)
-    if assets_id:
-        len_assets += len(assets_id)
-
-    for event_id in assets_map:
-        if assets_map[event_id] == len_assets:
-            assets_filter.append(event_id)
-
-    iocs_filter = []
-    if iocs:
-        for ioc in iocs_cache:
-            if ioc.event_id not in iocs_filter and ioc.ioc_value.lower() in iocs:
-                iocs_filter.append(ioc.event_id)
-
-    tim = []
-    events_list = []
-    for row in timeline:
-        if assets is not None or assets_id is not None:
-            if row.event_id not in assets_filter:
-                continue
+    timeline, assets_cache, iocs_cache = _get_timeline_with_links(caseid, condition, assets_id, iocs_id)
 
-        if iocs is not None:
-            if row.event_id not in iocs_filter:
-                continue
-
-        ras = row._asdict()
-
-        ras['event_date'] = ras['event_date'].strftime('%Y-%m-%dT%H:%M:%S.%f')
-        ras['event_date_wtz'] = ras['event_date_wtz'].strftime('%Y-%m-%dT%H:%M:%S.%f') if ras[
-            'event_date_wtz'] else None
-        ras['event_added'] = ras['event_added'].strftime('%Y-%m-%dT%H:%M:%S')
-
-        if row.event_id not in events_list:
-            events_list.append(row.event_id)
-
-        alki = []
-        for asset in assets_cache:
-
-            if asset.event_id == ras['event_id']:
-                alki.append(
-                    {
-                        "name": "{} ({})".format(asset.asset_name, asset.type),
-                        "ip": asset.asset_ip,
-                        "description": asset.asset_description,
-                        "compromised": asset.asset_compromise_status_id == CompromiseStatus.compromised.value
-                    }
-                )
-
-        ras['assets'] = alki
-
-        alki = []
-        for ioc in iocs_cache:
-            if ioc.event_id == ras['event_id']:
-                if ioc.ioc_id not in cache:
-                    cache[ioc.ioc_id] = [ioc.ioc_value]
-
-                alki.append(
-                    {
-                        "name": "{}".format(ioc.ioc_value),
-                        "description": ioc.ioc_description
-                    }
-                )
-
-        ras['iocs'] = alki
-
-        tim.append(ras)
+    tim, events_list, cache = build_filtered_timeline(timeline, assets_cache, iocs_cache,
+                                                      assets=assets, assets_id=assets_id, iocs=iocs)
 
     if request.cookies.get('session'):
 
@@ -670,6 +616,47 @@ def case_filter_timeline(caseid):
     return response_success("ok", data=resp)
 
 
+@case_timeline_blueprint.route('/case/timeline/events/changes', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def case_timeline_changes(caseid):
+    """
+    Return the events created, updated or deleted since the timeline state provided in `since`.
+    If the change log cannot answer, `full_refresh` is set and the client should reload the whole timeline.
+    """
+    since = request.args.get('since', type=int)
+    if since is None:
+        return response_error('Invalid or missing since state')
+
+    changes = get_timeline_changes(caseid, since)
+    if changes is None:
+        return response_success("ok", data={
+            "full_refresh": True,
+            "state": get_timeline_state(caseid=caseid)
+        })
+
+    updated_ids, deleted_ids = changes
+    tim = []
+    events_comments_map = {}
+    if updated_ids:
+        condition = and_(
+            CasesEvent.case_id == caseid,
+            CasesEvent.event_id.in_(updated_ids)
+        )
+        timeline, assets_cache, iocs_cache = _get_timeline_with_links(caseid, condition, events_id=updated_ids)
+        tim, events_list, _ = build_filtered_timeline(timeline, assets_cache, iocs_cache)
+
+        for k, v in get_case_events_comments_count(events_list):
+            events_comments_map.setdefault(k, []).append(v)
+
+    return response_success("ok", data={
+        "full_refresh": False,
+        "events": tim,
+        "deleted": deleted_ids,
+        "comments_map": events_comments_map,
+        "state": get_timeline_state(caseid=caseid)
+    })
+
+
 @case_timeline_blueprint.route('/case/timeline/events/delete/<int:cur_id>', methods=['POST'])
 @ac_api_case_requires(CaseAccessLevel.full_access)
 def case_delete_event(cur_id, caseid):
@@ -698,6 +685,7 @@ def event_flag(cur_id, caseid):
         return response_error("Invalid event ID for this case")
 
     event.event_is_flagged = not event.event_is_flagged
+    update_timeline_state(caseid=caseid, event=event)
     db.session.commit()
 
     collab_notify(caseid, 'events', 'flagged' if event.event_is_flagged else "un-flagged", cur_id)
@@ -785,7 +773,7 @@ def case_edit_event(cur_id, caseid):
         event.case_id = caseid
         add_obj_history_entry(event, 'updated')
 
-        update_timeline_state(caseid=caseid)
+        update_timeline_state(caseid=caseid, event=event)
         db.session.commit()
 
         save_event_category(event.event_id, request_data.get('event_category_id'))
@@ -869,7 +857,7 @@ def case_add_event(caseid):
         add_obj_history_entry(event, 'created')
 
         db.session.add(event)
-        update_timeline_state(caseid=caseid)
+        update_timeline_state(caseid=caseid, event=event, change_type='created')
         db.session.commit()
 
         save_event_category(event.event_id, request_data.get('event_category_id'))
@@ -931,7 +919,7 @@ def case_duplicate_event(cur_id, caseid):
             event.event_title = f"[DUPLICATED] - {event.event_title}"
 
         db.session.add(event)
-        update_timeline_state(caseid=caseid)
+        update_timeline_state(caseid=caseid, event=event, change_type='created')
         db.session.commit()
 
         # Update category
@@ -1122,7 +1110,7 @@ def case_events_upload_csv(caseid):
             add_obj_history_entry(event, 'created')
 
             db.session.add(event)
-            update_timeline_state(caseid=caseid)
+            update_timeline_state(caseid=caseid, event=event, change_type='created')
 
             save_event_category(event.event_id, request_data.get('event_category_id'))
 
@@ -1164,4 +1152,72 @@ def case_events_upload_csv(caseid):
 
     return response_success(msg="Events added (CSV File)")
 
+
+@case_timeline_blueprint.route('/case/timeline/events/csv_upload/bulk', methods=['POST'])
+@ac_api_case_requires(CaseAccessLevel.full_access)
+def case_events_upload_csv_bulk(caseid):
+    csv_file = request.files.get('file')
+    if not csv_file:
+        return response_error("Expecting a CSV file in the file field")
+
+    import_dir = os.path.join(app.config['UPLOADED_PATH'], 'timeline_imports')
+    os.makedirs(import_dir, exist_ok=True)
+    csv_path = os.path.join(import_dir, f'{uuid.uuid4()}.csv')
+
+    # The upload is streamed to disk by chunks rather than being loaded in memory
+    csv_file.save(csv_path)
+
+    try:
+        with open(csv_path, 'r', newline='', encoding='utf-8-sig') as fcsv:
+            header = next(csv.reader(fcsv, delimiter=','), [])
+    except UnicodeDecodeError:
+        os.remove(csv_path)
+        return response_error("Invalid CSV file, expecting UTF-8 data")
+
+    missing_fields = get_timeline_csv_missing_fields(header)
+    if missing_fields:
+        os.remove(csv_path)
+        msg = f"Bad CSV fields mapping. Fields missing: [{','.join(missing_fields)}]"
+        data = {"error_code": "BAD_FIELDS_MAPPING", "expected": ','.join(TIMELINE_CSV_FIELDS),
+                "found": ','.join(header), "missing": ','.join(missing_fields)}
+        return response_error(msg=msg, data=data)
+
+    options = {
+        'event_sync_iocs_assets': request.form.get('event_sync_iocs_assets') == 'true',
+        'event_in_summary': request.form.get('event_in_summary') == 'true',
+        'event_in_graph': request.form.get('event_in_graph', 'true') == 'true',
+        'event_source': request.form.get('event_source', '')
+    }
+
+    task = task_import_timeline_csv.delay(caseid=caseid, user_id=current_user.id, csv_path=csv_path, options=options)
+
+    return response_success("CSV import started", data={'task_id': task.id})
+
+
+@case_timeline_blueprint.route('/case/timeline/events/csv_upload/status/<string:task_id>', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def case_events_upload_csv_status(task_id, caseid):
+    task = task_import_timeline_csv.AsyncResult(task_id)
+
+    if task.successful():
+        result = task.result
+        if not isinstance(result, dict) or result.get('case_id') != caseid:
+            return response_error("Unknown import task", status=404)
+
+        if not result.get('success'):
+            return response_error(msg=result.get('message'), data=result.get('data'))
+
+        return response_success(result.get('message'), data={'status': 'done', **(result.get('data') or {})})
+
+    if task.failed():
+        return response_error("CSV import failed")
+
+    info = task.info if isinstance(task.info, dict) else {}
+
+    return response_success("CSV import in progress", data={
+        'status': 'pending',
+        'done': info.get('done', 0),
+        'total': info.get('total', 0)
+    })
+
 # END_RS_CODE
@@ -41,9 +41,17 @@ from app.datamgmt.datastore.datastore_db import datastore_get_file
 from app.datamgmt.datastore.datastore_db import datastore_get_interactive_path_node
 from app.datamgmt.datastore.datastore_db import datastore_get_local_file_path
 from app.datamgmt.datastore.datastore_db import datastore_get_path_node
+from app.datamgmt.datastore.datastore_db import datastore_get_root
+from app.datamgmt.datastore.datastore_db import datastore_list_node_children
 from app.datamgmt.datastore.datastore_db import datastore_get_standard_path
 from app.datamgmt.datastore.datastore_db import datastore_rename_node
 from app.datamgmt.datastore.datastore_db import ds_list_tree
+from app.datamgmt.datastore.datastore_upload import abort_upload
+from app.datamgmt.datastore.datastore_upload import append_upload_chunk
+from app.datamgmt.datastore.datastore_upload import complete_upload
+from app.datamgmt.datastore.datastore_upload import create_upload
+from app.datamgmt.datastore.datastore_upload import get_upload
+from app.datamgmt.datastore.datastore_upload import UploadChunkError
 from app.forms import ModalDSFileForm
 from app.iris_engine.utils.tracker import track_activity
 from app.models.authorization import CaseAccessLevel
@@ -62,6 +70,8 @@ datastore_blueprint = Blueprint(
 
 logger = app.logger
 
+DS_LIST_MAX_PER_PAGE = 1000
+
 
 @datastore_blueprint.route('/datastore/list/tree', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
@@ -72,6 +82,30 @@ def datastore_list_tree(caseid):
     return response_success("", data=data)
 
 
+@datastore_blueprint.route('/datastore/list/node', methods=['GET'])
+@datastore_blueprint.route('/datastore/list/node/<int:cur_id>', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
+def datastore_list_node(caseid, cur_id=None):
+
+    if cur_id is None:
+        node = datastore_get_root(caseid)
+    else:
+        node = datastore_get_path_node(cur_id, caseid)
+        if not node:
+            return response_error('Invalid path node for this case')
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 200, type=int)
+    if page < 1 or per_page < 1:
+        return response_error('Invalid page or per_page')
+
+    per_page = min(per_page, DS_LIST_MAX_PER_PAGE)
+
+    data = datastore_list_node_children(node, caseid, page, per_page)
+
+    return response_success("", data=data)
+
+
 @datastore_blueprint.route('/datastore/list/filter', methods=['GET'])
 @ac_api_case_requires(CaseAccessLevel.read_only, CaseAccessLevel.full_access)
 def datastore_list_filter(caseid):
@@ -324,20 +358,7 @@ def datastore_add_file(cur_id: int, caseid: int):
     dsf_schema = DSFileSchema()
     try:
 
-        dsf_sc = dsf_schema.load(request.form, partial=True)
-
-        dsf_sc.file_parent_id = dsp.path_id
-        dsf_sc.added_by_user_id = current_user.id
-        dsf_sc.file_date_added = datetime.datetime.now()
-        dsf_sc.file_local_name = 'tmp_xc'
-        dsf_sc.file_case_id = caseid
-        add_obj_history_entry(dsf_sc, 'created')
-
-        if dsf_sc.file_is_ioc and not dsf_sc.file_password:
-            dsf_sc.file_password = 'infected'
-
-        db.session.add(dsf_sc)
-        db.session.commit()
+        dsf_sc = _datastore_new_file(dsf_schema, request.form, dsp, caseid)
 
         ds_location = datastore_get_standard_path(dsf_sc, caseid)
         dsf_sc.file_local_name, dsf_sc.file_size, dsf_sc.file_sha256 = dsf_schema.ds_store_file(
@@ -348,22 +369,170 @@ def datastore_add_file(cur_id: int, caseid: int):
 
         db.session.commit()
 
-        msg_added_as = ''
-        if dsf_sc.file_is_ioc:
-            datastore_add_file_as_ioc(dsf_sc, caseid)
-            msg_added_as += 'and added in IOC'
+        return _datastore_file_added(dsf_sc, dsf_schema, caseid)
 
-        if dsf_sc.file_is_evidence:
-            datastore_add_file_as_evidence(dsf_sc, caseid)
-            msg_added_as += ' and evidence' if len(msg_added_as) > 0 else 'and added in evidence'
+    except marshmallow.exceptions.ValidationError as e:
+        return response_error(msg="Data error", data=e.messages)
+
+
+def _datastore_new_file(dsf_schema: DSFileSchema, file_metadata, dsp, caseid: int):
+    dsf_sc = dsf_schema.load(file_metadata, partial=True)
+
+    dsf_sc.file_parent_id = dsp.path_id
+    dsf_sc.added_by_user_id = current_user.id
+    dsf_sc.file_date_added = datetime.datetime.now()
+    dsf_sc.file_local_name = 'tmp_xc'
+    dsf_sc.file_case_id = caseid
+    add_obj_history_entry(dsf_sc, 'created')
+
+    if dsf_sc.file_is_ioc and not dsf_sc.file_password:
+        dsf_sc.file_password = 'infected'
+
+    db.session.add(dsf_sc)
+    db.session.commit()
+
+    return dsf_sc
+
+
+def _datastore_file_added(dsf_sc, dsf_schema: DSFileSchema, caseid: int):
+    msg_added_as = ''
+    if dsf_sc.file_is_ioc:
+        datastore_add_file_as_ioc(dsf_sc, caseid)
+        msg_added_as += 'and added in IOC'
+
+    if dsf_sc.file_is_evidence:
+        datastore_add_file_as_evidence(dsf_sc, caseid)
+        msg_added_as += ' and evidence' if len(msg_added_as) > 0 else 'and added in evidence'
+
+    track_activity(f"File \"{dsf_sc.file_original_name}\" added to DS", caseid=caseid)
+    return response_success(f'File saved in datastore {msg_added_as}', data=dsf_schema.dump(dsf_sc))
+
+
+@datastore_blueprint.route('/datastore/file/upload/init/<int:cur_id>', methods=['POST'])
+@ac_api_case_requires(CaseAccessLevel.full_access)
+def datastore_upload_init(cur_id: int, caseid: int):
+
+    dsp = datastore_get_path_node(cur_id, caseid)
+    if not dsp:
+        return response_error('Invalid path node for this case')
+
+    file_metadata = request.get_json(silent=True)
+    if not isinstance(file_metadata, dict):
+        return response_error('Invalid request')
+
+    file_size = file_metadata.pop('file_size', None)
+    if not isinstance(file_size, int) or isinstance(file_size, bool) or file_size < 0:
+        return response_error('Invalid file size')
+
+    errors = DSFileSchema().validate(file_metadata, partial=True)
+    if errors:
+        return response_error(msg="Data error", data=errors)
+
+    upload = create_upload(caseid, current_user.id, dsp.path_id, file_size, file_metadata)
+
+    return response_success('Upload started', data=_upload_status(upload))
 
-        track_activity(f"File \"{dsf_sc.file_original_name}\" added to DS", caseid=caseid)
-        return response_success(f'File saved in datastore {msg_added_as}', data=dsf_schema.dump(dsf_sc))
+
+def _upload_status(upload: dict) -> dict:
+    return {
+        'upload_id': upload['upload_id'],
+        'file_size': upload['file_size'],
+        'chunk_size': upload['chunk_size'],
+        'received': upload['received']
+    }
+
+
+@datastore_blueprint.route('/datastore/file/upload/<upload_id>', methods=['GET'])
+@ac_api_case_requires(CaseAccessLevel.full_access)
+def datastore_upload_status(upload_id: str, caseid: int):
+
+    upload = get_upload(upload_id, caseid, current_user.id)
+    if not upload:
+        return response_error('Invalid upload ID', status=404)
+
+    return response_success('', data=_upload_status(upload))
+
+
+@datastore_blueprint.route('/datastore/file/upload/<upload_id>', methods=['POST'])
+@ac_api_case_requires(CaseAccessLevel.full_access)
+def datastore_upload_chunk(upload_id: str, caseid: int):
+
+    upload = get_upload(upload_id, caseid, current_user.id)
+    if not upload:
+        return response_error('Invalid upload ID', status=404)
+
+    offset = request.args.get('offset', type=int)
+    try:
+        upload['received'] = append_upload_chunk(upload, offset, request.stream)
+
+    except UploadChunkError as e:
+        # The client resumes from the data received so far
+        upload['received'] = e.received
+        return response_error(str(e), data=_upload_status(upload), status=409)
+
+    return response_success('', data=_upload_status(upload))
+
+
+@datastore_blueprint.route('/datastore/file/upload/<upload_id>/complete', methods=['POST'])
+@ac_api_case_requires(CaseAccessLevel.full_access)
+def datastore_upload_complete(upload_id: str, caseid: int):
+
+    upload = get_upload(upload_id, caseid, current_user.id)
+    if not upload:
+        return response_error('Invalid upload ID', status=404)
+
+    if upload['received'] != upload['file_size']:
+        return response_error('Upload not complete', data=_upload_status(upload), status=409)
+
+    dsp = datastore_get_path_node(upload['parent_id'], caseid)
+    if not dsp:
+        return response_error('Invalid path node for this case')
+
+    dsf_schema = DSFileSchema()
+    try:
+
+        dsf_sc = _datastore_new_file(dsf_schema, upload['file_metadata'], dsp, caseid)
+
+        ds_location = datastore_get_standard_path(dsf_sc, caseid)
+        try:
+            dsf_sc.file_local_name, dsf_sc.file_size, dsf_sc.file_sha256 = complete_upload(
+                upload,
+                ds_location,
+                dsf_sc.file_password or None)
+
+        except UploadChunkError as e:
+            db.session.delete(dsf_sc)
+            db.session.commit()
+            upload['received'] = e.received
+            return response_error(str(e), data=_upload_status(upload), status=409)
+
+        except Exception as e:
+            logger.exception(e)
+            db.session.delete(dsf_sc)
+            db.session.commit()
+            return response_error('Unable to save file in datastore')
+
+        db.session.commit()
+
+        return _datastore_file_added(dsf_sc, dsf_schema, caseid)
 
     except marshmallow.exceptions.ValidationError as e:
         return response_error(msg="Data error", data=e.messages)
 
 
+@datastore_blueprint.route('/datastore/file/upload/<upload_id>/abort', methods=['POST'])
+@ac_api_case_requires(CaseAccessLevel.full_access)
+def datastore_upload_abort(upload_id: str, caseid: int):
+
+    upload = get_upload(upload_id, caseid, current_user.id)
+    if not upload:
+        return response_error('Invalid upload ID', status=404)
+
+    abort_upload(upload)
+
+    return response_success('Upload aborted')
+
+
 @datastore_blueprint.route('/datastore/file/add-interactive', methods=['POST'])
 @ac_api_case_requires(CaseAccessLevel.full_access)
 def datastore_add_interactive_file(caseid: int):
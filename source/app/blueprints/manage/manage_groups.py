@@ -14,6 +14,7 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import time
 import traceback
 
 import marshmallow
@@ -66,6 +67,15 @@ manage_groups_blueprint = Blueprint(
 log = app.logger
 
 
+def _recompute_group_members_access(group, update_time):
+    start_time = time.perf_counter()
+    deleted, updated, inserted = ac_recompute_effective_ac_from_users_list(group.group_members)
+
+    log.info(f'Group {group.group_id} cases access updated in {update_time:.3f}s, effective access of '
+             f'{len(group.group_members)} members recomputed in {time.perf_counter() - start_time:.3f}s '
+             f'({deleted} removed, {updated} updated, {inserted} added)')
+
+
 @manage_groups_blueprint.route('/manage/groups/list', methods=['GET'])
 @ac_api_requires(Permissions.server_administrator)
 def manage_groups_index():
@@ -190,7 +200,10 @@ def manage_groups_delete(cur_id):
     if ac_ldp_group_removal(current_user.id, group_id=group.group_id):
         return response_error("I can't let you do that Dave", data="Removing this group will lock you out")
 
+    start_time = time.perf_counter()
     delete_group(group)
+    log.info(f'Group {cur_id} deleted and members effective access recomputed '
+             f'in {time.perf_counter() - start_time:.3f}s')
 
     return response_success('Group deleted')
 
@@ -243,7 +256,11 @@ def manage_groups_members_update(cur_id):
     if not isinstance(data.get('group_members'), list):
         return response_error("Expecting a list of IDs")
 
+    start_time = time.perf_counter()
     update_group_members(group, data.get('group_members'))
+    log.info(f'Group {cur_id} members updated and effective access recomputed '
+             f'in {time.perf_counter() - start_time:.3f}s')
+
     group = get_group_with_members(cur_id)
 
     return response_success('', data=group)
@@ -268,7 +285,11 @@ def manage_groups_members_delete(cur_id, cur_id_2):
         return response_error('I cannot let you do that Dave', data="Removing you from the group will make you "
                                                                     "loose your access rights")
 
+    start_time = time.perf_counter()
     remove_user_from_group(group, user)
+    log.info(f'User {user.id} removed from group {cur_id} and effective access recomputed '
+             f'in {time.perf_counter() - start_time:.3f}s')
+
     group = get_group_with_members(cur_id)
 
     return response_success('Member deleted from group', data=group)
@@ -326,6 +347,7 @@ def manage_groups_cac_add_case(cur_id):
     if not isinstance(data.get('cases_list'), list) and data.get('auto_follow_cases') is False:
         return response_error("Expecting cases_list as list")
 
+    start_time = time.perf_counter()
     if data.get('auto_follow_cases') is True:
         group, logs = add_all_cases_access_to_group(group, data.get('access_level'))
         group.group_auto_follow = True
@@ -339,9 +361,11 @@ def manage_groups_cac_add_case(cur_id):
     if not group:
         return response_error(msg=logs)
 
+    update_time = time.perf_counter() - start_time
+
     group = get_group_details(cur_id)
 
-    ac_recompute_effective_ac_from_users_list(group.group_members)
+    _recompute_group_members_access(group, update_time)
 
     return response_success(data=group)
 
@@ -369,6 +393,7 @@ def manage_groups_cac_delete_case(cur_id):
 
     try:
 
+        start_time = time.perf_counter()
         success, logs = remove_cases_access_from_group(group.group_id, data.get('cases'))
         db.session.commit()
 
@@ -378,7 +403,7 @@ def manage_groups_cac_delete_case(cur_id):
         return response_error(msg=str(e))
 
     if success:
-        ac_recompute_effective_ac_from_users_list(group.group_members)
+        _recompute_group_members_access(group, time.perf_counter() - start_time)
         return response_success(msg="Cases access removed from group")
 
     return response_error(msg=logs)
@@ -23,16 +23,21 @@ import base64
 from flask import Blueprint
 from flask import request
 from flask import send_file
+from flask_login import current_user
 
 from app.iris_engine.module_handler.module_handler import call_modules_hook
 from app.iris_engine.reporter.reporter import IrisMakeDocReport
 from app.iris_engine.reporter.reporter import IrisMakeMdReport
+from app.iris_engine.reporter.reporter import get_cached_report
+from app.iris_engine.reporter.reporter import get_report_cache_key
+from app.iris_engine.reporter.reporter import task_generate_report
 from app.iris_engine.utils.tracker import track_activity
 from app.models import CaseTemplateReport
 from app.util import FileRemover
 from app.util import ac_api_requires
 from app.util import ac_requires_case_identifier
 from app.util import response_error
+from app.util import response_success
 from app.datamgmt.case.case_db import get_case
 
 reports_blueprint = Blueprint('reports', __name__, template_folder='templates')
@@ -142,3 +147,103 @@ def _gen_report(report_id, caseid):
             return resp
 
     return response_error("Unknown report", status=404)
+
+
+def _queue_report_generation(report_id, caseid, doc_type):
+    report = CaseTemplateReport.query.filter(CaseTemplateReport.id == report_id).first()
+    if not report:
+        return response_error("Unknown report", status=404)
+
+    _, report_format = os.path.splitext(report.internal_reference)
+    if report_format not in ['.docx', '.md', '.html']:
+        return response_error("Report error", "Unknown report format.")
+
+    safe_mode = request.args.get('safe-mode') == 'true'
+
+    report_key = get_report_cache_key(caseid, report, doc_type, safe_mode, current_user)
+    file_path, _ = get_cached_report(caseid, report_key)
+    if file_path:
+        return response_success("Report ready", data={'status': 'ready', 'report_key': report_key})
+
+    task = task_generate_report.delay(report_id=report_id, caseid=caseid, doc_type=doc_type, safe_mode=safe_mode,
+                                      user_id=current_user.id, cache_key=report_key)
+
+    return response_success("Report generation started", data={'status': 'pending', 'task_id': task.id})
+
+
+@reports_blueprint.route('/case/report/generate-activities/<int:report_id>/async', methods=['GET'])
+@ac_api_requires()
+@ac_requires_case_identifier()
+def generate_case_activity_async(report_id, caseid):
+
+    call_modules_hook('on_preload_activities_report_create', data=report_id, caseid=caseid)
+
+    return _queue_report_generation(report_id, caseid, doc_type="Activities")
+
+
+@reports_blueprint.route('/case/report/generate-investigation/<int:report_id>/async', methods=['GET'])
+@ac_api_requires()
+@ac_requires_case_identifier()
+def generate_case_investigation_async(report_id, caseid):
+
+    call_modules_hook('on_preload_report_create', data=report_id, caseid=caseid)
+
+    return _queue_report_generation(report_id, caseid, doc_type="Investigation")
+
+
+@reports_blueprint.route('/case/report/status/<string:task_id>', methods=['GET'])
+@ac_api_requires()
+@ac_requires_case_identifier()
+def get_report_generation_status(task_id, caseid):
+
+    task = task_generate_report.AsyncResult(task_id)
+
+    if task.successful():
+        result = task.result
+        if not isinstance(result, dict) or result.get('case_id') != caseid:
+            return response_error("Unknown report task", status=404)
+
+        if not result.get('success'):
+            return response_error("Failed to generate the report", data=result.get('logs'))
+
+        return response_success("Report ready", data={'status': 'ready', 'report_key': result.get('report_key')})
+
+    if task.failed():
+        return response_error("Failed to generate the report")
+
+    message = task.info.get('message') if isinstance(task.info, dict) else None
+
+    return response_success("Report generation in progress", data={'status': 'pending', 'message': message})
+
+
+@reports_blueprint.route('/case/report/download/<string:report_key>', methods=['GET'])
+@ac_api_requires()
+@ac_requires_case_identifier()
+def download_generated_report(report_key, caseid):
+
+    file_path, meta = get_cached_report(caseid, report_key)
+    if not file_path:
+        return response_error("Unknown report", status=404)
+
+    if meta.get('doc_type') == 'Investigation':
+        with open(file_path, 'rb') as rfile:
+            encoded_file = base64.b64encode(rfile.read()).decode('utf-8')
+
+        res = get_case(caseid)
+
+        _data = {
+            'report_id': meta.get('report_id'),
+            'file_path': file_path,
+            'case_id': res.case_id,
+            'user_name': res.user.name,
+            'file': encoded_file
+        }
+
+        call_modules_hook('on_postload_report_create', data=_data, caseid=caseid)
+
+    else:
+        call_modules_hook('on_postload_activities_report_create', data=meta.get('report_id'), caseid=caseid)
+
+    track_activity("generated a report")
+
+    return send_file(file_path, as_attachment=True)
@@ -22,28 +22,38 @@ from flask import redirect
 from flask import render_template
 from flask import request
 from flask import url_for
-from sqlalchemy import and_
-
+from flask_login import current_user
+
+from app import ac_current_user_has_permission
+from app.datamgmt.search.search_db import search_alerts
+from app.datamgmt.search.search_db import search_assets
+from app.datamgmt.search.search_db import search_comments
+from app.datamgmt.search.search_db import search_events
+from app.datamgmt.search.search_db import search_iocs
+from app.datamgmt.search.search_db import search_notes
 from app.forms import SearchForm
-from app.iris_engine.access_control.utils import ac_flag_match_mask
 from app.iris_engine.utils.tracker import track_activity
-from app.models import Comments
 from app.models.authorization import Permissions
-from app.models.cases import Cases
-from app.models.models import Client
-from app.models.models import Ioc
-from app.models.models import IocLink
-from app.models.models import IocType
-from app.models.models import Notes
-from app.models.models import Tlp
 from app.util import ac_api_requires
 from app.util import ac_requires
+from app.util import response_error
 from app.util import response_success
 
 search_blueprint = Blueprint('search',
                              __name__,
                              template_folder='templates')
 
+SEARCH_MAX_PER_PAGE = 1000
+
+search_functions = {
+    'ioc': search_iocs,
+    'assets': search_assets,
+    'notes': search_notes,
+    'comments': search_comments,
+    'events': search_events,
+    'alerts': search_alerts
+}
+
 
 @search_blueprint.route('/search', methods=['POST'])
 @ac_api_requires(Permissions.search_across_cases)
@@ -52,83 +62,36 @@ def search_file_post():
     jsdata = request.get_json()
     search_value = jsdata.get('search_value')
     search_type = jsdata.get('search_type')
-    files = []
-    search_condition = and_()
+
+    search_function = search_functions.get(search_type)
+    if search_function is None:
+        return response_error(f"Unknown search type {search_type}")
+
+    if search_type == 'alerts' and not ac_current_user_has_permission(Permissions.alerts_read):
+        return response_error("User not entitled to search alerts", status=403)
+
+    # Without pagination, all the results are returned as a plain list, as the API always did
+    paginated = 'page' in jsdata or 'per_page' in jsdata
+    try:
+        page = max(int(jsdata.get('page', 1)), 1)
+        per_page = min(max(int(jsdata.get('per_page', 100)), 1), SEARCH_MAX_PER_PAGE) if paginated else None
+    except (TypeError, ValueError):
+        return response_error("Invalid page or per_page")
+
+    if not search_value:
+        if not paginated:
+            return response_success("Results fetched", [])
+
+        return response_success("Results fetched", {'results': [], 'page': page, 'per_page': per_page,
+                                                    'has_next': False})
 
     track_activity("started a global search for {} on {}".format(search_value, search_type))
 
-    if search_type == "ioc":
-        res = Ioc.query.with_entities(
-                            Ioc.ioc_value.label('ioc_name'),
-                            Ioc.ioc_description.label('ioc_description'),
-                            Ioc.ioc_misp,
-                            IocType.type_name,
-                            Tlp.tlp_name,
-                            Tlp.tlp_bscolor,
-                            Cases.name.label('case_name'),
-                            Cases.case_id,
-                            Client.name.label('customer_name')
-                    ).filter(
-                        and_(
-                            Ioc.ioc_value.like(search_value),
-                            IocLink.ioc_id == Ioc.ioc_id,
-                            IocLink.case_id == Cases.case_id,
-                            Client.client_id == Cases.client_id,
-                            Ioc.ioc_tlp_id == Tlp.tlp_id,
-                            search_condition
-                        )
-                    ).join(Ioc.ioc_type).all()
-
-        files = [row._asdict() for row in res]
-
-    if search_type == "notes":
-
-        ns = []
-        if search_value:
-            search_value = "%{}%".format(search_value)
-            ns = Notes.query.filter(
-                Notes.note_content.like(search_value),
-                Cases.client_id == Client.client_id,
-                search_condition
-            ).with_entities(
-                Notes.note_id,
-                Notes.note_title,
-                Cases.name.label('case_name'),
-                Client.name.label('client_name'),
-                Cases.case_id
-            ).join(
-                Notes.case
-            ).order_by(
-                Client.name
-            ).all()
-
-            ns = [row._asdict() for row in ns]
-
-        files = ns
-
-    if search_type == "comments":
-        search_value = "%{}%".format(search_value)
-        comments = Comments.query.filter(
-            Comments.comment_text.like(search_value),
-            Cases.client_id == Client.client_id,
-            search_condition
-        ).with_entities(
-            Comments.comment_id,
-            Comments.comment_text,
-            Cases.name.label('case_name'),
-            Client.name.label('customer_name'),
-            Cases.case_id
-        ).join(
-            Comments.case
-        ).join(
-            Cases.client
-        ).order_by(
-            Client.name
-        ).all()
-
-        files = [row._asdict() for row in comments]
-
-    return response_success("Results fetched", files)
+    results = search_function(current_user.id, search_value, page, per_page)
+    if not paginated:
+        return response_success("Results fetched", results['results'])
+
+    return response_success("Results fetched", results)
 
 
 @search_blueprint.route('/search', methods=['GET'])
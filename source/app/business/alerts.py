@@ -0,0 +1,291 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from flask_login import current_user
+from marshmallow.exceptions import ValidationError
+
+from app import ac_current_user_has_permission
+from app import db
+from app.business.errors import BusinessProcessingError
+from app.business.errors import PermissionDeniedError
+from app.datamgmt.alerts.alerts_db import SIMILAR_ALERTS_CACHE_FIELDS
+from app.datamgmt.alerts.alerts_db import create_case_from_alerts
+from app.datamgmt.alerts.alerts_db import get_alert_status_by_name
+from app.datamgmt.alerts.alerts_db import get_alerts_by_ids
+from app.datamgmt.alerts.alerts_db import merge_alert_in_case
+from app.datamgmt.alerts.alerts_db import refresh_similar_alerts_cache
+from app.datamgmt.alerts.alerts_db import update_alerts_values
+from app.datamgmt.case.case_db import get_case
+from app.datamgmt.manage.manage_access_control_db import check_ua_case_client
+from app.datamgmt.manage.manage_access_control_db import get_user_clients_id
+from app.iris_engine.access_control.utils import ac_set_new_case_access
+from app.iris_engine.module_handler.module_handler import call_modules_hook
+from app.iris_engine.utils.tracker import track_activity
+from app.models.alerts import Alert
+from app.models.authorization import Permissions
+from app.schema.marshables import AlertSchema
+from app.util import add_obj_history_entry
+
+
+def parse_alert_ids(alert_ids):
+    """
+    Read a list of alert IDs, given either as a list or as a comma separated string
+    """
+    try:
+        if isinstance(alert_ids, str):
+            return [int(alert_id) for alert_id in alert_ids.split(',') if alert_id.strip()]
+
+        return [int(alert_id) for alert_id in alert_ids or []]
+
+    except (TypeError, ValueError):
+        raise BusinessProcessingError('Invalid alert ids')
+
+
+def _get_batch_alerts(alert_ids, action, ignore_missing):
+    """
+    Fetch the alerts of a batch in one query, and check the current user can access all their clients before
+    anything is changed
+    """
+    alerts = get_alerts_by_ids(alert_ids)
+
+    if not ignore_missing and len(alerts) != len(set(alert_ids)):
+        found_ids = {alert.alert_id for alert in alerts}
+        missing_id = next(alert_id for alert_id in alert_ids if alert_id not in found_ids)
+        raise BusinessProcessingError(f'Alert with ID {missing_id} not found')
+
+    if not ac_current_user_has_permission(Permissions.server_administrator):
+        user_clients = set(get_user_clients_id(current_user.id))
+        if any(alert.alert_customer_id not in user_clients for alert in alerts):
+            raise PermissionDeniedError(f'User not entitled to {action} alerts for the client')
+
+    return alerts
+
+
+def _notify_progress(progress, done, total):
+    if progress is not None:
+        progress(done, total)
+
+
+def batch_update(alert_ids, updates, progress=None):
+    """
+    Apply the same updates to a list of alerts.
+    Updates of the alerts columns are applied with a single UPDATE. Updates of their relationships are
+    loaded on each alert through the schema.
+
+    :param alert_ids: IDs of the alerts to update
+    :param updates: Dict of the fields to update
+    :param progress: Optional callable receiving the number of alerts processed and the total
+    :return: The updated alerts
+    """
+    alert_ids = parse_alert_ids(alert_ids)
+    if not alert_ids:
+        raise BusinessProcessingError('No alert IDs provided')
+
+    updates = dict(updates or {})
+    if not updates.get('alert_tags'):
+        updates.pop('alert_tags', None)
+
+    alerts = _get_batch_alerts(alert_ids, 'update', ignore_missing=False)
+
+    alert_schema = AlertSchema()
+    relationship_updates = set(updates) & set(Alert.__mapper__.relationships.keys())
+
+    activities = {}
+    for alert in alerts:
+        activities[alert.alert_id] = [f"\"{key}\"" for key, value in updates.items()
+                                      if getattr(alert, key, None) != value]
+
+    try:
+        if relationship_updates:
+            for index, alert in enumerate(alerts):
+                alert_schema.load(updates, instance=alert, partial=True)
+                _notify_progress(progress, index + 1, len(alerts))
+
+        else:
+            # Validated once, as every alert gets the same values
+            loaded_alert = alert_schema.load(updates, partial=True)
+            columns = set(Alert.__table__.columns.keys())
+            values = {key: getattr(loaded_alert, key) for key in updates if key in columns}
+
+            update_alerts_values([alert.alert_id for alert in alerts], values)
+            _notify_progress(progress, len(alerts), len(alerts))
+
+    except ValidationError as e:
+        db.session.rollback()
+        raise BusinessProcessingError('Data error', e.messages)
+
+    if any(field in updates for field in SIMILAR_ALERTS_CACHE_FIELDS):
+        refresh_similar_alerts_cache(alerts)
+
+    for alert in alerts:
+        if activities[alert.alert_id]:
+            add_obj_history_entry(alert, f"updated alert: {','.join(activities[alert.alert_id])}")
+
+    db.session.commit()
+
+    alerts = call_modules_hook('on_postload_alert_update', data=alerts)
+
+    for alert_id, activity_data in activities.items():
+        if activity_data:
+            track_activity(f"updated alert #{alert_id}: {','.join(activity_data)}", ctx_less=True)
+
+    return alerts
+
+
+def batch_merge(alert_ids, target_case_id, iocs_import_list, assets_import_list, note, import_as_event, case_tags,
+                progress=None):
+    """
+    Merge a list of alerts into an existing case
+
+    :param alert_ids: IDs of the alerts to merge
+    :param target_case_id: ID of the case to merge the alerts into
+    :param iocs_import_list: UUIDs of the alerts IOCs to import in the case
+    :param assets_import_list: UUIDs of the alerts assets to import in the case
+    :param note: Note appended to the case description
+    :param import_as_event: Whether to add each alert to the case timeline
+    :param case_tags: Comma separated tags to add to the case
+    :param progress: Optional callable receiving the number of alerts processed and the total
+    :return: The case
+    """
+    alert_ids = parse_alert_ids(alert_ids)
+    if not alert_ids:
+        raise BusinessProcessingError('No alert ids provided')
+
+    case = get_case(target_case_id)
+    if not case:
+        raise BusinessProcessingError('Target case not found')
+
+    if not check_ua_case_client(current_user.id, target_case_id):
+        raise PermissionDeniedError('User not entitled to merge alerts for the case')
+
+    alerts = _get_batch_alerts(alert_ids, 'merge', ignore_missing=True)
+
+    update_alerts_values([alert.alert_id for alert in alerts],
+                         {'alert_status_id': get_alert_status_by_name('Merged').status_id})
+
+    for index, alert in enumerate(alerts):
+        merge_alert_in_case(alert, case, iocs_list=iocs_import_list or [], assets_list=assets_import_list or [],
+                            note=None, import_as_event=import_as_event, case_tags=case_tags)
+
+        add_obj_history_entry(alert, f"Alert merged into existing case #{target_case_id}")
+        _notify_progress(progress, index + 1, len(alerts))
+
+    if note:
+        case.description += f"\n\n### Escalation note\n\n{note}\n\n" if case.description else f"\n\n{note}\n\n"
+
+    db.session.commit()
+
+    call_modules_hook('on_postload_alert_merge', data=alerts)
+
+    track_activity(f"batched merge alerts {','.join(str(alert.alert_id) for alert in alerts)} "
+                   f"into existing case #{target_case_id}", caseid=target_case_id)
+
+    return case
+
+
+def batch_escalate(alert_ids, iocs_import_list, assets_import_list, note, import_as_event, case_tags, case_title,
+                   case_template_id, progress=None):
+    """
+    Escalate a list of alerts into a new case
+
+    :param alert_ids: IDs of the alerts to escalate
+    :param iocs_import_list: UUIDs of the alerts IOCs to import in the case
+    :param assets_import_list: UUIDs of the alerts assets to import in the case
+    :param note: Escalation note added to the case description
+    :param import_as_event: Whether to add each alert to the case timeline
+    :param case_tags: Comma separated tags to add to the case
+    :param case_title: Title of the case
+    :param case_template_id: ID of the case template to apply
+    :param progress: Optional callable receiving the number of alerts processed and the total
+    :return: The created case
+    """
+    alert_ids = parse_alert_ids(alert_ids)
+    if not alert_ids:
+        raise BusinessProcessingError('No alert ids provided')
+
+    alerts = _get_batch_alerts(alert_ids, 'escalate', ignore_missing=True)
+    if not alerts:
+        raise BusinessProcessingError('No alert found')
+
+    update_alerts_values([alert.alert_id for alert in alerts],
+                         {'alert_status_id': get_alert_status_by_name('Merged').status_id})
+    db.session.commit()
+
+    alerts = call_modules_hook('on_postload_alert_escalate', data=alerts)
+    _notify_progress(progress, 0, len(alerts))
+
+    case = create_case_from_alerts(alerts, iocs_list=iocs_import_list or [], assets_list=assets_import_list or [],
+                                   note=note, import_as_event=import_as_event, case_tags=case_tags or '',
+                                   case_title=case_title, template_id=case_template_id)
+
+    if not case:
+        raise BusinessProcessingError('Failed to create case from alert')
+
+    ac_set_new_case_access(None, case.case_id, case.client_id)
+
+    case = call_modules_hook('on_postload_case_create', data=case)
+
+    add_obj_history_entry(case, 'created')
+    for alert in alerts:
+        add_obj_history_entry(alert, f"Alert escalated into new case #{case.case_id}")
+
+    db.session.commit()
+    _notify_progress(progress, len(alerts), len(alerts))
+
+    track_activity("new case {case_name} created from alerts".format(case_name=case.name), caseid=case.case_id)
+
+    return case
+
+
+def run_batch_action(action, payload, progress=None):
+    """
+    Run a batch action on alerts from the payload of its request, so it can be run either by the request
+    or by a worker
+
+    :param action: One of update, merge or escalate
+    :param payload: Request payload of the action
+    :param progress: Optional callable receiving the number of alerts processed and the total
+    :return: The updated alerts for an update, the case the alerts were merged or escalated into otherwise
+    """
+    if action == 'update':
+        return batch_update(payload.get('alert_ids'), payload.get('updates'), progress=progress)
+
+    if action == 'merge':
+        if payload.get('target_case_id') is None:
+            raise BusinessProcessingError('No target case id provided')
+
+        return batch_merge(payload.get('alert_ids'), payload.get('target_case_id'),
+                           iocs_import_list=payload.get('iocs_import_list'),
+                           assets_import_list=payload.get('assets_import_list'),
+                           note=payload.get('note'),
+                           import_as_event=payload.get('import_as_event'),
+                           case_tags=payload.get('case_tags'),
+                           progress=progress)
+
+    if action == 'escalate':
+        return batch_escalate(payload.get('alert_ids'),
+                              iocs_import_list=payload.get('iocs_import_list'),
+                              assets_import_list=payload.get('assets_import_list'),
+                              note=payload.get('note'),
+                              import_as_event=payload.get('import_as_event'),
+                              case_tags=payload.get('case_tags'),
+                              case_title=payload.get('case_title'),
+                              case_template_id=payload.get('case_template_id'),
+                              progress=progress)
+
+    raise BusinessProcessingError(f'Unknown batch action {action}')
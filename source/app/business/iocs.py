@@ -16,6 +16,8 @@
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
+import csv
+import logging as log
 from flask_login import current_user
 from marshmallow.exceptions import ValidationError
 
@@ -24,6 +26,13 @@ from app.models import Ioc, IocLink
 from app.models.authorization import CaseAccessLevel
 from app.datamgmt.case.case_iocs_db import add_ioc
 from app.datamgmt.case.case_iocs_db import add_ioc_link
+from app.datamgmt.case.case_iocs_db import add_iocs_links
+from app.datamgmt.case.case_iocs_db import find_iocs
+from app.datamgmt.case.case_iocs_db import get_case_linked_iocs_ids
+from app.datamgmt.case.case_iocs_db import get_ioc_types_by_name
+from app.datamgmt.case.case_iocs_db import get_tlps_dict
+from app.datamgmt.manage.manage_attribute_db import get_default_custom_attributes
+from app.datamgmt.manage.manage_tags_db import add_db_tags
 from app.datamgmt.case.case_iocs_db import check_ioc_type_id
 from app.datamgmt.case.case_iocs_db import get_iocs_by_case
 from app.datamgmt.case.case_iocs_db import delete_ioc
@@ -80,6 +89,141 @@ def create(request_json, case_identifier):
     raise BusinessProcessingError('Unable to create IOC for internal reasons')
 
 
+IOCS_CSV_HEADERS = "ioc_value,ioc_type,ioc_description,ioc_tags,ioc_tlp"
+
+
+def _read_csv_rows(csv_data, ioc_types, tlps, errors):
+    """
+    Read the rows of an IOCs CSV, resolving their type and TLP. The invalid rows are reported in errors.
+    """
+    csv_lines = csv_data.splitlines()  # unavoidable since the file is passed as a string
+    if not csv_lines or csv_lines[0].lower() != IOCS_CSV_HEADERS:
+        csv_lines.insert(0, IOCS_CSV_HEADERS)
+
+    rows = []
+    for index, row in enumerate(csv.DictReader(csv_lines, quotechar='"', delimiter=',')):
+        missing_fields = [field for field in IOCS_CSV_HEADERS.split(',') if row.get(field) is None]
+        if missing_fields:
+            errors.extend((index, f"{field} is missing for row {index}") for field in missing_fields)
+            continue
+
+        # IOC value must not be empty
+        if not row.get("ioc_value"):
+            errors.append((index, f"Empty IOC value for row {index}"))
+            track_activity("Attempted to upload an empty IOC value")
+            continue
+
+        row["ioc_tags"] = row["ioc_tags"].replace("|", ",")  # Reformat Tags
+
+        # Convert TLP into TLP id
+        row["ioc_tlp_id"] = tlps.get(row.pop("ioc_tlp", None), "")
+
+        ioc_type = ioc_types.get(row['ioc_type'].lower())
+        if not ioc_type:
+            errors.append((index, f"{row['ioc_value']} (invalid ioc type: {row['ioc_type']}) for row {index}"))
+            log.error(f'Unrecognised IOC type {row["ioc_type"]}')
+            continue
+
+        row['ioc_type_id'] = ioc_type.type_id
+        row.pop('ioc_type', None)
+
+        rows.append((index, row))
+
+    return rows
+
+
+def import_csv(csv_data, case_identifier):
+    """
+    Import IOCs from a CSV in a case, in a single transaction.
+    IOC types and TLPs are resolved once, existing IOCs are found with batched queries, and the new IOCs and
+    links are inserted in bulk. Module hooks are called once with the list of IOCs.
+
+    :param csv_data: CSV content, with the ioc_value, ioc_type, ioc_description, ioc_tags and ioc_tlp columns
+    :param case_identifier: Case ID
+    :return: Tuple (imported rows, errors)
+    """
+    errors = []
+
+    ioc_types = get_ioc_types_by_name()
+    tlps = get_tlps_dict()
+
+    rows = _read_csv_rows(csv_data, ioc_types, tlps, errors)
+    if not rows:
+        return [], [error for _, error in sorted(errors, key=lambda error: error[0])]
+
+    add_db_tags(tag.strip() for _, row in rows for tag in row['ioc_tags'].split(','))
+
+    rows_indexes = [index for index, _ in rows]
+    rows_data = call_modules_hook('on_preload_ioc_create', data=[row for _, row in rows], caseid=case_identifier)
+
+    ioc_schema = IocSchema(context={
+        'ioc_types': {ioc_type.type_id: ioc_type for ioc_type in ioc_types.values()},
+        'tlps': tlps,
+        'tags_created': True
+    })
+    custom_attributes = get_default_custom_attributes('ioc')
+
+    loaded = []
+    for index, row_data in zip(rows_indexes, rows_data):
+        try:
+            ioc = ioc_schema.load(row_data)
+        except ValidationError as e:
+            errors.append((index, f"{row_data.get('ioc_value')} ({e.messages}) for row {index}"))
+            continue
+
+        ioc.custom_attributes = custom_attributes
+        ioc.user_id = current_user.id
+        loaded.append((index, row_data, ioc))
+
+    existing_iocs = find_iocs((ioc.ioc_value, ioc.ioc_type_id) for _, _, ioc in loaded)
+
+    new_iocs = []
+    for _, _, ioc in loaded:
+        key = (ioc.ioc_value, ioc.ioc_type_id)
+        if key not in existing_iocs:
+            # Repeated rows of the file resolve to the same new IOC
+            existing_iocs[key] = ioc
+            new_iocs.append(ioc)
+
+    if new_iocs:
+        db.session.add_all(new_iocs)
+        db.session.flush()
+
+    linked_ioc_ids = get_case_linked_iocs_ids([ioc.ioc_id for ioc in existing_iocs.values()], case_identifier)
+
+    imported = []
+    imported_iocs = []
+    for index, row_data, ioc in loaded:
+        ioc = existing_iocs[(ioc.ioc_value, ioc.ioc_type_id)]
+
+        if ioc.ioc_id in linked_ioc_ids:
+            errors.append((index, f"{ioc.ioc_value} (already exists and linked to this case)"))
+            log.error(f"IOC {ioc.ioc_value} already exists and linked to this case")
+            continue
+
+        linked_ioc_ids.add(ioc.ioc_id)
+        imported.append(row_data)
+        imported_iocs.append(ioc)
+
+    add_iocs_links([ioc.ioc_id for ioc in imported_iocs], case_identifier)
+
+    if new_iocs or imported_iocs:
+        update_ioc_state(caseid=case_identifier)
+
+    # Read before the commit expires the IOCs
+    imported_values = [ioc.ioc_value for ioc in imported_iocs]
+
+    db.session.commit()
+
+    if imported_iocs:
+        call_modules_hook('on_postload_ioc_create', data=imported_iocs, caseid=case_identifier)
+
+    for ioc_value in imported_values:
+        track_activity(f"added ioc \"{ioc_value}\"", caseid=case_identifier)
+
+    return imported, [error for _, error in sorted(errors, key=lambda error: error[0])]
+
+
 # TODO most probably this method should not require a case_identifier... Since the IOC gets modified for all cases...
 def update(identifier, request_json, case_identifier):
 
@@ -23,6 +23,11 @@ from app import db, app
 from app.business.errors import BusinessProcessingError, UnhandledBusinessError
 from app.business.permissions import check_current_user_has_some_case_access_stricter
 from app.datamgmt.case.case_notes_db import get_note
+from app.datamgmt.case.case_notes_revisions_db import add_note_revision
+from app.datamgmt.case.case_notes_revisions_db import delete_note_revision as delete_note_revision_db
+from app.datamgmt.case.case_notes_revisions_db import get_latest_note_revision
+from app.datamgmt.case.case_notes_revisions_db import get_note_revision_content
+from app.datamgmt.states import update_notes_state
 from app.iris_engine.module_handler.module_handler import call_modules_hook
 from app.iris_engine.utils.tracker import track_activity
 from app.models import NoteRevisions
@@ -61,17 +66,11 @@ def create(request_json, case_identifier):
         note.note_case_id = case_identifier
 
         db.session.add(note)
+        update_notes_state(caseid=case_identifier)
         db.session.flush()
 
-        note_revision = NoteRevisions(
-            note_id=note.note_id,
-            revision_number=1,
-            note_title=note.note_title,
-            note_content=note.note_content,
-            note_user=note.note_user,
-            revision_timestamp=datetime.utcnow()
-        )
-        db.session.add(note_revision)
+        add_note_revision(note.note_id, 1, note.note_title, note.note_content, note.note_user,
+                          snapshot_interval=app.config.get('NOTE_REVISIONS_SNAPSHOT_INTERVAL'))
 
         add_obj_history_entry(note, 'created note', commit=True)
         note = call_modules_hook('on_postload_note_create', data=note, caseid=case_identifier)
@@ -106,35 +105,27 @@ def update(identifier: int = None, request_json: dict = None, case_identifier: i
 
         request_data = call_modules_hook('on_preload_note_update', data=request_json, caseid=case_identifier)
 
-        latest_version = db.session.query(
-            NoteRevisions
-        ).filter_by(
-            note_id=identifier
-        ).order_by(
-            NoteRevisions.revision_number.desc()
-        ).first()
+        latest_version = get_latest_note_revision(identifier)
         revision_number = 1 if latest_version is None else latest_version.revision_number + 1
         no_changes = False
 
         if revision_number > 1:
-            if latest_version.note_title == request_data.get('note_title') and latest_version.note_content == request_data.get('note_content'):
+            if latest_version.note_title == request_data.get('note_title') and get_note_revision_content(latest_version) == request_data.get('note_content'):
                 no_changes = True
                 app.logger.debug(f"Note {identifier} has not changed, skipping versioning")
 
         if not no_changes:
-            note_version = NoteRevisions(
-                note_id=note.note_id,
-                revision_number=revision_number,
-                note_title=note.note_title,
-                note_content=note.note_content,
-                note_user=current_user.id,
-                revision_timestamp=datetime.utcnow()
-            )
-            db.session.add(note_version)
+            add_note_revision(note.note_id, revision_number, note.note_title, note.note_content, current_user.id,
+                              snapshot_interval=app.config.get('NOTE_REVISIONS_SNAPSHOT_INTERVAL'),
+                              latest_revision=latest_version)
             db.session.commit()
 
         request_data['note_id'] = identifier
+        tree_position = (note.note_title, note.directory_id)
         addnote_schema.load(request_data, partial=True, instance=note)
+        if (note.note_title, note.directory_id) != tree_position:
+            # The notes tree lists the titles by directory
+            update_notes_state(caseid=case_identifier)
         note.update_date = datetime.utcnow()
         note.user_id = current_user.id
 
@@ -207,6 +198,12 @@ def get_note_revision(identifier: int = None, revision_number: int = None, case_
             NoteRevisions.revision_number == revision_number
         ).first()
 
+        if note_revision is not None and note_revision.snapshot_revision_id is not None:
+            # Detached, so the rebuilt content is not written back
+            note_content = get_note_revision_content(note_revision)
+            db.session.expunge(note_revision)
+            note_revision.note_content = note_content
+
         return note_revision
 
     except ValidationError as e:
@@ -239,7 +236,7 @@ def delete_note_revision(identifier: int = None, revision_number: int = None, ca
         if not note_revision:
             raise BusinessProcessingError("Invalid note revision number")
 
-        db.session.delete(note_revision)
+        delete_note_revision_db(note_revision, snapshot_interval=app.config.get('NOTE_REVISIONS_SNAPSHOT_INTERVAL'))
         db.session.commit()
 
         track_activity(f"deleted note revision {revision_number} of note \"{note.note_title}\"", caseid=case_identifier)
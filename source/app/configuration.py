@@ -354,6 +354,11 @@ class Config:
 
     DROPZONE_TIMEOUT = 15 * 60 * 10000  # 15 Minutes of uploads per file
 
+    """ Access control configuration
+    With sparse case access, only granted accesses are stored and a missing effective access means no access
+    """
+    SPARSE_CASE_ACCESS = config.load('IRIS', 'SPARSE_CASE_ACCESS', fallback="False") == "True"
+
     """ Celery configuration
     Configure URL and backend
     """
@@ -477,6 +482,62 @@ class Config:
     CACHE_TYPE = "SimpleCache"
     CACHE_DEFAULT_TIMEOUT = 300
 
+    # Case access checks are cached per process. Set the timeout to 0 to disable the cache
+    CASE_ACCESS_CACHE_TIMEOUT = int(config.load('IRIS', 'CASE_ACCESS_CACHE_TIMEOUT', fallback=30))
+    CASE_ACCESS_CACHE_THRESHOLD = int(config.load('IRIS', 'CASE_ACCESS_CACHE_THRESHOLD', fallback=10000))
+
+    # Generated reports are cached on disk, shared between the web application and the workers
+    REPORTS_CACHE_PATH = config.load('IRIS', 'REPORTS_CACHE_PATH', fallback="/home/iris/server_data/reports")
+    REPORTS_CACHE_MAX_AGE = int(config.load('IRIS', 'REPORTS_CACHE_MAX_AGE', fallback=86400))
+
+    # Message queue used by the workers to emit socket.io events, such as the reports generation progress. Disabled
+    # unless set, the workers events then do not reach the browsers
+    SOCKETIO_MESSAGE_QUEUE = config.load('IRIS', 'SOCKETIO_MESSAGE_QUEUE', fallback=None) or None
+
+    # Maximum number of alerts accepted in a single call of the batch alerts creation endpoint
+    ALERTS_BATCH_MAX_SIZE = int(config.load('IRIS', 'ALERTS_BATCH_MAX_SIZE', fallback=1000))
+
+    # Maximum number of hops the alerts correlation graph can be expanded to
+    ALERTS_CORRELATION_MAX_DEPTH = int(config.load('IRIS', 'ALERTS_CORRELATION_MAX_DEPTH', fallback=3))
+
+    # Repeats of an alert ingested within the window are folded into the first one, with an occurrences counter
+    ALERTS_DEDUP_ENABLED = config.load('IRIS', 'ALERTS_DEDUP_ENABLED', fallback='False') == 'True'
+    ALERTS_DEDUP_WINDOW = int(config.load('IRIS', 'ALERTS_DEDUP_WINDOW', fallback=3600))
+    ALERTS_DEDUP_FIELDS = [field.strip() for field in config.load(
+        'IRIS', 'ALERTS_DEDUP_FIELDS', fallback='alert_source,alert_source_ref,alert_title,assets,iocs'
+    ).split(',') if field.strip()]
+
+    # Triaged alerts older than their client retention window are purged every day, 0 keeping them forever
+    ALERTS_RETENTION_DAYS = int(config.load('IRIS', 'ALERTS_RETENTION_DAYS', fallback=0))
+    ALERTS_RETENTION_CLIENTS_DAYS = config.load('IRIS', 'ALERTS_RETENTION_CLIENTS_DAYS', fallback='')
+    ALERTS_RETENTION_ARCHIVE = config.load('IRIS', 'ALERTS_RETENTION_ARCHIVE', fallback='True') == 'True'
+    ALERTS_RETENTION_BATCH_SIZE = int(config.load('IRIS', 'ALERTS_RETENTION_BATCH_SIZE', fallback=5000))
+    ALERTS_RETENTION_HOUR = int(config.load('IRIS', 'ALERTS_RETENTION_HOUR', fallback=2))
+
+    # Similarity cache entries older than this are purged, the related alerts graph not looking back further
+    SIMILAR_ALERTS_CACHE_RETENTION_DAYS = int(config.load('IRIS', 'SIMILAR_ALERTS_CACHE_RETENTION_DAYS',
+                                                          fallback=180))
+
+    # Maximum number of assets of other cases listed as similar to each asset of a case, the most recent cases first
+    CASE_ASSETS_MAX_LINKS = int(config.load('IRIS', 'CASE_ASSETS_MAX_LINKS', fallback=100))
+
+    # Note revisions are stored as deltas against a full snapshot taken every interval revisions, and the revisions
+    # older than the compaction age are thinned every day to the last one of each day. 0, the default, disables it
+    NOTE_REVISIONS_SNAPSHOT_INTERVAL = int(config.load('IRIS', 'NOTE_REVISIONS_SNAPSHOT_INTERVAL', fallback=20))
+    NOTE_REVISIONS_COMPACTION_DAYS = int(config.load('IRIS', 'NOTE_REVISIONS_COMPACTION_DAYS', fallback=0))
+    NOTE_REVISIONS_COMPACTION_HOUR = int(config.load('IRIS', 'NOTE_REVISIONS_COMPACTION_HOUR', fallback=3))
+
+    # Activities are written in bulk at the end of each request, and by a background thread in the workers
+    ACTIVITY_BUFFERING = config.load('IRIS', 'ACTIVITY_BUFFERING', fallback='True') == 'True'
+    ACTIVITY_QUEUE_SIZE = int(config.load('IRIS', 'ACTIVITY_QUEUE_SIZE', fallback=10000))
+    ACTIVITY_FLUSH_INTERVAL = float(config.load('IRIS', 'ACTIVITY_FLUSH_INTERVAL', fallback=2))
+    ACTIVITY_FLUSH_BATCH_SIZE = int(config.load('IRIS', 'ACTIVITY_FLUSH_BATCH_SIZE', fallback=500))
+
+    # Large datastore files are uploaded in chunks of this size, and the uploads not updated for the expiration delay
+    # in seconds are deleted
+    DATASTORE_UPLOAD_CHUNK_SIZE = int(config.load('IRIS', 'DATASTORE_UPLOAD_CHUNK_SIZE', fallback=8 * 1024 * 1024))
+    DATASTORE_UPLOAD_EXPIRATION = int(config.load('IRIS', 'DATASTORE_UPLOAD_EXPIRATION', fallback=24 * 3600))
+
     log.info(f'IRIS Server {IRIS_VERSION}')
     log.info(f'Min. API version supported: {API_MIN_VERSION}')
     log.info(f'Max. API version supported: {API_MAX_VERSION}')
@@ -486,4 +547,5 @@ class Config:
     log.info(f'Authentication mechanism configured: {AUTHENTICATION_TYPE}')
     log.info(f'Authentication local fallback {"enabled" if AUTHENTICATION_LOCAL_FALLBACK else "disabled"}')
     log.info(f'MFA {"enabled" if MFA_ENABLED else "disabled"}')
+    log.info(f'Sparse case access {"enabled" if SPARSE_CASE_ACCESS else "disabled"}')
     log.info(f'Create user during authentication: {"enabled" if AUTHENTICATION_CREATE_USER_IF_NOT_EXIST else "disabled"}')
@@ -15,6 +15,9 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import base64
+import hashlib
+import math
 from copy import deepcopy
 
 import json
@@ -23,9 +26,14 @@ from flask_login import current_user
 from functools import reduce
 from operator import and_
 from sqlalchemy import desc, asc, func, tuple_, or_
+from sqlalchemy import bindparam
+from sqlalchemy import text
+from sqlalchemy import insert
+from sqlalchemy import update
 from sqlalchemy.orm import aliased, make_transient
 from sqlalchemy.orm import joinedload
-from typing import List, Tuple
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Tuple
 
 import app
 from app import db
@@ -38,8 +46,10 @@ from app.datamgmt.manage.manage_case_templates_db import get_case_template_by_id
     case_template_post_modifier
 from app.datamgmt.states import update_timeline_state
 from app.models import Cases, EventCategory, Tags, AssetsType, Comments, CaseAssets, alert_assets_association, \
-    alert_iocs_association, Ioc, IocLink
+    alert_iocs_association, Ioc, IocLink, Client, CaseClassification
 from app.models.alerts import Alert, AlertStatus, AlertCaseAssociation, SimilarAlertsCache, AlertResolutionStatus
+from app.models.alerts import Severity
+from app.models.authorization import User
 from app.schema.marshables import EventSchema
 from app.util import add_obj_history_entry
 
@@ -51,6 +61,74 @@ def db_list_all_alerts():
     return db.session.query(Alert).all()
 
 
+# Count modes of the filtered alerts. The estimate relies on the planner statistics of PostgreSQL
+ALERTS_COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+class AlertsPage:
+    """
+    Page of filtered alerts, exposing the same attributes as a Flask-SQLAlchemy pagination, as well as the cursor
+    of the next page. The total and the number of pages are None if the count is skipped.
+    """
+    def __init__(self, items, page, per_page, total, has_next, next_cursor=None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_next = has_next
+        self.next_num = page + 1 if has_next and page is not None else None
+        self.next_cursor = next_cursor
+        self.pages = math.ceil(total / per_page) if total is not None and per_page else None
+
+
+def _alerts_list_load_options():
+    """
+    Loading strategy of the alerts list. Many-to-one relationships are joined, while collections are loaded
+    with one query each, so they do not multiply the rows of the paginated query.
+    """
+    return (
+        joinedload(Alert.severity), joinedload(Alert.status), joinedload(Alert.customer), joinedload(Alert.owner),
+        joinedload(Alert.classification), joinedload(Alert.resolution_status),
+        selectinload(Alert.cases).load_only(Cases.case_id),
+        selectinload(Alert.comments).load_only(Comments.comment_id),
+        selectinload(Alert.iocs).joinedload(Ioc.ioc_type),
+        selectinload(Alert.assets).joinedload(CaseAssets.asset_type)
+    )
+
+
+def encode_alerts_cursor(alert: Alert) -> str:
+    """
+    Build the cursor pointing after an alert in the alerts list
+    """
+    cursor = json.dumps([alert.alert_source_event_time.isoformat(), alert.alert_id])
+    return base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('utf-8')
+
+
+def decode_alerts_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Read a cursor built by encode_alerts_cursor
+
+    raises:
+        ValueError: If the cursor is invalid
+    """
+    try:
+        event_time, alert_id = json.loads(base64.urlsafe_b64decode(cursor.encode('utf-8')))
+        return datetime.fromisoformat(event_time), int(alert_id)
+
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+def _estimate_query_count(query) -> int:
+    """
+    Estimate the number of rows returned by a query from the plan of PostgreSQL, without running it
+    """
+    compiled = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    plan = db.session.connection().exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params).scalar()
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
 def get_filtered_alerts(
         start_date: str = None,
         end_date: str = None,
@@ -71,7 +149,9 @@ def get_filtered_alerts(
         page: int = 1,
         per_page: int = 10,
         sort: str = 'desc',
-        current_user_id: int = None
+        current_user_id: int = None,
+        cursor: str = None,
+        count_mode: str = 'exact'
 ):
     """
     Get a list of alerts that match the given filter conditions
@@ -97,9 +177,15 @@ def get_filtered_alerts(
         per_page (int): The number of alerts per page
         sort (str): The sort order
         current_user_id (int): The ID of the current user
+        cursor (str): The cursor of the page to fetch. If set, the page number is ignored and the alerts are
+                      paginated on their event time and ID, so each page costs the same whatever its depth
+        count_mode (str): Whether the total is counted exactly, estimated or skipped. See ALERTS_COUNT_MODES
 
     returns:
-        list: A list of alerts that match the given filter conditions
+        AlertsPage: The page of alerts that match the given filter conditions
+
+    raises:
+        ValueError: If the cursor is invalid
     """
     # Build the filter conditions
     conditions = []
@@ -165,19 +251,52 @@ def get_filtered_alerts(
 
     order_func = desc if sort == "desc" else asc
 
+    keyset = decode_alerts_cursor(cursor) if cursor else None
+
     try:
 
         # Query the alerts using the filter conditions
-        filtered_alerts = db.session.query(
+        alerts_query = db.session.query(
             Alert
         ).filter(
             *conditions
-        ).options(
-            joinedload(Alert.severity), joinedload(Alert.status), joinedload(Alert.customer), joinedload(Alert.cases),
-            joinedload(Alert.iocs), joinedload(Alert.assets)
+        )
+
+        if count_mode == 'exact':
+            total = alerts_query.with_entities(func.count(Alert.alert_id)).scalar()
+        elif count_mode == 'estimate':
+            total = _estimate_query_count(alerts_query)
+        else:
+            total = None
+
+        if keyset is not None:
+            keyset_columns = tuple_(Alert.alert_source_event_time, Alert.alert_id)
+            alerts_query = alerts_query.filter(
+                keyset_columns < tuple_(*keyset) if sort == "desc" else keyset_columns > tuple_(*keyset)
+            )
+
+        alerts_query = alerts_query.options(
+            *_alerts_list_load_options()
         ).order_by(
-            order_func(Alert.alert_source_event_time)
-        ).paginate(page=page, per_page=per_page, error_out=False)
+            order_func(Alert.alert_source_event_time), order_func(Alert.alert_id)
+        )
+
+        if keyset is None and cursor is None:
+            alerts_query = alerts_query.offset((max(page, 1) - 1) * per_page)
+
+        # Fetch one more alert to know if there is a next page without counting
+        items = alerts_query.limit(per_page + 1).all()
+        has_next = len(items) > per_page
+        items = items[:per_page]
+
+        filtered_alerts = AlertsPage(
+            items=items,
+            page=max(page, 1) if cursor is None else None,
+            per_page=per_page,
+            total=total,
+            has_next=has_next,
+            next_cursor=encode_alerts_cursor(items[-1]) if has_next else None
+        )
 
     except Exception as e:
         app.app.logger.exception(f"Error getting alerts: {str(e)}")
@@ -224,6 +343,216 @@ def add_alert(
     return alert
 
 
+# Fields of an alert referencing another object, with the column they reference
+ALERT_REFERENCES = (
+    ('alert_severity_id', Severity.severity_id),
+    ('alert_status_id', AlertStatus.status_id),
+    ('alert_customer_id', Client.client_id),
+    ('alert_classification_id', CaseClassification.id),
+    ('alert_resolution_status_id', AlertResolutionStatus.resolution_status_id),
+    ('alert_owner_id', User.id)
+)
+
+
+def get_alerts_invalid_references(alerts: List[Alert]) -> List[List[str]]:
+    """
+    Check the objects referenced by a list of alerts exist, with one query per kind of reference
+
+    args:
+        alerts (List[Alert]): The alerts to check
+
+    returns:
+        List[List[str]]: For each alert, the fields referencing a missing object
+    """
+    invalid_references = [[] for _ in alerts]
+
+    for field, column in ALERT_REFERENCES:
+        values = {getattr(alert, field) for alert in alerts} - {None}
+        if not values:
+            continue
+
+        existing_values = {row[0] for row in db.session.query(column).filter(column.in_(values)).all()}
+
+        for index, alert in enumerate(alerts):
+            value = getattr(alert, field)
+            if value is not None and value not in existing_values:
+                invalid_references[index].append(field)
+
+    return invalid_references
+
+
+def add_alerts_batch(alerts: List[Alert]) -> List[dict]:
+    """
+    Add a list of alerts with their IOCs and assets, and cache them for similarities, in a single transaction.
+    The alerts rows, as well as the IOCs, assets and associations rows, are inserted in batches when the session
+    is flushed.
+
+    args:
+        alerts (List[Alert]): The alerts to add
+
+    returns:
+        List[dict]: The ID, UUID and title of each added alert, in the same order
+    """
+    for alert in alerts:
+        # Set explicitly so the similarity cache does not need to fetch the server default
+        if alert.alert_source_event_time is None:
+            alert.alert_source_event_time = alert.alert_creation_time
+
+    db.session.add_all(alerts)
+    db.session.flush()
+
+    cache_similar_alerts(alerts)
+
+    added_alerts = [{
+        'alert_id': alert.alert_id,
+        'alert_uuid': str(alert.alert_uuid),
+        'alert_title': alert.alert_title
+    } for alert in alerts]
+
+    db.session.commit()
+
+    return added_alerts
+
+
+# Statuses of the alerts still being triaged, which new occurrences can be folded into and retention keeps
+ALERT_OPEN_STATUSES = ('Unspecified', 'New', 'Assigned', 'In progress', 'Pending')
+
+
+def compute_alert_fingerprint(alert: Alert, fields: List[str]) -> str:
+    """
+    Compute the fingerprint identifying the repeats of an alert. The alert client is always part of it.
+
+    args:
+        alert (Alert): The alert, with its IOCs and assets
+        fields (List[str]): The alert columns making the fingerprint, and optionally assets and iocs
+
+    returns:
+        str: The fingerprint
+    """
+    values = [alert.alert_customer_id]
+
+    for field in fields:
+        if field == 'assets':
+            values.append(sorted({((asset.asset_name or '').strip().lower(), asset.asset_type_id)
+                                  for asset in alert.assets}))
+
+        elif field == 'iocs':
+            values.append(sorted({((ioc.ioc_value or '').strip(), ioc.ioc_type_id) for ioc in alert.iocs}))
+
+        else:
+            values.append(getattr(alert, field, None))
+
+    return hashlib.sha256(json.dumps(values, default=str).encode('utf-8')).hexdigest()
+
+
+def deduplicate_alerts(alerts: List[Alert], fields: List[str], window: int) -> Tuple[List[Alert], List[Optional[Alert]]]:
+    """
+    Fold the repeats of alerts into the alert they repeat, either an open alert of the same client last seen within
+    the window, or a previous alert of the same list. The occurrences counter and last seen time of the alerts
+    folded into are updated, and the caller commits.
+
+    Fingerprints are locked until the end of the transaction, so concurrent ingestions of the same alert are folded
+    into the same one.
+
+    args:
+        alerts (List[Alert]): The new alerts, with their IOCs and assets
+        fields (List[str]): The fields making the fingerprint of an alert
+        window (int): Number of seconds after the last occurrence of an alert during which a repeat is folded into it
+
+    returns:
+        Tuple[List[Alert], List[Optional[Alert]]]: The alerts to add, and for each given alert the alert it was
+        folded into, or None
+    """
+    window = timedelta(seconds=window)
+
+    for alert in alerts:
+        if alert.alert_source_event_time is None:
+            alert.alert_source_event_time = alert.alert_creation_time
+
+        alert.alert_fingerprint = compute_alert_fingerprint(alert, fields)
+        alert.alert_occurrences = 1
+        alert.alert_last_seen_time = alert.alert_source_event_time
+
+    fingerprints = sorted({alert.alert_fingerprint for alert in alerts})
+    if not fingerprints:
+        return alerts, []
+
+    # Locked in order so concurrent batches do not deadlock
+    db.session.execute(
+        text('SELECT pg_advisory_xact_lock(hashtext(fingerprint)) '
+             'FROM (SELECT unnest(CAST(:fingerprints AS text[])) AS fingerprint ORDER BY 1) AS fingerprints'),
+        {'fingerprints': fingerprints}
+    )
+
+    with db.session.no_autoflush:
+        candidates = db.session.query(
+            Alert.alert_id, Alert.alert_customer_id, Alert.alert_fingerprint, Alert.alert_last_seen_time
+        ).join(
+            AlertStatus, Alert.alert_status_id == AlertStatus.status_id
+        ).filter(
+            tuple_(Alert.alert_customer_id, Alert.alert_fingerprint).in_(
+                {(alert.alert_customer_id, alert.alert_fingerprint) for alert in alerts}
+            ),
+            Alert.alert_last_seen_time >= min(alert.alert_source_event_time for alert in alerts) - window,
+            AlertStatus.status_name.in_(ALERT_OPEN_STATUSES)
+        ).order_by(
+            Alert.alert_last_seen_time.desc()
+        ).all()
+
+    existing = {}
+    for candidate in candidates:
+        existing.setdefault((candidate.alert_customer_id, candidate.alert_fingerprint), candidate)
+
+    alerts_to_add = []
+    folded_into = []
+    in_batch = {}
+    existing_updates = {}
+
+    for alert in alerts:
+        key = (alert.alert_customer_id, alert.alert_fingerprint)
+        event_time = alert.alert_source_event_time
+
+        target = in_batch.get(key)
+        if target is not None and abs(event_time - target.alert_last_seen_time) <= window:
+            target.alert_occurrences += 1
+            target.alert_last_seen_time = max(target.alert_last_seen_time, event_time)
+            folded_into.append(target)
+            continue
+
+        candidate = existing.get(key)
+        if target is None and candidate is not None and event_time - candidate.alert_last_seen_time <= window:
+            occurrences, last_seen = existing_updates.get(candidate.alert_id, (0, event_time))
+            existing_updates[candidate.alert_id] = (occurrences + 1, max(last_seen, event_time))
+            folded_into.append(candidate.alert_id)
+            continue
+
+        in_batch[key] = alert
+        alerts_to_add.append(alert)
+        folded_into.append(None)
+
+    if existing_updates:
+        alerts_table = Alert.__table__
+        db.session.execute(
+            update(alerts_table).where(
+                alerts_table.c.alert_id == bindparam('b_alert_id')
+            ).values(
+                alert_occurrences=alerts_table.c.alert_occurrences + bindparam('b_occurrences'),
+                alert_last_seen_time=func.greatest(alerts_table.c.alert_last_seen_time, bindparam('b_last_seen'))
+            ),
+            [{'b_alert_id': alert_id, 'b_occurrences': occurrences, 'b_last_seen': last_seen}
+             for alert_id, (occurrences, last_seen) in existing_updates.items()]
+        )
+
+        with db.session.no_autoflush:
+            folded_alerts = {alert.alert_id: alert for alert in Alert.query.populate_existing().filter(
+                Alert.alert_id.in_(existing_updates.keys())
+            ).all()}
+
+        folded_into = [folded_alerts[target] if isinstance(target, int) else target for target in folded_into]
+
+    return alerts_to_add, folded_into
+
+
 def get_alert_by_id(alert_id: int) -> Alert:
     """
     Get an alert from the database
@@ -242,6 +571,46 @@ def get_alert_by_id(alert_id: int) -> Alert:
     )
 
 
+def get_alerts_by_ids(alert_ids: List[int]) -> List[Alert]:
+    """
+    Get a list of alerts in a single query, with their IOCs, assets and cases
+
+    args:
+        alert_ids (List[int]): The IDs of the alerts
+
+    returns:
+        List[Alert]: The alerts found, in the order of the given IDs
+    """
+    alerts = Alert.query.options(
+        selectinload(Alert.iocs), selectinload(Alert.assets), selectinload(Alert.cases)
+    ).filter(
+        Alert.alert_id.in_(alert_ids)
+    ).all()
+
+    alerts_by_id = {alert.alert_id: alert for alert in alerts}
+
+    return [alerts_by_id[alert_id] for alert_id in dict.fromkeys(alert_ids) if alert_id in alerts_by_id]
+
+
+def update_alerts_values(alert_ids: List[int], values: dict):
+    """
+    Set the same column values on a list of alerts with a single UPDATE. The caller commits.
+
+    args:
+        alert_ids (List[int]): The IDs of the alerts
+        values (dict): The values to set, keyed by column name
+
+    returns:
+        None
+    """
+    if not alert_ids or not values:
+        return
+
+    db.session.execute(
+        update(Alert).where(Alert.alert_id.in_(alert_ids)).values(**values)
+    )
+
+
 def get_unspecified_event_category():
     """
     Get the id of the 'Unspecified' event category
@@ -361,7 +730,7 @@ def create_case_from_alerts(alerts: List[Alert], iocs_list: List[str], assets_li
             add_obj_history_entry(event, 'created')
 
             db.session.add(event)
-            update_timeline_state(caseid=case.case_id)
+            update_timeline_state(caseid=case.case_id, event=event, change_type='created')
 
             event.category = [unspecified_cat]
 
@@ -508,7 +877,7 @@ def create_case_from_alert(alert: Alert, iocs_list: List[str], assets_list: List
         add_obj_history_entry(event, 'created')
 
         db.session.add(event)
-        update_timeline_state(caseid=case.case_id)
+        update_timeline_state(caseid=case.case_id, event=event, change_type='created')
 
         event.category = [unspecified_cat]
 
@@ -625,7 +994,7 @@ def merge_alert_in_case(alert: Alert, case: Cases, iocs_list: List[str],
         add_obj_history_entry(event, 'created')
 
         db.session.add(event)
-        update_timeline_state(caseid=case.case_id)
+        update_timeline_state(caseid=case.case_id, event=event, change_type='created')
 
         event.category = [unspecified_cat]
 
@@ -773,6 +1142,60 @@ def cache_similar_alert(customer_id, assets, iocs, alert_id, creation_date):
     db.session.commit()
 
 
+def cache_similar_alerts(alerts: List[Alert]):
+    """
+    Cache a list of flushed alerts for similarities check, in a single bulk insert. The caller commits.
+
+    args:
+        alerts (List[Alert]): The alerts to cache
+
+    returns:
+        None
+    """
+    cache_entries = []
+    for alert in alerts:
+        for asset in alert.assets:
+            cache_entries.append({
+                'customer_id': alert.alert_customer_id,
+                'asset_name': asset.asset_name,
+                'asset_type_id': asset.asset_type_id,
+                'alert_id': alert.alert_id,
+                'created_at': alert.alert_source_event_time
+            })
+
+        for ioc in alert.iocs:
+            cache_entries.append({
+                'customer_id': alert.alert_customer_id,
+                'ioc_value': ioc.ioc_value,
+                'ioc_type_id': ioc.ioc_type_id,
+                'alert_id': alert.alert_id,
+                'created_at': alert.alert_source_event_time
+            })
+
+    if cache_entries:
+        db.session.execute(insert(SimilarAlertsCache), cache_entries)
+
+
+# Fields of an alert copied in its similarity cache entries
+SIMILAR_ALERTS_CACHE_FIELDS = ('alert_customer_id', 'alert_source_event_time', 'assets', 'iocs')
+
+
+def refresh_similar_alerts_cache(alerts: List[Alert]):
+    """
+    Rebuild the similarity cache entries of alerts, once their assets, IOCs or customer changed. The caller commits.
+
+    args:
+        alerts (List[Alert]): The updated alerts
+
+    returns:
+        None
+    """
+    SimilarAlertsCache.query.filter(
+        SimilarAlertsCache.alert_id.in_([alert.alert_id for alert in alerts])
+    ).delete(synchronize_session=False)
+    cache_similar_alerts(alerts)
+
+
 def delete_similar_alert_cache(alert_id):
     """
     Delete the similar alert cache
@@ -835,10 +1258,148 @@ def get_related_alerts(customer_id, assets, iocs, details=False):
     return similarities
 
 
+def _get_correlated_alerts_entities(customer_id, assets, iocs, alert_status_filter, days_back, limit):
+    """
+    Fetch the alerts sharing at least one of the given entities from the similarity cache
+
+    returns:
+        list: Tuples (alert_id, asset_name, ioc_value, asset_icon) of the matching cache entries
+    """
+    entity_conditions = []
+    if assets:
+        entity_conditions.append(
+            tuple_(SimilarAlertsCache.asset_name, SimilarAlertsCache.asset_type_id).in_(list(assets))
+        )
+    if iocs:
+        entity_conditions.append(
+            tuple_(SimilarAlertsCache.ioc_value, SimilarAlertsCache.ioc_type_id).in_(list(iocs))
+        )
+
+    asset_type_alias = aliased(AssetsType)
+
+    query = db.session.query(
+        SimilarAlertsCache.alert_id, SimilarAlertsCache.asset_name, SimilarAlertsCache.ioc_value,
+        asset_type_alias.asset_icon_not_compromised
+    ).outerjoin(
+        asset_type_alias, SimilarAlertsCache.asset_type_id == asset_type_alias.asset_id
+    ).filter(
+        SimilarAlertsCache.customer_id == customer_id,
+        or_(*entity_conditions),
+        SimilarAlertsCache.created_at >= (func.now() - timedelta(days=days_back))
+    )
+
+    if alert_status_filter:
+        query = query.join(
+            Alert, Alert.alert_id == SimilarAlertsCache.alert_id
+        ).filter(
+            Alert.alert_status_id.in_(alert_status_filter)
+        )
+
+    return query.limit(limit).all()
+
+
+def _get_correlated_cases(customer_id, asset_names, ioc_values, close_condition, limit):
+    """
+    Fetch the cases of a customer holding at least one of the given assets names or IOCs values
+
+    returns:
+        tuple: The matching (case_id, ioc_value, case_name, close_date) and (case_id, asset_name, case_name,
+               close_date) rows
+    """
+    matching_ioc_cases = []
+    if ioc_values:
+        matching_ioc_cases = (
+            db.session.query(IocLink)
+            .with_entities(IocLink.case_id, Ioc.ioc_value, Cases.name, Cases.close_date)
+            .join(IocLink.ioc)
+            .join(IocLink.case)
+            .filter(
+                Ioc.ioc_value.in_(ioc_values),
+                Cases.client_id == customer_id,
+                close_condition
+            )
+            .distinct()
+            .limit(limit)
+            .all()
+        )
+
+    matching_asset_cases = []
+    if asset_names:
+        matching_asset_cases = (
+            db.session.query(CaseAssets)
+            .with_entities(CaseAssets.case_id, CaseAssets.asset_name, Cases.name, Cases.close_date)
+            .join(CaseAssets.case)
+            .filter(
+                CaseAssets.asset_name.in_(asset_names),
+                Cases.client_id == customer_id,
+                close_condition
+            )
+            .distinct()
+            .limit(limit)
+            .all()
+        )
+
+    return matching_ioc_cases, matching_asset_cases
+
+
+def _get_cases_entities(cases_ids):
+    """
+    Fetch the assets and IOCs of a list of cases, to expand the correlation graph from them
+
+    returns:
+        tuple: The sets of (asset_name, asset_type_id) and (ioc_value, ioc_type_id) of the cases
+    """
+    if not cases_ids:
+        return set(), set()
+
+    assets = db.session.query(
+        CaseAssets.asset_name, CaseAssets.asset_type_id
+    ).filter(
+        CaseAssets.case_id.in_(cases_ids)
+    ).distinct().all()
+
+    iocs = db.session.query(
+        Ioc.ioc_value, Ioc.ioc_type_id
+    ).join(
+        IocLink, IocLink.ioc_id == Ioc.ioc_id
+    ).filter(
+        IocLink.case_id.in_(cases_ids)
+    ).distinct().all()
+
+    return {tuple(asset) for asset in assets}, {tuple(ioc) for ioc in iocs}
+
+
+def _get_alerts_entities(alerts_ids):
+    """
+    Fetch the assets and IOCs of a list of alerts from the similarity cache
+
+    returns:
+        tuple: The sets of (asset_name, asset_type_id) and (ioc_value, ioc_type_id) of the alerts
+    """
+    if not alerts_ids:
+        return set(), set()
+
+    entries = db.session.query(
+        SimilarAlertsCache.asset_name, SimilarAlertsCache.asset_type_id,
+        SimilarAlertsCache.ioc_value, SimilarAlertsCache.ioc_type_id
+    ).filter(
+        SimilarAlertsCache.alert_id.in_(alerts_ids)
+    ).distinct().all()
+
+    assets = {(asset_name, asset_type_id) for asset_name, asset_type_id, _, _ in entries if asset_name is not None}
+    iocs = {(ioc_value, ioc_type_id) for _, _, ioc_value, ioc_type_id in entries if ioc_value is not None}
+
+    return assets, iocs
+
+
 def get_related_alerts_details(customer_id, assets, iocs, open_alerts, closed_alerts, open_cases, closed_cases,
-                               days_back=30, number_of_results=200):
+                               days_back=30, number_of_results=200, depth=1):
     """
-    Get the details of the related alerts
+    Get the details of the related alerts.
+
+    The alerts sharing an asset or an IOC are looked up in the similarity cache, maintained as alerts are created,
+    updated and deleted, and the cases in their assets and IOCs. With a depth above 1, the graph is expanded from
+    the entities of the alerts and cases found at the previous hop. Each hop costs a bounded number of queries.
 
     args:
         customer_id (int): The ID of the customer
@@ -850,6 +1411,7 @@ def get_related_alerts_details(customer_id, assets, iocs, open_alerts, closed_al
         closed_cases (bool): Include closed cases
         days_back (int): The number of days to look back
         number_of_results (int): The maximum number of alerts to return
+        depth (int): The number of hops to expand the graph
 
     returns:
         dict: The details of the related alerts with matched assets and/or IOCs
@@ -860,10 +1422,6 @@ def get_related_alerts_details(customer_id, assets, iocs, open_alerts, closed_al
             'edges': []
         }
 
-    asset_names = [(asset.asset_name, asset.asset_type_id) for asset in assets]
-    ioc_values = [(ioc.ioc_value, ioc.ioc_type_id) for ioc in iocs]
-
-    asset_type_alias = aliased(AssetsType)
     alert_status_filter = []
 
     if open_alerts:
@@ -878,41 +1436,82 @@ def get_related_alerts_details(customer_id, assets, iocs, open_alerts, closed_al
         ).filter(AlertStatus.status_name.in_(['Closed', 'Merged', 'Escalated'])).all()
         alert_status_filter += [status_id[0] for status_id in closed_alert_status_ids]
 
-    conditions = and_(
-        SimilarAlertsCache.customer_id == customer_id,
-        and_(or_(
-            tuple_(SimilarAlertsCache.asset_name, SimilarAlertsCache.asset_type_id).in_(asset_names),
-            tuple_(SimilarAlertsCache.ioc_value, SimilarAlertsCache.ioc_type_id).in_(ioc_values)
-        ),
-        SimilarAlertsCache.created_at >= (func.now() - timedelta(days=days_back))
-        )
-    )
+    close_condition = None
+    if open_cases and not closed_cases:
+        close_condition = Cases.close_date.is_(None)
+    if closed_cases and not open_cases:
+        close_condition = Cases.close_date.isnot(None)
+    if open_cases and closed_cases:
+        close_condition = Cases.close_date.isnot(None) | Cases.close_date.is_(None)
 
-    if alert_status_filter:
-        conditions = and_(conditions, Alert.alert_status_id.in_(alert_status_filter))
-
-    related_alerts = (
-        db.session.query(Alert, SimilarAlertsCache.asset_name, SimilarAlertsCache.ioc_value,
-                         asset_type_alias.asset_icon_not_compromised)
-        .join(SimilarAlertsCache, Alert.alert_id == SimilarAlertsCache.alert_id)
-        .outerjoin(asset_type_alias, SimilarAlertsCache.asset_type_id == asset_type_alias.asset_id)
-        .filter(conditions)
-        .limit(number_of_results)
-        .all()
-    )
+    frontier_assets = {(asset.asset_name, asset.asset_type_id) for asset in assets}
+    frontier_iocs = {(ioc.ioc_value, ioc.ioc_type_id) for ioc in iocs}
+    seen_assets = set(frontier_assets)
+    seen_iocs = set(frontier_iocs)
 
     alerts_dict = {}
+    cases_data = {}
+
+    for _ in range(max(depth, 1)):
+        if len(alerts_dict) >= number_of_results:
+            break
 
-    for alert, asset_name, ioc_value, asset_icon_not_compromised in related_alerts:
-        if alert.alert_id not in alerts_dict:
-            alerts_dict[alert.alert_id] = {'alert': alert, 'assets': [], 'iocs': []}
+        new_alerts = set()
+        for alert_id, asset_name, ioc_value, asset_icon_not_compromised in _get_correlated_alerts_entities(
+                customer_id, frontier_assets, frontier_iocs, alert_status_filter, days_back, number_of_results):
 
-        if any(name == asset_name for name, _ in asset_names):
-            asset_info = {'asset_name': asset_name, 'icon': asset_icon_not_compromised}
-            alerts_dict[alert.alert_id]['assets'].append(asset_info)
+            if alert_id not in alerts_dict:
+                if len(alerts_dict) >= number_of_results:
+                    continue
+                alerts_dict[alert_id] = {'assets': {}, 'iocs': set()}
+                new_alerts.add(alert_id)
 
-        if any(value == ioc_value for value, _ in ioc_values):
-            alerts_dict[alert.alert_id]['iocs'].append(ioc_value)
+            if asset_name is not None:
+                alerts_dict[alert_id]['assets'][asset_name] = asset_icon_not_compromised
+
+            if ioc_value is not None:
+                alerts_dict[alert_id]['iocs'].add(ioc_value)
+
+        new_cases = set()
+        if close_condition is not None:
+            matching_ioc_cases, matching_asset_cases = _get_correlated_cases(
+                customer_id, {name for name, _ in frontier_assets}, {value for value, _ in frontier_iocs},
+                close_condition, number_of_results
+            )
+
+            for case_id, ioc_value, case_name, close_date in matching_ioc_cases:
+                if case_id not in cases_data:
+                    cases_data[case_id] = {'name': case_name, 'matching_ioc': set(), 'matching_assets': set(),
+                                           'close_date': close_date}
+                    new_cases.add(case_id)
+                cases_data[case_id]['matching_ioc'].add(ioc_value)
+
+            for case_id, asset_name, case_name, close_date in matching_asset_cases:
+                if case_id not in cases_data:
+                    cases_data[case_id] = {'name': case_name, 'matching_ioc': set(), 'matching_assets': set(),
+                                           'close_date': close_date}
+                    new_cases.add(case_id)
+                cases_data[case_id]['matching_assets'].add(asset_name)
+
+        # Expand the next hop from the entities of the alerts and cases found at this one
+        alerts_assets, alerts_iocs = _get_alerts_entities(new_alerts) if depth > 1 else (set(), set())
+        cases_assets, cases_iocs = _get_cases_entities(new_cases) if depth > 1 else (set(), set())
+
+        frontier_assets = (alerts_assets | cases_assets) - seen_assets
+        frontier_iocs = (alerts_iocs | cases_iocs) - seen_iocs
+        seen_assets |= frontier_assets
+        seen_iocs |= frontier_iocs
+
+        if not frontier_assets and not frontier_iocs:
+            break
+
+    # Load the matched alerts at once rather than with each cache entry
+    alerts = Alert.query.options(
+        joinedload(Alert.status)
+    ).filter(
+        Alert.alert_id.in_(list(alerts_dict.keys()))
+    ).all() if alerts_dict else []
+    alerts_by_id = {alert.alert_id: alert for alert in alerts}
 
     nodes = []
     edges = []
@@ -922,12 +1521,16 @@ def get_related_alerts_details(customer_id, assets, iocs, open_alerts, closed_al
     added_cases = set()
 
     for alert_id, alert_info in alerts_dict.items():
-        alert_color = '#c95029' if alert_info['alert'].status.status_name in ['Closed', 'Merged', 'Escalated'] else ''
+        alert = alerts_by_id.get(alert_id)
+        if alert is None:
+            continue
+
+        alert_color = '#c95029' if alert.status.status_name in ['Closed', 'Merged', 'Escalated'] else ''
 
         nodes.append({
             'id': f'alert_{alert_id}',
             'label': f'[Closed] Alert #{alert_id}' if alert_color != '' else f'Alert #{alert_id}',
-            'title': alert_info['alert'].alert_title,
+            'title': alert.alert_title,
             'group': 'alert',
             'shape': 'icon',
             'icon': {
@@ -939,16 +1542,14 @@ def get_related_alerts_details(customer_id, assets, iocs, open_alerts, closed_al
             'font': "12px verdana white" if current_user.in_dark_mode else ''
         })
 
-        for asset_info in alert_info['assets']:
-            asset_id = asset_info['asset_name']
-
+        for asset_id, asset_icon in alert_info['assets'].items():
             if asset_id not in added_assets:
                 nodes.append({
                     'id': f'asset_{asset_id}',
                     'label': asset_id,
                     'group': 'asset',
                     'shape': 'image',
-                    'image': '/static/assets/img/graph/' + asset_info['icon'],
+                    'image': '/static/assets/img/graph/' + asset_icon,
                     'font': "12px verdana white" if current_user.in_dark_mode else ''
                 })
                 added_assets.add(asset_id)
@@ -981,84 +1582,42 @@ def get_related_alerts_details(customer_id, assets, iocs, open_alerts, closed_al
                 'dashes': True
             })
 
-    if open_cases or closed_cases:
-        close_condition = None
-        if open_cases and not closed_cases:
-            close_condition = Cases.close_date.is_(None)
-        if closed_cases and not open_cases:
-            close_condition = Cases.close_date.isnot(None)
-        if open_cases and closed_cases:
-            close_condition = Cases.close_date.isnot(None) | Cases.close_date.is_(None)
-
-        matching_ioc_cases = (
-            db.session.query(IocLink)
-            .with_entities(IocLink.case_id, Ioc.ioc_value, Cases.name, Cases.close_date)
-            .join(IocLink.ioc)
-            .join(IocLink.case)
-            .filter(
-                Ioc.ioc_value.in_(added_iocs),
-                close_condition
-            )
-            .distinct()
-            .all()
-        )
-
-        matching_asset_cases = (
-            db.session.query(CaseAssets)
-            .with_entities(CaseAssets.case_id, CaseAssets.asset_name, Cases.name, Cases.close_date)
-            .join(CaseAssets.case)
-            .filter(
-                CaseAssets.asset_name.in_(added_assets),
-                close_condition
-            )
-            .distinct(CaseAssets.case_id)
-            .all()
-        )
-
-        cases_data = {}
-
-        for case_id, ioc_value, case_name, close_date in matching_ioc_cases:
-            if case_id not in cases_data:
-                cases_data[case_id] = {'name': case_name, 'matching_ioc': [], 'matching_assets': [],
-                                       'close_date': close_date}
-            cases_data[case_id]['matching_ioc'].append(ioc_value)
-
-        for case_id, asset_name, case_name, close_date in matching_asset_cases:
-            if case_id not in cases_data:
-                cases_data[case_id] = {'name': case_name, 'matching_ioc': [], 'matching_assets': [],
-                                       'close_date': close_date}
-            cases_data[case_id]['matching_assets'].append(asset_name)
-
-        for case_id in cases_data:
-            if case_id not in added_cases:
-                nodes.append({
-                    'id': f'case_{case_id}',
-                    'label': f'[Closed] Case #{case_id}' if cases_data[case_id].get('close_date') else f'Case #{case_id}',
-                    'title': cases_data[case_id]['name'],
-                    'group': 'case',
-                    'shape': 'icon',
-                    'icon': {
-                        'face': 'FontAwesome',
-                        'code': '\uf0b1',
-                        'color': '#c95029' if cases_data[case_id].get('close_date') else '#4cba4f'
-                    },
-                    'font': "12px verdana white" if current_user.in_dark_mode else ''
-                })
-                added_cases.add(case_id)
+    for case_id in cases_data:
+        # Cases are only linked through the entities present in the graph
+        matching_ioc = cases_data[case_id]['matching_ioc'] & added_iocs
+        matching_assets = cases_data[case_id]['matching_assets'] & added_assets
+        if not matching_ioc and not matching_assets:
+            continue
+
+        if case_id not in added_cases:
+            nodes.append({
+                'id': f'case_{case_id}',
+                'label': f'[Closed] Case #{case_id}' if cases_data[case_id].get('close_date') else f'Case #{case_id}',
+                'title': cases_data[case_id]['name'],
+                'group': 'case',
+                'shape': 'icon',
+                'icon': {
+                    'face': 'FontAwesome',
+                    'code': '\uf0b1',
+                    'color': '#c95029' if cases_data[case_id].get('close_date') else '#4cba4f'
+                },
+                'font': "12px verdana white" if current_user.in_dark_mode else ''
+            })
+            added_cases.add(case_id)
 
-            for ioc_value in cases_data[case_id]['matching_ioc']:
-                edges.append({
-                    'from': f'ioc_{ioc_value}',
-                    'to': f'case_{case_id}',
-                    'dashes': True
-                })
+        for ioc_value in matching_ioc:
+            edges.append({
+                'from': f'ioc_{ioc_value}',
+                'to': f'case_{case_id}',
+                'dashes': True
+            })
 
-            for asset_name in cases_data[case_id]['matching_assets']:
-                edges.append({
-                    'from': f'asset_{asset_name}',
-                    'to': f'case_{case_id}',
-                    'dashes': True
-                })
+        for asset_name in matching_assets:
+            edges.append({
+                'from': f'asset_{asset_name}',
+                'to': f'case_{case_id}',
+                'dashes': True
+            })
 
     return {
         'nodes': nodes,
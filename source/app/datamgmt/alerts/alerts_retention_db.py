@@ -0,0 +1,235 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from datetime import datetime
+from datetime import timedelta
+from sqlalchemy import and_
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import text
+from typing import Dict, List, Optional
+
+from app import db
+from app.datamgmt.alerts.alerts_db import ALERT_OPEN_STATUSES
+from app.models import CaseAssets
+from app.models import Comments
+from app.models import alert_assets_association
+from app.models import alert_iocs_association
+from app.models.alerts import Alert
+from app.models.alerts import AlertCaseAssociation
+from app.models.alerts import AlertStatus
+from app.models.alerts import SimilarAlertsCache
+
+
+def parse_retention_windows(windows: str) -> Dict[int, int]:
+    """
+    Read per client retention windows, given as comma separated client_id:days pairs
+
+    args:
+        windows (str): The retention windows, such as 1:90,4:365
+
+    returns:
+        Dict[int, int]: The number of days to keep, by client ID
+    """
+    retention_windows = {}
+    for window in (windows or '').split(','):
+        if not window.strip():
+            continue
+
+        client_id, _, days = window.partition(':')
+        retention_windows[int(client_id.strip())] = int(days.strip())
+
+    return retention_windows
+
+
+def purge_similar_alerts_cache(before: datetime, batch_size: int) -> int:
+    """
+    Delete the similarity cache entries created before a date, by batches committed one after the other
+
+    args:
+        before (datetime): The entries created before this date are deleted
+        batch_size (int): The number of entries deleted by each statement
+
+    returns:
+        int: The number of deleted entries
+    """
+    deleted = 0
+    while True:
+        expired_ids = select(SimilarAlertsCache.id).where(
+            SimilarAlertsCache.created_at < before
+        ).limit(batch_size).scalar_subquery()
+
+        result = db.session.execute(
+            delete(SimilarAlertsCache).where(SimilarAlertsCache.id.in_(expired_ids)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def get_expired_alerts_ids(before: datetime, limit: int, customer_id: Optional[int] = None,
+                           excluded_customers_ids: Optional[List[int]] = None) -> List[int]:
+    """
+    Get the IDs of the triaged alerts last seen before a date
+
+    args:
+        before (datetime): The alerts last seen before this date are returned
+        limit (int): The maximum number of IDs to return
+        customer_id (int): Only return the alerts of this client
+        excluded_customers_ids (List[int]): Do not return the alerts of these clients
+
+    returns:
+        List[int]: The IDs of the expired alerts
+    """
+    query = db.session.query(Alert.alert_id).join(
+        AlertStatus, Alert.alert_status_id == AlertStatus.status_id
+    ).filter(
+        # The event time is never after the last occurrence, and is indexed
+        Alert.alert_source_event_time < before,
+        func.coalesce(Alert.alert_last_seen_time, Alert.alert_source_event_time) < before,
+        AlertStatus.status_name.notin_(ALERT_OPEN_STATUSES)
+    )
+
+    if customer_id is not None:
+        query = query.filter(Alert.alert_customer_id == customer_id)
+
+    if excluded_customers_ids:
+        query = query.filter(Alert.alert_customer_id.notin_(excluded_customers_ids))
+
+    return [row.alert_id for row in query.order_by(Alert.alert_id).limit(limit).all()]
+
+
+def archive_alerts(alert_ids: List[int]) -> None:
+    """
+    Copy alerts in the archive with a single INSERT ... SELECT, along with their IOCs and assets. The caller commits.
+
+    args:
+        alert_ids (List[int]): The IDs of the alerts to archive
+
+    returns:
+        None
+    """
+    db.session.execute(text("""
+        INSERT INTO alerts_archive (alert_id, alert_uuid, alert_customer_id, alert_source_event_time, alert_data)
+        SELECT a.alert_id, a.alert_uuid, a.alert_customer_id, a.alert_source_event_time,
+               (to_jsonb(a) - 'search_vector') || jsonb_build_object(
+                   'iocs', (SELECT coalesce(jsonb_agg(jsonb_build_object('ioc_value', i.ioc_value,
+                                                                         'ioc_type_id', i.ioc_type_id)), '[]')
+                            FROM alert_iocs_association ai JOIN ioc i ON i.ioc_id = ai.ioc_id
+                            WHERE ai.alert_id = a.alert_id),
+                   'assets', (SELECT coalesce(jsonb_agg(jsonb_build_object('asset_name', c.asset_name,
+                                                                           'asset_type_id', c.asset_type_id)), '[]')
+                              FROM alert_assets_association aa JOIN case_assets c ON c.asset_id = aa.asset_id
+                              WHERE aa.alert_id = a.alert_id),
+                   'cases', (SELECT coalesce(jsonb_agg(ac.case_id), '[]')
+                             FROM alert_case_association ac WHERE ac.alert_id = a.alert_id)
+               )
+        FROM alerts a
+        WHERE a.alert_id = ANY(:alert_ids)
+        ON CONFLICT (alert_id) DO NOTHING
+    """), {'alert_ids': alert_ids})
+
+
+def purge_alerts(alert_ids: List[int]) -> None:
+    """
+    Delete alerts and the rows referencing them with one statement per table. The assets only created for the alerts
+    are deleted as well. The caller commits.
+
+    args:
+        alert_ids (List[int]): The IDs of the alerts to delete
+
+    returns:
+        None
+    """
+    asset_ids = select(alert_assets_association.c.asset_id).where(
+        alert_assets_association.c.alert_id.in_(alert_ids)
+    ).scalar_subquery()
+
+    orphan_asset_ids = [row[0] for row in db.session.execute(
+        select(CaseAssets.asset_id).where(
+            CaseAssets.asset_id.in_(asset_ids),
+            CaseAssets.case_id.is_(None)
+        )
+    ).all()]
+
+    db.session.execute(delete(SimilarAlertsCache).where(SimilarAlertsCache.alert_id.in_(alert_ids)),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(delete(Comments).where(Comments.comment_alert_id.in_(alert_ids)),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(delete(AlertCaseAssociation).where(AlertCaseAssociation.alert_id.in_(alert_ids)),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(delete(alert_iocs_association).where(alert_iocs_association.c.alert_id.in_(alert_ids)))
+    db.session.execute(delete(alert_assets_association).where(alert_assets_association.c.alert_id.in_(alert_ids)))
+
+    if orphan_asset_ids:
+        # Assets still shared with alerts which are kept are not deleted
+        db.session.execute(delete(CaseAssets).where(and_(
+            CaseAssets.asset_id.in_(orphan_asset_ids),
+            ~select(alert_assets_association.c.asset_id).where(
+                alert_assets_association.c.asset_id == CaseAssets.asset_id
+            ).exists()
+        )), execution_options={'synchronize_session': False})
+
+    db.session.execute(delete(Alert).where(Alert.alert_id.in_(alert_ids)),
+                       execution_options={'synchronize_session': False})
+
+
+def apply_alerts_retention(default_days: int, clients_days: Dict[int, int], archive: bool, batch_size: int) -> int:
+    """
+    Delete, and optionally archive, the triaged alerts older than the retention window of their client.
+    Alerts are processed by batches committed one after the other, so the purge can be interrupted and resumed.
+
+    args:
+        default_days (int): Number of days the alerts are kept, 0 to keep them forever
+        clients_days (Dict[int, int]): Number of days the alerts are kept by client ID, overriding the default
+        archive (bool): Whether to copy the alerts in the archive before deleting them
+        batch_size (int): Number of alerts processed by each batch
+
+    returns:
+        int: The number of purged alerts
+    """
+    now = datetime.utcnow()
+
+    # Each window is given as (before, customer_id, excluded_customers_ids)
+    windows = [(now - timedelta(days=days), customer_id, None) for customer_id, days in clients_days.items() if days > 0]
+    if default_days > 0:
+        windows.append((now - timedelta(days=default_days), None, list(clients_days.keys())))
+
+    purged = 0
+    for before, customer_id, excluded_customers_ids in windows:
+        while True:
+            alert_ids = get_expired_alerts_ids(before, batch_size, customer_id=customer_id,
+                                               excluded_customers_ids=excluded_customers_ids)
+            if not alert_ids:
+                break
+
+            if archive:
+                archive_alerts(alert_ids)
+
+            purge_alerts(alert_ids)
+            db.session.commit()
+
+            purged += len(alert_ids)
+            if len(alert_ids) < batch_size:
+                break
+
+    return purged
@@ -232,7 +232,23 @@ def get_assets_ioc_links(caseid):
 
     return ioc_links_req
 
-def get_similar_assets(asset_name, asset_type_id, caseid, customer_id, cases_limitation):
+def get_case_similar_assets(caseid, customer_id, cases_limitation, max_links):
+    """
+    Get the assets of other cases of the same customer sharing the name and type of the assets of a case,
+    with a single query
+
+    :param caseid: Case ID
+    :param customer_id: Customer ID of the case
+    :param cases_limitation: IDs of the cases the user can access
+    :param max_links: Maximum number of similar assets returned for each asset, the most recent cases first
+    :return: Dict of the similar assets, keyed by asset name and type ID
+    """
+    case_assets = CaseAssets.query.with_entities(
+        CaseAssets.asset_name,
+        CaseAssets.asset_type_id
+    ).filter(
+        CaseAssets.case_id == caseid
+    ).distinct().subquery()
 
     linked_assets = CaseAssets.query.with_entities(
         Cases.name.label('case_name'),
@@ -240,17 +256,44 @@ def get_similar_assets(asset_name, asset_type_id, caseid, customer_id, cases_lim
         CaseAssets.asset_description,
         CaseAssets.asset_compromise_status_id,
         CaseAssets.asset_id,
-        CaseAssets.case_id
+        CaseAssets.case_id,
+        CaseAssets.asset_name,
+        CaseAssets.asset_type_id,
+        func.row_number().over(
+            partition_by=(CaseAssets.asset_name, CaseAssets.asset_type_id),
+            order_by=(Cases.open_date.desc(), CaseAssets.asset_id.desc())
+        ).label('link_rank')
+    ).join(
+        case_assets, and_(
+            CaseAssets.asset_name == case_assets.c.asset_name,
+            CaseAssets.asset_type_id == case_assets.c.asset_type_id
+        )
+    ).join(
+        CaseAssets.case
     ).filter(
         Cases.client_id == customer_id,
-        CaseAssets.case_id != caseid
-    ).filter(
-        CaseAssets.asset_name == asset_name,
-        CaseAssets.asset_type_id == asset_type_id,
+        CaseAssets.case_id != caseid,
         Cases.case_id.in_(cases_limitation)
-    ).join(CaseAssets.case).all()
+    ).subquery()
+
+    similar_assets = db.session.query(linked_assets).filter(
+        linked_assets.c.link_rank <= max_links
+    ).order_by(
+        linked_assets.c.link_rank
+    ).all()
 
-    return (lasset._asdict() for lasset in linked_assets)
+    links = {}
+    for similar_asset in similar_assets:
+        links.setdefault((similar_asset.asset_name, similar_asset.asset_type_id), []).append({
+            'case_name': similar_asset.case_name,
+            'case_open_date': similar_asset.case_open_date,
+            'asset_description': similar_asset.asset_description,
+            'asset_compromise_status_id': similar_asset.asset_compromise_status_id,
+            'asset_id': similar_asset.asset_id,
+            'case_id': similar_asset.case_id
+        })
+
+    return links
 
 
 def delete_ioc_asset_link(asset_id):
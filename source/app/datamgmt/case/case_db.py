@@ -17,7 +17,10 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import binascii
+from flask import g
+from flask import has_app_context
 from sqlalchemy import and_
+from sqlalchemy import inspect
 
 from app import db
 from app.datamgmt.manage.manage_tags_db import add_db_tag
@@ -48,7 +51,21 @@ def get_case_summary(caseid):
 
 
 def get_case(caseid) -> Cases:
-    return Cases.query.filter(Cases.case_id == caseid).first()
+    if caseid is None:
+        return None
+
+    # The case is kept for the rest of the request, so the case loaded by the access checks is reused by the route
+    # without a new query. The session identity map only holds weak references and cannot be relied on for this
+    if has_app_context():
+        case = g.get('case')
+        if case is not None and inspect(case).persistent and inspect(case).identity == (caseid,):
+            return case
+
+    case = db.session.get(Cases, caseid)
+    if has_app_context():
+        g.case = case
+
+    return case
 
 
 def case_exists(caseid):
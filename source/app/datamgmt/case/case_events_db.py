@@ -15,10 +15,17 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import csv
+import dateutil.parser
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import insert
 
 from app import db
+from app.datamgmt.manage.manage_tags_db import add_db_tags
 from app.datamgmt.states import update_timeline_state
 from app.models import AssetsType
 from app.models import CaseAssets
@@ -27,6 +34,7 @@ from app.models import CaseEventsAssets
 from app.models import CaseEventsIoc
 from app.models import CasesEvent
 from app.models import Comments
+from app.models import CompromiseStatus
 from app.models import EventCategory
 from app.models import EventComments
 from app.models import Ioc
@@ -357,6 +365,196 @@ def get_case_iocs_for_tm(caseid):
     return iocs
 
 
+def group_by_event(rows):
+    """
+    Index timeline link rows by their event_id, preserving the order of the rows
+    :param rows: Iterable of rows exposing an event_id attribute
+    :return: Dict of event_id -> list of rows
+    """
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.event_id].append(row)
+
+    return grouped
+
+
+def build_filtered_timeline(timeline, assets_cache, iocs_cache, assets=None, assets_id=None, iocs=None):
+    """
+    Assemble the advanced-filter timeline from the events and their asset / IOC links.
+    Links are indexed by event beforehand so the assembly is linear in the number of rows.
+
+    :param timeline: Rows of events, ordered as they should be returned
+    :param assets_cache: Rows of event / asset links
+    :param iocs_cache: Rows of event / IOC links
+    :param assets: Lowercase asset names every returned event must be linked to
+    :param assets_id: Asset IDs every returned event must be linked to
+    :param iocs: Lowercase IOC values of which a returned event must be linked to one
+    :return: Tuple of (timeline, list of event IDs, assets and IOCs cache)
+    """
+    cache = {}
+    assets_map = {}
+    for asset in assets_cache:
+        if asset.asset_id not in cache:
+            cache[asset.asset_id] = [asset.asset_name, asset.type]
+
+        if (assets and asset.asset_name.lower() in assets) \
+                or (assets_id and asset.asset_id in assets_id):
+            assets_map[asset.event_id] = assets_map.get(asset.event_id, 0) + 1
+
+    len_assets = 0
+    if assets:
+        len_assets += len(assets)
+    if assets_id:
+        len_assets += len(assets_id)
+
+    assets_filter = {event_id for event_id, count in assets_map.items() if count == len_assets}
+
+    iocs_filter = set()
+    if iocs:
+        for ioc in iocs_cache:
+            if ioc.ioc_value.lower() in iocs:
+                iocs_filter.add(ioc.event_id)
+
+    assets_by_event = group_by_event(assets_cache)
+    iocs_by_event = group_by_event(iocs_cache)
+
+    tim = []
+    events_list = []
+    events_seen = set()
+    for row in timeline:
+        if assets is not None or assets_id is not None:
+            if row.event_id not in assets_filter:
+                continue
+
+        if iocs is not None:
+            if row.event_id not in iocs_filter:
+                continue
+
+        ras = row._asdict()
+
+        ras['event_date'] = ras['event_date'].strftime('%Y-%m-%dT%H:%M:%S.%f')
+        ras['event_date_wtz'] = ras['event_date_wtz'].strftime('%Y-%m-%dT%H:%M:%S.%f') if ras[
+            'event_date_wtz'] else None
+        ras['event_added'] = ras['event_added'].strftime('%Y-%m-%dT%H:%M:%S')
+
+        if row.event_id not in events_seen:
+            events_seen.add(row.event_id)
+            events_list.append(row.event_id)
+
+        ras['assets'] = [
+            {
+                "name": f"{asset.asset_name} ({asset.type})",
+                "ip": asset.asset_ip,
+                "description": asset.asset_description,
+                "compromised": asset.asset_compromise_status_id == CompromiseStatus.compromised.value
+            }
+            for asset in assets_by_event.get(row.event_id, [])
+        ]
+
+        alki = []
+        for ioc in iocs_by_event.get(row.event_id, []):
+            if ioc.ioc_id not in cache:
+                cache[ioc.ioc_id] = [ioc.ioc_value]
+
+            alki.append(
+                {
+                    "name": f"{ioc.ioc_value}",
+                    "description": ioc.ioc_description
+                }
+            )
+
+        ras['iocs'] = alki
+
+        tim.append(ras)
+
+    return tim, events_list, cache
+
+
+def stream_case_timeline(caseid, asset_id=None, batch_size=1000):
+    """
+    Iterate over the events of a case with their assets and IOCs already joined.
+    Events are read through a server-side cursor and their links are fetched once per batch,
+    so the memory used does not depend on the size of the timeline.
+
+    :param caseid: Case ID
+    :param asset_id: Only return events linked to this asset if set
+    :param batch_size: Number of events fetched per round trip
+    :return: Generator of events dicts
+    """
+    timeline = CasesEvent.query.with_entities(
+        CasesEvent.event_id,
+        CasesEvent.event_uuid,
+        CasesEvent.event_date,
+        CasesEvent.event_date_wtz,
+        CasesEvent.event_tz,
+        CasesEvent.event_title,
+        CasesEvent.event_color,
+        CasesEvent.event_tags,
+        CasesEvent.event_content,
+        CasesEvent.event_in_summary,
+        CasesEvent.event_in_graph,
+        EventCategory.name.label("category_name"),
+        EventCategory.id.label("event_category_id")
+    ).filter(
+        CasesEvent.case_id == caseid
+    )
+
+    if asset_id:
+        timeline = timeline.join(
+            CaseEventsAssets, CaseEventsAssets.event_id == CasesEvent.event_id
+        ).filter(
+            CaseEventsAssets.asset_id == asset_id
+        )
+
+    events = iter(timeline.outerjoin(
+        CasesEvent.category
+    ).order_by(
+        CasesEvent.event_date,
+        CasesEvent.event_id
+    ).yield_per(batch_size))
+
+    while True:
+        batch = list(islice(events, batch_size))
+        if not batch:
+            break
+
+        events_ids = [row.event_id for row in batch]
+
+        assets_by_event = group_by_event(CaseEventsAssets.query.with_entities(
+            CaseEventsAssets.event_id,
+            CaseAssets.asset_id,
+            CaseAssets.asset_name
+        ).filter(
+            CaseEventsAssets.case_id == caseid,
+            CaseEventsAssets.event_id.in_(events_ids)
+        ).join(CaseEventsAssets.asset).all())
+
+        iocs_by_event = group_by_event(CaseEventsIoc.query.with_entities(
+            CaseEventsIoc.event_id,
+            Ioc.ioc_id,
+            Ioc.ioc_value
+        ).filter(
+            CaseEventsIoc.case_id == caseid,
+            CaseEventsIoc.event_id.in_(events_ids)
+        ).join(CaseEventsIoc.ioc).all())
+
+        for row in batch:
+            ras = row._asdict()
+            ras['event_date'] = ras['event_date'].strftime('%Y-%m-%dT%H:%M:%S.%f')
+            ras['event_date_wtz'] = ras['event_date_wtz'].strftime('%Y-%m-%dT%H:%M:%S.%f') if ras[
+                'event_date_wtz'] else None
+            ras['assets'] = [
+                {'asset_id': asset.asset_id, 'asset_name': asset.asset_name}
+                for asset in assets_by_event.get(row.event_id, [])
+            ]
+            ras['iocs'] = [
+                {'ioc_id': ioc.ioc_id, 'ioc_value': ioc.ioc_value}
+                for ioc in iocs_by_event.get(row.event_id, [])
+            ]
+
+            yield ras
+
+
 def delete_event(event, caseid):
     delete_event_category(event.event_id)
 
@@ -384,7 +582,7 @@ def delete_event(event, caseid):
     db.session.commit()
 
     db.session.delete(event)
-    update_timeline_state(caseid=caseid)
+    update_timeline_state(caseid=caseid, event=event, change_type='deleted')
 
     db.session.commit()
 
@@ -403,3 +601,289 @@ def get_default_category():
         EventCategory.name == "Unspecified"
     ).first()
 
+
+TIMELINE_CSV_FIELDS = [
+    "event_date",
+    "event_tz",
+    "event_title",
+    "event_category",
+    "event_content",
+    "event_raw",
+    "event_source",
+    "event_assets",
+    "event_iocs",
+    "event_tags"
+]
+
+
+def get_timeline_csv_missing_fields(fields):
+    """
+    Return the mandatory timeline CSV fields missing from a CSV header
+    """
+    return [field for field in TIMELINE_CSV_FIELDS if field not in (fields or [])]
+
+
+def _split_csv_values(value, separator):
+    return [item for item in (value or '').split(separator) if item != '']
+
+
+def _chunked(values, size):
+    iterator = iter(values)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _resolve_timeline_csv_names(caseid, assets_names, iocs_values, categories_names, chunk_size=5000):
+    """
+    Resolve the assets, IOCs and categories referenced by a timeline CSV with a query per kind and chunk of names
+    """
+    assets_map = {}
+    for chunk in _chunked(assets_names, chunk_size):
+        for asset in CaseAssets.query.with_entities(
+            CaseAssets.asset_name,
+            CaseAssets.asset_id
+        ).filter(
+            CaseAssets.case_id == caseid,
+            CaseAssets.asset_name.in_(chunk)
+        ).order_by(CaseAssets.asset_id).all():
+            assets_map.setdefault(asset.asset_name, asset.asset_id)
+
+    iocs_map = {}
+    for chunk in _chunked(iocs_values, chunk_size):
+        for ioc in IocLink.query.with_entities(
+            Ioc.ioc_value,
+            Ioc.ioc_id
+        ).filter(
+            IocLink.case_id == caseid,
+            Ioc.ioc_value.in_(chunk)
+        ).join(
+            IocLink.ioc
+        ).order_by(Ioc.ioc_id).all():
+            iocs_map.setdefault(ioc.ioc_value, ioc.ioc_id)
+
+    categories_map = {}
+    if categories_names:
+        for category in EventCategory.query.with_entities(
+            EventCategory.name,
+            EventCategory.id
+        ).filter(
+            EventCategory.name.in_(list(categories_names))
+        ).order_by(EventCategory.id).all():
+            categories_map.setdefault(category.name, category.id)
+
+    return assets_map, iocs_map, categories_map
+
+
+def _parse_timeline_csv_date(event_date, event_tz):
+    return dateutil.parser.isoparse(f"{event_date}{event_tz}"), dateutil.parser.isoparse(event_date)
+
+
+def import_timeline_csv(caseid, user, csv_path, sync_iocs_assets=False, in_summary=False, in_graph=True,
+                        source='', batch_size=1000, on_batch_loaded=None, on_batch_saved=None, progress=None):
+    """
+    Bulk import a CSV file of events into the timeline of a case.
+
+    The file is read twice: a first pass validates the rows and collects the assets, IOCs, categories
+    and tags referenced, which are then resolved with a handful of queries. The second pass inserts
+    the events and their links by batches, each batch with a single timeline state bump. The whole import
+    is committed at once, so nothing is inserted if any row is invalid or any batch fails.
+
+    :param caseid: Case ID
+    :param user: User importing the events
+    :param csv_path: Path of the CSV file
+    :param sync_iocs_assets: Link the IOCs of each event to its assets
+    :param in_summary: Show the events in the summary
+    :param in_graph: Show the events in the graph
+    :param source: Source set on all the events
+    :param batch_size: Number of events inserted per batch
+    :param on_batch_loaded: Called with the list of events data of a batch before its insertion, returns the data to insert
+    :param on_batch_saved: Called with the list of events IDs of each batch once the import is committed
+    :param progress: Called with the number of events imported so far and the total number of events
+    :return: Tuple (success, message, data)
+    """
+    assets_names = {}
+    iocs_values = {}
+    categories_names = {}
+    tags = set()
+    total = 0
+
+    # ============================  first pass: check the data and collect the names  ============================
+    with open(csv_path, 'r', newline='', encoding='utf-8-sig') as fcsv:
+        reader = csv.DictReader(fcsv, delimiter=',')
+
+        missing_fields = get_timeline_csv_missing_fields(reader.fieldnames)
+        if missing_fields:
+            return False, f"Bad CSV fields mapping. Fields missing: [{','.join(missing_fields)}]", {
+                "error_code": "BAD_FIELDS_MAPPING",
+                "expected": ','.join(TIMELINE_CSV_FIELDS),
+                "found": ','.join(reader.fieldnames or []),
+                "missing": ','.join(missing_fields)
+            }
+
+        for line, row in enumerate(reader, start=1):
+            event_title = row.get('event_title') or ''
+            if len(event_title) == 0:
+                return False, "Data error", {"Error": f"Event Title can not be empty.\nrow number: {line}"}
+
+            if len(event_title) < 2:
+                return False, "Data error", {"Error": f"Event Title must be at least 2 characters.\nrow number: {line}"}
+
+            try:
+                _parse_timeline_csv_date(row.get('event_date') or '', row.get('event_tz') or '')
+            except Exception:
+                return False, "Data error", {"Error": f"Invalid event date.\nrow number: {line}"}
+
+            for asset_name in _split_csv_values(row.get('event_assets'), ';'):
+                assets_names.setdefault(asset_name, line)
+
+            for ioc_value in _split_csv_values(row.get('event_iocs'), '|'):
+                iocs_values.setdefault(ioc_value, line)
+
+            if row.get('event_category'):
+                categories_names.setdefault(row.get('event_category'), line)
+
+            tags.update(tag.strip() for tag in _split_csv_values(row.get('event_tags'), '|'))
+
+            total += 1
+
+    if total == 0:
+        return False, "Data error", {"Error": "The CSV file does not contain any event"}
+
+    assets_map, iocs_map, categories_map = _resolve_timeline_csv_names(caseid, assets_names, iocs_values,
+                                                                      categories_names)
+
+    unresolved = [(line, f"Asset not recognized : {name}") for name, line in assets_names.items()
+                  if name not in assets_map]
+    unresolved += [(line, f"IoC not recognized : {value}") for value, line in iocs_values.items()
+                   if value not in iocs_map]
+    unresolved += [(line, f"event_category not recognized : {name}") for name, line in categories_names.items()
+                   if name not in categories_map]
+    if unresolved:
+        line, error = min(unresolved)
+        return False, "Data error", {"Error": f"{error}.\nrow number: {line}"}
+
+    add_db_tags(tags)
+
+    default_category_id = get_default_category().id
+    valid_assets = set(assets_map.values())
+    valid_iocs = set(iocs_map.values())
+
+    linked_iocs_assets = set()
+    if sync_iocs_assets and valid_assets:
+        linked_iocs_assets = {(link.asset_id, link.ioc_id) for link in IocAssetLink.query.with_entities(
+            IocAssetLink.asset_id,
+            IocAssetLink.ioc_id
+        ).filter(
+            IocAssetLink.asset_id.in_(valid_assets)
+        ).all()}
+
+    # ============================  second pass: insert the events by batches  ============================
+    imported = 0
+    batches_ids = []
+    with open(csv_path, 'r', newline='', encoding='utf-8-sig') as fcsv:
+        for batch in _chunked(csv.DictReader(fcsv, delimiter=','), batch_size):
+            events_data = []
+            for row in batch:
+                event_tags = row.get('event_tags')
+                events_data.append({
+                    'event_date': row.get('event_date'),
+                    'event_tz': row.get('event_tz'),
+                    'event_title': row.get('event_title'),
+                    'event_content': row.get('event_content'),
+                    'event_raw': row.get('event_raw'),
+                    'event_source': source,
+                    'event_assets': [assets_map[name] for name in _split_csv_values(row.get('event_assets'), ';')],
+                    'event_iocs': [iocs_map[value] for value in _split_csv_values(row.get('event_iocs'), '|')],
+                    'event_tags': ','.join(event_tags.split('|')) if event_tags else event_tags,
+                    'event_category_id': categories_map.get(row.get('event_category'), default_category_id),
+                    'event_in_summary': in_summary,
+                    'event_in_graph': in_graph
+                })
+
+            if on_batch_loaded:
+                events_data = on_batch_loaded(events_data)
+
+            now = datetime.utcnow()
+            events_rows = []
+            for event_data in events_data:
+                event_date, event_date_wtz = _parse_timeline_csv_date(event_data.get('event_date'),
+                                                                      event_data.get('event_tz'))
+                events_rows.append({
+                    'case_id': caseid,
+                    'event_title': event_data.get('event_title'),
+                    'event_content': event_data.get('event_content'),
+                    'event_raw': event_data.get('event_raw'),
+                    'event_source': event_data.get('event_source'),
+                    'event_date': event_date,
+                    'event_date_wtz': event_date_wtz,
+                    'event_tz': event_data.get('event_tz'),
+                    'event_tags': event_data.get('event_tags'),
+                    'event_in_summary': event_data.get('event_in_summary'),
+                    'event_in_graph': event_data.get('event_in_graph'),
+                    'event_color': '',
+                    'event_is_flagged': False,
+                    'event_added': now,
+                    'user_id': user.id,
+                    'modification_history': {
+                        datetime.now().timestamp(): {
+                            'user': user.user,
+                            'user_id': user.id,
+                            'action': 'created'
+                        }
+                    }
+                })
+
+            events_ids = db.session.scalars(
+                insert(CasesEvent).returning(CasesEvent.event_id, sort_by_parameter_order=True),
+                events_rows
+            ).all()
+
+            categories_rows = []
+            assets_rows = []
+            iocs_rows = []
+            iocs_assets_rows = []
+            for event_id, event_data in zip(events_ids, events_data):
+                categories_rows.append({'event_id': event_id, 'category_id': event_data.get('event_category_id')})
+
+                event_assets = [asset_id for asset_id in dict.fromkeys(event_data.get('event_assets') or [])
+                                if asset_id in valid_assets]
+                event_iocs = [ioc_id for ioc_id in dict.fromkeys(event_data.get('event_iocs') or [])
+                              if ioc_id in valid_iocs]
+
+                assets_rows += [{'event_id': event_id, 'asset_id': asset_id, 'case_id': caseid}
+                                for asset_id in event_assets]
+                iocs_rows += [{'event_id': event_id, 'ioc_id': ioc_id, 'case_id': caseid}
+                              for ioc_id in event_iocs]
+
+                if sync_iocs_assets:
+                    for asset_id in event_assets:
+                        for ioc_id in event_iocs:
+                            if (asset_id, ioc_id) not in linked_iocs_assets:
+                                linked_iocs_assets.add((asset_id, ioc_id))
+                                iocs_assets_rows.append({'asset_id': asset_id, 'ioc_id': ioc_id})
+
+            for model, rows in ((CaseEventCategory, categories_rows), (CaseEventsAssets, assets_rows),
+                                (CaseEventsIoc, iocs_rows), (IocAssetLink, iocs_assets_rows)):
+                if rows:
+                    db.session.execute(insert(model), rows)
+
+            update_timeline_state(caseid=caseid, userid=user.id, change_type='created', events_ids=events_ids)
+
+            # Flushed only, the batches are committed together
+            db.session.flush()
+            batches_ids.append(events_ids)
+
+            imported += len(events_ids)
+            if progress:
+                progress(imported, total)
+
+    db.session.commit()
+
+    if on_batch_saved:
+        for events_ids in batches_ids:
+            on_batch_saved(events_ids)
+
+    return True, f"{imported} events added", {'events_count': imported}
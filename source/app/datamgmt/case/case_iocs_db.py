@@ -17,6 +17,8 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import insert
+from sqlalchemy import tuple_
 
 from app import db
 from app.datamgmt.states import update_ioc_state
@@ -152,26 +154,43 @@ def get_detailed_iocs(caseid):
     return detailed_iocs
 
 
-def get_ioc_links(ioc_id, caseid):
+def get_case_iocs_links(caseid):
+    """
+    Get the other cases each IOC of a case is seen in, with a single query
+
+    :param caseid: Case ID
+    :return: Dict of the links of each IOC, keyed by IOC ID
+    """
     search_condition = and_(Cases.case_id.in_([]))
 
     user_search_limitations = ac_get_fast_user_cases_access(current_user.id)
     if user_search_limitations:
         search_condition = and_(Cases.case_id.in_(user_search_limitations))
 
-    ioc_link = (IocLink.query.with_entities(
+    case_iocs = IocLink.query.with_entities(IocLink.ioc_id).filter(IocLink.case_id == caseid)
+
+    iocs_links = (IocLink.query.with_entities(
+        IocLink.ioc_id,
         Cases.case_id,
         Cases.name.label('case_name'),
         Client.name.label('client_name')
     ).filter(and_(
-        IocLink.ioc_id == ioc_id,
+        IocLink.ioc_id.in_(case_iocs.scalar_subquery()),
         IocLink.case_id != caseid,
         search_condition)
     ).join(IocLink.case)
      .join(Cases.client)
      .all())
 
-    return ioc_link
+    links = {}
+    for ioc_link in iocs_links:
+        links.setdefault(ioc_link.ioc_id, []).append({
+            'case_id': ioc_link.case_id,
+            'case_name': ioc_link.case_name,
+            'client_name': ioc_link.client_name
+        })
+
+    return links
 
 
 def find_ioc(ioc_value, ioc_type_id):
@@ -227,6 +246,56 @@ def add_ioc_link(ioc_id, caseid):
         return False
 
 
+def find_iocs(values_types, batch_size=1000):
+    """
+    Find the existing IOCs matching a list of values and types, with one query per batch
+
+    :param values_types: Iterable of (ioc_value, ioc_type_id) tuples
+    :param batch_size: Number of tuples looked up by each query
+    :return: Dict of the IOCs, keyed by (ioc_value, ioc_type_id)
+    """
+    values_types = list(set(values_types))
+    iocs = {}
+
+    for i in range(0, len(values_types), batch_size):
+        for ioc in Ioc.query.filter(
+            tuple_(Ioc.ioc_value, Ioc.ioc_type_id).in_(values_types[i:i + batch_size])
+        ).all():
+            # Keep the first match, as find_ioc does
+            iocs.setdefault((ioc.ioc_value, ioc.ioc_type_id), ioc)
+
+    return iocs
+
+
+def get_case_linked_iocs_ids(ioc_ids, caseid):
+    """
+    Get which IOCs of a list are already linked to a case
+
+    :param ioc_ids: IDs of the IOCs
+    :param caseid: Case ID
+    :return: Set of the IDs of the IOCs linked to the case
+    """
+    if not ioc_ids:
+        return set()
+
+    return {link.ioc_id for link in IocLink.query.with_entities(IocLink.ioc_id).filter(
+        IocLink.case_id == caseid,
+        IocLink.ioc_id.in_(ioc_ids)
+    ).all()}
+
+
+def add_iocs_links(ioc_ids, caseid):
+    """
+    Link a list of IOCs to a case with a bulk insert. The caller commits.
+
+    :param ioc_ids: IDs of the IOCs, not yet linked to the case
+    :param caseid: Case ID
+    :return: None
+    """
+    if ioc_ids:
+        db.session.execute(insert(IocLink), [{'ioc_id': ioc_id, 'case_id': caseid} for ioc_id in ioc_ids])
+
+
 def get_ioc_types_list():
     ioc_types = IocType.query.with_entities(
         IocType.type_id,
@@ -268,6 +337,13 @@ def get_ioc_type_id(type_name: str):
     return type_id if type_id else None
 
 
+def get_ioc_types_by_name():
+    """
+    Get all the IOC types, keyed by name
+    """
+    return {ioc_type.type_name: ioc_type for ioc_type in IocType.query.all()}
+
+
 def get_tlps():
     return [(tlp.tlp_id, tlp.tlp_name) for tlp in Tlp.query.all()]
 
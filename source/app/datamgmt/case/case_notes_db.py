@@ -61,6 +61,7 @@ def delete_directory(directory, caseid):
 
         # Delete the directory
         db.session.delete(directory)
+        update_notes_state(caseid=caseid)
         db.session.commit()
 
         return True
@@ -385,38 +386,51 @@ def delete_note_comment(note_id, comment_id):
 
 
 def get_directories_with_note_count(case_id):
-    # Fetch all directories for the given case
-    directories = NoteDirectory.query.filter_by(case_id=case_id).order_by(
-        NoteDirectory.name.asc()
+    """
+    Build the notes tree of a case, listing every directory with its note count, its notes titles and its
+    subdirectories. The directories and the notes are fetched with one query each, and the tree is assembled in memory.
+    """
+    directories = NoteDirectory.query.with_entities(
+        NoteDirectory.id,
+        NoteDirectory.name,
+        NoteDirectory.parent_id
+    ).filter(
+        NoteDirectory.case_id == case_id
+    ).order_by(
+        NoteDirectory.name.asc(), NoteDirectory.id.asc()
     ).all()
 
-    # Create a list to store the directories with note counts
-    directories_with_note_count = []
-
-    # For each directory, fetch the subdirectories, note count, and note titles
-    for directory in directories:
-        directory_with_note_count = get_directory_with_note_count(directory)
-        notes = [{'id': note.note_id, 'title': note.note_title} for note in directory.notes]
-        # Order by note title
-        notes = sorted(notes, key=lambda note: note['title'])
-        directory_with_note_count['notes'] = notes
-        directories_with_note_count.append(directory_with_note_count)
-
-    return directories_with_note_count
-
+    notes = Notes.query.with_entities(
+        Notes.note_id,
+        Notes.note_title,
+        Notes.directory_id
+    ).filter(
+        Notes.note_case_id == case_id,
+        Notes.directory_id.isnot(None)
+    ).order_by(
+        Notes.note_title.asc(), Notes.note_id.asc()
+    ).all()
 
-def get_directory_with_note_count(directory):
-    note_count = Notes.query.filter_by(directory_id=directory.id).count()
+    notes_by_directory = {}
+    for note in notes:
+        notes_by_directory.setdefault(note.directory_id, []).append({'id': note.note_id, 'title': note.note_title})
 
-    directory_dict = {
-        'id': directory.id,
-        'name': directory.name,
-        'note_count': note_count,
-        'subdirectories': []
-    }
+    children = {}
+    for directory in directories:
+        children.setdefault(directory.parent_id, []).append(directory.id)
 
-    if directory.subdirectories:
-        for subdirectory in directory.subdirectories:
-            directory_dict['subdirectories'].append(get_directory_with_note_count(subdirectory))
+    nodes = {}
+    for directory in directories:
+        nodes[directory.id] = {
+            'id': directory.id,
+            'name': directory.name,
+            'note_count': len(notes_by_directory.get(directory.id, [])),
+            'subdirectories': []
+        }
+
+    # Directories are ordered by name, so the subdirectories are as well
+    for directory in directories:
+        for child_id in children.get(directory.id, []):
+            nodes[directory.id]['subdirectories'].append(nodes[child_id])
 
-    return directory_dict
+    return [dict(nodes[directory.id], notes=notes_by_directory.get(directory.id, [])) for directory in directories]
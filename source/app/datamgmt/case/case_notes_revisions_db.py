@@ -0,0 +1,252 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from datetime import datetime
+from sqlalchemy import func
+from typing import Dict, List, Optional
+
+from app import db
+from app.iris_engine.utils.text_delta import apply_text_delta
+from app.iris_engine.utils.text_delta import encode_text_version
+from app.iris_engine.utils.text_delta import encode_text_versions
+from app.models import NoteRevisions
+
+
+def get_latest_note_revision(note_id: int) -> Optional[NoteRevisions]:
+    """
+    Get the latest revision of a note
+
+    args:
+        note_id (int): The note ID
+
+    returns:
+        NoteRevisions: The latest revision, None if the note has none
+    """
+    return NoteRevisions.query.filter(
+        NoteRevisions.note_id == note_id
+    ).order_by(
+        NoteRevisions.revision_number.desc(), NoteRevisions.revision_id.desc()
+    ).first()
+
+
+def get_note_revision_content(revision: NoteRevisions) -> Optional[str]:
+    """
+    Get the content of a note revision, rebuilding it from its snapshot if it is stored as a delta
+
+    args:
+        revision (NoteRevisions): The revision
+
+    returns:
+        str: The content of the revision
+    """
+    if revision.snapshot_revision_id is None:
+        return revision.note_content
+
+    snapshot_content = NoteRevisions.query.with_entities(
+        NoteRevisions.note_content
+    ).filter(
+        NoteRevisions.revision_id == revision.snapshot_revision_id
+    ).scalar()
+
+    if snapshot_content is None:
+        return None
+
+    return apply_text_delta(snapshot_content, revision.note_content_delta)
+
+
+def add_note_revision(note_id: int, revision_number: int, note_title: str, note_content: str, user_id: int,
+                      snapshot_interval: int, latest_revision: Optional[NoteRevisions] = None) -> NoteRevisions:
+    """
+    Add a revision to a note, stored as a delta against the latest snapshot of the note when it is compact enough.
+    The caller commits.
+
+    args:
+        note_id (int): The note ID
+        revision_number (int): The number of the new revision
+        note_title (str): The title of the note
+        note_content (str): The content of the note
+        user_id (int): The ID of the user saving the revision
+        snapshot_interval (int): The maximum number of revisions sharing a snapshot
+        latest_revision (NoteRevisions): The latest revision of the note, if the caller already fetched it
+
+    returns:
+        NoteRevisions: The new revision
+    """
+    if latest_revision is None:
+        latest_revision = get_latest_note_revision(note_id)
+
+    # The snapshot is referred to by its primary key, revision numbers saved concurrently may be duplicated
+    snapshot = None
+    since_snapshot = 0
+    if latest_revision is not None:
+        snapshot_id = latest_revision.snapshot_revision_id or latest_revision.revision_id
+        snapshot_content = latest_revision.note_content
+
+        if latest_revision.snapshot_revision_id is not None:
+            snapshot_content = NoteRevisions.query.with_entities(
+                NoteRevisions.note_content
+            ).filter(
+                NoteRevisions.revision_id == snapshot_id
+            ).scalar()
+
+        snapshot = (snapshot_id, snapshot_content)
+        since_snapshot = 1 + NoteRevisions.query.filter(
+            NoteRevisions.snapshot_revision_id == snapshot_id
+        ).count()
+
+    _, snapshot_revision_id, content, delta = encode_text_version(revision_number, note_content, snapshot,
+                                                                  since_snapshot, snapshot_interval)
+
+    revision = NoteRevisions(
+        note_id=note_id,
+        revision_number=revision_number,
+        note_title=note_title,
+        note_content=content,
+        note_content_delta=delta,
+        snapshot_revision_id=snapshot_revision_id,
+        note_user=user_id,
+        revision_timestamp=datetime.utcnow()
+    )
+    db.session.add(revision)
+
+    return revision
+
+
+def _get_note_revisions_contents(revisions: List[NoteRevisions]) -> Dict[int, Optional[str]]:
+    snapshots = {revision.revision_id: revision.note_content for revision in revisions
+                 if revision.snapshot_revision_id is None}
+
+    contents = {}
+    for revision in revisions:
+        if revision.snapshot_revision_id is None:
+            contents[revision.revision_id] = revision.note_content
+        elif snapshots.get(revision.snapshot_revision_id) is not None:
+            contents[revision.revision_id] = apply_text_delta(snapshots[revision.snapshot_revision_id],
+                                                              revision.note_content_delta)
+        else:
+            contents[revision.revision_id] = None
+
+    return contents
+
+
+def _rewrite_note_revisions(revisions: List[NoteRevisions], contents: Dict[int, Optional[str]],
+                            snapshot_interval: int) -> None:
+    """
+    Encode again the revisions of a note after some of them were removed, so none refers to a removed snapshot
+    """
+    encoded = encode_text_versions([(revision.revision_id, contents[revision.revision_id])
+                                    for revision in revisions], snapshot_interval)
+
+    for revision, (_, snapshot_revision_id, content, delta) in zip(revisions, encoded):
+        if (revision.snapshot_revision_id, revision.note_content_delta) != (snapshot_revision_id, delta):
+            revision.snapshot_revision_id = snapshot_revision_id
+            revision.note_content = content
+            revision.note_content_delta = delta
+
+
+def delete_note_revision(revision: NoteRevisions, snapshot_interval: int) -> None:
+    """
+    Delete a note revision. When other revisions are stored as deltas against it, they are encoded again first.
+    The caller commits.
+
+    args:
+        revision (NoteRevisions): The revision to delete
+        snapshot_interval (int): The maximum number of revisions sharing a snapshot
+
+    returns:
+        None
+    """
+    if revision.snapshot_revision_id is None:
+        dependents = NoteRevisions.query.filter(
+            NoteRevisions.snapshot_revision_id == revision.revision_id
+        ).order_by(
+            NoteRevisions.revision_number, NoteRevisions.revision_id
+        ).all()
+
+        if dependents:
+            contents = _get_note_revisions_contents([revision] + dependents)
+            for dependent in dependents:
+                dependent.snapshot_revision_id = None
+                dependent.note_content_delta = None
+                dependent.note_content = contents[dependent.revision_id]
+
+            _rewrite_note_revisions(dependents, contents, snapshot_interval)
+
+    db.session.delete(revision)
+
+
+def compact_note_revisions(before: datetime, snapshot_interval: int, batch_size: int = 100) -> int:
+    """
+    Thin the revisions saved before a date, keeping the last revision of each day of each note.
+    The notes are processed by batches committed one after the other.
+
+    args:
+        before (datetime): Only the revisions saved before this date are thinned
+        snapshot_interval (int): The maximum number of revisions sharing a snapshot
+        batch_size (int): The number of notes processed by each batch
+
+    returns:
+        int: The number of deleted revisions
+    """
+    revision_day = func.date_trunc('day', NoteRevisions.revision_timestamp)
+
+    deleted = 0
+    while True:
+        note_ids = [row.note_id for row in db.session.query(
+            NoteRevisions.note_id
+        ).filter(
+            NoteRevisions.revision_timestamp < before
+        ).group_by(
+            NoteRevisions.note_id, revision_day
+        ).having(
+            func.count() > 1
+        ).distinct().limit(batch_size).all()]
+
+        if not note_ids:
+            return deleted
+
+        revisions_by_note = {}
+        for revision in NoteRevisions.query.filter(
+            NoteRevisions.note_id.in_(note_ids)
+        ).order_by(
+            NoteRevisions.note_id, NoteRevisions.revision_number, NoteRevisions.revision_id
+        ).all():
+            revisions_by_note.setdefault(revision.note_id, []).append(revision)
+
+        for revisions in revisions_by_note.values():
+            contents = _get_note_revisions_contents(revisions)
+
+            # The revisions are ordered, so the last one seen of each day is kept
+            kept_by_day = {}
+            for revision in revisions:
+                if revision.revision_timestamp is not None and revision.revision_timestamp < before:
+                    kept_by_day[revision.revision_timestamp.date()] = revision
+
+            kept_ids = {id(revision) for revision in kept_by_day.values()}
+            kept = []
+            for revision in revisions:
+                if revision.revision_timestamp is None or revision.revision_timestamp >= before \
+                        or id(revision) in kept_ids:
+                    kept.append(revision)
+                else:
+                    db.session.delete(revision)
+                    deleted += 1
+
+            _rewrite_note_revisions(kept, contents, snapshot_interval)
+
+        db.session.commit()
@@ -23,7 +23,10 @@ from pathlib import Path
 
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import exists
 from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased
 
 from app import app
 from app import db
@@ -54,24 +57,27 @@ def datastore_get_root(cid):
 
     return dsp_root
 
-def ds_list_tree(cid):
-    dsp_root = datastore_get_root(cid)
+def _get_ds_files_nodes(condition):
+    """
+    Fetch the files matching a condition as tree nodes, reading the columns without building ORM objects
+    """
+    rows = db.session.query(*DataStoreFile.__table__.columns).filter(condition).all()
 
-    dsp = DataStorePath.query.filter(
-        and_(DataStorePath.path_case_id == cid,
-             DataStorePath.path_is_root == False
-             )
-    ).order_by(
-        DataStorePath.path_parent_id
-    ).all()
+    files_nodes = []
+    for row in rows:
+        dfnode = row._asdict()
+        dfnode['type'] = "file"
+        files_nodes.append(dfnode)
 
-    dsf = DataStoreFile.query.filter(
-        DataStoreFile.file_case_id == cid
-    ).all()
+    return files_nodes
 
-    dsp_root = dsp_root
-    droot_id = f"d-{dsp_root.path_id}"
 
+def _build_ds_tree(dsp_root, dsp, files_nodes):
+    """
+    Assemble the datastore tree in one pass, using a map of the folders nodes by ID. Each folder lists its files
+    first, then its subfolders. Folders and files whose parent is not in the case are left out.
+    """
+    droot_id = f"d-{dsp_root.path_id}"
     path_tree = {
         droot_id: {
             "name": dsp_root.path_name,
@@ -81,52 +87,127 @@ def ds_list_tree(cid):
         }
     }
 
-    droot_children = path_tree[droot_id]["children"]
+    directories_nodes = {dsp_root.path_id: path_tree[droot_id]}
+    for dpath in dsp:
+        directories_nodes[dpath.path_id] = {
+            "name": dpath.path_name,
+            "type": "directory",
+            "children": {}
+        }
 
-    files_nodes = {}
+    for dfnode in files_nodes:
+        parent_node = directories_nodes.get(dfnode['file_parent_id'])
+        if parent_node is not None:
+            parent_node["children"][f"f-{dfnode['file_id']}"] = dfnode
 
-    for dfile in dsf:
-        dfnode = dfile.__dict__
-        dfnode.pop('_sa_instance_state')
-        dfnode['type'] = "file"
-        dnode_id = f"f-{dfile.file_id}"
-        dnode_parent_id = f"d-{dfile.file_parent_id}"
+    for dpath in dsp:
+        parent_node = directories_nodes.get(dpath.path_parent_id)
+        if parent_node is not None and dpath.path_parent_id != dpath.path_id:
+            parent_node["children"][f"d-{dpath.path_id}"] = directories_nodes[dpath.path_id]
+
+    return path_tree
 
-        if dnode_parent_id == droot_id:
-            droot_children.update({
-                dnode_id: dfnode
-            })
 
-        elif dnode_parent_id in files_nodes:
-            files_nodes[dnode_parent_id].update({
-                dnode_id: dfnode
-            })
+def _get_ds_folders(cid):
+    return DataStorePath.query.with_entities(
+        DataStorePath.path_id,
+        DataStorePath.path_name,
+        DataStorePath.path_parent_id
+    ).filter(
+        and_(DataStorePath.path_case_id == cid,
+             DataStorePath.path_is_root == False
+             )
+    ).order_by(
+        DataStorePath.path_parent_id, DataStorePath.path_id
+    ).all()
 
-        else:
-            files_nodes[dnode_parent_id] = {dnode_id: dfnode}
 
-    for dpath in dsp:
-        dpath_id = f"d-{dpath.path_id}"
-        dpath_parent_id = f"d-{dpath.path_parent_id}"
-        path_node = {
-            dpath_id: {
-                "name": dpath.path_name,
+def ds_list_tree(cid):
+    dsp_root = datastore_get_root(cid)
+
+    dsp = _get_ds_folders(cid)
+    files_nodes = _get_ds_files_nodes(DataStoreFile.file_case_id == cid)
+
+    return _build_ds_tree(dsp_root, dsp, files_nodes)
+
+
+def datastore_list_node_children(node, cid, page, per_page):
+    """
+    List the children of a single folder of the datastore, its subfolders first then its files, both ordered by name.
+    Subfolders are not expanded, but tell whether they have children.
+
+    :param node: The folder, a DataStorePath
+    :param cid: The case ID
+    :param page: The page number, starting at 1
+    :param per_page: The number of children per page
+    :return: The children of the folder, with the pagination details
+    """
+    offset = (page - 1) * per_page
+
+    folders_count = DataStorePath.query.filter(
+        DataStorePath.path_case_id == cid,
+        DataStorePath.path_parent_id == node.path_id,
+        DataStorePath.path_is_root == False
+    ).count()
+
+    files_count = DataStoreFile.query.filter(
+        DataStoreFile.file_case_id == cid,
+        DataStoreFile.file_parent_id == node.path_id
+    ).count()
+
+    children = {}
+    if offset < folders_count:
+        subfolder = aliased(DataStorePath)
+        subfolder_has_children = or_(
+            exists().where(subfolder.path_parent_id == DataStorePath.path_id,
+                           subfolder.path_case_id == cid),
+            exists().where(DataStoreFile.file_parent_id == DataStorePath.path_id)
+        )
+
+        folders = db.session.query(
+            DataStorePath.path_id,
+            DataStorePath.path_name,
+            subfolder_has_children.label('has_children')
+        ).filter(
+            DataStorePath.path_case_id == cid,
+            DataStorePath.path_parent_id == node.path_id,
+            DataStorePath.path_is_root == False
+        ).order_by(
+            DataStorePath.path_name, DataStorePath.path_id
+        ).limit(per_page).offset(offset).all()
+
+        for folder in folders:
+            children[f"d-{folder.path_id}"] = {
+                "name": folder.path_name,
                 "type": "directory",
+                "has_children": folder.has_children,
                 "children": {}
             }
-        }
-
-        path_node_files = files_nodes.get(dpath_id)
-        if path_node_files:
-            path_node[dpath_id]["children"].update(path_node_files)
 
-        if dpath_parent_id == droot_id:
-            droot_children.update(path_node)
-
-        else:
-            datastore_iter_tree(dpath_parent_id, path_node, droot_children)
-
-    return path_tree
+    if len(children) < per_page:
+        files = db.session.query(*DataStoreFile.__table__.columns).filter(
+            DataStoreFile.file_case_id == cid,
+            DataStoreFile.file_parent_id == node.path_id
+        ).order_by(
+            DataStoreFile.file_original_name, DataStoreFile.file_id
+        ).limit(per_page - len(children)).offset(max(offset - folders_count, 0)).all()
+
+        for row in files:
+            dfnode = row._asdict()
+            dfnode['type'] = "file"
+            children[f"f-{row.file_id}"] = dfnode
+
+    return {
+        "id": f"d-{node.path_id}",
+        "name": node.path_name,
+        "type": "directory",
+        "is_root": bool(node.path_is_root),
+        "children": children,
+        "page": page,
+        "per_page": per_page,
+        "total": folders_count + files_count,
+        "has_next": offset + per_page < folders_count + files_count
+    }
 
 
 def init_ds_tree(cid):
@@ -160,18 +241,6 @@ def init_ds_tree(cid):
     return dsp_root
 
 
-def datastore_iter_tree(path_parent_id, path_node, tree):
-    for parent_id, node in tree.items():
-        if parent_id == path_parent_id:
-            node["children"].update(path_node)
-            return tree
-
-        if isinstance(node, dict):
-            datastore_iter_tree(path_parent_id, path_node, node)
-
-    return None
-
-
 def datastore_add_child_node(parent_node, folder_name, cid):
     try:
 
@@ -487,78 +556,12 @@ def datastore_filter_tree(filter_d, caseid):
                  )
         ).first()
 
-    dsp = DataStorePath.query.filter(
-        and_(DataStorePath.path_case_id == caseid,
-             DataStorePath.path_is_root == False
-             )
-    ).order_by(
-        DataStorePath.path_parent_id
-    ).all()
+    dsp = _get_ds_folders(caseid)
 
     try:
-        dsf = DataStoreFile.query.filter(
-            condition
-        ).all()
+        files_nodes = _get_ds_files_nodes(condition)
 
     except Exception as e:
         return None, str(e)
 
-    dsp_root = dsp_root
-    droot_id = f"d-{dsp_root.path_id}"
-
-    path_tree = {
-        droot_id: {
-            "name": dsp_root.path_name,
-            "type": "directory",
-            "is_root": True,
-            "children": {}
-        }
-    }
-
-    droot_children = path_tree[droot_id]["children"]
-
-    files_nodes = {}
-
-    for dfile in dsf:
-        dfnode = dfile.__dict__
-        dfnode.pop('_sa_instance_state')
-        dfnode['type'] = "file"
-        dnode_id = f"f-{dfile.file_id}"
-        dnode_parent_id = f"d-{dfile.file_parent_id}"
-
-        if dnode_parent_id == droot_id:
-            droot_children.update({
-                dnode_id: dfnode
-            })
-
-        elif dnode_parent_id in files_nodes:
-            files_nodes[dnode_parent_id].update({
-                dnode_id: dfnode
-            })
-
-        else:
-            files_nodes[dnode_parent_id] = {dnode_id: dfnode}
-
-    for dpath in dsp:
-        dpath_id = f"d-{dpath.path_id}"
-        dpath_parent_id = f"d-{dpath.path_parent_id}"
-        path_node = {
-            dpath_id: {
-                "name": dpath.path_name,
-                "type": "directory",
-                "children": {}
-            }
-        }
-
-        path_node_files = files_nodes.get(dpath_id)
-        if path_node_files:
-            path_node[dpath_id]["children"].update(path_node_files)
-
-        if dpath_parent_id == droot_id:
-            droot_children.update(path_node)
-
-        else:
-            datastore_iter_tree(dpath_parent_id, path_node, droot_children)
-
-    return path_tree, 'Success'
-
+    return _build_ds_tree(dsp_root, dsp, files_nodes), 'Success'
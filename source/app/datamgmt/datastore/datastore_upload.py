@@ -0,0 +1,382 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+import pyminizip
+
+from app import app
+
+# Uploads are copied with large buffers, hashed on the way
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+
+# Hash of the chunked uploads received so far, by upload ID, as (received bytes, hash object). Chunks received in
+# order are hashed as they are written, so completing the upload does not read the file again.
+_uploads_hashes: Dict[str, Tuple[int, 'hashlib._Hash']] = {}
+
+
+class UploadChunkError(Exception):
+    """
+    A chunk was refused, the client resumes from the number of bytes received
+    """
+    def __init__(self, message: str, received: int):
+        super().__init__(message)
+        self.received = received
+
+
+def copy_stream(stream: BinaryIO, fout: BinaryIO, file_hash=None, max_size: Optional[int] = None) -> int:
+    """
+    Copy a stream into a file with large buffers, updating a hash with the copied data
+
+    args:
+        stream (BinaryIO): The stream to read
+        fout (BinaryIO): The file to write
+        file_hash: The hash object to update, if any
+        max_size (int): The maximum number of bytes to copy, if any
+
+    returns:
+        int: The number of bytes copied
+    """
+    size = 0
+    while True:
+        buffer_size = UPLOAD_BUFFER_SIZE if max_size is None else min(UPLOAD_BUFFER_SIZE, max_size - size)
+        if buffer_size <= 0:
+            return size
+
+        data = stream.read(buffer_size)
+        if not data:
+            return size
+
+        fout.write(data)
+        if file_hash is not None:
+            file_hash.update(data)
+
+        size += len(data)
+
+
+def _hash_file(file_path: Path) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as fin:
+        for data in iter(lambda: fin.read(UPLOAD_BUFFER_SIZE), b''):
+            file_hash.update(data)
+
+    return file_hash.hexdigest().upper()
+
+
+def _store_local_file(local_file: Path, location: Path, file_hash: str, password: Optional[str]) -> str:
+    """
+    Move a complete upload to its location in the datastore. When a password is given, it is zipped and encrypted
+    under the name of its hash instead, in a single read.
+    """
+    if password is None:
+        os.replace(local_file, location)
+        return location.as_posix()
+
+    # pyminizip only compresses from a path, the file is renamed so the archive entry is named after its hash
+    hashed_file = local_file.parent / file_hash
+    os.replace(local_file, hashed_file)
+    file_path = location.as_posix() + '.zip'
+    try:
+        pyminizip.compress(hashed_file.as_posix(), None, file_path, password, 0)
+    finally:
+        os.unlink(hashed_file)
+
+    return file_path
+
+
+def store_file_stream(stream: BinaryIO, location: Path, password: Optional[str]) -> Tuple[str, int, str]:
+    """
+    Store an uploaded stream in the datastore. The stream is written once, and hashed while it is written.
+
+    args:
+        stream (BinaryIO): The uploaded content
+        location (Path): The location of the file in the datastore
+        password (str): The password to zip and encrypt the file with, if any
+
+    returns:
+        Tuple[str, int, str]: The path, size and SHA256 of the stored file
+    """
+    file_hash = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=location.parent, prefix='.upload-', delete=False) as tmp:
+        try:
+            file_size = copy_stream(stream, tmp, file_hash)
+        except Exception:
+            os.unlink(tmp.name)
+            raise
+
+    file_sha256 = file_hash.hexdigest().upper()
+
+    try:
+        file_path = _store_local_file(Path(tmp.name), location, file_sha256, password)
+    finally:
+        if os.path.exists(tmp.name):
+            os.unlink(tmp.name)
+
+    return file_path, file_size, file_sha256
+
+
+def _get_uploads_path() -> Path:
+    uploads_path = Path(app.config['DATASTORE_PATH']) / 'uploads'
+    uploads_path.mkdir(parents=True, exist_ok=True)
+
+    return uploads_path
+
+
+def _get_upload_paths(upload_id: str) -> Tuple[Path, Path]:
+    # The upload ID comes from the request, only UUIDs are accepted so it cannot point outside the uploads folder
+    upload_id = str(uuid.UUID(upload_id))
+    uploads_path = _get_uploads_path()
+
+    return uploads_path / f'{upload_id}.json', uploads_path / f'{upload_id}.part'
+
+
+def _evict_stale_hashes(uploads_path: Path) -> None:
+    # The uploads completed, aborted or purged by another worker leave their hash behind in this one
+    for upload_id in list(_uploads_hashes):
+        if not (uploads_path / f'{upload_id}.json').exists():
+            _uploads_hashes.pop(upload_id, None)
+
+
+def purge_expired_uploads(max_age: int) -> int:
+    """
+    Delete the chunked uploads which were not completed nor updated for some time
+
+    args:
+        max_age (int): Number of seconds after which an upload which was not updated expires
+
+    returns:
+        int: The number of deleted uploads
+    """
+    uploads_path = _get_uploads_path()
+    _evict_stale_hashes(uploads_path)
+
+    expired = 0
+    now = time.time()
+    for session_file in uploads_path.glob('*.json'):
+        part_file = session_file.with_suffix('.part')
+        last_update = max(session_file.stat().st_mtime, part_file.stat().st_mtime if part_file.exists() else 0)
+        if now - last_update < max_age:
+            continue
+
+        _uploads_hashes.pop(session_file.stem, None)
+        part_file.unlink(missing_ok=True)
+        session_file.unlink(missing_ok=True)
+        expired += 1
+
+    return expired
+
+
+def create_upload(case_id: int, user_id: int, parent_id: int, file_size: int, file_metadata: dict) -> dict:
+    """
+    Start a chunked upload
+
+    args:
+        case_id (int): The case the file is uploaded to
+        user_id (int): The user uploading the file
+        parent_id (int): The datastore folder the file is uploaded to
+        file_size (int): The size of the file, in bytes
+        file_metadata (dict): The fields of the file, as sent to add a file in a single request
+
+    returns:
+        dict: The upload
+    """
+    purge_expired_uploads(app.config.get('DATASTORE_UPLOAD_EXPIRATION'))
+
+    upload = {
+        'upload_id': str(uuid.uuid4()),
+        'case_id': case_id,
+        'user_id': user_id,
+        'parent_id': parent_id,
+        'file_size': file_size,
+        'file_metadata': file_metadata,
+        'chunk_size': app.config.get('DATASTORE_UPLOAD_CHUNK_SIZE')
+    }
+
+    session_file, part_file = _get_upload_paths(upload['upload_id'])
+    part_file.touch()
+    with open(session_file, 'w') as fout:
+        json.dump(upload, fout)
+
+    _uploads_hashes[upload['upload_id']] = (0, hashlib.sha256())
+
+    return dict(upload, received=0)
+
+
+def get_upload(upload_id: str, case_id: int, user_id: int) -> Optional[dict]:
+    """
+    Get a chunked upload of a user, with the number of bytes received so far
+
+    args:
+        upload_id (str): The upload ID
+        case_id (int): The case the file is uploaded to
+        user_id (int): The user uploading the file
+
+    returns:
+        dict: The upload, None if it does not exist
+    """
+    try:
+        session_file, part_file = _get_upload_paths(upload_id)
+    except ValueError:
+        return None
+
+    _evict_stale_hashes(session_file.parent)
+
+    if not session_file.is_file() or not part_file.is_file():
+        return None
+
+    with open(session_file, 'r') as fin:
+        upload = json.load(fin)
+
+    if upload.get('case_id') != case_id or upload.get('user_id') != user_id:
+        return None
+
+    return dict(upload, received=part_file.stat().st_size)
+
+
+def _lock_part_file(fd) -> None:
+    # The lock is not waited for, the workers serving the other requests would be blocked meanwhile
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        raise UploadChunkError('Another chunk of the upload is being received', os.fstat(fd.fileno()).st_size)
+
+
+def append_upload_chunk(upload: dict, offset: int, stream: BinaryIO) -> int:
+    """
+    Append a chunk to a chunked upload. The chunk must start where the data received so far ends, so an
+    interrupted upload is resumed from the number of bytes received. A chunk is refused while another one of the
+    same upload is being received.
+
+    args:
+        upload (dict): The upload, as returned by get_upload
+        offset (int): The position of the chunk in the file
+        stream (BinaryIO): The content of the chunk
+
+    returns:
+        int: The number of bytes received so far
+    """
+    _, part_file = _get_upload_paths(upload['upload_id'])
+
+    with open(part_file, 'r+b') as fout:
+        _lock_part_file(fout)
+
+        received = os.fstat(fout.fileno()).st_size
+        if offset != received:
+            raise UploadChunkError(f'Chunk offset {offset} does not match the {received} bytes received', received)
+
+        # A copy is updated, so the hash of the data received so far is kept when the chunk is dropped
+        received_hash = _uploads_hashes.get(upload['upload_id'])
+        file_hash = received_hash[1].copy() if received_hash is not None and received_hash[0] == offset else None
+
+        max_size = min(upload['chunk_size'], upload['file_size'] - offset)
+        fout.seek(offset)
+        try:
+            written = copy_stream(stream, fout, file_hash, max_size=max_size)
+            if stream.read(1):
+                raise UploadChunkError(f'Chunks are limited to {max_size} bytes at offset {offset}', offset)
+
+        except Exception:
+            # The chunk is dropped as a whole
+            fout.truncate(offset)
+            raise
+
+        fout.flush()
+
+        if file_hash is not None:
+            _uploads_hashes[upload['upload_id']] = (offset + written, file_hash)
+        else:
+            # Resumed by another process, the file will be hashed when completed
+            _uploads_hashes.pop(upload['upload_id'], None)
+
+    return offset + written
+
+
+def complete_upload(upload: dict, location: Path, password: Optional[str]) -> Tuple[str, int, str]:
+    """
+    Move a chunked upload, once fully received, to its location in the datastore
+
+    args:
+        upload (dict): The upload, as returned by get_upload
+        location (Path): The location of the file in the datastore
+        password (str): The password to zip and encrypt the file with, if any
+
+    returns:
+        Tuple[str, int, str]: The path, size and SHA256 of the stored file
+    """
+    session_file, part_file = _get_upload_paths(upload['upload_id'])
+
+    # Moved next to its location first, the datastore folders being possibly on another volume
+    local_file = location.parent / f'.upload-{upload["upload_id"]}'
+
+    with open(part_file, 'r+b') as fin:
+        _lock_part_file(fin)
+
+        received = os.fstat(fin.fileno()).st_size
+        if received != upload['file_size']:
+            raise UploadChunkError(f'{received} bytes received out of {upload["file_size"]}', received)
+
+        received_hash = _uploads_hashes.pop(upload['upload_id'], None)
+        if received_hash is not None and received_hash[0] == received:
+            file_sha256 = received_hash[1].hexdigest().upper()
+        else:
+            file_sha256 = _hash_file(part_file)
+
+        if part_file.stat().st_dev == location.parent.stat().st_dev:
+            os.replace(part_file, local_file)
+        else:
+            _copy_file(part_file, local_file)
+
+    try:
+        file_path = _store_local_file(local_file, location, file_sha256, password)
+    finally:
+        local_file.unlink(missing_ok=True)
+        session_file.unlink(missing_ok=True)
+
+    return file_path, received, file_sha256
+
+
+def _copy_file(source: Path, target: Path) -> None:
+    with open(source, 'rb') as fin, open(target, 'wb') as fout:
+        copy_stream(fin, fout)
+
+    source.unlink()
+
+
+def abort_upload(upload: dict) -> None:
+    """
+    Delete a chunked upload and the data received so far
+
+    args:
+        upload (dict): The upload, as returned by get_upload
+
+    returns:
+        None
+    """
+    session_file, part_file = _get_upload_paths(upload['upload_id'])
+
+    _uploads_hashes.pop(upload['upload_id'], None)
+    part_file.unlink(missing_ok=True)
+    session_file.unlink(missing_ok=True)
@@ -30,6 +30,7 @@ from app.datamgmt.case.case_db import get_case_tags
 from app.datamgmt.manage.manage_case_state_db import get_case_state_by_name
 from app.datamgmt.authorization import has_deny_all_access_level
 from app.datamgmt.states import delete_case_states
+from app.iris_engine.access_control.utils import ac_clear_case_access_cache
 from app.models import CaseAssets
 from app.models import CaseClassification
 from app.models import alert_assets_association
@@ -391,6 +392,8 @@ def delete_case(case_id):
     Cases.query.filter(Cases.case_id == case_id).delete()
     db.session.commit()
 
+    ac_clear_case_access_cache()
+
     return True
 
 
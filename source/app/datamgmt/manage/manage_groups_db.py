@@ -16,6 +16,7 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import insert
 
 from app import db
 from app.datamgmt.case.case_db import get_case
@@ -23,6 +24,7 @@ from app.datamgmt.manage.manage_cases_db import list_cases_id
 from app.iris_engine.access_control.utils import ac_access_level_mask_from_val_list, ac_ldp_group_removal
 from app.iris_engine.access_control.utils import ac_access_level_to_list
 from app.iris_engine.access_control.utils import ac_auto_update_user_effective_access
+from app.iris_engine.access_control.utils import ac_bulk_update_users_effective_access
 from app.iris_engine.access_control.utils import ac_permission_to_list
 from app.models import Cases
 from app.models.authorization import Group
@@ -165,17 +167,16 @@ def update_group_members(group, members):
     users_to_add = set_members - set_cur_groups
     users_to_remove = set_cur_groups - set_members
 
-    for uid in users_to_add:
-        user = User.query.filter(User.id == uid).first()
-        if user:
-            ug = UserGroup()
-            ug.group_id = group.group_id
-            ug.user_id = user.id
-            db.session.add(ug)
+    added_users = [user.id for user in User.query.with_entities(User.id).filter(User.id.in_(users_to_add)).all()]
+    for uid in added_users:
+        ug = UserGroup()
+        ug.group_id = group.group_id
+        ug.user_id = uid
+        db.session.add(ug)
 
-        db.session.commit()
-        ac_auto_update_user_effective_access(uid)
+    db.session.commit()
 
+    removed_users = []
     for uid in users_to_remove:
         if current_user.id == uid and ac_ldp_group_removal(uid, group.group_id):
             continue
@@ -184,9 +185,10 @@ def update_group_members(group, members):
             and_(UserGroup.group_id == group.group_id,
                  UserGroup.user_id == uid)
         ).delete()
+        removed_users.append(uid)
 
-        db.session.commit()
-        ac_auto_update_user_effective_access(uid)
+    db.session.commit()
+    ac_bulk_update_users_effective_access(added_users + removed_users)
 
     return group
 
@@ -210,12 +212,18 @@ def delete_group(group):
     if not group:
         return None
 
+    members = [member.user_id for member in UserGroup.query.with_entities(
+        UserGroup.user_id
+    ).filter(UserGroup.group_id == group.group_id).all()]
+
     UserGroup.query.filter(UserGroup.group_id == group.group_id).delete()
     GroupCaseAccess.query.filter(GroupCaseAccess.group_id == group.group_id).delete()
 
     db.session.delete(group)
     db.session.commit()
 
+    ac_bulk_update_users_effective_access(members)
+
 
 def add_case_access_to_group(group, cases_list, access_level):
     if not group:
@@ -252,23 +260,18 @@ def add_all_cases_access_to_group(group, access_level):
     if not group:
         return None, "Invalid group"
 
-    for case_id in list_cases_id():
-        access_level_mask = ac_access_level_mask_from_val_list([access_level])
+    access_level_mask = ac_access_level_mask_from_val_list([access_level])
 
-        ocas = GroupCaseAccess.query.filter(
-            and_(
-                GroupCaseAccess.case_id == case_id,
-                GroupCaseAccess.group_id == group.group_id
-            )).all()
-        if ocas:
-            for oca in ocas:
-                db.session.delete(oca)
-
-        oca = GroupCaseAccess()
-        oca.group_id = group.group_id
-        oca.access_level = access_level_mask
-        oca.case_id = case_id
-        db.session.add(oca)
+    GroupCaseAccess.query.filter(
+        GroupCaseAccess.group_id == group.group_id
+    ).delete(synchronize_session=False)
+
+    gcas = [
+        {'group_id': group.group_id, 'case_id': case_id, 'access_level': access_level_mask}
+        for case_id in list_cases_id()
+    ]
+    if gcas:
+        db.session.execute(insert(GroupCaseAccess), gcas)
 
     db.session.commit()
     return group, "Updated"
@@ -1,6 +1,8 @@
+import datetime
 from functools import reduce
 
 from sqlalchemy import and_, desc, asc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 import app
 from app.models import Tags
@@ -83,3 +85,23 @@ def add_db_tag(tag_title, tag_namespace=None):
 
     return tag
 
+
+
+def add_db_tags(tags_titles):
+    """
+    Adds a set of tags to the database at once, skipping the ones that already exist.
+    The tags are inserted in the transaction of the caller, which commits.
+
+    :param tags_titles: Iterable of tags titles
+    :return: Number of tags added
+    """
+    tags_titles = {tag_title for tag_title in tags_titles if tag_title}
+    if not tags_titles:
+        return 0
+
+    now = datetime.datetime.now()
+    result = app.db.session.execute(pg_insert(Tags).values([
+        {'tag_title': tag_title, 'tag_creation_date': now} for tag_title in tags_titles
+    ]).on_conflict_do_nothing(index_elements=['tag_title']))
+
+    return result.rowcount
@@ -28,6 +28,7 @@ from app.datamgmt.case.case_db import get_case
 from app.iris_engine.access_control.utils import ac_access_level_mask_from_val_list, ac_ldp_group_removal
 from app.iris_engine.access_control.utils import ac_access_level_to_list
 from app.iris_engine.access_control.utils import ac_auto_update_user_effective_access
+from app.iris_engine.access_control.utils import ac_clear_case_access_cache
 from app.iris_engine.access_control.utils import ac_get_detailed_effective_permissions_from_groups
 from app.iris_engine.access_control.utils import ac_remove_case_access_from_user
 from app.iris_engine.access_control.utils import ac_set_case_access_for_user
@@ -707,6 +708,8 @@ def delete_user(user_id):
     User.query.filter(User.id == user_id).delete()
     db.session.commit()
 
+    ac_clear_case_access_cache()
+
 
 def user_exists(user_name, user_email):
     user = User.query.filter_by(user=user_name).first()
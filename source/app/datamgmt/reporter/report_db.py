@@ -17,11 +17,16 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import datetime
 import re
+from collections import defaultdict
 
 from sqlalchemy import desc
+from sqlalchemy.orm import selectinload
 
-from app.business.iocs import get_iocs
-from app.datamgmt.case.case_notes_db import get_notes_from_group, get_case_note_comments
+from app import db
+
+from app.datamgmt.case.case_events_db import group_by_event
+from app.datamgmt.case.case_iocs_db import get_iocs_by_case
+from app.datamgmt.case.case_notes_db import get_notes_from_group
 from app.datamgmt.case.case_tasks_db import get_tasks_with_assignees
 from app.models import AnalysisStatus, CompromiseStatus, TaskAssignee, NotesGroupLink
 from app.models import AssetsType
@@ -41,9 +46,12 @@ from app.models import IocAssetLink
 from app.models import IocLink
 from app.models import IocType
 from app.models import Notes
+from app.models import NotesComments
 from app.models import NotesGroup
+from app.models import ObjectState
 from app.models import TaskStatus
 from app.models import Tlp
+from app.models import UserActivity
 from app.models.authorization import User
 from app.schema.marshables import CaseDetailsSchema, CommentSchema, CaseNoteSchema, IocSchema
 
@@ -123,6 +131,33 @@ def export_case_json_extended(case_id):
     return export
 
 
+def get_case_report_version(case_id, doc_type):
+    """
+    Return what a report of the case depends on, i.e the case details and the version of each case object.
+    Two identical versions yield the same report content
+    """
+    version = {
+        'case': export_caseinfo_json(case_id),
+        'states': {
+            state.object_name: state.object_state for state in ObjectState.query.with_entities(
+                ObjectState.object_name,
+                ObjectState.object_state
+            ).filter(
+                ObjectState.object_case_id == case_id
+            ).all()
+        }
+    }
+
+    if doc_type == 'Activities':
+        version['last_activity'] = db.session.query(
+            db.func.max(UserActivity.id)
+        ).filter(
+            UserActivity.case_id == case_id
+        ).scalar()
+
+    return version
+
+
 def process_md_images_links_for_report(markdown_text):
     """Process images links in markdown for better processing on the generator side
         Creates proper links with FQDN and removal of scale
@@ -239,8 +274,28 @@ def export_case_notes_json(case_id):
     # Fetch all notes associated with the case
     notes = Notes.query.filter(
         Notes.note_case_id == case_id
+    ).options(
+        selectinload(Notes.directory)
     ).all()
 
+    # Fetch all the notes comments at once rather than note by note
+    notes_comments = defaultdict(list)
+    for note_id, comment in db.session.query(
+        NotesComments.comment_note_id,
+        Comments
+    ).join(
+        Comments, Comments.comment_id == NotesComments.comment_id
+    ).join(
+        Notes, Notes.note_id == NotesComments.comment_note_id
+    ).filter(
+        Notes.note_case_id == case_id
+    ).options(
+        selectinload(Comments.user)
+    ).order_by(
+        Comments.comment_date.asc()
+    ).all():
+        notes_comments[note_id].append(comment)
+
     # Initialize the schemas
     note_schema = CaseNoteSchema()
     comments_schema = CommentSchema(many=True)
@@ -248,7 +303,7 @@ def export_case_notes_json(case_id):
     # Serialize the notes and their comments
     serialized_notes = []
     for note in notes:
-        note_comments = get_case_note_comments(note.note_id)
+        note_comments = notes_comments.get(note.note_id, [])
         serialized_note = note_schema.dump(note)
         serialized_note['comments'] = comments_schema.dump(note_comments)
         serialized_note["note_content"] = process_md_images_links_for_report(serialized_note["note_content"])
@@ -288,46 +343,58 @@ def export_case_tm_json(case_id):
         CasesEvent.category
     ).all()
 
+    assets_links = group_by_event(CaseEventsAssets.query.with_entities(
+        CaseEventsAssets.event_id,
+        CaseAssets.asset_id,
+        CaseAssets.asset_name,
+        AssetsType.asset_name.label('type')
+    ).join(
+        CasesEvent, CasesEvent.event_id == CaseEventsAssets.event_id
+    ).filter(
+        CasesEvent.case_id == case_id
+    ).join(
+        CaseEventsAssets.asset
+    ).join(
+        CaseAssets.asset_type
+    ).order_by(
+        CaseEventsAssets.id
+    ).all())
+
+    iocs_links = group_by_event(CaseEventsIoc.query.with_entities(
+        CaseEventsIoc.event_id,
+        CaseEventsIoc.ioc_id,
+        Ioc.ioc_value,
+        Ioc.ioc_description,
+        Tlp.tlp_name,
+        IocType.type_name.label('type')
+    ).join(
+        CasesEvent, CasesEvent.event_id == CaseEventsIoc.event_id
+    ).filter(
+        CasesEvent.case_id == case_id
+    ).join(
+        CaseEventsIoc.ioc
+    ).join(
+        Ioc.ioc_type
+    ).join(
+        Ioc.tlp
+    ).order_by(
+        CaseEventsIoc.id
+    ).all())
+
     tim = []
     for row in timeline:
         ras = row._asdict()
-        ras['assets'] = None
 
-        as_list = CaseEventsAssets.query.with_entities(
-            CaseAssets.asset_id,
-            CaseAssets.asset_name,
-            AssetsType.asset_name.label('type')
-        ).filter(
-            CaseEventsAssets.event_id == row.event_id
-        ).join(
-            CaseEventsAssets.asset
-        ).join(
-            CaseAssets.asset_type
-        ).all()
-
-        alki = []
-        for asset in as_list:
-            alki.append("{} ({})".format(asset.asset_name, asset.type))
-
-        ras['assets'] = alki
-
-        iocs_list = CaseEventsIoc.query.with_entities(
-            CaseEventsIoc.ioc_id,
-            Ioc.ioc_value,
-            Ioc.ioc_description,
-            Tlp.tlp_name,
-            IocType.type_name.label('type')
-        ).filter(
-            CaseEventsIoc.event_id == row.event_id
-        ).join(
-            CaseEventsIoc.ioc
-        ).join(
-            Ioc.ioc_type
-        ).join(
-            Ioc.tlp
-        ).all()
+        ras['assets'] = ["{} ({})".format(asset.asset_name, asset.type)
+                         for asset in assets_links.get(row.event_id, [])]
 
-        ras['iocs'] = [ioc._asdict() for ioc in iocs_list]
+        ras['iocs'] = [{
+            'ioc_id': ioc.ioc_id,
+            'ioc_value': ioc.ioc_value,
+            'ioc_description': ioc.ioc_description,
+            'tlp_name': ioc.tlp_name,
+            'type': ioc.type
+        } for ioc in iocs_links.get(row.event_id, [])]
 
         tim.append(ras)
 
@@ -335,7 +402,7 @@ def export_case_tm_json(case_id):
 
 
 def export_case_iocs_json(case_id):
-    iocs = get_iocs(case_id)
+    iocs = get_iocs_by_case(case_id)
 
     iocs_serialized = IocSchema().dump(iocs, many=True)
 
@@ -362,39 +429,31 @@ def export_case_tasks_json(case_id):
 
     tasks = [c._asdict() for c in res]
 
-    task_with_assignees = []
+    assignees = TaskAssignee.query.with_entities(
+        TaskAssignee.task_id,
+        User.user,
+        User.id,
+        User.name
+    ).join(
+        TaskAssignee.user
+    ).join(
+        TaskAssignee.task
+    ).filter(
+        CaseTasks.task_case_id == case_id
+    ).all()
+
+    assignee_list = defaultdict(list)
+    for member in assignees:
+        assignee_list[member.task_id].append({
+            'user': member.user,
+            'name': member.name,
+            'id': member.id
+        })
+
     for task in tasks:
-        task_id = task['id']
-        get_assignee_list = TaskAssignee.query.with_entities(
-            TaskAssignee.task_id,
-            User.user,
-            User.id,
-            User.name
-        ).join(
-            TaskAssignee.user
-        ).filter(
-            TaskAssignee.task_id == task_id
-        ).all()
-
-        assignee_list = {}
-        for member in get_assignee_list:
-            if member.task_id not in assignee_list:
-
-                assignee_list[member.task_id] = [{
-                    'user': member.user,
-                    'name': member.name,
-                    'id': member.id
-                }]
-            else:
-                assignee_list[member.task_id].append({
-                    'user': member.user,
-                    'name': member.name,
-                    'id': member.id
-                })
         task['task_assignees'] = assignee_list.get(task['id'], [])
-        task_with_assignees.append(task)
 
-    return task_with_assignees
+    return tasks
 
 
 def export_case_assets_json(case_id):
@@ -422,26 +481,33 @@ def export_case_assets_json(case_id):
         CaseAssets.analysis_status
     ).order_by(desc(CaseAssets.asset_compromise_status_id)).all()
 
+    assets_iocs = defaultdict(list)
+    for link in IocAssetLink.query.with_entities(
+        IocAssetLink.asset_id,
+        Ioc.ioc_value,
+        IocType.type_name,
+        Ioc.ioc_description
+    ).join(
+        IocAssetLink.asset
+    ).filter(
+        CaseAssets.case_id == case_id
+    ).join(
+        IocAssetLink.ioc
+    ).join(
+        Ioc.ioc_type
+    ).order_by(
+        IocAssetLink.ioc_asset_link_id
+    ).all():
+        assets_iocs[link.asset_id].append({
+            'ioc_value': link.ioc_value,
+            'type_name': link.type_name,
+            'ioc_description': link.ioc_description
+        })
+
     for row in res:
         row = row._asdict()
         row['light_asset_description'] = row['asset_description']
-
-        ial = IocAssetLink.query.with_entities(
-            Ioc.ioc_value,
-            IocType.type_name,
-            Ioc.ioc_description
-        ).filter(
-            IocAssetLink.asset_id == row['asset_id']
-        ).join(
-            IocAssetLink.ioc
-        ).join(
-            Ioc.ioc_type
-        ).all()
-
-        if ial:
-            row['asset_ioc'] = [row._asdict() for row in ial]
-        else:
-            row['asset_ioc'] = []
+        row['asset_ioc'] = assets_iocs.get(row['asset_id'], [])
 
         if row['asset_compromise_status_id'] is None:
             row['asset_compromise_status_id'] = CompromiseStatus.unknown.value
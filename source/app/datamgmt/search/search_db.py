@@ -0,0 +1,280 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import re
+
+from sqlalchemy import desc
+from sqlalchemy import exists
+from sqlalchemy import func
+from sqlalchemy import or_
+
+from app import db
+from app.datamgmt.manage.manage_access_control_db import get_user_clients_id
+from app.models import AssetsType
+from app.models import CaseAssets
+from app.models import Cases
+from app.models import CasesEvent
+from app.models import Client
+from app.models import Comments
+from app.models import Ioc
+from app.models import IocLink
+from app.models import IocType
+from app.models import Notes
+from app.models import Tlp
+from app.models.alerts import Alert
+from app.models.authorization import CaseAccessLevel
+from app.models.authorization import UserCaseEffectiveAccess
+
+
+def _user_can_access_case(user_id, case_id_column):
+    """
+    SQL condition on the user having access to the case of a row
+    """
+    return exists().where(
+        UserCaseEffectiveAccess.user_id == user_id,
+        UserCaseEffectiveAccess.case_id == case_id_column,
+        UserCaseEffectiveAccess.access_level != CaseAccessLevel.deny_all.value
+    )
+
+
+def _text_query(search_value):
+    return func.websearch_to_tsquery('simple', search_value)
+
+
+def _rank(model, search_value):
+    return func.ts_rank_cd(model.__table__.c.search_vector, _text_query(search_value)).label('rank')
+
+
+def _matches(model, search_value):
+    return model.__table__.c.search_vector.op('@@')(_text_query(search_value))
+
+
+# Words, possibly quoted or excluded with -, as accepted by websearch_to_tsquery
+_words_pattern = re.compile(r'\s*"?-?[^\W\d_]+"?(\s+"?-?[^\W\d_]+"?)*\s*')
+
+
+def _has_wildcard(search_value):
+    return '%' in search_value
+
+
+def _is_words(search_value):
+    return _words_pattern.fullmatch(search_value) is not None
+
+
+def _paginate(query, page, per_page):
+    """
+    Fetch a page of results, without counting all of them. One more row is fetched to know if there is a next page.
+    Without per_page, all the results are fetched.
+    """
+    if per_page is None:
+        rows = query.all()
+        return {
+            'results': [row._asdict() for row in rows],
+            'page': 1,
+            'per_page': len(rows),
+            'has_next': False
+        }
+
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+
+    return {
+        'results': [row._asdict() for row in rows[:per_page]],
+        'page': page,
+        'per_page': per_page,
+        'has_next': len(rows) > per_page
+    }
+
+
+def search_iocs(user_id, search_value, page, per_page):
+    """
+    Search the IOCs of the cases a user can access, by value. The value accepts % as a wildcard.
+    """
+    query = Ioc.query.with_entities(
+        Ioc.ioc_value.label('ioc_name'),
+        Ioc.ioc_description.label('ioc_description'),
+        Ioc.ioc_misp,
+        IocType.type_name,
+        Tlp.tlp_name,
+        Tlp.tlp_bscolor,
+        Cases.name.label('case_name'),
+        Cases.case_id,
+        Client.name.label('customer_name')
+    ).join(
+        IocLink, IocLink.ioc_id == Ioc.ioc_id
+    ).join(
+        Cases, IocLink.case_id == Cases.case_id
+    ).join(
+        Client, Client.client_id == Cases.client_id
+    ).join(
+        Tlp, Ioc.ioc_tlp_id == Tlp.tlp_id
+    ).join(
+        Ioc.ioc_type
+    ).filter(
+        Ioc.ioc_value.like(search_value),
+        _user_can_access_case(user_id, Cases.case_id)
+    ).order_by(
+        Ioc.ioc_value, Cases.case_id
+    )
+
+    return _paginate(query, page, per_page)
+
+
+def search_assets(user_id, search_value, page, per_page):
+    """
+    Search the assets of the cases a user can access, by name or IP. The value accepts % as a wildcard.
+    """
+    query = CaseAssets.query.with_entities(
+        CaseAssets.asset_id,
+        CaseAssets.asset_name,
+        CaseAssets.asset_description,
+        CaseAssets.asset_ip,
+        AssetsType.asset_name.label('asset_type'),
+        Cases.name.label('case_name'),
+        Cases.case_id,
+        Client.name.label('customer_name')
+    ).join(
+        Cases, CaseAssets.case_id == Cases.case_id
+    ).join(
+        Client, Client.client_id == Cases.client_id
+    ).join(
+        AssetsType, CaseAssets.asset_type_id == AssetsType.asset_id
+    ).filter(
+        or_(CaseAssets.asset_name.like(search_value), CaseAssets.asset_ip.like(search_value)),
+        _user_can_access_case(user_id, Cases.case_id)
+    ).order_by(
+        CaseAssets.asset_name, CaseAssets.asset_id
+    )
+
+    return _paginate(query, page, per_page)
+
+
+def _search_text(query, model, text_column, id_column, search_value, page, per_page):
+    """
+    Full-text search of a text column, the best matches first. IPs, hashes, domains and other values which are not
+    words are matched as substrings of the text instead, the most recent rows first, served by a trigram index. So are
+    values holding the % wildcard, and words the full-text search does not find, such as parts of longer tokens.
+    """
+    if _is_words(search_value) and not _has_wildcard(search_value):
+        text_query = query.filter(_matches(model, search_value))
+        results = _paginate(text_query.add_columns(
+            _rank(model, search_value)
+        ).order_by(
+            desc('rank'), id_column.desc()
+        ), page, per_page)
+
+        if results['results'] or (page > 1 and db.session.query(text_query.exists()).scalar()):
+            return results
+
+    query = query.filter(
+        text_column.like(f'%{search_value}%')
+    ).order_by(
+        id_column.desc()
+    )
+
+    return _paginate(query, page, per_page)
+
+
+def search_notes(user_id, search_value, page, per_page):
+    """
+    Search the notes of the cases a user can access, by words or by substrings of their content
+    """
+    query = Notes.query.with_entities(
+        Notes.note_id,
+        Notes.note_title,
+        Cases.name.label('case_name'),
+        Client.name.label('client_name'),
+        Cases.case_id
+    ).join(
+        Cases, Notes.note_case_id == Cases.case_id
+    ).join(
+        Client, Client.client_id == Cases.client_id
+    ).filter(
+        _user_can_access_case(user_id, Cases.case_id)
+    )
+
+    return _search_text(query, Notes, Notes.note_content, Notes.note_id, search_value, page, per_page)
+
+
+def search_comments(user_id, search_value, page, per_page):
+    """
+    Search the comments of the cases a user can access, by words or by substrings of their text
+    """
+    query = Comments.query.with_entities(
+        Comments.comment_id,
+        Comments.comment_text,
+        Cases.name.label('case_name'),
+        Client.name.label('customer_name'),
+        Cases.case_id
+    ).join(
+        Cases, Comments.comment_case_id == Cases.case_id
+    ).join(
+        Client, Client.client_id == Cases.client_id
+    ).filter(
+        _user_can_access_case(user_id, Cases.case_id)
+    )
+
+    return _search_text(query, Comments, Comments.comment_text, Comments.comment_id, search_value, page, per_page)
+
+
+def search_events(user_id, search_value, page, per_page):
+    """
+    Full-text search of the timeline events of the cases a user can access, the best matches first
+    """
+    query = CasesEvent.query.with_entities(
+        CasesEvent.event_id,
+        CasesEvent.event_title,
+        CasesEvent.event_date,
+        Cases.name.label('case_name'),
+        Client.name.label('customer_name'),
+        Cases.case_id,
+        _rank(CasesEvent, search_value)
+    ).join(
+        Cases, CasesEvent.case_id == Cases.case_id
+    ).join(
+        Client, Client.client_id == Cases.client_id
+    ).filter(
+        _matches(CasesEvent, search_value),
+        _user_can_access_case(user_id, Cases.case_id)
+    ).order_by(
+        desc('rank'), CasesEvent.event_id.desc()
+    )
+
+    return _paginate(query, page, per_page)
+
+
+def search_alerts(user_id, search_value, page, per_page):
+    """
+    Full-text search of the alerts of the clients a user can access, the best matches first
+    """
+    query = db.session.query(
+        Alert.alert_id,
+        Alert.alert_title,
+        Alert.alert_source,
+        Alert.alert_source_event_time,
+        Client.name.label('customer_name'),
+        _rank(Alert, search_value)
+    ).join(
+        Client, Client.client_id == Alert.alert_customer_id
+    ).filter(
+        _matches(Alert, search_value),
+        Alert.alert_customer_id.in_(get_user_clients_id(user_id))
+    ).order_by(
+        desc('rank'), Alert.alert_id.desc()
+    )
+
+    return _paginate(query, page, per_page)
@@ -19,8 +19,11 @@
 from datetime import datetime
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import insert
 
 from app import db
+from app.models import CaseEventsChange
 from app.models import ObjectState
 
 
@@ -78,19 +81,110 @@ def get_object_state(object_name, caseid):
 
 
 def delete_case_states(caseid):
+    CaseEventsChange.query.filter(
+        CaseEventsChange.case_id == caseid
+    ).delete()
+
     ObjectState.query.filter(
         ObjectState.object_case_id == caseid
     ).delete()
 
 
-def update_timeline_state(caseid, userid=None):
-    return _update_object_state('timeline', caseid=caseid, userid=userid)
+def update_timeline_state(caseid, userid=None, event=None, change_type='updated', events_ids=None):
+    """
+    Bump the timeline state of a case. If an event or a list of events IDs is provided, the change
+    is also recorded in the timeline change log so clients can fetch it incrementally.
+
+    Args:
+        caseid: case id
+        userid: user id
+        event: event that was created, updated or deleted
+        change_type: one of created, updated or deleted
+        events_ids: IDs of events that were changed at once, e.g by a bulk import
+
+    Returns:
+        ObjectState object
+    """
+    os = _update_object_state('timeline', caseid=caseid, userid=userid)
+
+    if event is not None:
+        if event.event_id is None:
+            db.session.flush()
+
+        db.session.add(CaseEventsChange(
+            case_id=caseid,
+            event_id=event.event_id,
+            change_type=change_type,
+            object_state=os.object_state,
+            change_date=datetime.utcnow()
+        ))
+
+    if events_ids:
+        change_date = datetime.utcnow()
+        db.session.execute(insert(CaseEventsChange), [{
+            'case_id': caseid,
+            'event_id': event_id,
+            'change_type': change_type,
+            'object_state': os.object_state,
+            'change_date': change_date
+        } for event_id in events_ids])
+
+    return os
 
 
 def get_timeline_state(caseid):
     return get_object_state('timeline', caseid=caseid)
 
 
+def get_timeline_changes(caseid, since_state):
+    """
+    Get the events changed after a timeline state
+
+    Args:
+        caseid: case id
+        since_state: timeline state known by the client
+
+    Returns:
+        Tuple of (IDs of the created or updated events, IDs of the deleted events), or None
+        if the change log does not cover everything since this state
+    """
+    current_state = get_timeline_state(caseid)
+    if current_state is None or since_state > current_state['object_state']:
+        return None
+
+    if since_state == current_state['object_state']:
+        return [], []
+
+    oldest_state = CaseEventsChange.query.with_entities(
+        func.min(CaseEventsChange.object_state)
+    ).filter(
+        CaseEventsChange.case_id == caseid
+    ).scalar()
+
+    if oldest_state is None or oldest_state > since_state + 1:
+        return None
+
+    changes = CaseEventsChange.query.with_entities(
+        CaseEventsChange.event_id,
+        CaseEventsChange.change_type
+    ).filter(
+        CaseEventsChange.case_id == caseid,
+        CaseEventsChange.object_state > since_state
+    ).order_by(
+        CaseEventsChange.object_state,
+        CaseEventsChange.id
+    ).all()
+
+    last_changes = {}
+    for change in changes:
+        last_changes[change.event_id] = change.change_type
+
+    updated = [event_id for event_id, change_type in last_changes.items() if change_type != 'deleted']
+    deleted = [event_id for event_id, change_type in last_changes.items() if change_type == 'deleted']
+
+    return updated, deleted
+
+
 def update_tasks_state(caseid, userid=None):
     return _update_object_state('tasks', caseid=caseid, userid=userid)
 
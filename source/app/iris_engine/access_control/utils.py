@@ -1,8 +1,11 @@
 from flask import session
 from flask_login import current_user
 from sqlalchemy import and_
+from sqlalchemy import insert
+from sqlalchemy import update
 
 import app
+from app import case_access_cache
 from app import db
 from app.datamgmt.manage.manage_access_control_db import check_ua_case_client
 from app.models import Cases, Client
@@ -25,6 +28,32 @@ def ac_flag_match_mask(flag, mask):
     return (flag & mask) == mask
 
 
+def _ac_case_access_cache_key(user_id, case_id):
+    return f'case_access::{user_id}::{case_id}'
+
+
+def ac_invalidate_case_access_cache(users_list, case_id):
+    """
+    Drop the cached case accesses of a list of users on a case
+    """
+    if users_list:
+        case_access_cache.delete_many(*[_ac_case_access_cache_key(user_id, case_id) for user_id in users_list])
+
+
+def ac_clear_case_access_cache():
+    """
+    Drop all the cached case accesses
+    """
+    case_access_cache.clear()
+
+
+def ac_is_sparse_case_access():
+    """
+    Return true if only granted case accesses are materialized as effective accesses
+    """
+    return app.app.config.get('SPARSE_CASE_ACCESS', False)
+
+
 def ac_get_mask_full_permissions():
     """
     Return access mask for full permissions
@@ -290,12 +319,25 @@ def ac_fast_check_user_has_case_access(user_id, cid, access_level):
     """
     Returns true if the user has access to the case
     """
-    ucea = UserCaseEffectiveAccess.query.with_entities(
-        UserCaseEffectiveAccess.access_level
-    ).filter(
-        UserCaseEffectiveAccess.user_id == user_id,
-        UserCaseEffectiveAccess.case_id == cid
-    ).first()
+    cache_key = _ac_case_access_cache_key(user_id, cid)
+    ucea = case_access_cache.get(cache_key)
+
+    if ucea is None:
+        ucea = UserCaseEffectiveAccess.query.with_entities(
+            UserCaseEffectiveAccess.access_level
+        ).filter(
+            UserCaseEffectiveAccess.user_id == user_id,
+            UserCaseEffectiveAccess.case_id == cid
+        ).first()
+
+        if ucea:
+            ucea = tuple(ucea)
+            case_access_cache.set(cache_key, ucea)
+
+        elif ac_is_sparse_case_access():
+            # Only granted accesses are stored, so no row means no access
+            case_access_cache.set(cache_key, (CaseAccessLevel.deny_all.value,))
+            return None
 
     if not ucea:
         # The user has no direct access, check if he is part of the client
@@ -324,23 +366,14 @@ def ac_recompute_effective_ac_from_users_list(users_list):
     """
     Recompute all users effective access of users
     """
-    for member in users_list:
-        ac_auto_update_user_effective_access(user_id=member['id'])
-
-    return
+    return ac_bulk_update_users_effective_access([member['id'] for member in users_list])
 
 
 def ac_recompute_all_users_effective_ac():
     """
     Recompute all users effective access
     """
-    users = User.query.with_entities(
-        User.id
-    ).all()
-    for user_id in users:
-        ac_auto_update_user_effective_access(user_id[0])
-
-    return
+    return ac_bulk_update_users_effective_access()
 
 
 def ac_recompute_effective_ac(user_id):
@@ -370,6 +403,11 @@ def ac_add_user_effective_access(users_list, case_id, access_level):
         UserCaseEffectiveAccess.case_id == case_id,
         UserCaseEffectiveAccess.user_id.in_(users_list)
     ).delete()
+    ac_invalidate_case_access_cache(users_list, case_id)
+
+    if ac_is_sparse_case_access() and access_level == CaseAccessLevel.deny_all.value:
+        db.session.commit()
+        return
 
     access_to_add = []
     for user_id in users_list:
@@ -391,9 +429,14 @@ def ac_add_user_effective_access_from_map(users_map, case_id):
         UserCaseEffectiveAccess.case_id == case_id,
         UserCaseEffectiveAccess.user_id.in_(users_map.keys())
     ).delete()
+    ac_invalidate_case_access_cache(list(users_map.keys()), case_id)
 
+    sparse = ac_is_sparse_case_access()
     access_to_add = []
     for user_id in users_map:
+        if sparse and users_map[user_id] == CaseAccessLevel.deny_all.value:
+            continue
+
         ucea = UserCaseEffectiveAccess()
         ucea.user_id = user_id
         ucea.case_id = case_id
@@ -413,11 +456,12 @@ def ac_set_new_case_access(org_members, case_id, customer_id = None):
     if current_user.id in users.keys():
         del users[current_user.id]
 
-    users_full = User.query.with_entities(User.id).all()
-    users_full_access = list(set([u.id for u in users_full]) - set(users.keys()))
+    if not ac_is_sparse_case_access():
+        users_full = User.query.with_entities(User.id).all()
+        users_full_access = list(set([u.id for u in users_full]) - set(users.keys()))
 
-    # Default users case access - Full access
-    ac_add_user_effective_access(users_full_access, case_id, CaseAccessLevel.deny_all.value)
+        # Default users case access - Deny all
+        ac_add_user_effective_access(users_full_access, case_id, CaseAccessLevel.deny_all.value)
 
     # Add specific right for the user creating the case
     UserCaseAccess.query.filter(
@@ -454,8 +498,12 @@ def ac_apply_autofollow_groups_access(case_id):
     groups = get_auto_follow_groups()
     users = ac_combine_groups_access(groups)
 
+    sparse = ac_is_sparse_case_access()
     rows_to_push = []
     for user_id in users:
+        if sparse and users[user_id] == CaseAccessLevel.deny_all.value:
+            continue
+
         ucea = UserCaseEffectiveAccess()
         ucea.user_id = user_id
         ucea.case_id = case_id
@@ -476,6 +524,8 @@ def ac_apply_autofollow_groups_access(case_id):
 
     db.session.add_all(rows_to_push)
     db.session.commit()
+    ac_invalidate_case_access_cache(list(users.keys()), case_id)
+
     return users
 
 
@@ -483,46 +533,157 @@ def ac_auto_update_user_effective_access(user_id):
     """
     Updates the effective access of a user given its ID
     """
-    uceas = UserCaseEffectiveAccess.query.filter(
-        UserCaseEffectiveAccess.user_id == user_id
+    ac_bulk_update_users_effective_access([user_id])
+
+    return
+
+
+def _ac_get_users_cases_access_overrides(users_ids):
+    """
+    Return the case accesses granted to a set of users through their groups, clients and own accesses,
+    as a dict {user_id: {case_id: access_level}}. Cases not listed fall back to deny all.
+    Uses the same precedence as ac_get_user_cases_access, i.e groups < clients < user
+    """
+    overrides = {user_id: {} for user_id in users_ids}
+
+    gcas = GroupCaseAccess.query.with_entities(
+        UserGroup.user_id,
+        GroupCaseAccess.case_id,
+        GroupCaseAccess.access_level
+    ).join(
+        UserGroup, UserGroup.group_id == GroupCaseAccess.group_id
+    ).join(
+        GroupCaseAccess.case
+    ).filter(
+        UserGroup.user_id.in_(users_ids)
+    ).all()
+
+    ccas = UserClient.query.with_entities(
+        UserClient.user_id,
+        Cases.case_id,
+        UserClient.access_level
+    ).join(
+        Cases, UserClient.client_id == Cases.client_id
+    ).filter(
+        UserClient.user_id.in_(users_ids)
+    ).all()
+
+    ucas = UserCaseAccess.query.with_entities(
+        UserCaseAccess.user_id,
+        UserCaseAccess.case_id,
+        UserCaseAccess.access_level
+    ).join(
+        UserCaseAccess.case
+    ).filter(
+        UserCaseAccess.user_id.in_(users_ids)
     ).all()
 
-    grouped_uca = {}
-    for ucea in uceas:
-        grouped_uca[ucea.case_id] = ucea.access_level
+    for rows in (gcas, ccas, ucas):
+        for user_id, case_id, access_level in rows:
+            overrides[user_id][case_id] = access_level
 
-    target_ucas = ac_get_user_cases_access(user_id)
+    return overrides
 
-    ucea_to_add = {}
-    cid_to_remove = []
 
-    for case_id in target_ucas:
-        if case_id not in grouped_uca:
-            ucea_to_add.update({case_id: target_ucas[case_id]})
-        else:
-            if not ac_flag_match_mask(grouped_uca[case_id], target_ucas[case_id]):
-                cid_to_remove.append(case_id)
-                ucea_to_add.update({case_id: target_ucas[case_id]})
+def ac_bulk_update_users_effective_access(users_ids=None, chunk_size=100):
+    """
+    Recompute the effective case accesses of a list of users, or of all users if no list is provided.
 
-    for prev_case_id in grouped_uca:
-        if prev_case_id not in target_ucas.keys():
-            cid_to_remove.append(prev_case_id)
+    The target accesses of each chunk of users are built with a fixed number of queries, diffed in memory
+    against the stored effective accesses, and only the differences are written back with bulk
+    deletes, updates and inserts.
 
-    UserCaseEffectiveAccess.query.where(and_(
-        UserCaseEffectiveAccess.user_id == user_id,
-        UserCaseEffectiveAccess.case_id.in_(cid_to_remove)
-    )).delete()
+    Returns a tuple (deleted, updated, inserted) with the number of rows affected
+    """
+    if users_ids is None:
+        users_ids = [row.id for row in User.query.with_entities(User.id).order_by(User.id).all()]
+
+    users_ids = list(dict.fromkeys(users_ids))
+    if not users_ids:
+        return 0, 0, 0
+
+    deny_all = CaseAccessLevel.deny_all.value
+    sparse = ac_is_sparse_case_access()
+
+    cases_ids = []
+    if not sparse:
+        cases_ids = [row.case_id for row in Cases.query.with_entities(Cases.case_id).all()]
+
+    deleted = updated = inserted = 0
+    changed_keys = []
+
+    for index in range(0, len(users_ids), chunk_size):
+        chunk = users_ids[index:index + chunk_size]
+        overrides = _ac_get_users_cases_access_overrides(chunk)
+
+        current = {user_id: {} for user_id in chunk}
+        ids_to_delete = []
+        for ucea_id, user_id, case_id, access_level in UserCaseEffectiveAccess.query.with_entities(
+            UserCaseEffectiveAccess.id,
+            UserCaseEffectiveAccess.user_id,
+            UserCaseEffectiveAccess.case_id,
+            UserCaseEffectiveAccess.access_level
+        ).filter(
+            UserCaseEffectiveAccess.user_id.in_(chunk)
+        ).all():
+            if case_id in current[user_id]:
+                # Duplicated effective access, only keep one
+                ids_to_delete.append(ucea_id)
+                changed_keys.append((user_id, case_id))
+                continue
+            current[user_id][case_id] = (ucea_id, access_level)
+
+        rows_to_update = []
+        rows_to_insert = []
+        for user_id in chunk:
+            user_overrides = overrides[user_id]
+            user_current = current[user_id]
+
+            if sparse:
+                target = {case_id: access_level for case_id, access_level in user_overrides.items()
+                          if access_level != deny_all}
+            else:
+                target = {case_id: user_overrides.get(case_id, deny_all) for case_id in cases_ids}
+
+            for case_id, access_level in target.items():
+                existing = user_current.get(case_id)
+                if existing is None:
+                    rows_to_insert.append({'user_id': user_id, 'case_id': case_id, 'access_level': access_level})
+                    changed_keys.append((user_id, case_id))
+
+                elif not ac_flag_match_mask(existing[1], access_level):
+                    rows_to_update.append({'id': existing[0], 'access_level': access_level})
+                    changed_keys.append((user_id, case_id))
+
+            for case_id, (ucea_id, _) in user_current.items():
+                if case_id not in target:
+                    ids_to_delete.append(ucea_id)
+                    changed_keys.append((user_id, case_id))
+
+        for sub_index in range(0, len(ids_to_delete), 5000):
+            UserCaseEffectiveAccess.query.filter(
+                UserCaseEffectiveAccess.id.in_(ids_to_delete[sub_index:sub_index + 5000])
+            ).delete(synchronize_session=False)
+
+        if rows_to_update:
+            db.session.execute(update(UserCaseEffectiveAccess), rows_to_update)
+
+        if rows_to_insert:
+            db.session.execute(insert(UserCaseEffectiveAccess), rows_to_insert)
 
-    for case_id in ucea_to_add:
-        ucea = UserCaseEffectiveAccess()
-        ucea.user_id = user_id
-        ucea.case_id = case_id
-        ucea.access_level = ucea_to_add[case_id]
-        db.session.add(ucea)
+        db.session.commit()
 
-    db.session.commit()
+        deleted += len(ids_to_delete)
+        updated += len(rows_to_update)
+        inserted += len(rows_to_insert)
 
-    return
+    if len(changed_keys) > 1000:
+        ac_clear_case_access_cache()
+    else:
+        for user_id, case_id in changed_keys:
+            ac_invalidate_case_access_cache([user_id], case_id)
+
+    return deleted, updated, inserted
 
 
 def ac_remove_case_access_from_user(user_id, case_id):
@@ -535,7 +696,11 @@ def ac_remove_case_access_from_user(user_id, case_id):
         UserCaseEffectiveAccess.case_id == case_id
     )).all()
 
-    if len(uac) > 1:
+    if ac_is_sparse_case_access():
+        for u in uac:
+            db.session.delete(u)
+
+    elif len(uac) > 1:
         log.error(f'Multiple access found for user {user_id} and case {case_id}')
         for u in uac:
             db.session.delete(u)
@@ -552,6 +717,7 @@ def ac_remove_case_access_from_user(user_id, case_id):
         uac.access_level = CaseAccessLevel.deny_all.value
 
     db.session.commit()
+    ac_invalidate_case_access_cache([user_id], case_id)
 
     return
 
@@ -585,7 +751,11 @@ def ac_set_case_access_for_user(user_id, case_id, access_level, commit=True):
         UserCaseEffectiveAccess.case_id == case_id
     )).all()
 
-    if len(uac) > 1:
+    if ac_is_sparse_case_access() and access_level == CaseAccessLevel.deny_all.value:
+        for u in uac:
+            db.session.delete(u)
+
+    elif len(uac) > 1:
         log.error(f'Multiple access found for user {user_id} and case {case_id}')
         for u in uac:
             db.session.delete(u)
@@ -601,12 +771,32 @@ def ac_set_case_access_for_user(user_id, case_id, access_level, commit=True):
         uac = uac[0]
         uac.access_level = access_level
 
+    elif ac_is_sparse_case_access():
+        uac = UserCaseEffectiveAccess()
+        uac.user_id = user_id
+        uac.case_id = case_id
+        uac.access_level = access_level
+        db.session.add(uac)
+
     if commit:
         db.session.commit()
 
+    ac_invalidate_case_access_cache([user_id], case_id)
+
     return
 
 
+def ac_prune_denied_effective_access():
+    """
+    Remove the deny all effective accesses, which are implicit with sparse case access
+    """
+    UserCaseEffectiveAccess.query.filter(
+        UserCaseEffectiveAccess.access_level == CaseAccessLevel.deny_all.value
+    ).delete()
+    db.session.commit()
+    ac_clear_case_access_cache()
+
+
 def ac_get_fast_user_cases_access(user_id):
     ucea = UserCaseEffectiveAccess.query.with_entities(
         UserCaseEffectiveAccess.case_id
@@ -648,9 +838,12 @@ def ac_get_user_cases_access(user_id):
     # ).join(
     #     OrganisationCaseAccess.case,
     # ).all()
-    cases = Cases.query.with_entities(
-        Cases.case_id
-    ).all()
+    # With sparse case access, cases without any access are not listed rather than set to deny all
+    cases = []
+    if not ac_is_sparse_case_access():
+        cases = Cases.query.with_entities(
+            Cases.case_id
+        ).all()
 
     gcas = GroupCaseAccess.query.with_entities(
         Cases.case_id,
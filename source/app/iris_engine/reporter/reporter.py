@@ -23,14 +23,21 @@
 # VARS ---------------------------------------------------
 
 # CONTENT ------------------------------------------------
+import hashlib
+import json
 import logging as log
 import os
+import re
+import shutil
+import tempfile
+import time
 from datetime import datetime
 
 import jinja2
 from jinja2.sandbox import SandboxedEnvironment
 
 from app.datamgmt.reporter.report_db import export_case_json_for_report
+from app.datamgmt.reporter.report_db import get_case_report_version
 from app.iris_engine.utils.common import IrisJinjaEnv
 from docx_generator.docx_generator import DocxGenerator
 from docx_generator.exceptions import rendering_error
@@ -38,6 +45,9 @@ from flask_login import current_user
 from sqlalchemy import desc
 
 from app import app
+from app import celery
+from app import socket_io
+from app import user_room
 from app.datamgmt.activities.activities_db import get_auto_activities
 from app.datamgmt.activities.activities_db import get_manual_activities
 from app.datamgmt.case.case_db import case_get_desc_crc
@@ -51,6 +61,7 @@ from app.models import CasesEvent
 from app.models import Ioc
 from app.models import IocAssetLink
 from app.models import IocLink
+from app.models.authorization import User
 from app.iris_engine.reporter.ImageHandler import ImageHandler
 
 LOG_FORMAT = '%(asctime)s :: %(levelname)s :: %(module)s :: %(funcName)s :: %(message)s'
@@ -62,12 +73,13 @@ class IrisReportMaker(object):
     IRIS generical report maker
     """
 
-    def __init__(self, tmp_dir, report_id, caseid, safe_mode=False):
+    def __init__(self, tmp_dir, report_id, caseid, safe_mode=False, user=None):
         self._tmp = tmp_dir
         self._report_id = report_id
         self._case_info = {}
         self._caseid = caseid
         self.safe_mode = safe_mode
+        self._user = user if user else current_user
 
     def get_case_info(self, doc_type):
         """Returns case information
@@ -99,7 +111,7 @@ class IrisReportMaker(object):
             'auto_activities': auto_activities,
             'manual_activities': manual_activities,
             'date': datetime.utcnow(),
-            'gen_user': current_user.name,
+            'gen_user': self._user.name,
             'case': {'name': case_info_in['case'].get('name'),
                      'open_date': case_info_in['case'].get('open_date'),
                      'for_customer': case_info_in['case'].get('client').get('customer_name'),
@@ -119,7 +131,7 @@ class IrisReportMaker(object):
 
         # Get customer, user and case title
         case_info['doc_id'] = IrisReportMaker.get_docid()
-        case_info['user'] = current_user.name
+        case_info['user'] = self._user.name
 
         # Set date
         case_info['date'] = datetime.utcnow().strftime("%Y-%m-%d")
@@ -284,12 +296,13 @@ class IrisMakeDocReport(IrisReportMaker):
     Generates a DOCX report for the case
     """
 
-    def __init__(self, tmp_dir, report_id, caseid, safe_mode=False):
+    def __init__(self, tmp_dir, report_id, caseid, safe_mode=False, user=None):
         self._tmp = tmp_dir
         self._report_id = report_id
         self._case_info = {}
         self._caseid = caseid
         self._safe_mode = safe_mode
+        self._user = user if user else current_user
 
     def generate_doc_report(self, doc_type):
         """
@@ -345,7 +358,7 @@ class IrisMakeDocReport(IrisReportMaker):
             'auto_activities': auto_activities,
             'manual_activities': manual_activities,
             'date': datetime.utcnow(),
-            'gen_user': current_user.name,
+            'gen_user': self._user.name,
             'case': {'name': case_info_in['case'].get('name'),
                      'open_date': case_info_in['case'].get('open_date'),
                      'for_customer': case_info_in['case'].get('for_customer'),
@@ -365,7 +378,7 @@ class IrisMakeDocReport(IrisReportMaker):
 
         # Get customer, user and case title
         case_info['doc_id'] = IrisMakeDocReport.get_docid()
-        case_info['user'] = current_user.name
+        case_info['user'] = self._user.name
 
         # Set date
         case_info['date'] = datetime.utcnow().strftime("%Y-%m-%d")
@@ -530,12 +543,13 @@ class IrisMakeMdReport(IrisReportMaker):
     Generates a MD report for the case
     """
 
-    def __init__(self, tmp_dir, report_id, caseid, safe_mode=False):
+    def __init__(self, tmp_dir, report_id, caseid, safe_mode=False, user=None):
         self._tmp = tmp_dir
         self._report_id = report_id
         self._case_info = {}
         self._caseid = caseid
         self.safe_mode = safe_mode
+        self._user = user if user else current_user
 
     def generate_md_report(self, doc_type):
         """
@@ -582,6 +596,173 @@ class IrisMakeMdReport(IrisReportMaker):
         return output_file_path, 'Report generated'
 
 
+def _get_reports_cache_dir(caseid):
+    return os.path.join(app.config['REPORTS_CACHE_PATH'], str(caseid))
+
+
+def get_report_cache_key(caseid, report, doc_type, safe_mode, user):
+    """
+    Build the key under which a report is cached. The key changes as soon as the case, its objects,
+    the template or the generation parameters change
+    """
+    try:
+        template_mtime = os.path.getmtime(os.path.join(app.config['TEMPLATES_PATH'], report.internal_reference))
+    except OSError:
+        template_mtime = None
+
+    key_data = {
+        'report_id': report.id,
+        'template_mtime': template_mtime,
+        'doc_type': doc_type,
+        'safe_mode': safe_mode,
+        'user_id': user.id,
+        'date': datetime.utcnow().strftime("%Y-%m-%d"),
+        'version': get_case_report_version(caseid, doc_type)
+    }
+
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get_cached_report(caseid, cache_key):
+    """
+    Return the path and metadata of a cached report, or (None, None) if the report is not cached
+    """
+    if not re.fullmatch(r'[0-9a-f]{64}', cache_key):
+        return None, None
+
+    entry_dir = os.path.join(_get_reports_cache_dir(caseid), cache_key)
+    try:
+        with open(os.path.join(entry_dir, 'meta.json'), 'r') as fmeta:
+            meta = json.load(fmeta)
+    except (OSError, ValueError):
+        return None, None
+
+    if time.time() - meta.get('generated_at', 0) > app.config['REPORTS_CACHE_MAX_AGE']:
+        return None, None
+
+    file_path = os.path.join(entry_dir, os.path.basename(meta.get('file_name', '')))
+    if not os.path.isfile(file_path):
+        return None, None
+
+    return file_path, meta
+
+
+def _store_report_in_cache(caseid, cache_key, file_path, meta):
+    cache_dir = _get_reports_cache_dir(caseid)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Build the entry aside and move it in place at once, so readers never see a partial entry
+    staging_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.staging-')
+    shutil.move(file_path, os.path.join(staging_dir, meta['file_name']))
+    with open(os.path.join(staging_dir, 'meta.json'), 'w') as fmeta:
+        json.dump(meta, fmeta)
+
+    entry_dir = os.path.join(cache_dir, cache_key)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.rename(staging_dir, entry_dir)
+    except OSError:
+        # The same report was generated concurrently
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def prune_reports_cache():
+    """
+    Remove the cached reports older than the configured maximum age
+    """
+    cache_root = app.config['REPORTS_CACHE_PATH']
+    if not os.path.isdir(cache_root):
+        return
+
+    expiry = time.time() - app.config['REPORTS_CACHE_MAX_AGE']
+    for case_entry in os.scandir(cache_root):
+        if not case_entry.is_dir():
+            continue
+
+        for entry in os.scandir(case_entry.path):
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < expiry:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                continue
+
+
+def _notify_report_status(user_id, task_id, status, message, report_key=None):
+    socket_io.emit('report_status', {
+        'task_id': task_id,
+        'status': status,
+        'message': message,
+        'report_key': report_key
+    }, to=user_room(user_id))
+
+
+@celery.task(bind=True)
+def task_generate_report(self, report_id, caseid, doc_type, safe_mode, user_id, cache_key):
+    """
+    Generate a report in the background and store it in the reports cache.
+    The progress is emitted to the room of the requesting user and stored in the task state
+
+    :param self: Task instance
+    :param report_id: ID of the report template
+    :param caseid: Case to generate the report of
+    :param doc_type: Investigation or Activities
+    :param safe_mode: Do not render the images of the report
+    :param user_id: User requesting the report
+    :param cache_key: Key under which the report is cached
+    :return: Dict with the case ID, and the report key on success or the generation logs on failure
+    """
+    task_id = self.request.id
+
+    def _failure(logs):
+        _notify_report_status(user_id, task_id, 'failed', 'Failed to generate the report')
+        return {'success': False, 'case_id': caseid, 'logs': logs}
+
+    user = User.query.filter(User.id == user_id).first()
+    report = CaseTemplateReport.query.filter(CaseTemplateReport.id == report_id).first()
+    if not user or not report:
+        return _failure('Invalid user or report')
+
+    self.update_state(state='PROGRESS', meta={'message': 'Generating report'})
+    _notify_report_status(user_id, task_id, 'progress', 'Generating report')
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        _, report_format = os.path.splitext(report.internal_reference)
+        if report_format == ".docx":
+            mreport = IrisMakeDocReport(tmp_dir, report_id, caseid, safe_mode, user=user)
+            fpath, logs = mreport.generate_doc_report(doc_type=doc_type)
+
+        elif report_format == ".md" or report_format == ".html":
+            mreport = IrisMakeMdReport(tmp_dir, report_id, caseid, safe_mode, user=user)
+            fpath, logs = mreport.generate_md_report(doc_type=doc_type)
+
+        else:
+            fpath, logs = None, 'Unknown report format'
+
+        if fpath is None:
+            return _failure(logs)
+
+        _store_report_in_cache(caseid, cache_key, fpath, {
+            'report_id': report_id,
+            'doc_type': doc_type,
+            'file_name': os.path.basename(fpath),
+            'generated_at': time.time()
+        })
+
+    except Exception as e:
+        log.exception(f"Error while generating report: {e}")
+        return _failure(str(e))
+
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    prune_reports_cache()
+
+    _notify_report_status(user_id, task_id, 'ready', 'Report ready', report_key=cache_key)
+
+    return {'success': True, 'case_id': caseid, 'report_key': cache_key}
+
+
 class QueuingHandler(log.Handler):
     """A thread safe logging.Handler that writes messages into a queue object.
 
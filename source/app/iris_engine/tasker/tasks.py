@@ -19,15 +19,35 @@
 # IMPORTS ------------------------------------------------
 import os
 import urllib.parse
+from celery.schedules import crontab
 from celery.signals import task_prerun
+from datetime import datetime
+from datetime import timedelta
+from flask import session
 from flask_login import current_user
+from flask_login import login_user
 
 from app import app
+from app import alerts_user_room
+from app import celery
 from app import db
+from app import socket_io
+from app.business.alerts import run_batch_action
+from app.business.errors import BusinessProcessingError
+from app.business.errors import PermissionDeniedError
+from app.datamgmt.alerts.alerts_retention_db import apply_alerts_retention
+from app.datamgmt.alerts.alerts_retention_db import parse_retention_windows
+from app.datamgmt.alerts.alerts_retention_db import purge_similar_alerts_cache
 from app.datamgmt.case.case_db import get_case
+from app.datamgmt.case.case_events_db import import_timeline_csv
+from app.datamgmt.case.case_notes_revisions_db import compact_note_revisions
+from app.iris_engine.access_control.utils import ac_get_effective_permissions_of_user
+from app.iris_engine.module_handler.module_handler import call_modules_hook
 from app.iris_engine.module_handler.module_handler import pipeline_dispatcher
 from app.iris_engine.utils.common import build_upload_path
 from app.iris_engine.utils.tracker import track_activity
+from app.models import CasesEvent
+from app.models.authorization import User
 from iris_interface import IrisInterfaceStatus as IStatus
 from iris_interface.IrisModuleInterface import IrisPipelineTypes
 
@@ -94,6 +114,214 @@ def task_case_update(module, pipeline, pipeline_args, caseid):
         return IStatus.I2UnexpectedResult("Invalid context")
 
 
+def _notify_timeline_import_status(caseid, task_id, status, message, done=0, total=0):
+    socket_io.emit('timeline_import_status', {
+        'task_id': task_id,
+        'status': status,
+        'message': message,
+        'done': done,
+        'total': total
+    }, to=f"case-{caseid}")
+
+
+@celery.task(bind=True)
+def task_import_timeline_csv(self, caseid, user_id, csv_path, options):
+    """
+    Bulk import a CSV file of events into a case timeline in the background.
+    The module hooks are called once per batch of events, and the progress is emitted to the case room
+    and stored in the task state. The CSV file is removed once processed.
+
+    :param self: Task instance
+    :param caseid: Case to import the events into
+    :param user_id: User importing the events
+    :param csv_path: Path of the uploaded CSV file
+    :param options: Dict of import options (event_sync_iocs_assets, event_in_summary, event_in_graph, event_source)
+    :return: Dict with the case ID, the success of the import, a message and its details
+    """
+    task_id = self.request.id
+
+    def _progress(done, total):
+        self.update_state(state='PROGRESS', meta={'done': done, 'total': total})
+        _notify_timeline_import_status(caseid, task_id, 'progress', f'{done}/{total} events imported', done, total)
+
+    def _preload(events_data):
+        return call_modules_hook('on_preload_event_create', data=events_data, caseid=caseid)
+
+    def _postload(events_ids):
+        events = CasesEvent.query.filter(CasesEvent.event_id.in_(events_ids)).all()
+        call_modules_hook('on_postload_event_create', data=events, caseid=caseid)
+
+    success, message, data = False, "Invalid user", None
+    try:
+        user = User.query.filter(User.id == user_id).first()
+        if user:
+            # Module hooks and activities tracking rely on the current user
+            with app.test_request_context():
+                login_user(user)
+
+                success, message, data = import_timeline_csv(
+                    caseid, user, csv_path,
+                    sync_iocs_assets=options.get('event_sync_iocs_assets', False),
+                    in_summary=options.get('event_in_summary', False),
+                    in_graph=options.get('event_in_graph', True),
+                    source=options.get('event_source', ''),
+                    on_batch_loaded=_preload,
+                    on_batch_saved=_postload,
+                    progress=_progress
+                )
+
+                if success:
+                    track_activity(f"imported {data['events_count']} events from a CSV file", caseid=caseid)
+
+    except Exception as e:
+        app.logger.exception(f"Error while importing timeline CSV: {e}")
+        db.session.rollback()
+        success, message, data = False, "Data error", {"Error": f"{e}"}
+
+    finally:
+        try:
+            os.remove(csv_path)
+        except OSError:
+            pass
+
+    _notify_timeline_import_status(caseid, task_id, 'done' if success else 'failed', message)
+
+    return {'success': success, 'case_id': caseid, 'message': message, 'data': data}
+
+
+def _notify_alerts_batch_status(user_id, task_id, status, message, done=0, total=0):
+    socket_io.emit('alerts_batch_status', {
+        'task_id': task_id,
+        'status': status,
+        'message': message,
+        'done': done,
+        'total': total
+    }, namespace='/alerts', to=alerts_user_room(user_id))
+
+
+@celery.task(bind=True)
+def task_alerts_batch(self, action, user_id, payload):
+    """
+    Run a batch update, merge or escalation of alerts in the background.
+    The progress is emitted to the room of the user on the alerts namespace, and stored in the task state.
+
+    :param self: Task instance
+    :param action: One of update, merge or escalate
+    :param user_id: User running the batch
+    :param payload: Request payload of the batch action
+    :return: Dict with the user ID, the success of the batch, a message and the ID of the case merged or escalated into
+    """
+    task_id = self.request.id
+
+    def _progress(done, total):
+        self.update_state(state='PROGRESS', meta={'user_id': user_id, 'done': done, 'total': total})
+        _notify_alerts_batch_status(user_id, task_id, 'progress', f'{done}/{total} alerts processed', done, total)
+
+    success, message, data = False, "Invalid user", None
+    try:
+        user = User.query.filter(User.id == user_id).first()
+        if user:
+            # Access checks, module hooks and activities tracking rely on the current user and its permissions
+            with app.test_request_context():
+                login_user(user)
+                session['permissions'] = ac_get_effective_permissions_of_user(user)
+
+                result = run_batch_action(action, payload, progress=_progress)
+
+                success, message = True, f'Batch {action} successful'
+                data = {'case_id': result.case_id} if action in ['merge', 'escalate'] else None
+
+    except (BusinessProcessingError, PermissionDeniedError) as e:
+        db.session.rollback()
+        message = e.get_message() if isinstance(e, BusinessProcessingError) else str(e)
+
+    except Exception as e:
+        app.logger.exception(f"Error while running alerts batch {action}: {e}")
+        db.session.rollback()
+        message = f"Batch {action} failed"
+
+    _notify_alerts_batch_status(user_id, task_id, 'done' if success else 'failed', message)
+
+    return {'success': success, 'user_id': user_id, 'message': message, 'data': data}
+
+
+@celery.task
+def task_alerts_retention():
+    """
+    Purge the expired similarity cache entries and the triaged alerts older than their client retention window
+
+    :return: IIStatus
+    """
+    batch_size = app.config.get('ALERTS_RETENTION_BATCH_SIZE')
+
+    try:
+        purged_cache_entries = 0
+        cache_days = app.config.get('SIMILAR_ALERTS_CACHE_RETENTION_DAYS')
+        if cache_days > 0:
+            purged_cache_entries = purge_similar_alerts_cache(datetime.utcnow() - timedelta(days=cache_days),
+                                                              batch_size=batch_size)
+
+        purged_alerts = apply_alerts_retention(
+            default_days=app.config.get('ALERTS_RETENTION_DAYS'),
+            clients_days=parse_retention_windows(app.config.get('ALERTS_RETENTION_CLIENTS_DAYS')),
+            archive=app.config.get('ALERTS_RETENTION_ARCHIVE'),
+            batch_size=batch_size
+        )
+
+    except Exception as e:
+        db.session.rollback()
+        app.logger.exception(f'Cron - Alerts retention failed: {e}')
+        return IStatus.I2Error(message='Alerts retention failed')
+
+    app.logger.info(f'Cron - Alerts retention purged {purged_alerts} alerts and '
+                    f'{purged_cache_entries} similarity cache entries')
+
+    return IStatus.I2Success(data={'alerts': purged_alerts, 'similar_alerts_cache': purged_cache_entries})
+
+
+@celery.on_after_finalize.connect
+def setup_periodic_alerts_retention(sender, **kwargs):
+    sender.add_periodic_task(
+        crontab(hour=app.config.get('ALERTS_RETENTION_HOUR'), minute=0),
+        task_alerts_retention.s(),
+        name='iris_alerts_retention'
+    )
+
+
+@celery.task
+def task_note_revisions_compaction():
+    """
+    Thin the note revisions older than the compaction age to the last revision of each day
+
+    :return: IIStatus
+    """
+    compaction_days = app.config.get('NOTE_REVISIONS_COMPACTION_DAYS')
+    if compaction_days <= 0:
+        return IStatus.I2Success(data={'note_revisions': 0})
+
+    try:
+        deleted = compact_note_revisions(datetime.utcnow() - timedelta(days=compaction_days),
+                                         snapshot_interval=app.config.get('NOTE_REVISIONS_SNAPSHOT_INTERVAL'))
+
+    except Exception as e:
+        db.session.rollback()
+        app.logger.exception(f'Cron - Note revisions compaction failed: {e}')
+        return IStatus.I2Error(message='Note revisions compaction failed')
+
+    app.logger.info(f'Cron - Note revisions compaction deleted {deleted} revisions')
+
+    return IStatus.I2Success(data={'note_revisions': deleted})
+
+
+@celery.on_after_finalize.connect
+def setup_periodic_note_revisions_compaction(sender, **kwargs):
+    sender.add_periodic_task(
+        crontab(hour=app.config.get('NOTE_REVISIONS_COMPACTION_HOUR'), minute=0),
+        task_note_revisions_compaction.s(),
+        name='iris_note_revisions_compaction'
+    )
+
+
 def chunks(lst, n):
     """Yield successive n-sized chunks from lst."""
     for i in range(0, len(lst), n):
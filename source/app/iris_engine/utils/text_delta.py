@@ -0,0 +1,132 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import difflib
+import json
+from typing import List, Optional, Tuple
+
+# A version is stored as a full snapshot when its delta would exceed this share of its size
+MAX_DELTA_RATIO = 0.5
+
+
+def compute_text_delta(base: str, target: str) -> str:
+    """
+    Compute a line based delta turning a text into another. The delta is a JSON list where each item is either
+    a [start, end] range of lines copied from the base, or a string inserted as is.
+
+    args:
+        base (str): The text the delta applies to
+        target (str): The text the delta produces
+
+    returns:
+        str: The delta, serialized as JSON
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+
+    delta = []
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append(''.join(target_lines[j1:j2]))
+
+    return json.dumps(delta, separators=(',', ':'))
+
+
+def apply_text_delta(base: str, delta: str) -> str:
+    """
+    Rebuild a text from its base and the delta computed by compute_text_delta
+
+    args:
+        base (str): The text the delta applies to
+        delta (str): The delta, serialized as JSON
+
+    returns:
+        str: The rebuilt text
+    """
+    base_lines = base.splitlines(keepends=True)
+
+    parts = []
+    for item in json.loads(delta):
+        if isinstance(item, str):
+            parts.append(item)
+        else:
+            parts.extend(base_lines[item[0]:item[1]])
+
+    return ''.join(parts)
+
+
+def encode_text_versions(versions: List[Tuple[int, Optional[str]]],
+                         snapshot_interval: int) -> List[Tuple[int, Optional[int], Optional[str], Optional[str]]]:
+    """
+    Encode successive versions of a text as full snapshots followed by deltas against the latest snapshot,
+    so any version is rebuilt from at most two of them.
+
+    A new snapshot is taken every snapshot_interval versions, or when the delta would not be compact.
+
+    args:
+        versions (List[Tuple[int, Optional[str]]]): The (version number, text) pairs, in increasing order
+        snapshot_interval (int): The maximum number of versions sharing a snapshot
+
+    returns:
+        List[Tuple[int, Optional[int], Optional[str], Optional[str]]]: The (version number, snapshot version
+            number, text, delta) of each version. Snapshots have no snapshot number nor delta, deltas have no text.
+    """
+    encoded = []
+    snapshot = None
+    since_snapshot = 0
+
+    for number, text in versions:
+        encoded_version = encode_text_version(number, text, snapshot, since_snapshot, snapshot_interval)
+        encoded.append(encoded_version)
+
+        if encoded_version[1] is None:
+            snapshot = (number, text)
+            since_snapshot = 1
+        else:
+            since_snapshot += 1
+
+    return encoded
+
+
+def encode_text_version(number: int, text: Optional[str], snapshot: Optional[Tuple[int, Optional[str]]],
+                        since_snapshot: int,
+                        snapshot_interval: int) -> Tuple[int, Optional[int], Optional[str], Optional[str]]:
+    """
+    Encode a single version of a text, against the latest snapshot of the text
+
+    args:
+        number (int): The version number
+        text (Optional[str]): The text of the version
+        snapshot (Optional[Tuple[int, Optional[str]]]): The (version number, text) of the latest snapshot, if any
+        since_snapshot (int): The number of versions sharing the latest snapshot, itself included
+        snapshot_interval (int): The maximum number of versions sharing a snapshot
+
+    returns:
+        Tuple[int, Optional[int], Optional[str], Optional[str]]: The (version number, snapshot version number,
+            text, delta) of the version
+    """
+    if text is None or snapshot is None or snapshot[1] is None or since_snapshot >= snapshot_interval:
+        return number, None, text, None
+
+    delta = compute_text_delta(snapshot[1], text)
+    if len(delta) > len(text) * MAX_DELTA_RATIO:
+        return number, None, text, None
+
+    return number, snapshot[0], None, delta
@@ -17,9 +17,18 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 # IMPORTS ------------------------------------------------
+import atexit
+import os
+import queue
+import threading
 from datetime import datetime
+from celery import current_task
+from celery.signals import worker_process_shutdown
+from flask import g
+from flask import has_request_context
 from flask import request
 from flask_login import current_user
+from sqlalchemy import insert
 
 import app
 from app import db
@@ -27,13 +36,176 @@ from app.models import UserActivity
 
 log = app.app.logger
 
+_activity_columns = ('user_id', 'case_id', 'activity_date', 'activity_desc', 'user_input', 'is_from_api',
+                     'display_in_ui')
+
+_activity_stats = {'buffered': 0, 'queued': 0, 'flushed': 0, 'dropped': 0}
+_activity_stats_lock = threading.Lock()
+
+_activity_queue = None
+_activity_queue_pid = None
+_activity_writer = None
+_activity_queue_lock = threading.Lock()
+
 
 # CONTENT ------------------------------------------------
-def track_activity(message, caseid=None, ctx_less=False, user_input=False, display_in_ui=True):
+def _count_activity(counter, value=1):
+    with _activity_stats_lock:
+        _activity_stats[counter] += value
+
+
+def get_activity_tracking_stats():
+    """
+    Returns the counters of the activity writer of the current process
+
+    :return: Dict with the number of activities buffered in requests, queued by workers, flushed to the DB and dropped
+    """
+    with _activity_stats_lock:
+        return dict(_activity_stats)
+
+
+def _insert_activities(activities):
+    """
+    Write a list of activities rows in a single bulk insert and commit it
+    """
+    if not activities:
+        return
+
+    try:
+        db.session.execute(insert(UserActivity), activities)
+        db.session.commit()
+        _count_activity('flushed', len(activities))
+
+    except Exception as e:
+        db.session.rollback()
+        _count_activity('dropped', len(activities))
+        log.error(f'Unable to save {len(activities)} activities: {e}')
+
+
+def flush_request_activities(exception=None):
+    """
+    Write the activities buffered during the current request in one bulk insert.
+    Called at the teardown of the request. Uncommitted changes left by the request are rolled back first, as the
+    session would have discarded them anyway, so they are not committed along with the activities.
+    """
+    activities = g.pop('iris_activities', None)
+    if not activities:
+        return
+
+    db.session.rollback()
+    _insert_activities(activities)
+
+
+def _activity_queue_worker(activity_queue):
+    batch_size = app.app.config.get('ACTIVITY_FLUSH_BATCH_SIZE', 500)
+    interval = app.app.config.get('ACTIVITY_FLUSH_INTERVAL', 2)
+
+    with app.app.app_context():
+        # None is queued to stop the writer, once the batch in progress is written
+        while True:
+            activities = []
+            activity = activity_queue.get()
+            try:
+                while activity is not None:
+                    activities.append(activity)
+                    if len(activities) >= batch_size:
+                        break
+                    activity = activity_queue.get(timeout=interval)
+            except queue.Empty:
+                pass
+
+            _insert_activities(activities)
+            db.session.remove()
+
+            if activity is None:
+                return
+
+
+@worker_process_shutdown.connect
+def _drain_activity_queue(**kwargs):
+    """
+    Write the activities still queued when the worker process exits. Celery pool processes exit without running the
+    atexit handlers, so it is also called on their shutdown signal.
+    """
+    global _activity_queue
+
+    with _activity_queue_lock:
+        activity_queue = _activity_queue
+        if activity_queue is None or _activity_queue_pid != os.getpid():
+            return
+
+        _activity_queue = None
+
+    timeout = app.app.config.get('ACTIVITY_FLUSH_INTERVAL', 2) + 5
+    try:
+        activity_queue.put(None, timeout=timeout)
+        _activity_writer.join(timeout=timeout)
+    except queue.Full:
+        pass
+
+    # Left behind if the writer did not stop in time
+    activities = []
+    try:
+        while True:
+            activity = activity_queue.get_nowait()
+            if activity is not None:
+                activities.append(activity)
+    except queue.Empty:
+        pass
+
+    if activities:
+        with app.app.app_context():
+            _insert_activities(activities)
+
+
+def _get_activity_queue():
+    """
+    Returns the activity queue of the current process, starting its writer thread if needed.
+    The queue is recreated in forked worker processes, as the thread of the parent is not inherited.
+    """
+    global _activity_queue, _activity_queue_pid, _activity_writer
+
+    if _activity_queue is None or _activity_queue_pid != os.getpid():
+        with _activity_queue_lock:
+            if _activity_queue is None or _activity_queue_pid != os.getpid():
+                activity_queue = queue.Queue(maxsize=app.app.config.get('ACTIVITY_QUEUE_SIZE', 10000))
+                _activity_writer = threading.Thread(target=_activity_queue_worker, args=(activity_queue,),
+                                                    name='iris-activity-writer', daemon=True)
+                _activity_writer.start()
+                _activity_queue = activity_queue
+                _activity_queue_pid = os.getpid()
+                atexit.register(_drain_activity_queue)
+
+    return _activity_queue
+
+
+def _enqueue_activity(activity):
+    try:
+        _get_activity_queue().put_nowait(activity)
+        _count_activity('queued')
+
+    except queue.Full:
+        _count_activity('dropped')
+        dropped = get_activity_tracking_stats().get('dropped')
+        if dropped == 1 or dropped % 100 == 0:
+            log.warning(f'Activity queue is full, {dropped} activities dropped so far')
+
+
+def track_activity(message, caseid=None, ctx_less=False, user_input=False, display_in_ui=True, flush=False):
     """
     Register a user activity in DB.
+
+    Within a request, the activity is buffered and written with the other activities of the request at its teardown.
+    Within a Celery task, it is pushed to a bounded queue written in bulk by a background thread.
+    Pending changes of the caller are still committed, as some callers rely on it.
+
     :param message: Message to save as activity
-    :return: Nothing
+    :param caseid: Case the activity relates to
+    :param ctx_less: Set to True if the activity is not bound to a case
+    :param user_input: Set to True if the message was provided by the user
+    :param display_in_ui: Set to False to hide the activity from the UI
+    :param flush: Set to True to write the activity immediately
+    :return: The activity
     """
     ua = UserActivity()
 
@@ -62,7 +234,24 @@ def track_activity(message, caseid=None, ctx_less=False, user_input=False, displ
 
     ua.is_from_api = (request.cookies.get('session') is None if request else False)
 
-    db.session.add(ua)
-    db.session.commit()
+    in_task = bool(current_task) and current_task.request.id is not None
+    if flush or not app.app.config.get('ACTIVITY_BUFFERING', True) or not (in_task or has_request_context()):
+        db.session.add(ua)
+        db.session.commit()
+        _count_activity('flushed')
+
+        return ua
+
+    if db.session.new or db.session.dirty or db.session.deleted:
+        db.session.commit()
+
+    activity = {column: getattr(ua, column) for column in _activity_columns}
+
+    if in_task:
+        _enqueue_activity(activity)
+
+    else:
+        g.setdefault('iris_activities', []).append(activity)
+        _count_activity('buffered')
 
     return ua
@@ -2,10 +2,12 @@ from datetime import datetime
 
 import uuid
 from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy import BigInteger, Table, Boolean
 from sqlalchemy import Column
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import Text
 from sqlalchemy import text
@@ -14,6 +16,7 @@ from sqlalchemy.orm import relationship, backref
 
 from app import db
 from app.models import Base, alert_assets_association, alert_iocs_association
+from app.models import search_vector_column
 from app.models.cases import Cases
 
 
@@ -26,6 +29,19 @@ class AlertCaseAssociation(db.Model):
 
 class Alert(db.Model):
     __tablename__ = 'alerts'
+    # The trigram indexes of the substring filters need the pg_trgm extension and are only created by the migrations
+    __table_args__ = (
+        Index('ix_alerts_source_event_time_id', 'alert_source_event_time', 'alert_id'),
+        Index('ix_alerts_customer_source_event_time', 'alert_customer_id', 'alert_source_event_time', 'alert_id'),
+        Index('ix_alerts_status_source_event_time', 'alert_status_id', 'alert_source_event_time'),
+        Index('ix_alerts_severity_source_event_time', 'alert_severity_id', 'alert_source_event_time'),
+        Index('ix_alerts_owner_source_event_time', 'alert_owner_id', 'alert_source_event_time'),
+        Index('ix_alerts_creation_time', 'alert_creation_time'),
+        Index('ix_alerts_customer_fingerprint_last_seen', 'alert_customer_id', 'alert_fingerprint',
+              'alert_last_seen_time'),
+        Index('ix_alerts_search_vector', 'search_vector', postgresql_using='gin')
+    )
+    __mapper_args__ = {'exclude_properties': ['search_vector']}
 
     alert_id = Column(BigInteger, primary_key=True)
     alert_uuid = Column(UUID(as_uuid=True), default=uuid.uuid4, nullable=False,
@@ -48,6 +64,10 @@ class Alert(db.Model):
     alert_customer_id = Column(ForeignKey('client.client_id'), nullable=False)
     alert_classification_id = Column(ForeignKey('case_classification.id'))
     alert_resolution_status_id = Column(ForeignKey('alert_resolution_status.resolution_status_id'), nullable=True)
+    alert_fingerprint = Column(Text, nullable=True)
+    alert_occurrences = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    alert_last_seen_time = Column(DateTime, nullable=True)
+    search_vector = search_vector_column(('alert_title', 'A'), ('alert_description', 'B'), ('alert_tags', 'C'))
 
     owner = relationship('User', foreign_keys=[alert_owner_id])
     severity = relationship('Severity')
@@ -89,6 +109,13 @@ class AlertResolutionStatus(db.Model):
 
 class SimilarAlertsCache(db.Model):
     __tablename__ = 'similar_alerts_cache'
+    __table_args__ = (
+        # Hash indexes, as a b-tree cannot hold the longest IOC values
+        Index('ix_similar_alerts_cache_asset_name', 'asset_name', postgresql_using='hash'),
+        Index('ix_similar_alerts_cache_ioc_value', 'ioc_value', postgresql_using='hash'),
+        Index('ix_similar_alerts_cache_alert', 'alert_id'),
+        Index('ix_similar_alerts_cache_created_at', 'created_at')
+    )
 
     id = Column(BigInteger, primary_key=True)
     customer_id = Column(BigInteger, ForeignKey('client.client_id'), nullable=False)
@@ -114,3 +141,14 @@ class SimilarAlertsCache(db.Model):
         self.asset_type_id = asset_type_id
         self.ioc_type_id = ioc_type_id
         self.created_at = created_at if created_at else datetime.utcnow()
+
+
+class AlertArchive(db.Model):
+    __tablename__ = 'alerts_archive'
+
+    alert_id = Column(BigInteger, primary_key=True)
+    alert_uuid = Column(UUID(as_uuid=True), nullable=False)
+    alert_customer_id = Column(BigInteger, nullable=False, index=True)
+    alert_source_event_time = Column(DateTime, nullable=False)
+    alert_data = Column(JSONB, nullable=False)
+    archived_at = Column(DateTime, nullable=False, server_default=text("now()"))
@@ -7,6 +7,7 @@ from sqlalchemy import BigInteger, JSON
 from sqlalchemy import Boolean
 from sqlalchemy import Column
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Text
@@ -136,6 +137,11 @@ class UserCaseEffectiveAccess(db.Model):
 
     UniqueConstraint('case_id', 'user_id')
 
+    __table_args__ = (
+        Index('ix_user_case_effective_access_user_case', 'user_id', 'case_id'),
+        Index('ix_user_case_effective_access_case', 'case_id'),
+    )
+
 
 class UserOrganisation(db.Model):
     __tablename__ = "user_organisation"
@@ -26,6 +26,7 @@ from sqlalchemy import Column
 from sqlalchemy import Date
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Text
@@ -44,6 +45,7 @@ from app.datamgmt.states import update_notes_state
 from app.datamgmt.states import update_tasks_state
 from app.datamgmt.states import update_timeline_state
 from app.models.models import Client, Base
+from app.models.models import search_vector_column
 
 
 class Cases(db.Model):
@@ -168,6 +170,10 @@ class CaseTags(db.Model):
 
 class CasesEvent(db.Model):
     __tablename__ = "cases_events"
+    __table_args__ = (
+        Index('ix_cases_events_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+    __mapper_args__ = {'exclude_properties': ['search_vector']}
 
     event_id = Column(BigInteger, primary_key=True)
     parent_event_id = Column(BigInteger, ForeignKey('cases_events.event_id'), nullable=True)
@@ -190,6 +196,7 @@ class CasesEvent(db.Model):
     event_date_wtz = Column(DateTime)
     event_is_flagged = Column(Boolean, default=False)
     custom_attributes = Column(JSONB)
+    search_vector = search_vector_column(('event_title', 'A'), ('event_content', 'B'), ('event_tags', 'C'))
 
     case = relationship('Cases')
     user = relationship('User')
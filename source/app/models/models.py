@@ -24,8 +24,10 @@ import uuid
 from sqlalchemy import BigInteger, UniqueConstraint, Table
 from sqlalchemy import Boolean
 from sqlalchemy import Column
+from sqlalchemy import Computed
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import LargeBinary
 from sqlalchemy import Sequence
@@ -35,6 +37,7 @@ from sqlalchemy import Text
 from sqlalchemy import create_engine
 from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import JSON, JSONB
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -47,6 +50,26 @@ from app import db
 Base = declarative_base()
 metadata = Base.metadata
 
+# Text indexed by the full-text search is truncated, as a tsvector cannot exceed 1MB
+SEARCH_VECTOR_MAX_LENGTH = 262144
+
+
+def search_vector_column(*weighted_columns):
+    """
+    Build the tsvector column of the full-text search, generated by the database from weighted text columns.
+    Models exclude it from their mapper, so it is never loaded nor serialized with the objects.
+
+    :param weighted_columns: Tuples (column name, weight), the weight being one of A, B, C or D
+    :return: Column
+    """
+    expression = ' || '.join(
+        f"setweight(to_tsvector('simple'::regconfig, left(coalesce({column_name}, ''), "
+        f"{SEARCH_VECTOR_MAX_LENGTH})), '{weight}')"
+        for column_name, weight in weighted_columns
+    )
+
+    return Column('search_vector', TSVECTOR, Computed(expression, persisted=True))
+
 
 class CaseStatus(enum.Enum):
     unknown = 0x0
@@ -170,6 +193,9 @@ alert_iocs_association = Table(
 
 class CaseAssets(db.Model):
     __tablename__ = 'case_assets'
+    __table_args__ = (
+        Index('ix_case_assets_asset_name', 'asset_name', postgresql_using='hash'),
+    )
 
     asset_id = Column(BigInteger, primary_key=True)
     asset_uuid = Column(UUID(as_uuid=True), server_default=text("gen_random_uuid()"), nullable=False)
@@ -318,6 +344,23 @@ class ObjectState(db.Model):
     updated_by = relationship('User')
 
 
+class CaseEventsChange(db.Model):
+    __tablename__ = 'case_events_change'
+
+    id = Column(BigInteger, primary_key=True)
+    case_id = Column(ForeignKey('cases.case_id'), nullable=False)
+    event_id = Column(BigInteger, nullable=False)
+    change_type = Column(Text, nullable=False)
+    object_state = Column(BigInteger, nullable=False)
+    change_date = Column(TIMESTAMP)
+
+    case = relationship('Cases')
+
+    __table_args__ = (
+        Index('ix_case_events_change_case_state', 'case_id', 'object_state'),
+    )
+
+
 class EventCategory(db.Model):
     __tablename__ = 'event_category'
 
@@ -402,6 +445,9 @@ class Tlp(db.Model):
 
 class Ioc(db.Model):
     __tablename__ = 'ioc'
+    __table_args__ = (
+        Index('ix_ioc_ioc_value', 'ioc_value', postgresql_using='hash'),
+    )
 
     ioc_id = Column(BigInteger, primary_key=True)
     ioc_uuid = Column(UUID(as_uuid=True), server_default=text("gen_random_uuid()"), nullable=False)
@@ -435,6 +481,9 @@ class CustomAttribute(db.Model):
 
 class DataStorePath(db.Model):
     __tablename__ = 'data_store_path'
+    __table_args__ = (
+        Index('ix_data_store_path_case_parent', 'path_case_id', 'path_parent_id'),
+    )
 
     path_id = Column(BigInteger, primary_key=True)
     path_uuid = Column(UUID(as_uuid=True), default=uuid.uuid4)
@@ -448,6 +497,10 @@ class DataStorePath(db.Model):
 
 class DataStoreFile(db.Model):
     __tablename__ = 'data_store_file'
+    __table_args__ = (
+        Index('ix_data_store_file_parent_id', 'file_parent_id'),
+        Index('ix_data_store_file_case_id', 'file_case_id'),
+    )
 
     file_id = Column(BigInteger, primary_key=True)
     file_uuid = Column(UUID(as_uuid=True), default=uuid.uuid4, server_default=text("gen_random_uuid()"), nullable=False)
@@ -484,6 +537,10 @@ class IocType(db.Model):
 
 class IocLink(db.Model):
     __tablename__ = 'ioc_link'
+    __table_args__ = (
+        Index('ix_ioc_link_ioc_id', 'ioc_id'),
+        Index('ix_ioc_link_case_id', 'case_id')
+    )
 
     ioc_link_id = Column(Integer, primary_key=True)
     ioc_id = Column(ForeignKey('ioc.ioc_id'))
@@ -525,6 +582,10 @@ class CasesAssetsExt(db.Model):
 
 class Notes(db.Model):
     __tablename__ = 'notes'
+    __table_args__ = (
+        Index('ix_notes_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+    __mapper_args__ = {'exclude_properties': ['search_vector']}
 
     note_id = Column(BigInteger, primary_key=True)
     note_uuid = Column(UUID(as_uuid=True), default=uuid.uuid4, server_default=text("gen_random_uuid()"), nullable=False)
@@ -540,18 +601,27 @@ class Notes(db.Model):
 
     user = relationship('User')
     case = relationship('Cases')
+    search_vector = search_vector_column(('note_title', 'A'), ('note_content', 'B'))
+
     directory = relationship('NoteDirectory', backref='notes')
     versions = relationship('NoteRevisions', back_populates='note', cascade="all, delete-orphan")
 
 
 class NoteRevisions(db.Model):
     __tablename__ = 'note_revisions'
+    __table_args__ = (
+        Index('ix_note_revisions_note_id_revision_number', 'note_id', 'revision_number'),
+        Index('ix_note_revisions_snapshot_revision_id', 'snapshot_revision_id'),
+    )
 
     revision_id = Column(BigInteger, primary_key=True)
     note_id = Column(BigInteger, ForeignKey('notes.note_id'), nullable=False)
     revision_number = Column(Integer, nullable=False)
     note_title = Column(String(155))
+    # Either the full content, or a delta against the content of the snapshot revision
     note_content = Column(Text)
+    note_content_delta = Column(Text, nullable=True)
+    snapshot_revision_id = Column(BigInteger, ForeignKey('note_revisions.revision_id'), nullable=True)
     note_user = Column(ForeignKey('user.id'))
     revision_timestamp = Column(DateTime, default=datetime.datetime.utcnow)
 
@@ -772,6 +842,10 @@ class ServerSettings(db.Model):
 
 class Comments(db.Model):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index('ix_comments_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+    __mapper_args__ = {'exclude_properties': ['search_vector']}
 
     comment_id = Column(BigInteger, primary_key=True)
     comment_uuid = Column(UUID(as_uuid=True), default=uuid.uuid4, server_default=text("gen_random_uuid()"),
@@ -782,6 +856,7 @@ class Comments(db.Model):
     comment_user_id = Column(ForeignKey('user.id'))
     comment_case_id = Column(ForeignKey('cases.case_id'))
     comment_alert_id = Column(ForeignKey('alerts.alert_id'))
+    search_vector = search_vector_column(('comment_text', 'A'))
 
     user = relationship('User')
     case = relationship('Cases')
@@ -41,6 +41,7 @@ from app.datamgmt.manage.manage_groups_db import add_case_access_to_group
 from app.datamgmt.manage.manage_users_db import add_user_to_group
 from app.datamgmt.manage.manage_users_db import add_user_to_organisation
 from app.iris_engine.access_control.utils import ac_add_user_effective_access
+from app.iris_engine.access_control.utils import ac_prune_denied_effective_access
 from app.iris_engine.demo_builder import create_demo_cases
 from app.iris_engine.access_control.utils import ac_get_mask_analyst
 from app.datamgmt.manage.manage_groups_db import get_group_by_name
@@ -247,6 +248,10 @@ def run_post_init(development=False):
                 groups=[gadm, ganalysts]
             )
 
+            if app.config.get('SPARSE_CASE_ACCESS'):
+                log.info("Pruning implicit deny all case accesses")
+                ac_prune_denied_effective_access()
+
             # Setup symlinks for custom_assets
             log.info("Creating symlinks for custom asset icons")
             custom_assets_symlinks()
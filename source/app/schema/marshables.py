@@ -20,12 +20,9 @@ import dateutil.parser
 import marshmallow
 import os
 import psycopg2
-import pyminizip
 import random
 import re
-import shutil
 import string
-import tempfile
 from flask_login import current_user
 from marshmallow import ValidationError, EXCLUDE
 from marshmallow import fields
@@ -43,6 +40,7 @@ from app import app
 from app import db
 from app import ma
 from app.datamgmt.datastore.datastore_db import datastore_get_standard_path
+from app.datamgmt.datastore.datastore_upload import store_file_stream
 from app.datamgmt.manage.manage_attribute_db import merge_custom_attributes
 from app.datamgmt.manage.manage_tags_db import add_db_tag
 from app.iris_engine.access_control.utils import ac_mask_from_val_list
@@ -73,7 +71,7 @@ from app.models.authorization import Group
 from app.models.authorization import Organisation
 from app.models.authorization import User
 from app.models.cases import CaseState, CaseProtagonist
-from app.util import file_sha256sum, str_to_bool, assert_type_mml
+from app.util import str_to_bool, assert_type_mml
 from app.util import stream_sha256sum
 
 ALLOWED_EXTENSIONS = {'png', 'svg'}
@@ -399,6 +397,7 @@ class CaseNoteRevisionSchema(ma.SQLAlchemyAutoSchema):
         model = NoteRevisions
         load_instance = True
         include_fk = True
+        exclude = ['note_content_delta', 'snapshot_revision_id']
         unknown = EXCLUDE
 
 
@@ -984,9 +983,15 @@ class IocSchema(ma.SQLAlchemyAutoSchema):
             TLP ID are invalid.
 
         """
+        # Bulk imports pass the IOC types and TLPs in the context, and create the tags beforehand
+        ioc_types = self.context.get('ioc_types')
+
         if data.get('ioc_type_id'):
             assert_type_mml(input_var=data.get('ioc_type_id'), field_name="ioc_type_id", type=int)
-            ioc_type = IocType.query.filter(IocType.type_id == data.get('ioc_type_id')).first()
+            if ioc_types is not None:
+                ioc_type = ioc_types.get(data.get('ioc_type_id'))
+            else:
+                ioc_type = IocType.query.filter(IocType.type_id == data.get('ioc_type_id')).first()
             if not ioc_type:
                 raise marshmallow.exceptions.ValidationError("Invalid IOC type ID", field_name="ioc_type_id")
 
@@ -1000,9 +1005,10 @@ class IocSchema(ma.SQLAlchemyAutoSchema):
             assert_type_mml(input_var=data.get('ioc_tlp_id'), field_name="ioc_tlp_id", type=int,
                             max_val=POSTGRES_INT_MAX)
 
-            Tlp.query.filter(Tlp.tlp_id == data.get('ioc_tlp_id')).count()
+            if self.context.get('tlps') is None:
+                Tlp.query.filter(Tlp.tlp_id == data.get('ioc_tlp_id')).count()
 
-        if data.get('ioc_tags'):
+        if data.get('ioc_tags') and not self.context.get('tags_created'):
             for tag in data.get('ioc_tags').split(','):
                 if not isinstance(tag, str):
                     raise marshmallow.exceptions.ValidationError("All items in list must be strings",
@@ -1338,50 +1344,20 @@ class DSFileSchema(ma.SQLAlchemyAutoSchema):
             return None
 
         passwd = None
+        if is_ioc and not password:
+            passwd = 'infected'
+        elif password:
+            passwd = password
 
         try:
-            if is_ioc and not password:
-                passwd = 'infected'
-            elif password:
-                passwd = password
-
-            if passwd is not None:
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                        file_storage.save(tmp)
-                        file_storage.close()
-
-                        fn = tmp
-
-                    file_hash = file_sha256sum(fn.name)
-                    file_size = os.stat(fn.name).st_size
-
-                    file_path = location.as_posix() + '.zip'
-
-                    shutil.copyfile(fn.name, Path(fn.name).parent / file_hash)
-
-                    pyminizip.compress((Path(fn.name).parent / file_hash).as_posix(), None, file_path, passwd, 0)
-                    os.unlink(Path(tmp.name).parent / file_hash)
-                    os.unlink(fn.name)
-
-                except Exception as e:
-                    log.exception(e)
-                    raise marshmallow.exceptions.ValidationError(
-                        str(e),
-                        field_name='file_password'
-                    )
-
-            else:
-                file_storage.save(location)
-                file_storage.close()
-                file_path = location.as_posix()
-                file_size = location.stat().st_size
-                file_hash = file_sha256sum(file_path)
+            file_path, file_size, file_hash = store_file_stream(file_storage.stream, location, passwd)
+            file_storage.close()
 
         except Exception as e:
+            log.exception(e)
             raise marshmallow.exceptions.ValidationError(
                 str(e),
-                field_name='file_content'
+                field_name='file_password' if passwd is not None else 'file_content'
             )
 
         if location is None:
@@ -649,7 +649,8 @@ function fetchSimilarAlerts(alert_id,
           'open-cases': fetch_open_cases,
           'closed-cases': fetch_closed_cases,
           'days-back': $(`#daysBackGraphFilter-${alert_id}`).val(),
-          'number-of-nodes': nb_nodes
+          'number-of-nodes': nb_nodes,
+          'depth': $(`#depthGraphFilter-${alert_id}`).val() || 1
         }).toString();
 
         $(`#similarAlertsNotify-${alert_id}`).text('Fetching relationships...');
@@ -997,6 +998,10 @@ function renderAlert(alert, expanded=false, modulesOptionsAlertReq,
                         <div class="col-md-3"><b>Source Event Time:</b></div>
                         <div class="col-md-9">${formatTime(alert.alert_source_event_time)} UTC</div>
                       </div>` : ''}
+                      ${alert.alert_occurrences > 1 ? `<div class="row mt-2">
+                        <div class="col-md-3"><b>Occurrences:</b></div>
+                        <div class="col-md-9">${alert.alert_occurrences}, last seen ${formatTime(alert.alert_last_seen_time)} UTC</div>
+                      </div>` : ''}
                       ${alert.alert_creation_time ? `<div class="row mt-2">
                         <div class="col-md-3"><b>IRIS Creation Time:</b></div>
                         <div class="col-md-9">${formatTime(alert.alert_creation_time)} UTC</div>
@@ -1058,6 +1063,14 @@ function renderAlert(alert, expanded=false, modulesOptionsAlertReq,
                                     <input type="number" name="value" value="180" class="form-control" id="daysBackGraphFilter-${alert.alert_id}" onchange="refreshAlertRelationships(${alert.alert_id})">
                                 </div>
                             </div>  
+                            <div class="ml-2 mt-4">
+                                <div class="input-group">
+                                    <div class="input-group-prepend">
+                                        <span class="input-group-text">Depth</span>
+                                    </div>
+                                    <input type="number" name="value" value="1" min="1" class="form-control" id="depthGraphFilter-${alert.alert_id}" onchange="refreshAlertRelationships(${alert.alert_id})">
+                                </div>
+                            </div>
                         </div>
                         <div class="row mt-4">
                                     
@@ -1192,6 +1205,8 @@ function renderAlert(alert, expanded=false, modulesOptionsAlertReq,
                 ${alert.status ? `<span class="badge alert-bade-status badge-pill badge-light mr-3">${alert.status.status_name}</span>` : ''}                    
                 <span title="Alert source event UTC time"><b><i class="fa-regular fa-calendar-check"></i></b>
                 <small class="text-muted ml-1">${formatTime(alert.alert_source_event_time)}</small></span>
+                ${alert.alert_occurrences > 1 ? `<span title="Occurrences of the alert, last seen ${formatTime(alert.alert_last_seen_time)} UTC"><b class="ml-3"><i class="fa-solid fa-layer-group"></i></b>
+                  <small class="text-muted ml-1">${alert.alert_occurrences}</small></span>` : ''}
                 <span title="Alert severity"><b class="ml-3"><i class="fa-solid fa-bolt"></i></b>
                   <small class="text-muted ml-1" id="alertSeverity-${alert.alert_id}" data-severity-id="${alert.severity.severity_id}">${alert.severity.severity_name}</small></span>
                 <span title="Alert source"><b class="ml-3"><i class="fa-solid fa-cloud-arrow-down"></i></b>
@@ -2116,4 +2131,12 @@ $(document).ready(function () {
         badge.attr('title', 'New alerts available');
     });
 
+    socket.on('new_alerts', function (data) {
+        const alert_ids = JSON.parse(data).alert_ids || [];
+        const badge = $('#newAlertsBadge');
+        const currentCount = parseInt(badge.text()) || 0;
+        badge.text(currentCount + alert_ids.length).show();
+        badge.attr('title', 'New alerts available');
+    });
+
 });
\ No newline at end of file
@@ -4,6 +4,7 @@ var buffer_dumped = false ;
 var last_applied_change = null ;
 var just_cleared_buffer = null ;
 var from_sync = null;
+var pending_report_task = null;
 
 var editor = ace.edit("editor_summary",
     {
@@ -37,6 +38,10 @@ function Collaborator( session_id ) {
         $("#content_last_saved_by").text("Last saved by " + data.last_saved);
          sync_editor(true);
     }.bind() ) ;
+
+    this.collaboration_socket.on( "report_status", function(data) {
+        handle_report_status(data);
+    }.bind() ) ;
 }
 
 Collaborator.prototype.change = function( delta ) {
@@ -114,20 +119,81 @@ function report_template_selector() {
     $('#modal_select_report').modal({ show: true });
 }
 
-function gen_report(safe) {
-    url = '/case/report/generate-investigation/' + $("#select_report option:selected").val() + case_param();
-    if (safe === true) {
-        url += '&safe=true';
+function download_generated_report(report_key) {
+    pending_report_task = null;
+    window.location.href = '/case/report/download/' + report_key + case_param();
+}
+
+function handle_report_status(data) {
+    if (data.task_id !== pending_report_task) {
+        return;
+    }
+
+    if (data.status === 'ready') {
+        download_generated_report(data.report_key);
+    } else if (data.status === 'failed') {
+        pending_report_task = null;
+        notify_error(data.message);
     }
-    window.open(url, '_blank');
 }
 
-function gen_act_report(safe) {
-    url = '/case/report/generate-activities/' + $("#select_report_act option:selected").val() + case_param();
+function poll_report_status(task_id) {
+    if (pending_report_task !== task_id) {
+        return;
+    }
+
+    get_request_api('/case/report/status/' + task_id)
+    .done((data) => {
+        if (pending_report_task !== task_id) {
+            return;
+        }
+        if (data.data.status === 'ready') {
+            download_generated_report(data.data.report_key);
+        } else {
+            setTimeout(function() { poll_report_status(task_id); }, 3000);
+        }
+    })
+    .fail((jqXHR) => {
+        pending_report_task = null;
+        if (jqXHR.responseJSON) {
+            notify_error(jqXHR.responseJSON.message);
+        }
+    });
+}
+
+function request_report(url, safe) {
+    url += case_param();
     if (safe === true) {
-        url += '&safe=true';
+        url += '&safe-mode=true';
     }
-    window.open(url, '_blank');
+
+    get_raw_request_api(url)
+    .done((data) => {
+        if (!notify_auto_api(data, true)) {
+            return;
+        }
+        if (data.data.status === 'ready') {
+            download_generated_report(data.data.report_key);
+            return;
+        }
+
+        pending_report_task = data.data.task_id;
+        notify_success('The report is being generated and will be downloaded once ready');
+        setTimeout(function() { poll_report_status(data.data.task_id); }, 3000);
+    })
+    .fail((jqXHR) => {
+        if (jqXHR.responseJSON) {
+            notify_error(jqXHR.responseJSON.message);
+        }
+    });
+}
+
+function gen_report(safe) {
+    request_report('/case/report/generate-investigation/' + $("#select_report option:selected").val() + '/async', safe);
+}
+
+function gen_act_report(safe) {
+    request_report('/case/report/generate-activities/' + $("#select_report_act option:selected").val() + '/async', safe);
 }
 
 function act_report_template_selector() {
@@ -1308,37 +1308,93 @@ function fire_upload_csv_events() {
     $('#modal_upload_csv_events').modal('show');
 }
 
+let csv_import_task_id = null;
+let csv_import_poller = null;
+
 function upload_csv_events() {
-    const api_path =  '/case/timeline/events/csv_upload';
-    const modal_dlg = '#modal_upload_csv_events'
+    const api_path =  '/case/timeline/events/csv_upload/bulk';
     const file_input = '#input_upload_csv_events'
 
     var file = $(file_input).get(0).files[0];
+    if (file === undefined) {
+        notify_error('No file selected');
+        return false;
+    }
 
-    var reader = new FileReader();
-    reader.onload = function (e) {
-        let fileData = e.target.result
-        let data = new Object();
-        data['csrf_token'] = $('#csrf_token').val();
-        data['CSVData'] = fileData;
+    let formData = new FormData();
+    formData.append('file', file);
+    formData.append('csrf_token', $('#csrf_token').val());
 
-        post_request_api(api_path, JSON.stringify(data), true)
-        .done((data) => {
+    post_request_data_api(api_path, formData, true)
+    .done((data) => {
+        if (data.status !== 'success') {
+            swal("Got bad news for you", data.message, "error");
+            return;
+        }
+        csv_import_task_id = data.data.task_id;
+        notify_success('CSV import started, the timeline will refresh once done');
+        $('#modal_upload_csv_events').modal('hide');
+        poll_csv_import_status();
+    })
+    .fail((error) => {
+        let message = error.responseJSON !== undefined ? error.responseJSON.message : 'Unable to upload the CSV file';
+        swal("Got bad news for you", message, "error");
+    });
 
-            if (notify_auto_api(data)) {
-                apply_filtering();
-                $(modal_dlg).modal('hide');
-                swal("Got news for you", data.message, "success");
-            } else {
-                //alert( JSON.stringify(data.data,null,2));
-                swal("Got bad news for you", data.message, "error");
-            }
-        })
+    return false;
+}
 
-    };
-    reader.readAsText(file)
+function csv_import_finished(success, message) {
+    csv_import_task_id = null;
+    if (csv_import_poller !== null) {
+        clearTimeout(csv_import_poller);
+        csv_import_poller = null;
+    }
+    if (success) {
+        apply_filtering();
+        swal("Got news for you", message, "success");
+    } else {
+        swal("Got bad news for you", message, "error");
+    }
+}
 
-    return false;
+function poll_csv_import_status() {
+    /* Fallback in case the socket notifications are not received */
+    if (csv_import_task_id === null) {
+        return;
+    }
+    let task_id = csv_import_task_id;
+    get_request_api('/case/timeline/events/csv_upload/status/' + task_id, true)
+    .done((data) => {
+        if (csv_import_task_id !== task_id) {
+            return;
+        }
+        if (data.status !== 'success') {
+            csv_import_finished(false, data.message);
+        } else if (data.data.status === 'done') {
+            csv_import_finished(true, data.message);
+        } else {
+            csv_import_poller = setTimeout(poll_csv_import_status, 5000);
+        }
+    })
+    .fail((error) => {
+        if (csv_import_task_id !== task_id) {
+            return;
+        }
+        let message = error.responseJSON !== undefined ? error.responseJSON.message : 'CSV import failed';
+        csv_import_finished(false, message);
+    });
+}
+
+function handleTimelineImportStatus(import_data) {
+    if (csv_import_task_id === null || import_data.task_id !== csv_import_task_id) {
+        return;
+    }
+    if (import_data.status === 'done') {
+        csv_import_finished(true, import_data.message);
+    } else if (import_data.status === 'failed') {
+        csv_import_finished(false, import_data.message);
+    }
 }
 
 function handleCollabNotifications(collab_data) {
@@ -1410,5 +1466,9 @@ $(document).ready(function(){
         }
     });
 
+    collab_case.on('timeline_import_status', function(data) {
+        handleTimelineImportStatus(data);
+    });
+
 });
 
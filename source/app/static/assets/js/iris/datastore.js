@@ -277,6 +277,100 @@ function info_ds_file(node) {
     });
 }
 
+// Files larger than this are uploaded in chunks, an interrupted upload resuming from the last chunk received
+const DS_CHUNKED_UPLOAD_THRESHOLD = 32 * 1024 * 1024;
+const DS_CHUNKED_UPLOAD_RETRIES = 5;
+
+function post_ds_upload_chunk(upload_id, file, offset, chunk_size) {
+    return $.ajax({
+        url: `/datastore/file/upload/${upload_id}` + case_param() + `&offset=${offset}`,
+        type: 'POST',
+        data: file.slice(offset, offset + chunk_size),
+        dataType: "json",
+        contentType: 'application/octet-stream',
+        processData: false,
+        headers: {'X-CSRFToken': $('#csrf_token').val()}
+    });
+}
+
+function upload_ds_file_chunked(node, formData, file, beforeSend_fn) {
+    let deferred = $.Deferred();
+    let file_metadata = {'file_size': file.size};
+    for (let [key, value] of formData.entries()) {
+        if (key !== 'file_content') {
+            file_metadata[key] = value;
+        }
+    }
+
+    let retries = 0;
+    let send_chunk = function (upload) {
+        if (upload.received >= upload.file_size) {
+            post_request_api(`/datastore/file/upload/${upload.upload_id}/complete`)
+                .done((data) => deferred.resolve(data))
+                .fail((jqXHR) => {
+                    if (jqXHR.status === 409 && jqXHR.responseJSON && retries < DS_CHUNKED_UPLOAD_RETRIES) {
+                        retries += 1;
+                        setTimeout(() => send_chunk(jqXHR.responseJSON.data), 1000 * retries);
+                    } else {
+                        deferred.reject(jqXHR);
+                    }
+                });
+            return;
+        }
+
+        post_ds_upload_chunk(upload.upload_id, file, upload.received, upload.chunk_size)
+            .done((data) => {
+                retries = 0;
+                send_chunk(data.data);
+            })
+            .fail((jqXHR) => {
+                if (jqXHR.status === 409 && jqXHR.responseJSON) {
+                    // Resume from the data the server received. A previous chunk still being received is waited for
+                    let status = jqXHR.responseJSON.data;
+                    if (status.received !== upload.received) {
+                        send_chunk(status);
+                    } else if (retries < DS_CHUNKED_UPLOAD_RETRIES) {
+                        retries += 1;
+                        setTimeout(() => send_chunk(status), 1000 * retries);
+                    } else {
+                        notify_error(jqXHR.responseJSON.message);
+                        deferred.reject(jqXHR);
+                    }
+                } else if (retries < DS_CHUNKED_UPLOAD_RETRIES && jqXHR.status !== 404) {
+                    retries += 1;
+                    get_raw_request_api(`/datastore/file/upload/${upload.upload_id}` + case_param())
+                        .done((data) => send_chunk(data.data))
+                        .fail((jqXHR) => deferred.reject(jqXHR));
+                } else {
+                    ajax_notify_error(jqXHR, `/datastore/file/upload/${upload.upload_id}`);
+                    deferred.reject(jqXHR);
+                }
+            });
+    }
+
+    post_request_api(`/datastore/file/upload/init/${node}`, JSON.stringify(file_metadata), true, beforeSend_fn)
+        .done((data) => {
+            if (data.status !== 'success') {
+                deferred.resolve(data);
+                return;
+            }
+
+            send_chunk(data.data);
+        })
+        .fail((jqXHR) => deferred.reject(jqXHR));
+
+    return deferred.promise();
+}
+
+function post_ds_file(node, formData, file, beforeSend_fn) {
+    if (file !== undefined && file.size > DS_CHUNKED_UPLOAD_THRESHOLD) {
+        return upload_ds_file_chunked(node, formData, file, beforeSend_fn);
+    }
+
+    formData.append('file_content', file);
+    return post_request_data_api('/datastore/file/add/' + node, formData, true, beforeSend_fn);
+}
+
 async function save_ds_multi_files(node, index_i) {
     let formData = new FormData($('#form_new_ds_files')[0]);
     let totalFiles = $('#input_upload_ds_files').prop('files').length;
@@ -287,10 +381,8 @@ async function save_ds_multi_files(node, index_i) {
         return;
     }
     let file = $('#input_upload_ds_files').prop('files')[index];
-    formData.append('file_content', file);
     formData.append('file_original_name', file.name);
-    let uri = '/datastore/file/add/' + node;
-    await post_request_data_api(uri, formData, true, function () {
+    await post_ds_file(node, formData, file, function () {
         window.swal({
             title: `File ${file.name} is uploading. (${index}/${totalFiles} files)`,
             text: "Please wait. This window will close automatically when the file is uploaded.",
@@ -310,16 +402,8 @@ async function save_ds_multi_files(node, index_i) {
 
 function save_ds_file(node, file_id) {
     var formData = new FormData($('#form_new_ds_file')[0]);
-    formData.append('file_content', $('#input_upload_ds_file').prop('files')[0]);
-    let uri = '';
-
-    if (file_id === undefined) {
-        uri = '/datastore/file/add/' + node;
-    } else {
-        uri = '/datastore/file/update/' + file_id;
-    }
-
-    post_request_data_api(uri, formData, true, function() {
+    let file = $('#input_upload_ds_file').prop('files')[0];
+    let beforeSend_fn = function() {
         window.swal({
               title: "File is uploading",
               text: "Please wait. This window will close automatically when the file is uploaded.",
@@ -327,7 +411,17 @@ function save_ds_file(node, file_id) {
               button: false,
               allowOutsideClick: false
         });
-    })
+    };
+
+    let request;
+    if (file_id === undefined) {
+        request = post_ds_file(node, formData, file, beforeSend_fn);
+    } else {
+        formData.append('file_content', file);
+        request = post_request_data_api('/datastore/file/update/' + file_id, formData, true, beforeSend_fn);
+    }
+
+    request
     .done(function (data){
         if(notify_auto_api(data)){
             $('#modal_ds_file').modal("hide");
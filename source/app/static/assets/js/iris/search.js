@@ -126,62 +126,204 @@ Table_comments = $("#comments_search_table").DataTable({
 });
 $("#comments_search_table").css("font-size", 12);
 
+function render_search_text(data, type, row, meta) {
+    if (type === 'display') { data = sanitizeHTML(data);}
+    return data;
+}
+
+function render_search_case(data, type, row, meta) {
+    if (type === 'display') {
+        let a_anchor = $('<a>');
+        a_anchor.attr('href', `case?cid=${row["case_id"]}`);
+        a_anchor.attr('target', '_blank');
+        a_anchor.text(data);
+        return a_anchor[0].outerHTML;
+    }
+    return data;
+}
+
+function search_table(table_id, columns) {
+    let table = $(table_id).DataTable({
+        dom: 'Bfrtip',
+        aaData: [],
+        aoColumns: columns,
+        filter: true,
+        info: true,
+        ordering: true,
+        processing: true,
+        retrieve: true,
+        buttons: [
+        { "extend": 'csvHtml5', "text":'Export',"className": 'btn btn-primary btn-border btn-round btn-sm float-left mr-4 mt-2' },
+        { "extend": 'copyHtml5', "text":'Copy',"className": 'btn btn-primary btn-border btn-round btn-sm float-left mr-4 mt-2' },
+        ]
+    });
+    $(table_id).css("font-size", 12);
+    return table;
+}
+
+Table_assets = search_table("#assets_search_table", [
+    { "data": "asset_id",
+      "render": function (data, type, row, meta) {
+            if (type === 'display') {
+                let a_anchor = $('<a>');
+                a_anchor.attr('href', `/case/assets?cid=${row["case_id"]}&shared=${data}`);
+                a_anchor.attr('target', '_blank');
+                a_anchor.text(data);
+                return a_anchor[0].outerHTML;
+            }
+            return data;
+      }
+    },
+    { "data": "asset_name", "render": render_search_text },
+    { "data": "asset_ip", "render": render_search_text },
+    { "data": "asset_type", "render": render_search_text },
+    { "data": "asset_description",
+      "render": function (data, type, row, meta) {
+            if (type === 'display') {
+                return ret_obj_dt_description(data);
+            }
+            return data;
+      }
+    },
+    { "data": "case_name", "render": render_search_case },
+    { "data": "customer_name", "render": render_search_text }
+]);
+
+Table_events = search_table("#events_search_table", [
+    { "data": "event_id",
+      "render": function (data, type, row, meta) {
+            if (type === 'display') {
+                let a_anchor = $('<a>');
+                a_anchor.attr('href', `/case/timeline?cid=${row["case_id"]}&shared=${data}`);
+                a_anchor.attr('target', '_blank');
+                a_anchor.text(data);
+                return a_anchor[0].outerHTML;
+            }
+            return data;
+      }
+    },
+    { "data": "event_title", "render": render_search_text },
+    { "data": "event_date", "render": render_search_text },
+    { "data": "case_name", "render": render_search_case },
+    { "data": "customer_name", "render": render_search_text }
+]);
+
+Table_alerts = search_table("#alerts_search_table", [
+    { "data": "alert_id",
+      "render": function (data, type, row, meta) {
+            if (type === 'display') {
+                let a_anchor = $('<a>');
+                a_anchor.attr('href', `/alerts?alert_ids=${data}`);
+                a_anchor.attr('target', '_blank');
+                a_anchor.text(data);
+                return a_anchor[0].outerHTML;
+            }
+            return data;
+      }
+    },
+    { "data": "alert_title", "render": render_search_text },
+    { "data": "alert_source", "render": render_search_text },
+    { "data": "alert_source_event_time", "render": render_search_text },
+    { "data": "customer_name", "render": render_search_text }
+]);
+
 $('#submit_search').click(function () {
     search();
 });
 
+$('#search_load_more').click(function () {
+    search(search_next_page);
+});
+
+var search_next_page = 1;
+var search_last_request = null;
+
+
+function show_search_results(table, wrapper, results) {
+    table.rows.add(results);
+    table.columns.adjust().draw();
+    $(wrapper).show();
+}
+
+function search(page) {
+    var data_sent;
+    if (page === undefined || search_last_request === null) {
+        page = 1;
+        data_sent = $('form#form_search').serializeObject();
+        data_sent['csrf_token'] = $('#csrf_token').val();
+        search_last_request = data_sent;
+    } else {
+        data_sent = search_last_request;
+    }
+    data_sent['page'] = page;
 
-function search() {
-    var data_sent = $('form#form_search').serializeObject();
-    data_sent['csrf_token'] = $('#csrf_token').val();
     post_request_api('/search', JSON.stringify(data_sent), true, function (data) {
             $('#submit_search').text("Searching...");
     })
     .done((data) => {
         if(notify_auto_api(data, true)) {
-              $('#notes_msearch_list').empty();
-              Table_1.clear();
-              Table_comments.clear();
-              $('#search_table_wrapper_1').hide();
-              $('#search_table_wrapper_2').hide();
-              $('#search_table_wrapper_3').hide();
-            val = $("input[type='radio']:checked").val();
-            if (val == "ioc") {
-                Table_1.rows.add(data.data);
-                Table_1.columns.adjust().draw();
-                $('#search_table_wrapper_1').show();
-
-                $('#search_table_wrapper_1').on('click', function(e){
+            if (page === 1) {
+                $('#notes_msearch_list').empty();
+                Table_1.clear();
+                Table_comments.clear();
+                Table_assets.clear();
+                Table_events.clear();
+                Table_alerts.clear();
+                $('#search_table_wrapper_1').hide();
+                $('#search_table_wrapper_2').hide();
+                $('#search_table_wrapper_3').hide();
+                $('#search_table_wrapper_4').hide();
+                $('#search_table_wrapper_5').hide();
+                $('#search_table_wrapper_6').hide();
+            }
+
+            let results = data.data.results;
+            val = data_sent['search_type'];
+            if (val === "ioc") {
+                show_search_results(Table_1, '#search_table_wrapper_1', results);
+
+                $('#search_table_wrapper_1').off('click').on('click', function(e){
                     if($('.popover').length>1)
                         $('.popover').popover('hide');
                         $(e.target).popover('toggle');
                 });
             }
-            else if (val == "notes") {
-                for (e in data.data) {
+            else if (val === "notes") {
+                for (e in results) {
                     let li_anchor = $('<i>');
                     li_anchor.addClass('list-group-item');
                     let span_anchor = $('<span>');
                     span_anchor.addClass('name');
                     span_anchor.attr('style', 'cursor:pointer');
                     span_anchor.attr('title', 'Click to open note');
-                    span_anchor.attr('onclick', 'note_in_details(' + data.data[e]['note_id'] + ', ' + data.data[e]['case_id'] + ');');
-                    span_anchor.text(data.data[e]['note_title'] + ' - ' + data.data[e]['case_name'] + ' - ' + data.data[e]['client_name']);
+                    span_anchor.attr('onclick', `note_in_details(${results[e]['note_id']}, ${results[e]['case_id']});`);
+                    span_anchor.text(`${results[e]['note_title']} - ${results[e]['case_name']} - ${results[e]['client_name']}`);
                     li_anchor.append(span_anchor);
                     $('#notes_msearch_list').append(li_anchor);
 
                 }
                 $('#search_table_wrapper_2').show();
-            } else if (val == "comments") {
-                Table_comments.rows.add(data.data);
-                Table_comments.columns.adjust().draw();
-                $('#search_table_wrapper_3').show();
+            } else if (val === "comments") {
+                show_search_results(Table_comments, '#search_table_wrapper_3', results);
 
-                $('#search_table_wrapper_3').on('click', function(e){
+                $('#search_table_wrapper_3').off('click').on('click', function(e){
                     if($('.popover').length>1)
                         $('.popover').popover('hide');
                         $(e.target).popover('toggle');
                 });
+            } else if (val === "assets") {
+                show_search_results(Table_assets, '#search_table_wrapper_4', results);
+            } else if (val === "events") {
+                show_search_results(Table_events, '#search_table_wrapper_5', results);
+            } else if (val === "alerts") {
+                show_search_results(Table_alerts, '#search_table_wrapper_6', results);
+            }
+
+            search_next_page = data.data.page + 1;
+            if (data.data.has_next) {
+                $('#search_load_more_wrapper').show();
+            } else {
+                $('#search_load_more_wrapper').hide();
             }
         }
     })
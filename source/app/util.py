@@ -51,6 +51,7 @@ from pyunpack import Archive
 from requests.auth import HTTPBasicAuth
 from sqlalchemy.ext.declarative import DeclarativeMeta
 from sqlalchemy.orm.attributes import flag_modified
+from werkzeug.datastructures import MultiDict
 from werkzeug.utils import redirect
 
 from app import TEMPLATE_PATH
@@ -639,11 +640,13 @@ def ac_api_case_requires(*access_level):
                 cookie_session = request.cookies.get('session')
                 is_api = (request.headers.get('X-IRIS-AUTH') is not None) | (request.headers.get('Authorization') is not None)
                 if cookie_session and not is_api:
-                    form = FlaskForm()
+                    # Raw uploads carry no form, their token is sent in a header
+                    csrf_header = request.headers.get('X-CSRFToken')
+                    form = FlaskForm(formdata=MultiDict({'csrf_token': csrf_header})) if csrf_header else FlaskForm()
                     if not form.validate():
                         return response_error('Invalid CSRF token')
                     elif request.is_json:
-                        request.json.pop('csrf_token')
+                        request.json.pop('csrf_token', None)
 
             if not is_user_authenticated(request):
                 return response_error("Authentication required", status=401)
@@ -0,0 +1,72 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+
+from unittest import TestCase
+
+import logging
+from flask_login import login_user
+from sqlalchemy import event
+
+from app import app
+from app import db
+from app.iris_engine.utils.tracker import track_activity
+from app.models import UserActivity
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestActivityTracking(TestCase):
+    """
+    Ensure the activities of a request are written in a single insert at its teardown
+    """
+
+    def setUp(self) -> None:
+        logging.info('SetUp called')
+        clean_db()
+        run_post_init()
+
+    def tearDown(self) -> None:
+        logging.info('Teardown called')
+        clean_db()
+
+    def test_request_activities_are_written_in_bulk(self):
+        user = User.query.order_by(User.id).first()
+        activities_before = UserActivity.query.count()
+        statements = []
+
+        def _count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('INSERT INTO USER_ACTIVITY'):
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', _count_inserts)
+        try:
+            with app.test_request_context():
+                login_user(user)
+                for i in range(50):
+                    track_activity(f'bulk activity {i}', ctx_less=True)
+
+                self.assertEqual(UserActivity.query.count(), activities_before)
+
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _count_inserts)
+
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(UserActivity.query.count(), activities_before + 50)
@@ -0,0 +1,167 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+import logging
+import os
+import statistics
+import time
+from types import SimpleNamespace
+from sqlalchemy import text
+
+from app import db
+from app.datamgmt.alerts.alerts_db import get_filtered_alerts
+from app.datamgmt.alerts.alerts_db import get_related_alerts
+from app.models import AssetsType
+from app.models.alerts import AlertStatus
+from app.models.alerts import Severity
+from app.models.authorization import User
+from app.models.cases import Client
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+# Number of alerts seeded by the benchmark. Lower it for a quicker run
+ALERTS_NB = int(os.environ.get('IRIS_BENCHMARK_ALERTS_NB', 1000000))
+CLIENTS_NB = 20
+RUNS_NB = 20
+
+# The trigram indexes are created by the migrations, which do not run again after the tables are recreated
+_TRIGRAM_INDEXES = {
+    'ix_alerts_title_trgm': 'alert_title',
+    'ix_alerts_description_trgm': 'alert_description',
+    'ix_alerts_source_trgm': 'alert_source',
+    'ix_alerts_tags_trgm': 'alert_tags'
+}
+
+
+class TestAlertsFiltering(TestCase):
+    """
+    Benchmark the common alerts filters on a large number of alerts, and report their p50 and p95 latencies
+    """
+
+    def setUp(self) -> None:
+        logging.info('SetUp called')
+        clean_db()
+        run_post_init()
+
+    def tearDown(self) -> None:
+        logging.info('Teardown called')
+        clean_db()
+
+    @staticmethod
+    def _seed_alerts(alerts_nb: int):
+        for i in range(CLIENTS_NB):
+            db.session.add(Client(f'benchmark_client_{i}'))
+        db.session.commit()
+
+        clients = [client.client_id for client in Client.query.all()]
+        statuses = [status.status_id for status in AlertStatus.query.all()]
+        severities = [severity.severity_id for severity in Severity.query.all()]
+        owner_id = User.query.order_by(User.id).first().id
+        asset_type_id = AssetsType.query.first().asset_id
+
+        # Generated server side, as inserting a million rows from the ORM would dominate the benchmark
+        db.session.execute(text("""
+            INSERT INTO alerts (alert_title, alert_description, alert_source, alert_tags, alert_severity_id,
+                                alert_status_id, alert_customer_id, alert_owner_id, alert_source_event_time,
+                                alert_creation_time, alert_uuid)
+            SELECT 'Suspicious activity ' || md5(i::text), 'Alert description ' || md5((i * 7)::text),
+                   'source_' || (i % 50), 'tag_' || (i % 200) || ',benchmark',
+                   (:severities)[1 + i % array_length(:severities, 1)],
+                   (:statuses)[1 + i % array_length(:statuses, 1)],
+                   (:clients)[1 + i % array_length(:clients, 1)],
+                   CASE WHEN i % 3 = 0 THEN :owner_id END,
+                   now() - (i || ' seconds')::interval, now() - (i || ' seconds')::interval, gen_random_uuid()
+            FROM generate_series(1, :alerts_nb) AS i
+        """), {'severities': severities, 'statuses': statuses, 'clients': clients, 'owner_id': owner_id,
+               'alerts_nb': alerts_nb})
+
+        db.session.execute(text("""
+            INSERT INTO similar_alerts_cache (customer_id, asset_name, asset_type_id, alert_id, created_at)
+            SELECT alert_customer_id, 'host_' || (alert_id % 5000), :asset_type_id, alert_id, alert_creation_time
+            FROM alerts
+        """), {'asset_type_id': asset_type_id})
+
+        db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        for index_name, column in _TRIGRAM_INDEXES.items():
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {index_name} ON alerts '
+                                    f'USING gin ({column} gin_trgm_ops)'))
+
+        db.session.commit()
+        db.session.execute(text('ANALYZE alerts'))
+        db.session.execute(text('ANALYZE similar_alerts_cache'))
+        db.session.commit()
+
+        return clients, statuses, severities, owner_id
+
+    @staticmethod
+    def _measure(name, fn):
+        durations = []
+        for _ in range(RUNS_NB):
+            start_time = time.perf_counter()
+            fn()
+            durations.append((time.perf_counter() - start_time) * 1000)
+            db.session.rollback()
+
+        quantiles = statistics.quantiles(durations, n=100)
+        logging.info(f'{name}: p50 {quantiles[49]:.1f}ms, p95 {quantiles[94]:.1f}ms')
+
+        return quantiles[49], quantiles[94]
+
+    def test_alerts_filters_latency(self):
+        clients, statuses, severities, owner_id = self._seed_alerts(ALERTS_NB)
+        logging.info(f'Seeded {ALERTS_NB} alerts')
+
+        first_page = get_filtered_alerts(per_page=50, sort='desc', count_mode='none', cursor='')
+        deep_page_number = ALERTS_NB // 100
+        self.assertEqual(50, len(first_page.items))
+        self.assertIsNotNone(first_page.next_cursor)
+
+        benchmarks = {
+            'No filter, exact count': lambda: get_filtered_alerts(per_page=50, sort='desc'),
+            'No filter, estimated count': lambda: get_filtered_alerts(per_page=50, sort='desc',
+                                                                      count_mode='estimate'),
+            'Deep page with offset': lambda: get_filtered_alerts(page=deep_page_number, per_page=50, sort='desc',
+                                                                 count_mode='none'),
+            'Next page with cursor': lambda: get_filtered_alerts(per_page=50, sort='desc', count_mode='none',
+                                                                 cursor=first_page.next_cursor),
+            'Customer and status': lambda: get_filtered_alerts(client=clients[0], status=statuses[0], per_page=50,
+                                                               sort='desc', count_mode='none'),
+            'Severity and time range': lambda: get_filtered_alerts(
+                severity=severities[0], per_page=50, sort='desc', count_mode='none',
+                start_date='2000-01-01', end_date='2100-01-01'),
+            'Unassigned': lambda: get_filtered_alerts(owner=-1, per_page=50, sort='desc', count_mode='none'),
+            'Owner': lambda: get_filtered_alerts(owner=owner_id, per_page=50, sort='desc', count_mode='none'),
+            'Title substring': lambda: get_filtered_alerts(title='activity 1a2b', per_page=50, sort='desc',
+                                                           count_mode='none'),
+            'Description substring': lambda: get_filtered_alerts(description='description ff', per_page=50,
+                                                                 sort='desc', count_mode='none'),
+            'Tags substring': lambda: get_filtered_alerts(tags='tag_42,', per_page=50, sort='desc',
+                                                          count_mode='none'),
+            'Source substring': lambda: get_filtered_alerts(source='source_7', per_page=50, sort='desc',
+                                                            count_mode='none'),
+            'Related alerts': lambda: get_related_alerts(clients[0], [SimpleNamespace(asset_name='host_42')], [])
+        }
+
+        results = {name: self._measure(name, fn) for name, fn in benchmarks.items()}
+
+        # A deep page reached with the cursor must not cost much more than the first one
+        self.assertLess(results['Next page with cursor'][0], results['Deep page with offset'][0])
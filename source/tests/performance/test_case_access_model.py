@@ -0,0 +1,133 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+import logging
+import random
+import time
+from flask_login import login_user
+from sqlalchemy import text
+
+from app import app
+from app import db
+from app.iris_engine.access_control.utils import ac_fast_check_user_has_case_access
+from app.iris_engine.access_control.utils import ac_prune_denied_effective_access
+from app.iris_engine.access_control.utils import ac_set_new_case_access
+from app.models import Cases
+from app.models.authorization import CaseAccessLevel
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestCaseAccessModel(TestCase):
+    """
+    Compare the dense (one row per user and case) and sparse (granted rows only) case access models
+    """
+    _USERS_NB = 500
+    _CASES_NB = 50000
+    _GRANTED_RATIO = 0.02
+    _NEW_CASES_NB = 50
+    _CHECKS_NB = 2000
+
+    def setUp(self) -> None:
+        logging.info('SetUp called')
+        clean_db()
+        run_post_init()
+        self._sparse_mode = app.config.get('SPARSE_CASE_ACCESS', False)
+
+    def tearDown(self) -> None:
+        logging.info('Teardown called')
+        app.config['SPARSE_CASE_ACCESS'] = self._sparse_mode
+        clean_db()
+
+    def _seed(self):
+        db.session.execute(text(
+            "INSERT INTO \"user\" (\"user\", name, email, password, active) "
+            "SELECT 'bench_' || i, 'Bench ' || i, 'bench_' || i || '@iris.local', '', true "
+            "FROM generate_series(1, :nb) AS i"
+        ), {'nb': self._USERS_NB})
+
+        case = Cases.query.first()
+        db.session.execute(text(
+            "INSERT INTO cases (name, description, soc_id, client_id, user_id, owner_id, open_date, "
+            "classification_id, state_id) "
+            "SELECT 'Bench ' || i, '', '', :client_id, :user_id, :user_id, now(), :classification_id, :state_id "
+            "FROM generate_series(1, :nb) AS i"
+        ), {'nb': self._CASES_NB, 'client_id': case.client_id, 'user_id': case.user_id,
+            'classification_id': case.classification_id, 'state_id': case.state_id})
+
+        # Dense model: every user has a row for every case, a few of them being grants
+        db.session.execute(text(
+            "INSERT INTO user_case_effective_access (user_id, case_id, access_level) "
+            "SELECT u.id, c.case_id, CASE WHEN random() < :ratio THEN :granted ELSE :denied END "
+            "FROM \"user\" u CROSS JOIN cases c"
+        ), {'ratio': self._GRANTED_RATIO, 'granted': CaseAccessLevel.full_access.value,
+            'denied': CaseAccessLevel.deny_all.value})
+        db.session.commit()
+
+    def _time_access_checks(self, pairs):
+        start_time = time.perf_counter()
+        for user_id, case_id in pairs:
+            ac_fast_check_user_has_case_access(user_id, case_id, [CaseAccessLevel.read_only,
+                                                                  CaseAccessLevel.full_access])
+        return (time.perf_counter() - start_time) / len(pairs)
+
+    def _time_case_creations(self, admin):
+        cases_ids = [c.case_id for c in Cases.query.with_entities(Cases.case_id).limit(self._NEW_CASES_NB).all()]
+
+        with app.test_request_context():
+            login_user(admin)
+            start_time = time.perf_counter()
+            for case_id in cases_ids:
+                ac_set_new_case_access(None, case_id)
+
+        return (time.perf_counter() - start_time) / len(cases_ids)
+
+    def _count_rows(self):
+        return db.session.execute(text("SELECT count(*) FROM user_case_effective_access")).scalar()
+
+    def test_sparse_access_model_should_be_smaller_and_not_slower(self):
+        self._seed()
+
+        admin = User.query.order_by(User.id).first()
+        users_ids = [u.id for u in User.query.with_entities(User.id).all()]
+        cases_ids = [c.case_id for c in Cases.query.with_entities(Cases.case_id).all()]
+        pairs = [(random.choice(users_ids), random.choice(cases_ids)) for _ in range(self._CHECKS_NB)]
+
+        app.config['SPARSE_CASE_ACCESS'] = False
+        dense_rows = self._count_rows()
+        dense_check = self._time_access_checks(pairs)
+        dense_creation = self._time_case_creations(admin)
+
+        app.config['SPARSE_CASE_ACCESS'] = True
+        ac_prune_denied_effective_access()
+        sparse_rows = self._count_rows()
+        sparse_check = self._time_access_checks(pairs)
+        sparse_creation = self._time_case_creations(admin)
+
+        logging.info(f'Dense model: {dense_rows} rows, check {dense_check * 1000:.3f}ms, '
+                     f'case creation {dense_creation * 1000:.1f}ms')
+        logging.info(f'Sparse model: {sparse_rows} rows, check {sparse_check * 1000:.3f}ms, '
+                     f'case creation {sparse_creation * 1000:.1f}ms')
+
+        self.assertLess(sparse_rows, dense_rows * self._GRANTED_RATIO * 2)
+        self.assertLess(sparse_creation, dense_creation)
+        self.assertLess(sparse_check, dense_check * 1.5)
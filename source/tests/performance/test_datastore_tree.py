@@ -0,0 +1,141 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+import logging
+import os
+import statistics
+import time
+from sqlalchemy import text
+
+from app import db
+from app.datamgmt.datastore.datastore_db import datastore_get_root
+from app.datamgmt.datastore.datastore_db import datastore_list_node_children
+from app.datamgmt.datastore.datastore_db import ds_list_tree
+from app.models.authorization import User
+from app.models.cases import Cases
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+# Size of the benchmark datastore. Lower them for a quicker run
+FILES_NB = int(os.environ.get('IRIS_BENCHMARK_DS_FILES_NB', 100000))
+FOLDERS_NB = int(os.environ.get('IRIS_BENCHMARK_DS_FOLDERS_NB', 10000))
+RUNS_NB = 5
+
+
+class TestDatastoreTree(TestCase):
+    """
+    Benchmark the datastore tree of a case holding many folders and files, and the lazy listing of a single folder
+    """
+
+    def setUp(self) -> None:
+        logging.info('SetUp called')
+        clean_db()
+        run_post_init()
+
+    def tearDown(self) -> None:
+        logging.info('Teardown called')
+        clean_db()
+
+    @staticmethod
+    def _seed_datastore(case_id, root_id, folders_nb, files_nb):
+        user_id = User.query.order_by(User.id).first().id
+
+        db.session.execute(text("""
+            INSERT INTO data_store_path (path_name, path_parent_id, path_is_root, path_case_id)
+            SELECT 'folder_' || i, :root_id, false, :case_id FROM generate_series(1, :folders_nb) AS i
+        """), {'root_id': root_id, 'case_id': case_id, 'folders_nb': folders_nb})
+
+        # Nest the folders under random ones, parents being as often listed after their children as before.
+        # Folders are only moved under lower IDs, so no cycle is created
+        db.session.execute(text("""
+            UPDATE data_store_path p SET path_parent_id = (
+                SELECT min(path_id) + floor(random() * (p.path_id - min(path_id)))::bigint
+                FROM data_store_path WHERE path_case_id = :case_id AND path_is_root = false
+            )
+            WHERE path_case_id = :case_id AND path_is_root = false AND random() < 0.8
+              AND path_id > (SELECT min(path_id) FROM data_store_path WHERE path_case_id = :case_id
+                                                                          AND path_is_root = false)
+        """), {'case_id': case_id})
+
+        db.session.execute(text("""
+            INSERT INTO data_store_file (file_original_name, file_local_name, file_description, file_size,
+                                         file_is_ioc, file_is_evidence, file_password, file_parent_id,
+                                         file_sha256, added_by_user_id, file_case_id, file_date_added)
+            SELECT 'file_' || i || '.bin', md5(i::text), '', i, false, false, '',
+                   (SELECT array_agg(path_id) FROM data_store_path WHERE path_case_id = :case_id)
+                       [1 + i % (:folders_nb + 1)],
+                   md5(i::text) || md5((i * 3)::text), :user_id, :case_id, now()
+            FROM generate_series(1, :files_nb) AS i
+        """), {'case_id': case_id, 'user_id': user_id, 'folders_nb': folders_nb, 'files_nb': files_nb})
+
+        db.session.commit()
+        db.session.execute(text('ANALYZE data_store_path'))
+        db.session.execute(text('ANALYZE data_store_file'))
+        db.session.commit()
+
+    @staticmethod
+    def _count_nodes(node):
+        folders, files = 0, 0
+        for child in node['children'].values():
+            if child['type'] == 'directory':
+                child_folders, child_files = TestDatastoreTree._count_nodes(child)
+                folders += 1 + child_folders
+                files += child_files
+            else:
+                files += 1
+
+        return folders, files
+
+    @staticmethod
+    def _measure(name, fn):
+        durations = []
+        result = None
+        for _ in range(RUNS_NB):
+            start_time = time.perf_counter()
+            result = fn()
+            durations.append((time.perf_counter() - start_time) * 1000)
+            db.session.rollback()
+
+        logging.info(f'{name}: median {statistics.median(durations):.1f}ms, max {max(durations):.1f}ms')
+
+        return result
+
+    def test_datastore_tree_latency(self):
+        case_id = Cases.query.first().case_id
+        root = datastore_get_root(case_id)
+        self._seed_datastore(case_id, root.path_id, FOLDERS_NB, FILES_NB)
+        logging.info(f'Seeded {FOLDERS_NB} folders and {FILES_NB} files')
+
+        tree = self._measure('Full tree', lambda: ds_list_tree(case_id))
+
+        # Every folder and every file is placed in the tree, whatever the order of their parents
+        self.assertEqual((FOLDERS_NB, FILES_NB), self._count_nodes(tree[f'd-{root.path_id}']))
+
+        first_page = self._measure('Root folder, first page',
+                                   lambda: datastore_list_node_children(root, case_id, page=1, per_page=200))
+        self.assertEqual(200, len(first_page['children']))
+
+        last_page_number = (first_page['total'] + 199) // 200
+        last_page = self._measure('Root folder, last page',
+                                  lambda: datastore_list_node_children(root, case_id, page=last_page_number,
+                                                                       per_page=200))
+        self.assertFalse(last_page['has_next'])
@@ -0,0 +1,118 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+import hashlib
+import io
+import logging
+import os
+import statistics
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from app import app
+from app.datamgmt.datastore.datastore_upload import append_upload_chunk
+from app.datamgmt.datastore.datastore_upload import complete_upload
+from app.datamgmt.datastore.datastore_upload import create_upload
+from app.datamgmt.datastore.datastore_upload import get_upload
+from app.datamgmt.datastore.datastore_upload import store_file_stream
+
+
+# Size of the uploaded file, in MB. Lower it for a quicker run
+FILE_SIZE_MB = int(os.environ.get('IRIS_BENCHMARK_UPLOAD_SIZE_MB', 512))
+RUNS_NB = 3
+
+
+class TestDatastoreUpload(TestCase):
+    """
+    Benchmark the throughput of the datastore uploads, in a single request and in chunks
+    """
+
+    def setUp(self) -> None:
+        logging.info('SetUp called')
+        self._datastore_path = app.config['DATASTORE_PATH']
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        app.config['DATASTORE_PATH'] = self._tmp_dir.name
+
+        self._source = Path(self._tmp_dir.name) / 'source.bin'
+        file_hash = hashlib.sha256()
+        with open(self._source, 'wb') as fout:
+            for _ in range(FILE_SIZE_MB):
+                data = os.urandom(1024 * 1024)
+                file_hash.update(data)
+                fout.write(data)
+
+        self._source_hash = file_hash.hexdigest().upper()
+        self._location = Path(self._tmp_dir.name) / 'case-1'
+        self._location.mkdir()
+
+    def tearDown(self) -> None:
+        logging.info('Teardown called')
+        app.config['DATASTORE_PATH'] = self._datastore_path
+        self._tmp_dir.cleanup()
+
+    def _measure(self, name, fn):
+        durations = []
+        for run in range(RUNS_NB):
+            location = self._location / f'dsf-{name.replace(" ", "-")}-{run}'
+            start_time = time.perf_counter()
+            file_path, file_size, file_hash = fn(location)
+            durations.append(time.perf_counter() - start_time)
+
+            self.assertEqual(FILE_SIZE_MB * 1024 * 1024, file_size)
+            self.assertEqual(self._source_hash, file_hash)
+            os.unlink(file_path)
+
+        logging.info(f'{name}: median {FILE_SIZE_MB / statistics.median(durations):.1f}MB/s, '
+                     f'min {FILE_SIZE_MB / max(durations):.1f}MB/s')
+
+    def _store_plain(self, location):
+        with open(self._source, 'rb') as stream:
+            return store_file_stream(stream, location, None)
+
+    def _store_encrypted(self, location):
+        with open(self._source, 'rb') as stream:
+            return store_file_stream(stream, location, 'infected')
+
+    def _store_chunked(self, location):
+        upload = create_upload(1, 1, 1, FILE_SIZE_MB * 1024 * 1024, {'file_original_name': 'source.bin'})
+        with open(self._source, 'rb') as stream:
+            while upload['received'] < upload['file_size']:
+                chunk = io.BytesIO(stream.read(upload['chunk_size']))
+                upload['received'] = append_upload_chunk(upload, upload['received'], chunk)
+
+        return complete_upload(get_upload(upload['upload_id'], 1, 1), location, None)
+
+    def test_datastore_upload_throughput(self):
+        logging.info(f'Uploading {FILE_SIZE_MB}MB files')
+
+        self._measure('Single request', self._store_plain)
+        self._measure('Single request, encrypted', self._store_encrypted)
+        self._measure('Chunked', self._store_chunked)
+
+    def test_encrypted_upload_is_named_after_its_hash(self):
+        file_path, _, file_hash = self._store_encrypted(self._location / 'dsf-encrypted')
+
+        with zipfile.ZipFile(file_path) as archive:
+            self.assertEqual([file_hash], archive.namelist())
+            with archive.open(file_hash, pwd=b'infected') as fin:
+                self.assertEqual(self._source_hash, hashlib.sha256(fin.read()).hexdigest().upper())
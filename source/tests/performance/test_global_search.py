@@ -0,0 +1,177 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+import logging
+import os
+import statistics
+import time
+from sqlalchemy import text
+
+from app import db
+from app.datamgmt.search.search_db import search_comments
+from app.datamgmt.search.search_db import search_events
+from app.datamgmt.search.search_db import search_iocs
+from app.datamgmt.search.search_db import search_notes
+from app.models import IocType
+from app.models import Tlp
+from app.models.authorization import CaseAccessLevel
+from app.models.authorization import User
+from app.models.cases import Cases
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+# Number of notes, comments, events and IOCs seeded by the benchmark. Lower it for a quicker run
+DOCUMENTS_NB = int(os.environ.get('IRIS_BENCHMARK_SEARCH_DOCUMENTS_NB', 200000))
+CASES_NB = 2000
+RUNS_NB = 20
+
+# The trigram index is created by the migrations, which do not run again after the tables are recreated
+_TRIGRAM_INDEXES = {
+    'ix_ioc_value_trgm': ('ioc', 'ioc_value'),
+    'ix_notes_content_trgm': ('notes', 'note_content'),
+    'ix_comments_text_trgm': ('comments', 'comment_text')
+}
+
+
+class TestGlobalSearch(TestCase):
+    """
+    Benchmark the global search on a synthetic corpus, the user having access to half of the cases,
+    and report the p50 and p95 latencies of the first page
+    """
+
+    def setUp(self) -> None:
+        logging.info('SetUp called')
+        clean_db()
+        run_post_init()
+
+    def tearDown(self) -> None:
+        logging.info('Teardown called')
+        clean_db()
+
+    @staticmethod
+    def _seed_corpus(documents_nb: int):
+        case = Cases.query.first()
+        user_id = User.query.order_by(User.id).first().id
+
+        db.session.execute(text(
+            "INSERT INTO cases (name, description, soc_id, client_id, user_id, owner_id, open_date, "
+            "classification_id, state_id) "
+            "SELECT 'Bench ' || i, '', '', :client_id, :user_id, :user_id, now(), :classification_id, :state_id "
+            "FROM generate_series(1, :nb) AS i"
+        ), {'nb': CASES_NB, 'client_id': case.client_id, 'user_id': case.user_id,
+            'classification_id': case.classification_id, 'state_id': case.state_id})
+
+        cases = [row.case_id for row in Cases.query.with_entities(Cases.case_id).order_by(Cases.case_id).all()]
+
+        # The user is granted every other case
+        db.session.execute(text(
+            "INSERT INTO user_case_effective_access (user_id, case_id, access_level) "
+            "SELECT :user_id, case_id, CASE WHEN case_id % 2 = 0 THEN :granted ELSE :denied END "
+            "FROM cases WHERE case_id <> ALL(:existing) "
+        ), {'user_id': user_id, 'granted': CaseAccessLevel.full_access.value,
+            'denied': CaseAccessLevel.deny_all.value, 'existing': [case.case_id]})
+
+        # Generated server side, the text mixing a few frequent words with rare ones
+        db.session.execute(text("""
+            INSERT INTO notes (note_title, note_content, note_user, note_creationdate, note_lastupdate, note_case_id)
+            SELECT 'Note ' || md5(i::text), 'Lateral movement observed from host_' || (i % 5000) || ' '
+                   || repeat(md5((i * 3)::text) || ' ', 50), :user_id, now(), now(),
+                   (:cases)[1 + i % array_length(:cases, 1)]
+            FROM generate_series(1, :nb) AS i
+        """), {'user_id': user_id, 'cases': cases, 'nb': documents_nb})
+
+        db.session.execute(text("""
+            INSERT INTO comments (comment_text, comment_date, comment_update_date, comment_user_id, comment_case_id)
+            SELECT 'Checked with the owner of host_' || (i % 5000) || ' ' || md5(i::text), now(), now(), :user_id,
+                   (:cases)[1 + i % array_length(:cases, 1)]
+            FROM generate_series(1, :nb) AS i
+        """), {'user_id': user_id, 'cases': cases, 'nb': documents_nb})
+
+        db.session.execute(text("""
+            INSERT INTO cases_events (case_id, event_title, event_content, event_tags, event_date, event_added,
+                                      event_date_wtz, user_id)
+            SELECT (:cases)[1 + i % array_length(:cases, 1)], 'Logon on host_' || (i % 5000),
+                   'Event ' || md5(i::text), 'tag_' || (i % 200), now(), now(), now(), :user_id
+            FROM generate_series(1, :nb) AS i
+        """), {'user_id': user_id, 'cases': cases, 'nb': documents_nb})
+
+        db.session.execute(text("""
+            INSERT INTO ioc (ioc_value, ioc_type_id, ioc_description, user_id, ioc_tlp_id)
+            SELECT 'evil-' || md5(i::text) || '.com', :ioc_type_id, '', :user_id, :tlp_id
+            FROM generate_series(1, :nb) AS i
+        """), {'user_id': user_id, 'nb': documents_nb, 'ioc_type_id': IocType.query.first().type_id,
+               'tlp_id': Tlp.query.first().tlp_id})
+
+        db.session.execute(text("""
+            INSERT INTO ioc_link (ioc_id, case_id)
+            SELECT ioc_id, (:cases)[1 + ioc_id % array_length(:cases, 1)] FROM ioc
+        """), {'cases': cases})
+
+        db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        for index_name, (table_name, column) in _TRIGRAM_INDEXES.items():
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} '
+                                    f'USING gin ({column} gin_trgm_ops)'))
+
+        db.session.commit()
+        for table_name in ['notes', 'comments', 'cases_events', 'ioc', 'ioc_link', 'user_case_effective_access']:
+            db.session.execute(text(f'ANALYZE {table_name}'))
+        db.session.commit()
+
+        return user_id
+
+    @staticmethod
+    def _measure(name, fn):
+        durations = []
+        for _ in range(RUNS_NB):
+            start_time = time.perf_counter()
+            fn()
+            durations.append((time.perf_counter() - start_time) * 1000)
+            db.session.rollback()
+
+        quantiles = statistics.quantiles(durations, n=100)
+        logging.info(f'{name}: p50 {quantiles[49]:.1f}ms, p95 {quantiles[94]:.1f}ms')
+
+        return quantiles[49], quantiles[94]
+
+    def test_global_search_latency(self):
+        user_id = self._seed_corpus(DOCUMENTS_NB)
+        logging.info(f'Seeded {DOCUMENTS_NB} documents of each kind over {CASES_NB} cases')
+
+        notes = search_notes(user_id, 'lateral movement', 1, 100)
+        self.assertEqual(100, len(notes['results']))
+        self.assertTrue(notes['has_next'])
+        # Only the granted cases are returned
+        self.assertTrue(all(note['case_id'] % 2 == 0 for note in notes['results']))
+
+        benchmarks = {
+            'Notes, frequent words': lambda: search_notes(user_id, 'lateral movement', 1, 100),
+            'Notes, rare word': lambda: search_notes(user_id, 'host_42', 1, 100),
+            'Notes, deep page': lambda: search_notes(user_id, 'lateral movement', 50, 100),
+            'Notes, substring': lambda: search_notes(user_id, '%c4ca4238%', 1, 100),
+            'Comments': lambda: search_comments(user_id, 'owner host_42', 1, 100),
+            'Comments, substring': lambda: search_comments(user_id, '%c4ca42%', 1, 100),
+            'Events': lambda: search_events(user_id, 'logon host_42', 1, 100),
+            'IOCs, substring': lambda: search_iocs(user_id, '%-c4ca%', 1, 100)
+        }
+
+        for name, fn in benchmarks.items():
+            self._measure(name, fn)
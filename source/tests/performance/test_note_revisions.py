@@ -0,0 +1,131 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+import logging
+import os
+import random
+import statistics
+import time
+from datetime import datetime
+from datetime import timedelta
+from sqlalchemy import text
+
+from app import db
+from app.datamgmt.case.case_notes_revisions_db import add_note_revision
+from app.datamgmt.case.case_notes_revisions_db import compact_note_revisions
+from app.datamgmt.case.case_notes_revisions_db import get_note_revision_content
+from app.models import NoteRevisions
+from app.models import Notes
+from app.models.authorization import User
+from app.models.cases import Cases
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+# Number of saves of the benchmark note. Lower it for a quicker run
+SAVES_NB = int(os.environ.get('IRIS_BENCHMARK_NOTE_SAVES_NB', 2000))
+SNAPSHOT_INTERVAL = 20
+READS_NB = 200
+
+
+class TestNoteRevisions(TestCase):
+    """
+    Benchmark the storage of the revisions of a note edited many times, and report their size and the p50 and p95
+    latencies of reading a revision
+    """
+
+    def setUp(self) -> None:
+        logging.info('SetUp called')
+        clean_db()
+        run_post_init()
+
+    def tearDown(self) -> None:
+        logging.info('Teardown called')
+        clean_db()
+
+    @staticmethod
+    def _save_revisions(saves_nb: int):
+        case = Cases.query.first()
+        user_id = User.query.order_by(User.id).first().id
+
+        note = Notes(note_title='Benchmark note', note_content='', note_case_id=case.case_id, note_user=user_id,
+                     note_creationdate=datetime.utcnow(), note_lastupdate=datetime.utcnow())
+        db.session.add(note)
+        db.session.commit()
+
+        # A note growing by small edits, as saved by collaborative editing
+        lines = [f'Line {i} of the investigation notes, with some details about host_{i}\n' for i in range(300)]
+        contents = {}
+        start_time = time.perf_counter()
+        for revision_number in range(1, saves_nb + 1):
+            lines[random.randrange(len(lines))] = f'Edited in revision {revision_number}\n'
+            if revision_number % 10 == 0:
+                lines.append(f'Finding of revision {revision_number}\n')
+
+            contents[revision_number] = ''.join(lines)
+            add_note_revision(note.note_id, revision_number, note.note_title, contents[revision_number], user_id,
+                              snapshot_interval=SNAPSHOT_INTERVAL)
+            db.session.commit()
+
+        logging.info(f'Saved {saves_nb} revisions in {time.perf_counter() - start_time:.1f}s')
+
+        return note, contents
+
+    def test_note_revisions_size_and_latency(self):
+        note, contents = self._save_revisions(SAVES_NB)
+
+        stored_size = db.session.execute(text(
+            "SELECT sum(coalesce(octet_length(note_content), 0) + coalesce(octet_length(note_content_delta), 0)) "
+            "FROM note_revisions WHERE note_id = :note_id"
+        ), {'note_id': note.note_id}).scalar()
+        full_copies_size = sum(len(content.encode()) for content in contents.values())
+        logging.info(f'Revisions size: {stored_size} bytes, {full_copies_size} bytes as full copies')
+
+        self.assertLess(stored_size, full_copies_size / 4)
+
+        durations = []
+        for revision_number in random.sample(list(contents), min(READS_NB, len(contents))):
+            start_time = time.perf_counter()
+            revision = NoteRevisions.query.filter(
+                NoteRevisions.note_id == note.note_id,
+                NoteRevisions.revision_number == revision_number
+            ).first()
+            content = get_note_revision_content(revision)
+            durations.append((time.perf_counter() - start_time) * 1000)
+
+            self.assertEqual(contents[revision_number], content)
+
+        quantiles = statistics.quantiles(durations, n=100)
+        logging.info(f'Revision read: p50 {quantiles[49]:.1f}ms, p95 {quantiles[94]:.1f}ms')
+
+        # Spread the revisions over the past days, then thin them
+        db.session.execute(text(
+            "UPDATE note_revisions SET revision_timestamp = now() - ((:saves_nb - revision_number) || ' hours')::interval "
+            "WHERE note_id = :note_id"
+        ), {'saves_nb': SAVES_NB, 'note_id': note.note_id})
+        db.session.commit()
+
+        start_time = time.perf_counter()
+        deleted = compact_note_revisions(datetime.utcnow() - timedelta(days=30), snapshot_interval=SNAPSHOT_INTERVAL)
+        logging.info(f'Compaction deleted {deleted} revisions in {time.perf_counter() - start_time:.1f}s')
+
+        for revision in NoteRevisions.query.filter(NoteRevisions.note_id == note.note_id).all():
+            self.assertEqual(contents[revision.revision_number], get_note_revision_content(revision))
@@ -0,0 +1,167 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+
+from unittest import TestCase
+
+import logging
+import time
+from datetime import datetime
+from flask_login import login_user
+from sqlalchemy import event
+
+from app import app
+from app import db
+from app.datamgmt.reporter.report_db import export_case_assets_json
+from app.datamgmt.reporter.report_db import export_case_notes_json
+from app.datamgmt.reporter.report_db import export_case_tasks_json
+from app.datamgmt.reporter.report_db import export_case_tm_json
+from app.models import AnalysisStatus
+from app.models import AssetsType
+from app.models import CaseAssets
+from app.models import CaseEventsAssets
+from app.models import CaseEventsIoc
+from app.models import CaseTasks
+from app.models import Cases
+from app.models import CasesEvent
+from app.models import Comments
+from app.models import Ioc
+from app.models import IocAssetLink
+from app.models import IocLink
+from app.models import IocType
+from app.models import Notes
+from app.models import NotesComments
+from app.models import TaskAssignee
+from app.models import TaskStatus
+from app.models import Tlp
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestReportExport(TestCase):
+    """
+    Ensure the report export issues the same number of queries whatever the size of the case
+    """
+
+    def setUp(self) -> None:
+        logging.info('SetUp called')
+        clean_db()
+        run_post_init()
+
+    def tearDown(self) -> None:
+        logging.info('Teardown called')
+        clean_db()
+
+    @staticmethod
+    def _seed_case(items_nb: int):
+        user = User.query.order_by(User.id).first()
+        template = Cases.query.first()
+        now = datetime.utcnow()
+
+        with app.test_request_context():
+            login_user(user)
+            case = Cases(name=f'Report export {items_nb}', description='', soc_id='', user=user,
+                         client_id=template.client_id, classification_id=template.classification_id,
+                         state_id=template.state_id)
+            case.save()
+
+        asset_type = AssetsType.query.first()
+        analysis_status = AnalysisStatus.query.first()
+        ioc_type = IocType.query.first()
+        tlp = Tlp.query.first()
+        task_status = TaskStatus.query.first()
+
+        for i in range(items_nb):
+            asset = CaseAssets(asset_name=f'asset_{i}', asset_description='', asset_type_id=asset_type.asset_id,
+                               analysis_status_id=analysis_status.id, case_id=case.case_id, user_id=user.id,
+                               date_added=now)
+            ioc = Ioc(ioc_value=f'ioc_{i}', ioc_description='', ioc_type_id=ioc_type.type_id, ioc_tlp_id=tlp.tlp_id,
+                      user_id=user.id)
+            event_ = CasesEvent(case_id=case.case_id, user_id=user.id, event_title=f'Event {i}', event_content='',
+                                event_raw='', event_tags='', event_color='', event_date=now, event_date_wtz=now,
+                                event_tz='+00:00', event_added=now)
+            task = CaseTasks(task_title=f'Task {i}', task_description='', task_case_id=case.case_id,
+                             task_status_id=task_status.id, task_userid_open=user.id, task_open_date=now)
+            note = Notes(note_title=f'Note {i}', note_content='', note_case_id=case.case_id, note_user=user.id,
+                         note_creationdate=now, note_lastupdate=now)
+            comment = Comments(comment_text=f'Comment {i}', comment_case_id=case.case_id, comment_user_id=user.id,
+                               comment_date=now)
+            db.session.add_all([asset, ioc, event_, task, note, comment])
+            db.session.flush()
+
+            db.session.add_all([
+                IocLink(ioc_id=ioc.ioc_id, case_id=case.case_id),
+                IocAssetLink(ioc_id=ioc.ioc_id, asset_id=asset.asset_id),
+                CaseEventsAssets(event_id=event_.event_id, asset_id=asset.asset_id, case_id=case.case_id),
+                CaseEventsIoc(event_id=event_.event_id, ioc_id=ioc.ioc_id, case_id=case.case_id),
+                TaskAssignee(task_id=task.id, user_id=user.id),
+                NotesComments(comment_id=comment.comment_id, comment_note_id=note.note_id)
+            ])
+
+        db.session.commit()
+        return case.case_id
+
+    @staticmethod
+    def _export(case_id):
+        queries = []
+
+        def _count_query(*args, **kwargs):
+            queries.append(1)
+
+        db.session.expunge_all()
+        event.listen(db.engine, 'before_cursor_execute', _count_query)
+        start_time = time.perf_counter()
+        try:
+            export = {
+                'timeline': export_case_tm_json(case_id),
+                'assets': export_case_assets_json(case_id),
+                'tasks': export_case_tasks_json(case_id),
+                'notes': export_case_notes_json(case_id)
+            }
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _count_query)
+
+        return export, len(queries), time.perf_counter() - start_time
+
+    def test_report_export_query_count_should_not_depend_on_case_size(self):
+        small_case = self._seed_case(10)
+        large_case = self._seed_case(500)
+
+        small_export, small_queries, small_time = self._export(small_case)
+        large_export, large_queries, large_time = self._export(large_case)
+
+        logging.info(f'Small case export: {small_queries} queries in {small_time:.3f}s')
+        logging.info(f'Large case export: {large_queries} queries in {large_time:.3f}s')
+
+        self.assertEqual(500, len(large_export['timeline']))
+        for event_ in large_export['timeline']:
+            self.assertEqual(1, len(event_['assets']))
+            self.assertEqual(1, len(event_['iocs']))
+
+        for asset in large_export['assets']:
+            self.assertEqual(1, len(asset['asset_ioc']))
+
+        for task in large_export['tasks']:
+            self.assertEqual(1, len(task['task_assignees']))
+
+        for note in large_export['notes']:
+            self.assertEqual(1, len(note['comments']))
+
+        self.assertEqual(small_queries, large_queries)
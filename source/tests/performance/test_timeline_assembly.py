@@ -0,0 +1,109 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+import logging
+import random
+import time
+from collections import namedtuple
+from datetime import datetime
+from datetime import timedelta
+
+from app.datamgmt.case.case_events_db import build_filtered_timeline
+
+_EventRow = namedtuple('_EventRow', [
+    'event_id', 'event_uuid', 'event_date', 'event_date_wtz', 'event_tz', 'event_title', 'event_color',
+    'event_tags', 'event_content', 'event_in_summary', 'event_in_graph', 'event_is_flagged', 'parent_event_id',
+    'user', 'event_added', 'category_name'
+])
+_AssetLinkRow = namedtuple('_AssetLinkRow', [
+    'event_id', 'asset_id', 'asset_name', 'type', 'asset_ip', 'asset_description', 'asset_compromise_status_id'
+])
+_IocLinkRow = namedtuple('_IocLinkRow', ['event_id', 'ioc_id', 'ioc_value', 'ioc_description'])
+
+
+class TestTimelineAssembly(TestCase):
+
+    @staticmethod
+    def _build_synthetic_case(events_nb: int, links_per_event: int = 3):
+        start_date = datetime(2024, 1, 1)
+        assets_nb = max(events_nb // 20, 10)
+        iocs_nb = max(events_nb // 10, 10)
+
+        timeline = []
+        assets_cache = []
+        iocs_cache = []
+        for i in range(events_nb):
+            event_date = start_date + timedelta(seconds=i)
+            timeline.append(_EventRow(
+                i, f'uuid-{i}', event_date, event_date, '+00:00', f'Event {i}', '', '', f'Content {i}',
+                True, True, False, None, 'analyst', event_date, None
+            ))
+
+            for _ in range(links_per_event):
+                asset_id = random.randrange(assets_nb)
+                assets_cache.append(_AssetLinkRow(
+                    i, asset_id, f'asset_{asset_id}', 'Windows - Computer', '', '', 1
+                ))
+
+                ioc_id = random.randrange(iocs_nb)
+                iocs_cache.append(_IocLinkRow(i, ioc_id, f'ioc_{ioc_id}', ''))
+
+        random.shuffle(assets_cache)
+        random.shuffle(iocs_cache)
+
+        return timeline, assets_cache, iocs_cache
+
+    def _time_assembly(self, events_nb: int, **filters):
+        timeline, assets_cache, iocs_cache = self._build_synthetic_case(events_nb)
+
+        start_time = time.perf_counter()
+        tim, _, _ = build_filtered_timeline(timeline, assets_cache, iocs_cache, **filters)
+        elapsed = time.perf_counter() - start_time
+
+        logging.info(f'Assembled {len(tim)}/{events_nb} events in {elapsed:.3f}s')
+        return elapsed
+
+    def test_assembly_should_link_assets_and_iocs_to_their_event(self):
+        timeline, assets_cache, iocs_cache = self._build_synthetic_case(100)
+
+        tim, events_list, _ = build_filtered_timeline(timeline, assets_cache, iocs_cache)
+
+        self.assertEqual(100, len(tim))
+        self.assertEqual([row.event_id for row in timeline], events_list)
+        for event in tim:
+            expected_assets = [a for a in assets_cache if a.event_id == event['event_id']]
+            expected_iocs = [i for i in iocs_cache if i.event_id == event['event_id']]
+            self.assertEqual([f'{a.asset_name} ({a.type})' for a in expected_assets],
+                             [a['name'] for a in event['assets']])
+            self.assertEqual([i.ioc_value for i in expected_iocs], [i['name'] for i in event['iocs']])
+
+    def test_assembly_should_scale_linearly_with_events(self):
+        timings = {events_nb: self._time_assembly(events_nb) for events_nb in (1000, 10000, 100000)}
+
+        # A linear assembly grows ~10x per step, a per-event scan of the links ~100x
+        self.assertLess(timings[100000], timings[10000] * 30)
+        self.assertLess(timings[10000], max(timings[1000], 0.01) * 30)
+
+    def test_filtered_assembly_should_scale_linearly_with_events(self):
+        filters = {'assets': ['asset_1'], 'iocs': ['ioc_1', 'ioc_2']}
+        timings = {events_nb: self._time_assembly(events_nb, **filters) for events_nb in (1000, 10000, 100000)}
+
+        self.assertLess(timings[100000], timings[10000] * 30)
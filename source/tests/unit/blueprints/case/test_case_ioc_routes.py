@@ -0,0 +1,117 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+from sqlalchemy import event
+from sqlalchemy import text
+
+from app import app
+from app import db
+from app.models import Cases
+from app.models import IocType
+from app.models import Tlp
+from app.models.authorization import CaseAccessLevel
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+from tests.test_helper import TestHelper
+
+app.testing = True
+
+
+class TestCaseIocRoutes(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._case = Cases.query.first()
+        self._admin = User.query.order_by(User.id).first()
+
+        # A second case sharing the IOCs, which the administrator can access
+        self._other_case_id = db.session.execute(text(
+            "INSERT INTO cases (name, description, soc_id, client_id, user_id, owner_id, open_date, "
+            "classification_id, state_id) "
+            "VALUES ('Other case', '', '', :client_id, :user_id, :user_id, now(), :classification_id, :state_id) "
+            "RETURNING case_id"
+        ), {'client_id': self._case.client_id, 'user_id': self._admin.id,
+            'classification_id': self._case.classification_id, 'state_id': self._case.state_id}).scalar()
+
+        db.session.execute(text(
+            "INSERT INTO user_case_effective_access (user_id, case_id, access_level) "
+            "VALUES (:user_id, :case_id, :access_level)"
+        ), {'user_id': self._admin.id, 'case_id': self._other_case_id,
+            'access_level': CaseAccessLevel.full_access.value})
+        db.session.commit()
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    def _add_shared_iocs(self, count):
+        db.session.execute(text(
+            "INSERT INTO ioc (ioc_value, ioc_type_id, ioc_tlp_id, user_id) "
+            "SELECT 'shared_ioc_' || i || '_' || :count, :type_id, :tlp_id, :user_id "
+            "FROM generate_series(1, :count) AS i"
+        ), {'count': count, 'type_id': IocType.query.first().type_id, 'tlp_id': Tlp.query.first().tlp_id,
+            'user_id': self._admin.id})
+
+        db.session.execute(text(
+            "INSERT INTO ioc_link (ioc_id, case_id) "
+            "SELECT i.ioc_id, c.case_id FROM ioc i CROSS JOIN (VALUES (:case_id), (:other_case_id)) AS c(case_id) "
+            "WHERE i.ioc_value LIKE 'shared_ioc_%' AND NOT EXISTS ("
+            "    SELECT 1 FROM ioc_link l WHERE l.ioc_id = i.ioc_id AND l.case_id = c.case_id)"
+        ), {'case_id': self._case.case_id, 'other_case_id': self._other_case_id})
+        db.session.commit()
+
+    def _list_iocs(self, test_app):
+        statements = []
+
+        def _count_statement(*args, **kwargs):
+            statements.append(args[2])
+
+        event.listen(db.engine, 'before_cursor_execute', _count_statement)
+        try:
+            result = test_app.get(f'/case/ioc/list?cid={self._case.case_id}')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _count_statement)
+
+        self.assertEqual(200, result.status_code)
+
+        return result.get_json()['data']['ioc'], len(statements)
+
+    def test_case_list_ioc_query_count_should_not_depend_on_iocs_count(self):
+        with app.test_client() as test_app:
+            TestHelper.log_in(test_app)
+
+            self._add_shared_iocs(5)
+            few_iocs, few_iocs_queries = self._list_iocs(test_app)
+
+            self._add_shared_iocs(200)
+            many_iocs, many_iocs_queries = self._list_iocs(test_app)
+
+        self.assertEqual(5, len(few_iocs))
+        self.assertEqual(205, len(many_iocs))
+        self.assertEqual(few_iocs_queries, many_iocs_queries)
+
+        for ioc in many_iocs:
+            self.assertEqual([{
+                'case_id': self._other_case_id,
+                'case_name': 'Other case',
+                'client_name': self._case.client.name
+            }], ioc['link'])
@@ -0,0 +1,120 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+from sqlalchemy import event
+from sqlalchemy import text
+
+from app import app
+from app import db
+from app.datamgmt.states import update_notes_state
+from app.models import Cases
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+from tests.test_helper import TestHelper
+
+app.testing = True
+
+
+class TestCaseNotesRoutes(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._case = Cases.query.first()
+        self._admin = User.query.order_by(User.id).first()
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    def _add_directories(self, count):
+        # Each directory holds two notes and a subdirectory holding one note
+        for i in range(count):
+            directory_id = db.session.execute(text(
+                "INSERT INTO note_directory (name, case_id) VALUES (:name, :case_id) RETURNING id"
+            ), {'name': f'Directory {i:03}', 'case_id': self._case.case_id}).scalar()
+
+            subdirectory_id = db.session.execute(text(
+                "INSERT INTO note_directory (name, case_id, parent_id) VALUES (:name, :case_id, :parent_id) RETURNING id"
+            ), {'name': f'Subdirectory {i:03}', 'case_id': self._case.case_id, 'parent_id': directory_id}).scalar()
+
+            db.session.execute(text(
+                "INSERT INTO notes (note_title, note_content, note_case_id, note_user, directory_id) "
+                "VALUES ('Second note', '', :case_id, :user_id, :directory_id), "
+                "       ('First note', '', :case_id, :user_id, :directory_id), "
+                "       ('Nested note', '', :case_id, :user_id, :subdirectory_id)"
+            ), {'case_id': self._case.case_id, 'user_id': self._admin.id, 'directory_id': directory_id,
+                'subdirectory_id': subdirectory_id})
+
+        update_notes_state(caseid=self._case.case_id, userid=self._admin.id)
+        db.session.commit()
+
+    def _get_directories(self, test_app, headers=None):
+        statements = []
+
+        def _count_statement(*args, **kwargs):
+            statements.append(args[2])
+
+        event.listen(db.engine, 'before_cursor_execute', _count_statement)
+        try:
+            result = test_app.get(f'/case/notes/directories/filter?cid={self._case.case_id}', headers=headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _count_statement)
+
+        return result, len(statements)
+
+    def test_case_filter_notes_directories_query_count_should_not_depend_on_directories_count(self):
+        with app.test_client() as test_app:
+            TestHelper.log_in(test_app)
+
+            self._add_directories(2)
+            few_result, few_directories_queries = self._get_directories(test_app)
+
+            self._add_directories(50)
+            many_result, many_directories_queries = self._get_directories(test_app)
+
+        self.assertEqual(few_directories_queries, many_directories_queries)
+
+        directories = {directory['name']: directory for directory in many_result.get_json()['data']}
+        self.assertEqual(2 * 52, len(directories))
+
+        directory = directories['Directory 001']
+        self.assertEqual(2, directory['note_count'])
+        self.assertEqual(['First note', 'Second note'], [note['title'] for note in directory['notes']])
+        self.assertEqual([directories['Subdirectory 001']['id']],
+                         [subdirectory['id'] for subdirectory in directory['subdirectories']])
+        self.assertEqual(1, directory['subdirectories'][0]['note_count'])
+
+    def test_case_filter_notes_directories_should_return_not_modified_until_notes_change(self):
+        with app.test_client() as test_app:
+            TestHelper.log_in(test_app)
+            self._add_directories(1)
+
+            result, _ = self._get_directories(test_app)
+            etag = result.headers['ETag']
+
+            not_modified, _ = self._get_directories(test_app, headers={'If-None-Match': etag})
+            self.assertEqual(304, not_modified.status_code)
+
+            self._add_directories(1)
+            modified, _ = self._get_directories(test_app, headers={'If-None-Match': etag})
+            self.assertEqual(200, modified.status_code)
+            self.assertNotEqual(etag, modified.headers['ETag'])
@@ -0,0 +1,65 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+import re
+from sqlalchemy import event
+
+from app import app
+from app import db
+from app.models import Cases
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+from tests.test_helper import TestHelper
+
+app.testing = True
+
+
+class TestCaseRoutes(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._case = Cases.query.first()
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    def test_case_meta_should_load_the_case_once(self):
+        with app.test_client() as test_app:
+            TestHelper.log_in(test_app)
+
+            statements = []
+
+            def _record_statement(*args, **kwargs):
+                statements.append(args[2])
+
+            event.listen(db.engine, 'before_cursor_execute', _record_statement)
+            try:
+                result = test_app.get(f'/case/meta?cid={self._case.case_id}')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', _record_statement)
+
+        self.assertEqual(200, result.status_code)
+        self.assertEqual(self._case.case_id, result.get_json()['data']['case_id'])
+
+        # The access checks and the route share the case loaded for the request
+        cases_selects = [statement for statement in statements if re.search(r'\bFROM cases\b', statement)]
+        self.assertEqual(1, len(cases_selects), cases_selects)
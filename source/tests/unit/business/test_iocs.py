@@ -0,0 +1,67 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from unittest import TestCase
+
+from flask_login import login_user
+
+from app import app
+from app.business.iocs import import_csv
+from app.models import Cases
+from app.models import Ioc
+from app.models import IocLink
+from app.models import Tags
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestIocs(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._case_id = Cases.query.first().case_id
+        self._user = User.query.order_by(User.id).first()
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    def _import_csv(self, csv_data):
+        with app.test_request_context():
+            login_user(self._user)
+
+            return import_csv(csv_data, self._case_id)
+
+    def test_import_csv_should_create_the_tags_of_the_file(self):
+        imported, errors = self._import_csv(
+            'ioc_value,ioc_type,ioc_description,ioc_tags,ioc_tlp\n'
+            '10.20.30.40,ip-dst,C2 server,csv_tag_c2|csv_tag_apt,amber\n'
+            '10.20.30.41,ip-dst,Backup C2 server,csv_tag_c2,red\n'
+        )
+
+        self.assertEqual([], errors)
+        self.assertEqual(2, len(imported))
+        self.assertEqual({'csv_tag_c2', 'csv_tag_apt'},
+                         {tag.tag_title for tag in Tags.query.filter(Tags.tag_title.like('csv_tag_%')).all()})
+
+        ioc = Ioc.query.join(IocLink, IocLink.ioc_id == Ioc.ioc_id).filter(
+            IocLink.case_id == self._case_id,
+            Ioc.ioc_value == '10.20.30.40'
+        ).one()
+        self.assertEqual('csv_tag_c2,csv_tag_apt', ioc.ioc_tags)
@@ -0,0 +1,61 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+from app.datamgmt.alerts.alerts_db import compute_alert_fingerprint
+from app.models import CaseAssets
+from app.models import Ioc
+from app.models.alerts import Alert
+
+FINGERPRINT_FIELDS = ['alert_source', 'alert_source_ref', 'alert_title', 'assets', 'iocs']
+
+
+def _build_alert(customer_id=1, title='Suspicious logon', assets=('srv-01', 'WKS-02'), iocs=('10.0.0.1', 'evil.com')):
+    alert = Alert(alert_customer_id=customer_id, alert_title=title, alert_source='EDR', alert_source_ref='rule-42')
+    alert.assets = [CaseAssets(asset_name=asset_name, asset_type_id=1) for asset_name in assets]
+    alert.iocs = [Ioc(ioc_value=ioc_value, ioc_type_id=1) for ioc_value in iocs]
+
+    return alert
+
+
+class TestAlertsDB(TestCase):
+
+    def test_compute_alert_fingerprint_should_ignore_assets_and_iocs_order(self):
+        alert = _build_alert()
+        repeat = _build_alert(assets=('wks-02', 'srv-01'), iocs=('evil.com', '10.0.0.1'))
+
+        self.assertEqual(compute_alert_fingerprint(alert, FINGERPRINT_FIELDS),
+                         compute_alert_fingerprint(repeat, FINGERPRINT_FIELDS))
+
+    def test_compute_alert_fingerprint_should_differ_between_clients(self):
+        alert = _build_alert(customer_id=1)
+        other_client_alert = _build_alert(customer_id=2)
+
+        self.assertNotEqual(compute_alert_fingerprint(alert, FINGERPRINT_FIELDS),
+                            compute_alert_fingerprint(other_client_alert, FINGERPRINT_FIELDS))
+
+    def test_compute_alert_fingerprint_should_only_use_given_fields(self):
+        alert = _build_alert(title='Suspicious logon')
+        retitled_alert = _build_alert(title='Suspicious logon from a new country')
+
+        self.assertNotEqual(compute_alert_fingerprint(alert, FINGERPRINT_FIELDS),
+                            compute_alert_fingerprint(retitled_alert, FINGERPRINT_FIELDS))
+        self.assertEqual(compute_alert_fingerprint(alert, ['alert_source', 'assets']),
+                         compute_alert_fingerprint(retitled_alert, ['alert_source', 'assets']))
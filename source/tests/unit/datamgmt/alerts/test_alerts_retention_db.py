@@ -0,0 +1,36 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+from app.datamgmt.alerts.alerts_retention_db import parse_retention_windows
+
+
+class TestAlertsRetentionDB(TestCase):
+
+    def test_parse_retention_windows_should_return_days_by_client(self):
+        self.assertEqual({1: 90, 4: 365}, parse_retention_windows('1:90, 4:365'))
+
+    def test_parse_retention_windows_should_accept_no_windows(self):
+        self.assertEqual({}, parse_retention_windows(''))
+        self.assertEqual({}, parse_retention_windows(None))
+
+    def test_parse_retention_windows_should_reject_invalid_windows(self):
+        with self.assertRaises(ValueError):
+            parse_retention_windows('1:ninety')
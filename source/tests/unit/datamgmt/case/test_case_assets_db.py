@@ -0,0 +1,84 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from unittest import TestCase
+
+from sqlalchemy import text
+
+from app import db
+from app.datamgmt.case.case_assets_db import get_case_similar_assets
+from app.models import AssetsType
+from app.models import Cases
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestCaseAssetsDB(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._case = Cases.query.first()
+        self._user_id = User.query.order_by(User.id).first().id
+        self._asset_types = [asset_type.asset_id for asset_type in AssetsType.query.order_by(AssetsType.asset_id)
+                             .limit(2).all()]
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    def _add_case(self, name, days_ago):
+        return db.session.execute(text(
+            "INSERT INTO cases (name, description, soc_id, client_id, user_id, owner_id, open_date, "
+            "classification_id, state_id) "
+            "VALUES (:name, '', '', :client_id, :user_id, :user_id, current_date - :days_ago, :classification_id, "
+            ":state_id) RETURNING case_id"
+        ), {'name': name, 'client_id': self._case.client_id, 'user_id': self._user_id, 'days_ago': days_ago,
+            'classification_id': self._case.classification_id, 'state_id': self._case.state_id}).scalar()
+
+    def _add_asset(self, case_id, asset_name, asset_type_id):
+        return db.session.execute(text(
+            "INSERT INTO case_assets (asset_name, asset_type_id, case_id, user_id) "
+            "VALUES (:asset_name, :asset_type_id, :case_id, :user_id) RETURNING asset_id"
+        ), {'asset_name': asset_name, 'asset_type_id': asset_type_id, 'case_id': case_id,
+            'user_id': self._user_id}).scalar()
+
+    def test_get_case_similar_assets_should_link_the_same_name_and_type_in_accessible_cases(self):
+        host_type, account_type = self._asset_types
+        older_case_id = self._add_case('Older case', 10)
+        recent_case_id = self._add_case('Recent case', 1)
+        hidden_case_id = self._add_case('Hidden case', 0)
+
+        self._add_asset(self._case.case_id, 'WKS-001', host_type)
+        self._add_asset(self._case.case_id, 'jdoe', account_type)
+        older_asset_id = self._add_asset(older_case_id, 'WKS-001', host_type)
+        recent_asset_id = self._add_asset(recent_case_id, 'WKS-001', host_type)
+        self._add_asset(recent_case_id, 'WKS-001', account_type)
+        self._add_asset(recent_case_id, 'WKS-002', host_type)
+        self._add_asset(hidden_case_id, 'jdoe', account_type)
+        db.session.commit()
+
+        cases_access = [self._case.case_id, older_case_id, recent_case_id]
+        links = get_case_similar_assets(self._case.case_id, self._case.client_id, cases_access, max_links=100)
+
+        self.assertEqual([('WKS-001', host_type)], list(links))
+        self.assertEqual([recent_asset_id, older_asset_id], [link['asset_id'] for link in links[('WKS-001', host_type)]])
+
+        links = get_case_similar_assets(self._case.case_id, self._case.client_id, cases_access, max_links=1)
+
+        self.assertEqual([recent_asset_id], [link['asset_id'] for link in links[('WKS-001', host_type)]])
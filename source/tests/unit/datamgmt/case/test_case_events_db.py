@@ -0,0 +1,85 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from unittest import TestCase
+
+import csv
+import tempfile
+
+from app import db
+from app.datamgmt.case.case_events_db import TIMELINE_CSV_FIELDS
+from app.datamgmt.case.case_events_db import import_timeline_csv
+from app.models import Cases
+from app.models import CasesEvent
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestCaseEventsDB(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._case_id = Cases.query.first().case_id
+        self._user = User.query.order_by(User.id).first()
+
+        self._csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', newline='')
+        writer = csv.DictWriter(self._csv_file, fieldnames=TIMELINE_CSV_FIELDS)
+        writer.writeheader()
+        for i in range(3):
+            writer.writerow({'event_date': f'2024-01-0{i + 1}T10:00:00.000', 'event_tz': '+00:00',
+                             'event_title': f'Event {i}', 'event_category': '', 'event_content': '',
+                             'event_raw': '', 'event_source': '', 'event_assets': '', 'event_iocs': '',
+                             'event_tags': ''})
+        self._csv_file.flush()
+
+    def tearDown(self) -> None:
+        self._csv_file.close()
+        clean_db()
+
+    def _count_events(self):
+        return CasesEvent.query.filter(CasesEvent.case_id == self._case_id).count()
+
+    def test_import_timeline_csv_should_add_all_the_events(self):
+        saved_batches = []
+
+        success, _, data = import_timeline_csv(self._case_id, self._user, self._csv_file.name, batch_size=2,
+                                               on_batch_saved=saved_batches.append)
+
+        self.assertTrue(success)
+        self.assertEqual(3, data['events_count'])
+        self.assertEqual(3, self._count_events())
+        self.assertEqual([2, 1], [len(events_ids) for events_ids in saved_batches])
+
+    def test_import_timeline_csv_failing_on_a_later_batch_should_add_no_event(self):
+        loaded_batches = []
+
+        def _fail_on_second_batch(events_data):
+            loaded_batches.append(events_data)
+            if len(loaded_batches) == 2:
+                raise ValueError('Module hook failure')
+
+            return events_data
+
+        with self.assertRaises(ValueError):
+            import_timeline_csv(self._case_id, self._user, self._csv_file.name, batch_size=1,
+                                on_batch_loaded=_fail_on_second_batch)
+        db.session.rollback()
+
+        self.assertEqual(0, self._count_events())
@@ -0,0 +1,85 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from unittest import TestCase
+
+from datetime import datetime
+
+from app import db
+from app.datamgmt.case.case_notes_revisions_db import add_note_revision
+from app.datamgmt.case.case_notes_revisions_db import delete_note_revision
+from app.datamgmt.case.case_notes_revisions_db import get_note_revision_content
+from app.models import Cases
+from app.models import NoteRevisions
+from app.models import Notes
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+_SNAPSHOT_INTERVAL = 20
+
+
+class TestCaseNotesRevisionsDB(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._user_id = User.query.order_by(User.id).first().id
+        self._note = Notes(note_title='Note', note_content='', note_case_id=Cases.query.first().case_id,
+                           note_user=self._user_id, note_creationdate=datetime.utcnow(),
+                           note_lastupdate=datetime.utcnow())
+        db.session.add(self._note)
+        db.session.commit()
+
+        self._lines = [f'Line {i} of the note\n' for i in range(50)]
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    def _add_revision(self, revision_number, content):
+        revision = add_note_revision(self._note.note_id, revision_number, self._note.note_title, content,
+                                     self._user_id, snapshot_interval=_SNAPSHOT_INTERVAL)
+        db.session.commit()
+
+        return revision
+
+    def test_revisions_with_the_same_number_should_be_rebuilt_from_their_own_snapshot(self):
+        first_content = ''.join(self._lines)
+        # Two concurrent saves of the first revision, with unrelated contents
+        self._add_revision(1, 'Unrelated content of the concurrent save\n' * 50)
+        snapshot = self._add_revision(1, first_content)
+        second_content = first_content + 'Finding\n'
+        revision = self._add_revision(2, second_content)
+
+        self.assertEqual(snapshot.revision_id, revision.snapshot_revision_id)
+        self.assertEqual(second_content, get_note_revision_content(revision))
+
+    def test_deleted_snapshot_should_keep_the_content_of_its_dependents(self):
+        contents = {1: ''.join(self._lines)}
+        snapshot = self._add_revision(1, contents[1])
+        for revision_number in range(2, 5):
+            contents[revision_number] = contents[revision_number - 1] + f'Finding {revision_number}\n'
+            self._add_revision(revision_number, contents[revision_number])
+
+        delete_note_revision(snapshot, snapshot_interval=_SNAPSHOT_INTERVAL)
+        db.session.commit()
+
+        revisions = NoteRevisions.query.filter(NoteRevisions.note_id == self._note.note_id).all()
+        self.assertEqual([2, 3, 4], sorted(revision.revision_number for revision in revisions))
+        for revision in revisions:
+            self.assertEqual(contents[revision.revision_number], get_note_revision_content(revision))
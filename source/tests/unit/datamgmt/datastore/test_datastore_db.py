@@ -0,0 +1,105 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+from sqlalchemy import text
+
+from app import db
+from app.datamgmt.datastore.datastore_db import datastore_get_root
+from app.datamgmt.datastore.datastore_db import datastore_list_node_children
+from app.datamgmt.datastore.datastore_db import ds_list_tree
+from app.models import Cases
+from app.models import DataStorePath
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestDatastoreDB(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._case_id = Cases.query.first().case_id
+        self._user_id = User.query.order_by(User.id).first().id
+        self._root = datastore_get_root(self._case_id)
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    def _add_folder(self, name, parent_id):
+        folder_id = db.session.execute(text(
+            "INSERT INTO data_store_path (path_name, path_parent_id, path_is_root, path_case_id) "
+            "VALUES (:name, :parent_id, false, :case_id) RETURNING path_id"
+        ), {'name': name, 'parent_id': parent_id, 'case_id': self._case_id}).scalar()
+        db.session.commit()
+
+        return folder_id
+
+    def _add_file(self, name, parent_id):
+        db.session.execute(text(
+            "INSERT INTO data_store_file (file_original_name, file_local_name, file_parent_id, added_by_user_id, "
+            "file_case_id) VALUES (:name, :name, :parent_id, :user_id, :case_id)"
+        ), {'name': name, 'parent_id': parent_id, 'user_id': self._user_id, 'case_id': self._case_id})
+        db.session.commit()
+
+    def _move_folder(self, folder_id, parent_id):
+        db.session.execute(text("UPDATE data_store_path SET path_parent_id = :parent_id WHERE path_id = :path_id"),
+                           {'parent_id': parent_id, 'path_id': folder_id})
+        db.session.commit()
+
+    def test_ds_list_tree_should_place_folders_whose_parent_is_listed_later(self):
+        # The parent is created after its child, then the child is moved into it
+        child_id = self._add_folder('Child', self._root.path_id)
+        parent_id = self._add_folder('Parent', self._root.path_id)
+        grand_parent_id = self._add_folder('Grand parent', self._root.path_id)
+        self._move_folder(child_id, parent_id)
+        self._move_folder(parent_id, grand_parent_id)
+        self._add_file('evidence.zip', child_id)
+
+        tree = ds_list_tree(self._case_id)
+
+        root_children = tree[f'd-{self._root.path_id}']['children']
+        self.assertEqual([f'd-{grand_parent_id}'], [key for key in root_children if key.startswith('d-')])
+
+        child = root_children[f'd-{grand_parent_id}']['children'][f'd-{parent_id}']['children'][f'd-{child_id}']
+        self.assertEqual('Child', child['name'])
+        self.assertEqual(['evidence.zip'], [node['file_original_name'] for node in child['children'].values()])
+
+    def test_datastore_list_node_children_should_page_folders_then_files(self):
+        folder_id = self._add_folder('Folder', self._root.path_id)
+        self._add_folder('Subfolder B', folder_id)
+        self._add_folder('Subfolder A', folder_id)
+        for i in range(3):
+            self._add_file(f'file_{i}.txt', folder_id)
+
+        folder = db.session.get(DataStorePath, folder_id)
+        first_page = datastore_list_node_children(folder, self._case_id, page=1, per_page=4)
+        second_page = datastore_list_node_children(folder, self._case_id, page=2, per_page=4)
+
+        self.assertEqual(['Subfolder A', 'Subfolder B', 'file_0.txt', 'file_1.txt'],
+                         [node.get('name') or node.get('file_original_name')
+                          for node in first_page['children'].values()])
+        self.assertEqual(5, first_page['total'])
+        self.assertTrue(first_page['has_next'])
+        self.assertFalse(first_page['children'][next(iter(first_page['children']))]['has_children'])
+
+        self.assertEqual(['file_2.txt'], [node['file_original_name'] for node in second_page['children'].values()])
+        self.assertFalse(second_page['has_next'])
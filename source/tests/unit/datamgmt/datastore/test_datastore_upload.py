@@ -0,0 +1,113 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from unittest import TestCase
+
+import fcntl
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+from app import app
+from app.datamgmt.datastore import datastore_upload
+from app.datamgmt.datastore.datastore_upload import UploadChunkError
+from app.datamgmt.datastore.datastore_upload import append_upload_chunk
+from app.datamgmt.datastore.datastore_upload import complete_upload
+from app.datamgmt.datastore.datastore_upload import create_upload
+from app.datamgmt.datastore.datastore_upload import get_upload
+
+
+class TestDatastoreUpload(TestCase):
+    def setUp(self) -> None:
+        self._config = {key: app.config[key] for key in ('DATASTORE_PATH', 'DATASTORE_UPLOAD_CHUNK_SIZE')}
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        app.config['DATASTORE_PATH'] = self._tmp_dir.name
+        app.config['DATASTORE_UPLOAD_CHUNK_SIZE'] = 1000
+
+        self._data = os.urandom(2500)
+        self._location = Path(self._tmp_dir.name) / 'case-1'
+        self._location.mkdir()
+
+        self._upload = create_upload(1, 1, 1, len(self._data), {'file_original_name': 'file.bin'})
+        self._part_file = Path(self._tmp_dir.name) / 'uploads' / f'{self._upload["upload_id"]}.part'
+
+    def tearDown(self) -> None:
+        app.config.update(self._config)
+        self._tmp_dir.cleanup()
+
+    def _append(self, offset, end):
+        return append_upload_chunk(get_upload(self._upload['upload_id'], 1, 1), offset,
+                                   io.BytesIO(self._data[offset:end]))
+
+    def test_chunk_sent_twice_should_be_appended_once(self):
+        self._append(0, 1000)
+
+        with self.assertRaises(UploadChunkError) as error:
+            self._append(0, 1000)
+
+        self.assertEqual(1000, error.exception.received)
+        self.assertEqual(1000, self._part_file.stat().st_size)
+
+    def test_chunk_should_be_refused_while_another_is_received(self):
+        with open(self._part_file, 'r+b') as fd:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            with self.assertRaises(UploadChunkError):
+                self._append(0, 1000)
+
+        self.assertEqual(0, self._part_file.stat().st_size)
+
+    def test_chunk_past_the_file_size_should_be_refused(self):
+        self._append(0, 1000)
+        self._append(1000, 2000)
+
+        with self.assertRaises(UploadChunkError):
+            append_upload_chunk(get_upload(self._upload['upload_id'], 1, 1), 2000,
+                                io.BytesIO(self._data[2000:] + b'extra'))
+
+        self.assertEqual(2000, self._part_file.stat().st_size)
+
+    def test_complete_upload_should_match_the_uploaded_file(self):
+        self._append(0, 1000)
+        with self.assertRaises(UploadChunkError):
+            self._append(1000, 2001)
+
+        with self.assertRaises(UploadChunkError):
+            complete_upload(get_upload(self._upload['upload_id'], 1, 1), self._location / 'dsf', None)
+
+        self._append(1000, 2000)
+        self._append(2000, 2500)
+
+        file_path, file_size, file_hash = complete_upload(get_upload(self._upload['upload_id'], 1, 1),
+                                                          self._location / 'dsf', None)
+
+        self.assertEqual(len(self._data), file_size)
+        self.assertEqual(hashlib.sha256(self._data).hexdigest().upper(), file_hash)
+        with open(file_path, 'rb') as fin:
+            self.assertEqual(self._data, fin.read())
+
+    def test_hash_should_be_evicted_when_the_upload_is_removed_by_another_worker(self):
+        self._append(0, 1000)
+        self.assertIn(self._upload['upload_id'], datastore_upload._uploads_hashes)
+
+        self._part_file.with_suffix('.json').unlink()
+        get_upload(self._upload['upload_id'], 1, 1)
+
+        self.assertNotIn(self._upload['upload_id'], datastore_upload._uploads_hashes)
@@ -0,0 +1,52 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from unittest import TestCase
+
+from app import db
+from app.datamgmt.manage.manage_tags_db import add_db_tags
+from app.models import Tags
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestManageTagsDB(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    def _get_tags_titles(self):
+        return {tag.tag_title for tag in Tags.query.filter(Tags.tag_title.like('bulk_tag_%')).all()}
+
+    def test_add_db_tags_should_skip_the_existing_tags(self):
+        self.assertEqual(2, add_db_tags(['bulk_tag_1', 'bulk_tag_2', '']))
+        db.session.commit()
+
+        self.assertEqual(1, add_db_tags(['bulk_tag_2', 'bulk_tag_3']))
+        db.session.commit()
+
+        self.assertEqual({'bulk_tag_1', 'bulk_tag_2', 'bulk_tag_3'}, self._get_tags_titles())
+
+    def test_add_db_tags_should_be_rolled_back_with_the_caller_transaction(self):
+        add_db_tags(['bulk_tag_1'])
+        db.session.rollback()
+
+        self.assertEqual(set(), self._get_tags_titles())
@@ -0,0 +1,88 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from unittest import TestCase
+
+from sqlalchemy import text
+
+from app import db
+from app.datamgmt.search.search_db import search_comments
+from app.datamgmt.search.search_db import search_notes
+from app.models import Cases
+from app.models.authorization import User
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestSearchDB(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._case_id = Cases.query.first().case_id
+        self._user_id = User.query.order_by(User.id).first().id
+
+        db.session.execute(text(
+            "INSERT INTO notes (note_title, note_content, note_user, note_creationdate, note_lastupdate, "
+            "note_case_id) VALUES ('Beaconing', 'Host beaconing to 10.20.30.40 and c2.evil-domain.com, payload "
+            "sha256 9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08', :user_id, now(), now(), "
+            ":case_id)"
+        ), {'user_id': self._user_id, 'case_id': self._case_id})
+
+        db.session.execute(text(
+            "INSERT INTO comments (comment_text, comment_date, comment_update_date, comment_user_id, "
+            "comment_case_id) VALUES ('Same payload 9f86d081884c7d659a2feaa0c55ad015 seen on 10.20.30.41', now(), "
+            "now(), :user_id, :case_id)"
+        ), {'user_id': self._user_id, 'case_id': self._case_id})
+
+        db.session.commit()
+
+    def tearDown(self) -> None:
+        clean_db()
+
+    def test_search_notes_with_wildcard_should_match_inside_words(self):
+        for search_value in ['%884c7d65%', '10.20.30.%', '%evil-dom%']:
+            with self.subTest(search_value=search_value):
+                results = search_notes(self._user_id, search_value, 1, 100)['results']
+
+                self.assertEqual(['Beaconing'], [result['note_title'] for result in results])
+
+    def test_search_comments_with_wildcard_should_match_inside_words(self):
+        results = search_comments(self._user_id, '%c7d659a2%', 1, 100)['results']
+
+        self.assertEqual(1, len(results))
+        self.assertIn('10.20.30.41', results[0]['comment_text'])
+
+    def test_search_notes_without_wildcard_should_use_the_full_text_search(self):
+        results = search_notes(self._user_id, 'beaconing', 1, 100)['results']
+
+        self.assertEqual(['Beaconing'], [result['note_title'] for result in results])
+        self.assertIn('rank', results[0])
+
+    def test_search_notes_without_wildcard_should_match_ips_hashes_and_domains(self):
+        for search_value in ['10.20.30.40', '884c7d659a2f', 'evil-domain']:
+            with self.subTest(search_value=search_value):
+                results = search_notes(self._user_id, search_value, 1, 100)['results']
+
+                self.assertEqual(['Beaconing'], [result['note_title'] for result in results])
+
+    def test_search_notes_should_match_words_inside_longer_tokens(self):
+        # The full-text search does not split the domain, the word is matched as a substring
+        results = search_notes(self._user_id, 'evil', 1, 100)['results']
+        self.assertEqual(['Beaconing'], [result['note_title'] for result in results])
+        self.assertNotIn('rank', results[0])
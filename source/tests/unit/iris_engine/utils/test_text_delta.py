@@ -0,0 +1,63 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+from app.iris_engine.utils.text_delta import apply_text_delta
+from app.iris_engine.utils.text_delta import compute_text_delta
+from app.iris_engine.utils.text_delta import encode_text_versions
+
+NOTE = ''.join(f'Line {i} of the investigation notes, with some details about host_{i}\n' for i in range(200))
+
+
+class TestTextDelta(TestCase):
+
+    def test_apply_text_delta_should_rebuild_the_target(self):
+        target = NOTE.replace('host_42', 'host_43') + 'A new finding\n'
+
+        self.assertEqual(target, apply_text_delta(NOTE, compute_text_delta(NOTE, target)))
+
+    def test_apply_text_delta_should_handle_texts_without_final_newline(self):
+        self.assertEqual('first\nsecond', apply_text_delta('first\n', compute_text_delta('first\n', 'first\nsecond')))
+        self.assertEqual('', apply_text_delta(NOTE, compute_text_delta(NOTE, '')))
+
+    def test_compute_text_delta_should_be_compact_for_small_edits(self):
+        target = NOTE.replace('host_42', 'host_43')
+
+        self.assertLess(len(compute_text_delta(NOTE, target)), len(target) / 20)
+
+    def test_encode_text_versions_should_take_a_snapshot_every_interval(self):
+        versions = [(number, NOTE + f'Edit {number}\n') for number in range(1, 8)]
+
+        encoded = encode_text_versions(versions, snapshot_interval=3)
+
+        self.assertEqual([None, 1, 1, None, 4, 4, None], [snapshot for _, snapshot, _, _ in encoded])
+        for (number, text), (_, snapshot, content, delta) in zip(versions, encoded):
+            if snapshot is None:
+                self.assertEqual(text, content)
+            else:
+                self.assertIsNone(content)
+                self.assertEqual(text, apply_text_delta(dict(versions)[snapshot], delta))
+
+    def test_encode_text_versions_should_take_a_snapshot_when_the_delta_is_not_compact(self):
+        versions = [(1, NOTE), (2, 'A completely rewritten note\n')]
+
+        encoded = encode_text_versions(versions, snapshot_interval=20)
+
+        self.assertEqual((2, None, 'A completely rewritten note\n', None), encoded[1])
@@ -0,0 +1,56 @@
+#  IRIS Source Code
+#  Copyright (C) 2024 - DFIR-IRIS
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from unittest import TestCase
+
+import os
+from celery.signals import worker_process_shutdown
+from datetime import datetime
+
+from app import app
+from app.iris_engine.utils import tracker
+from app.models import UserActivity
+from app.post_init import run_post_init
+from tests.clean_database import clean_db
+
+
+class TestTracker(TestCase):
+    def setUp(self) -> None:
+        clean_db()
+        run_post_init()
+
+        self._flush_interval = app.config.get('ACTIVITY_FLUSH_INTERVAL')
+        # Stops the writer left by a previous test, so a new one starts with the interval below
+        tracker._drain_activity_queue()
+        app.config['ACTIVITY_FLUSH_INTERVAL'] = 60
+
+    def tearDown(self) -> None:
+        tracker._drain_activity_queue()
+        app.config['ACTIVITY_FLUSH_INTERVAL'] = self._flush_interval
+        clean_db()
+
+    def test_worker_process_shutdown_should_write_the_queued_activities(self):
+        for i in range(3):
+            tracker._enqueue_activity({'user_id': None, 'case_id': None, 'activity_date': datetime.utcnow(),
+                                       'activity_desc': f'Queued activity {i}', 'user_input': False,
+                                       'is_from_api': False, 'display_in_ui': True})
+
+        worker_process_shutdown.send(sender=None, pid=os.getpid(), exitcode=0)
+
+        self.assertEqual(3, UserActivity.query.filter(UserActivity.activity_desc.like('Queued activity %')).count())